@@ -8,6 +8,8 @@ from pydantic import BaseModel
 
 from models.geodata import GeoDataObject
 from services.ai.llm_config import get_llm
+from services.storage.file_management import local_upload_path
+from services.storage.layer_stats import dominant_geometry_type, get_layer_stats
 
 logger = logging.getLogger(__name__)
 
@@ -212,11 +214,21 @@ def detect_geometry_type(data_link: str) -> str:
     """
     Detect the geometry type from GeoJSON data by examining the first feature.
     Returns the geometry type or 'Mixed' if multiple types are found.
+
+    Local uploads are answered from their layer statistics sidecar without
+    reading the file.
     """
     # Default to Polygon for uploaded files as a fallback
     default_type = "Polygon"
 
     try:
+        local_path = local_upload_path(data_link)
+        if local_path:
+            stats = get_layer_stats(local_path)
+            detected_type = dominant_geometry_type(stats) if stats else None
+            if detected_type:
+                logger.info(f"Detected geometry type from layer statistics: {detected_type}")
+                return detected_type
         import json
 
         import requests
@@ -1,10 +1,12 @@
+import html
 import io
 import json
 import os
 import uuid
 from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import HTMLResponse
 from kml2geojson.main import convert as kml2geojson_convert
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from pydantic import BaseModel
@@ -21,6 +23,7 @@ from services.agents.langgraph_agent import SearchState, executor
 from services.multi_agent_orch import multi_agent_executor
 from services.storage.file_management import store_file
 from services.tools.geocoding import geocode_using_nominatim
+from utility import tracing
 from utility.string_methods import clean_allow
 
 # Geo conversion
@@ -315,3 +318,53 @@ async def geoprocess(req: NaLaMapRequest):
     # geodataResponse.global_geodata=global_geodata
     geodataResponse.messages = [*req.messages, AIMessage(response_str)]
     return geodataResponse
+
+
+# --- Trace Viewer ---
+
+
+def _waterfall_html(trace_id: str, spans: List[Dict[str, Any]]) -> str:
+    """Render the spans of a trace as a minimal HTML waterfall."""
+    total = max(s["offset_ms"] + s["duration_ms"] for s in spans) or 1.0
+    rows = []
+    for s in spans:
+        left = 100 * s["offset_ms"] / total
+        width = max(100 * s["duration_ms"] / total, 0.2)
+        color = "#d9534f" if s["status"]["code"] == "ERROR" else "#5b8def"
+        attributes = html.escape(json.dumps(s["attributes"], default=str))
+        rows.append(
+            f'<tr title="{attributes}"><td style="padding-left:{s["depth"]}em">'
+            f'{html.escape(s["name"])}</td><td align="right">{s["duration_ms"]:.1f} ms</td>'
+            f'<td><div style="margin-left:{left:.2f}%;width:{width:.2f}%;'
+            f'background:{color};height:1em"></div></td></tr>'
+        )
+    return (
+        f"<html><head><title>Trace {trace_id}</title></head>"
+        f'<body style="font-family:sans-serif"><h3>Trace {trace_id} ({total:.1f} ms)</h3>'
+        '<table style="width:100%;border-collapse:collapse">'
+        '<col style="width:30%"><col style="width:8%"><col style="width:62%">'
+        f'{"".join(rows)}</table></body></html>'
+    )
+
+
+@router.get("/debug/traces", tags=["debug"])
+async def list_traces():
+    """List the sampled request traces kept in memory, newest first.
+
+    Tracing is enabled with TRACE_SAMPLE_RATE (fraction of chat requests).
+    """
+    return {"traces": tracing.get_recent_traces()}
+
+
+@router.get("/debug/traces/{trace_id}", tags=["debug"])
+async def get_trace(trace_id: str, format: str = Query(default="json", pattern="^(json|html)$")):
+    """Get one trace as a waterfall: spans in start order with offsets and depth.
+
+    ``format=html`` renders the waterfall as a page.
+    """
+    spans = tracing.get_trace_waterfall(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail=f"Trace {trace_id} not found")
+    if format == "html":
+        return HTMLResponse(_waterfall_html(trace_id, spans))
+    return {"trace_id": trace_id, "spans": spans}
@@ -4,23 +4,36 @@ Streaming endpoint for efficient serving of large GeoJSON files.
 This endpoint provides:
 - Chunked streaming transfer for large files
 - Proper content-type handling for GeoJSON
-- Range request support
-- Gzip compression support for large files
+- Range request support, including multiple ranges (multipart/byteranges)
+- Precompressed brotli/zstd/gzip variants of large files, negotiated from Accept-Encoding
 - Better memory efficiency than StaticFiles for large files
+
+Disk reads never run on the event loop: every chunk is read with ``os.pread``
+on a dedicated thread pool (``FILE_STREAM_WORKERS`` threads), so slow disks or
+many concurrent downloads don't delay other requests such as chat streams.
+Ranges always address the uncompressed content; when only the gzip variant is
+available they are read from it through its offset index.
 """
 
+import asyncio
 import logging
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Iterator, List, Optional, Tuple
 
 from fastapi import APIRouter, HTTPException, Request, status
 from fastapi.responses import StreamingResponse
 
-from core.config import LOCAL_UPLOAD_DIR
-from services.compression.gzip_utils import (
-    compress_file,
-    get_file_to_serve,
-    should_compress_file,
+from core.config import FILE_STREAM_WORKERS, LOCAL_UPLOAD_DIR
+from services.compression.gzip_utils import get_file_to_serve, iter_gzip_range, load_gzip_index
+from services.compression.variants import (
+    negotiate_encoding,
+    ready_variants,
+    schedule_precompression,
 )
 from utility.string_methods import sanitize_filename
 
@@ -31,6 +44,24 @@ logger = logging.getLogger(__name__)
 # Chunk size for streaming (1MB)
 CHUNK_SIZE = 1024 * 1024
 
+# Requests with more ranges than this are answered with the full file
+MAX_RANGES = 16
+
+_read_executor: Optional[ThreadPoolExecutor] = None
+_read_executor_lock = threading.Lock()
+
+
+def _get_read_executor() -> ThreadPoolExecutor:
+    """Thread pool dedicated to file reads."""
+    global _read_executor
+    if _read_executor is None:
+        with _read_executor_lock:
+            if _read_executor is None:
+                _read_executor = ThreadPoolExecutor(
+                    max_workers=FILE_STREAM_WORKERS, thread_name_prefix="file-stream"
+                )
+    return _read_executor
+
 
 def get_file_path(filename: str) -> Path:
     """
@@ -84,61 +115,182 @@ def get_file_path(filename: str) -> Path:
     return file_path
 
 
+def _pread(fd: int, size: int, offset: int) -> bytes:
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    # Windows has no pread; the descriptor is private to one range anyway
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, size)
+
+
+def _iter_file_range(file_path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """Blocking generator of the bytes ``start`` to ``end`` (inclusive) of a file."""
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        offset = start
+        while end is None or offset <= end:
+            size = CHUNK_SIZE if end is None else min(CHUNK_SIZE, end - offset + 1)
+            chunk = _pread(fd, size, offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+    finally:
+        os.close(fd)
+
+
+async def _iterate_in_pool(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """Advance a blocking chunk generator on the read pool, one chunk at a time."""
+    loop = asyncio.get_running_loop()
+    executor = _get_read_executor()
+    pending = None
+    try:
+        while True:
+            pending = loop.run_in_executor(executor, next, chunks, None)
+            chunk = await pending
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        if pending is not None and not pending.done():
+            # Client went away mid-read; close once the read has finished
+            pending.add_done_callback(lambda _: chunks.close())
+        else:
+            chunks.close()
+
+
 async def file_iterator(file_path: Path, start: int = 0, end: Optional[int] = None):
     """
-    Async generator to yield file chunks with explicit flushing.
+    Async generator to yield file chunks read on the file stream thread pool.
 
     Args:
         file_path: Path to the file
         start: Start byte position
-        end: End byte position (None for end of file)
+        end: End byte position, inclusive (None for end of file)
 
     Yields:
         Chunks of file data
     """
+    bytes_read = 0
+    chunk_count = 0
     try:
-        # Use synchronous file I/O but make the generator async
-        # This ensures proper async context handling
-        with open(file_path, "rb") as f:
-            f.seek(start)
-            remaining = end - start + 1 if end else None
-            bytes_read = 0
-            chunk_count = 0
+        async for chunk in _iterate_in_pool(_iter_file_range(file_path, start, end)):
+            bytes_read += len(chunk)
+            chunk_count += 1
+            yield chunk
+
+        logger.info(
+            f"Finished streaming {file_path.name}: "
+            f"{bytes_read} bytes sent ({chunk_count} chunks)"
+        )
+    except Exception as e:
+        logger.error(f"Error streaming file {file_path}: {e}", exc_info=True)
+        raise
 
-            while True:
-                chunk_size = CHUNK_SIZE
-                if remaining is not None:
-                    chunk_size = min(chunk_size, remaining)
 
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    break
+def parse_range_header(range_header: str, size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a ``Range`` header into satisfiable, inclusive byte ranges.
 
-                bytes_read += len(chunk)
-                chunk_count += 1
+    Ranges are clamped to the content, sorted, and overlapping or adjacent
+    ranges are merged.
 
-                # Yield chunk and ensure it's sent
-                yield chunk
+    Args:
+        range_header: Value of the Range header (e.g. "bytes=0-99,200-")
+        size: Size of the content in bytes
 
-                # CRITICAL: Give control back to event loop after EVERY chunk
-                # This prevents the async generator from blocking FastAPI's event loop
-                # Without this, nginx sees "upstream prematurely closed connection"
-                import asyncio
+    Returns:
+        List of (start, end) tuples, or None if the header should be ignored
+        because it asks for more than MAX_RANGES ranges
 
-                await asyncio.sleep(0)
+    Raises:
+        ValueError: If the header is malformed
+        HTTPException: 416 if none of the ranges overlaps the content
+    """
+    unit, _, specs = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        raise ValueError(f"Unsupported range unit: {range_header}")
+    specs = specs.split(",")
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for spec in specs:
+        first, dash, last = spec.strip().partition("-")
+        if not dash:
+            raise ValueError(f"Invalid range: {spec}")
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length > 0 and size > 0:
+                ranges.append((max(size - length, 0), size - 1))
+            continue
+        start = int(first)
+        end = int(last) if last else size - 1
+        if start < 0 or end < start:
+            raise ValueError(f"Invalid range: {spec}")
+        if start < size:
+            ranges.append((start, min(end, size - 1)))
+
+    if not ranges:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Invalid range",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
 
-                if remaining is not None:
-                    remaining -= len(chunk)
-                    if remaining <= 0:
-                        break
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+async def _multipart_iterator(
+    read_range: Callable[[int, int], Iterator[bytes]],
+    ranges: List[Tuple[int, int]],
+    boundary: str,
+    content_type: str,
+    size: int,
+) -> AsyncIterator[bytes]:
+    """Yield a multipart/byteranges body for ``ranges``."""
+    for start, end in ranges:
+        yield (
+            f"--{boundary}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode("ascii")
+        async for chunk in _iterate_in_pool(read_range(start, end)):
+            yield chunk
+        yield b"\r\n"
+    yield f"--{boundary}--\r\n".encode("ascii")
+
+
+def _range_source(
+    serve_path: Path, encoding: Optional[str]
+) -> Optional[Tuple[Callable[[int, int], Iterator[bytes]], int]]:
+    """
+    Reader and size of the uncompressed content, for range requests.
 
-            logger.info(
-                f"Finished streaming {file_path.name}: "
-                f"{bytes_read} bytes sent ({chunk_count} chunks)"
-            )
-    except Exception as e:
-        logger.error(f"Error streaming file {file_path}: {e}", exc_info=True)
-        raise
+    Returns:
+        (read_range, size), or None if ranges can't be served for this file
+    """
+    if encoding is None:
+        return partial(_iter_file_range, serve_path), serve_path.stat().st_size
+    if encoding != "gzip":
+        return None
+
+    original_path = serve_path.with_suffix("")
+    if original_path.is_file():
+        return partial(_iter_file_range, original_path), original_path.stat().st_size
+
+    index = load_gzip_index(serve_path)
+    if index is None:
+        return None
+    read_range = partial(iter_gzip_range, serve_path, index, chunk_size=CHUNK_SIZE)
+    return read_range, index["size"]
 
 
 def get_content_type(filename: str) -> str:
@@ -164,11 +316,15 @@ def get_content_type(filename: str) -> str:
 @router.get("/stream/{filename:path}")
 async def stream_file(filename: str, request: Request):
     """
-    Stream a file with support for range requests and gzip compression.
+    Stream a file with support for range requests and precompressed variants.
 
     This endpoint efficiently streams large files using chunked transfer,
     reducing memory usage compared to loading entire files into memory.
-    For large files (>1MB), serves pre-compressed .gz version if available.
+    For large files (>1MB), serves the best precompressed variant (brotli,
+    zstd or gzip) the client accepts. Variants are built in the background;
+    until they are ready the uncompressed file is served.
+    Range requests address the uncompressed content; several ranges are
+    answered with a multipart/byteranges body.
 
     Args:
         filename: Path to the file relative to upload directory
@@ -178,15 +334,30 @@ async def stream_file(filename: str, request: Request):
         StreamingResponse with file content (optionally compressed)
 
     Raises:
-        HTTPException: If file doesn't exist or is invalid
+        HTTPException: If file doesn't exist or is invalid, 400 for a malformed
+            Range header, 416 if no requested range overlaps the file
     """
-    # Check if client accepts gzip encoding
     accept_encoding = request.headers.get("accept-encoding", "")
-    client_accepts_gzip = "gzip" in accept_encoding.lower()
+    range_header = request.headers.get("range")
 
-    # Determine which file to serve (original or compressed)
-    # This also validates the filename and sanitizes it
-    serve_path, is_compressed = get_file_to_serve(filename)
+    safe_filename = sanitize_filename(filename)
+    original_path = Path(LOCAL_UPLOAD_DIR) / safe_filename if safe_filename else None
+
+    if original_path is not None and original_path.is_file():
+        serve_path, encoding = original_path, None
+        # Ranges address the uncompressed content, so only full downloads
+        # are served from a precompressed variant
+        if not range_header:
+            variants = ready_variants(original_path)
+            encoding = negotiate_encoding(accept_encoding, variants)
+            if encoding:
+                serve_path = variants[encoding]
+        # Until the variants are ready, the uncompressed file is served
+        schedule_precompression(original_path)
+    else:
+        # Only the gzip variant of the file is left
+        serve_path, is_compressed = get_file_to_serve(filename)
+        encoding = "gzip" if is_compressed else None
 
     # Validate that serve_path exists
     if not serve_path.exists():
@@ -196,14 +367,6 @@ async def stream_file(filename: str, request: Request):
             detail="File not found",
         )
 
-    # If not compressed but should be, compress it now
-    if not is_compressed and client_accepts_gzip and should_compress_file(serve_path):
-        logger.info(f"Pre-compressing {filename} on first request...")
-        compressed = compress_file(serve_path)
-        if compressed:
-            serve_path = compressed
-            is_compressed = True
-
     # Get file size
     file_size = serve_path.stat().st_size
 
@@ -212,68 +375,72 @@ async def stream_file(filename: str, request: Request):
         "Content-Type": get_content_type(filename),
         "Accept-Ranges": "bytes",
         "Cache-Control": "public, max-age=3600",
+        "Vary": "Accept-Encoding",
     }
 
-    if is_compressed:
-        headers["Content-Encoding"] = "gzip"
+    if encoding:
+        headers["Content-Encoding"] = encoding
         # Use original filename in content-disposition
         headers["Content-Disposition"] = f'inline; filename="{filename}"'
 
-    # Check for range request (not supported with compression)
-    range_header = request.headers.get("range")
+    source = _range_source(serve_path, encoding) if range_header else None
 
-    if range_header and not is_compressed:
-        # Parse range header (e.g., "bytes=0-1023")
+    if source is not None:
+        read_range, content_size = source
         try:
-            range_str = range_header.replace("bytes=", "")
-            start, end = range_str.split("-")
-            start = int(start) if start else 0
-            end = int(end) if end else file_size - 1
-
-            # Validate range
-            if start >= file_size or end >= file_size or start > end:
-                raise HTTPException(
-                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
-                    detail="Invalid range",
-                    headers={"Content-Range": f"bytes */{file_size}"},
-                )
+            ranges = parse_range_header(range_header, content_size)
+        except ValueError as e:
+            logger.error(f"Invalid range header: {range_header}, error: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid range header",
+            )
+    else:
+        ranges = None
+
+    if ranges:
+        # Ranges address the uncompressed content
+        headers.pop("Content-Encoding", None)
+        content_type = headers["Content-Type"]
 
+        if len(ranges) == 1:
+            start, end = ranges[0]
             logger.info(
-                f"Streaming file {filename} with range: " f"bytes {start}-{end}/{file_size}"
+                f"Streaming file {filename} with range: " f"bytes {start}-{end}/{content_size}"
             )
-
-            # For range requests, we CAN keep Content-Length since it's partial content
-            # But remove it if you see issues with partial content streaming too
             return StreamingResponse(
-                file_iterator(serve_path, start, end),
+                _iterate_in_pool(read_range(start, end)),
                 status_code=status.HTTP_206_PARTIAL_CONTENT,
                 headers={
                     **headers,
-                    "Content-Range": f"bytes {start}-{end}/{file_size}",
+                    "Content-Range": f"bytes {start}-{end}/{content_size}",
                 },
             )
-        except ValueError as e:
-            logger.error(f"Invalid range header: {range_header}, error: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid range header",
-            )
-    else:
-        # Full file stream
-        compression_note = " (gzip)" if is_compressed else ""
-        logger.info(f"Streaming full file {filename} ({file_size} bytes){compression_note}")
-        logger.info(f"Serving file: {serve_path} (exists: {serve_path.exists()})")
-
-        # Do NOT set Content-Length for streaming responses!
-        # This forces chunked transfer encoding which is required for proper
-        # async streaming in Azure Container Apps. Setting Content-Length can
-        # cause nginx to see "upstream prematurely closed connection"
+
+        logger.info(f"Streaming file {filename} with {len(ranges)} ranges")
+        boundary = secrets.token_hex(16)
+        headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
         return StreamingResponse(
-            file_iterator(serve_path),
-            status_code=status.HTTP_200_OK,
+            _multipart_iterator(read_range, ranges, boundary, content_type, content_size),
+            status_code=status.HTTP_206_PARTIAL_CONTENT,
             headers=headers,
         )
 
+    # Full file stream (also when the ranges can't be served for this file)
+    compression_note = f" ({encoding})" if encoding else ""
+    logger.info(f"Streaming full file {filename} ({file_size} bytes){compression_note}")
+    logger.info(f"Serving file: {serve_path} (exists: {serve_path.exists()})")
+
+    # Do NOT set Content-Length for streaming responses!
+    # This forces chunked transfer encoding which is required for proper
+    # async streaming in Azure Container Apps. Setting Content-Length can
+    # cause nginx to see "upstream prematurely closed connection"
+    return StreamingResponse(
+        file_iterator(serve_path),
+        status_code=status.HTTP_200_OK,
+        headers=headers,
+    )
+
 
 @router.head("/stream/{filename:path}")
 async def head_file(filename: str):
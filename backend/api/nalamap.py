@@ -192,8 +192,9 @@ async def _prepare_chat_context(
     Returns:
         Tuple of (state, single_agent, options, perf_callback, session_id, stream_id, plan)
     """
-    from services.planner import build_plan_system_addendum, create_execution_plan
+    from services.planner import create_execution_plan
     from services.single_agent import create_geo_agent, prepare_messages
+    from utility import tracing
     from utility.performance_metrics import PerformanceCallbackHandler
 
     logger.info(f"[CHAT] query={request.query[:120]!r}")
@@ -236,26 +237,28 @@ async def _prepare_chat_context(
     # Get enabled MCP servers from options (pass full objects for auth)
     mcp_servers = [server for server in getattr(options, "mcp_servers", []) if server.enabled]
 
-    single_agent, llm = await create_geo_agent(
-        model_settings=options.model_settings,
-        selected_tools=options.tools,
-        enable_parallel_tools=enable_parallel_tools,
-        query=request.query,
-        session_id=options.session_id,
-        mcp_servers=mcp_servers if mcp_servers else None,
-    )
+    with tracing.span("agent.create"):
+        single_agent, llm = await create_geo_agent(
+            model_settings=options.model_settings,
+            selected_tools=options.tools,
+            enable_parallel_tools=enable_parallel_tools,
+            query=request.query,
+            session_id=options.session_id,
+            mcp_servers=mcp_servers if mcp_servers else None,
+        )
 
     # Get message management mode from settings (or fall back to env var)
     message_management_mode = getattr(options.model_settings, "message_management_mode", None)
 
     # Prepare messages (summarization or pruning based on settings/env)
-    messages = await prepare_messages(
-        messages=messages,
-        message_window_size=message_window_size,
-        session_id=options.session_id,
-        llm=llm,
-        settings_mode=message_management_mode,
-    )
+    with tracing.span("messages.prepare", message_count=len(messages)):
+        messages = await prepare_messages(
+            messages=messages,
+            message_window_size=message_window_size,
+            session_id=options.session_id,
+            llm=llm,
+            settings_mode=message_management_mode,
+        )
 
     # Track message count after processing
     metrics.record("message_count_after", len(messages))
@@ -263,8 +266,9 @@ async def _prepare_chat_context(
 
     # --- Multi-step Planning ---
     # Analyze the query to determine if it requires a multi-step plan.
-    # If so, the plan is injected into the agent's prompt so it follows
-    # the structured steps, and streamed to the frontend for visibility.
+    # If so, the plan goes into the agent state, from which the agent's prompt
+    # includes it on every model call so it follows the structured steps, and
+    # is streamed to the frontend for visibility.
     enable_planning = getattr(options.model_settings, "enable_planning", False)
     execution_plan = None
 
@@ -282,12 +286,13 @@ async def _prepare_chat_context(
                 ]
 
             metrics.start_timer("planning")
-            execution_plan = await create_execution_plan(
-                query=request.query,
-                llm=llm,
-                messages=messages,
-                existing_layers=existing_layers,
-            )
+            with tracing.span("plan.create"):
+                execution_plan = await create_execution_plan(
+                    query=request.query,
+                    llm=llm,
+                    messages=messages,
+                    existing_layers=existing_layers,
+                )
             metrics.end_timer("planning")
 
             if execution_plan:
@@ -296,18 +301,6 @@ async def _prepare_chat_context(
                     f"for query: {request.query[:80]}"
                 )
                 metrics.record("plan_steps", len(execution_plan.steps))
-
-                # Inject plan into agent by rebuilding with augmented prompt
-                plan_addendum = build_plan_system_addendum(execution_plan)
-                single_agent, llm = await create_geo_agent(
-                    model_settings=options.model_settings,
-                    selected_tools=options.tools,
-                    enable_parallel_tools=enable_parallel_tools,
-                    query=request.query,
-                    session_id=options.session_id,
-                    mcp_servers=mcp_servers if mcp_servers else None,
-                    system_prompt_addendum=plan_addendum,
-                )
         except Exception as e:
             logger.warning(f"Planning failed, proceeding without plan: {e}")
             execution_plan = None
@@ -567,6 +560,8 @@ async def ask_nalamap_agent_stream(request: NaLaMapRequest, raw_request: Request
     from fastapi.responses import StreamingResponse
 
     from services.planner import match_tool_to_plan_step, update_plan_step_status
+    from utility import tracing
+    from utility.metrics_exporter import count_sse_events
     from utility.metrics_storage import get_metrics_storage
     from utility.performance_metrics import (
         PerformanceMetrics,
@@ -593,6 +588,9 @@ async def ask_nalamap_agent_stream(request: NaLaMapRequest, raw_request: Request
                 stream_id,
                 execution_plan,
             ) = await _prepare_chat_context(request, raw_request, metrics)
+            root_span = tracing.current_span()
+            if root_span is not None:
+                root_span.set_attribute("session.id", session_id)
 
             # If we have an execution plan, stream it to the frontend
             if execution_plan:
@@ -616,7 +614,9 @@ async def ask_nalamap_agent_stream(request: NaLaMapRequest, raw_request: Request
 
             while True:  # Outer loop: plan continuation
                 aiter = single_agent.astream_events(
-                    current_state, version="v2", config={"callbacks": [perf_callback]}
+                    current_state,
+                    version="v2",
+                    config={"callbacks": [perf_callback, *tracing.callbacks()]},
                 ).__aiter__()
 
                 while True:  # Inner loop: event processing
@@ -853,23 +853,24 @@ async def ask_nalamap_agent_stream(request: NaLaMapRequest, raw_request: Request
                     },
                 )
 
-                # Convert messages to serializable format
-                serializable_messages = []
-                for msg in result_messages:
-                    if isinstance(msg, HumanMessage):
-                        serializable_messages.append({"type": "human", "content": msg.content})
-                    elif isinstance(msg, AIMessage):
-                        serializable_messages.append({"type": "ai", "content": msg.content})
-                    elif isinstance(msg, SystemMessage):
-                        serializable_messages.append({"type": "system", "content": msg.content})
-
-                serialized_results = [
-                    r.model_dump() if hasattr(r, "model_dump") else r for r in geodata_results
-                ]
-                serialized_layers = [
-                    layer.model_dump() if hasattr(layer, "model_dump") else layer
-                    for layer in geodata_layers
-                ]
+                with tracing.span("response.serialize", layer_count=len(geodata_layers)):
+                    # Convert messages to serializable format
+                    serializable_messages = []
+                    for msg in result_messages:
+                        if isinstance(msg, HumanMessage):
+                            serializable_messages.append({"type": "human", "content": msg.content})
+                        elif isinstance(msg, AIMessage):
+                            serializable_messages.append({"type": "ai", "content": msg.content})
+                        elif isinstance(msg, SystemMessage):
+                            serializable_messages.append({"type": "system", "content": msg.content})
+
+                    serialized_results = [
+                        r.model_dump() if hasattr(r, "model_dump") else r for r in geodata_results
+                    ]
+                    serialized_layers = [
+                        layer.model_dump() if hasattr(layer, "model_dump") else layer
+                        for layer in geodata_layers
+                    ]
 
                 # Mark any remaining plan steps as complete
                 if execution_plan:
@@ -891,7 +892,9 @@ async def ask_nalamap_agent_stream(request: NaLaMapRequest, raw_request: Request
                     "geodata_layers": serialized_layers,
                     "metrics": final_metrics,
                 }
-                yield f"data: {json.dumps(result_data)}\n\n"
+                with tracing.span("response.encode"):
+                    payload = json.dumps(result_data)
+                yield f"data: {payload}\n\n"
 
             # Send done event
             yield "event: done\n"
@@ -923,7 +926,7 @@ async def ask_nalamap_agent_stream(request: NaLaMapRequest, raw_request: Request
             await clear_cancellation(stream_id)
 
     return StreamingResponse(
-        event_generator(),
+        count_sse_events(tracing.trace_stream(event_generator(), "chat.stream")),
         media_type="text/event-stream",
         headers={
             "Cache-Control": "no-cache",
@@ -15,14 +15,17 @@ Security Considerations:
 - Private network access is blocked (SSRF prevention)
 """
 
+import json
 import logging
 from typing import Optional
 from urllib.parse import urlparse
 
-import requests
+import httpx
 from fastapi import APIRouter, HTTPException, Query
 from fastapi.responses import JSONResponse, Response
 
+from services import http_client
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
@@ -106,45 +109,41 @@ async def proxy_geojson(
     logger.info(f"Proxying GeoJSON request to: {request_url}")
 
     try:
-        response = requests.get(
+        async with http_client.astream(
+            "GET",
             request_url,
             headers={
                 "Accept": "application/json, application/geo+json, */*;q=0.1",
                 "User-Agent": "NaLaMap-Proxy/1.0 (github.com/nalamap)",
             },
             timeout=REQUEST_TIMEOUT,
-            stream=True,
-        )
-        response.raise_for_status()
-
-        # Check content length if available
-        content_length = response.headers.get("content-length")
-        if content_length and int(content_length) > MAX_PROXY_RESPONSE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=(
-                    f"Response too large: {content_length} bytes "
-                    f"(max: {MAX_PROXY_RESPONSE_SIZE})"
-                ),
-            )
-
-        # Read the response content with size limit
-        content = b""
-        for chunk in response.iter_content(chunk_size=8192):
-            content += chunk
-            if len(content) > MAX_PROXY_RESPONSE_SIZE:
+        ) as response:
+            response.raise_for_status()
+
+            # Check content length if available
+            content_length = response.headers.get("content-length")
+            if content_length and int(content_length) > MAX_PROXY_RESPONSE_SIZE:
                 raise HTTPException(
                     status_code=413,
-                    detail=f"Response exceeded maximum size of {MAX_PROXY_RESPONSE_SIZE} bytes",
+                    detail=(
+                        f"Response too large: {content_length} bytes "
+                        f"(max: {MAX_PROXY_RESPONSE_SIZE})"
+                    ),
                 )
 
+            # Read the response content with size limit
+            content = bytearray()
+            async for chunk in response.aiter_bytes(chunk_size=65536):
+                content += chunk
+                if len(content) > MAX_PROXY_RESPONSE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Response exceeded maximum size of {MAX_PROXY_RESPONSE_SIZE} bytes",
+                    )
+
         # Parse as JSON
         try:
-            json_data = (
-                response.json()
-                if not content
-                else __import__("json").loads(content.decode("utf-8"))
-            )
+            json_data = json.loads(content)
         except Exception as e:
             logger.error(f"Failed to parse response as JSON: {e}")
             raise HTTPException(status_code=502, detail="External server returned invalid JSON")
@@ -158,14 +157,14 @@ async def proxy_geojson(
             },
         )
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error(f"Timeout fetching from: {request_url}")
         raise HTTPException(status_code=504, detail="Request to external server timed out")
-    except requests.exceptions.ConnectionError as e:
+    except httpx.TransportError as e:
         logger.error(f"Connection error fetching from {request_url}: {e}")
         raise HTTPException(status_code=502, detail="Could not connect to external server")
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else 502
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
         logger.error(f"HTTP error fetching from {request_url}: {e}")
         raise HTTPException(
             status_code=status_code,
@@ -212,43 +211,43 @@ async def proxy_image(
     logger.info(f"Proxying image request to: {url}")
 
     try:
-        response = requests.get(
+        async with http_client.astream(
+            "GET",
             url,
             headers={
                 "Accept": "image/png, image/jpeg, image/gif, image/webp, image/svg+xml, */*",
                 "User-Agent": "NaLaMap-Proxy/1.0 (github.com/nalamap)",
             },
             timeout=REQUEST_TIMEOUT,
-            stream=True,
-        )
-        response.raise_for_status()
-
-        # Check content type
-        content_type = response.headers.get("content-type", "").split(";")[0].strip()
-        if not content_type:
-            content_type = "image/png"  # Default to PNG for unspecified types
-
-        # Check content length if available
-        content_length = response.headers.get("content-length")
-        if content_length and int(content_length) > MAX_IMAGE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=(f"Image too large: {content_length} bytes " f"(max: {MAX_IMAGE_SIZE})"),
-            )
-
-        # Read the response content with size limit
-        content = b""
-        for chunk in response.iter_content(chunk_size=8192):
-            content += chunk
-            if len(content) > MAX_IMAGE_SIZE:
+        ) as response:
+            response.raise_for_status()
+
+            # Check content type
+            content_type = response.headers.get("content-type", "").split(";")[0].strip()
+            if not content_type:
+                content_type = "image/png"  # Default to PNG for unspecified types
+
+            # Check content length if available
+            content_length = response.headers.get("content-length")
+            if content_length and int(content_length) > MAX_IMAGE_SIZE:
                 raise HTTPException(
                     status_code=413,
-                    detail=f"Image exceeded maximum size of {MAX_IMAGE_SIZE} bytes",
+                    detail=(f"Image too large: {content_length} bytes " f"(max: {MAX_IMAGE_SIZE})"),
                 )
 
+            # Read the response content with size limit
+            content = bytearray()
+            async for chunk in response.aiter_bytes(chunk_size=65536):
+                content += chunk
+                if len(content) > MAX_IMAGE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Image exceeded maximum size of {MAX_IMAGE_SIZE} bytes",
+                    )
+
         # Return the image with appropriate headers
         return Response(
-            content=content,
+            content=bytes(content),
             media_type=content_type,
             headers={
                 "X-Proxied-From": url,
@@ -256,14 +255,14 @@ async def proxy_image(
             },
         )
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error(f"Timeout fetching image from: {url}")
         raise HTTPException(status_code=504, detail="Request to external server timed out")
-    except requests.exceptions.ConnectionError as e:
+    except httpx.TransportError as e:
         logger.error(f"Connection error fetching image from {url}: {e}")
         raise HTTPException(status_code=502, detail="Could not connect to external server")
-    except requests.exceptions.HTTPError as e:
-        status_code = e.response.status_code if e.response else 502
+    except httpx.HTTPStatusError as e:
+        status_code = e.response.status_code
         logger.error(f"HTTP error fetching image from {url}: {e}")
         raise HTTPException(
             status_code=status_code,
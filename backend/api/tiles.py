@@ -0,0 +1,69 @@
+"""
+Vector tile endpoints for layer files in the upload directory.
+
+Serves Mapbox Vector Tiles so large uploads and tool outputs can be rendered
+without sending the whole file to the client:
+
+- GET /tiles/{filename}/{z}/{x}/{y}.mvt: one tile (204 when empty)
+- GET /tiles/{filename}/tilejson.json: TileJSON with bounds and tile URL template
+"""
+
+import logging
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from starlette.concurrency import run_in_threadpool
+
+from api.file_streaming import get_file_path
+from services.tiles.vector_tiles import get_tile_service
+
+router = APIRouter(tags=["vector-tiles"])
+
+logger = logging.getLogger(__name__)
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get("/tiles/{filename:path}/tilejson.json")
+async def get_tilejson(filename: str, request: Request):
+    """
+    Describe the vector tiles of a layer file.
+
+    The first call parses and indexes the file, so tile requests that follow
+    are served from memory.
+    """
+    file_path = get_file_path(filename)
+    tiles_url = str(request.url_for("get_tile", filename=file_path.name, z=0, x=0, y=0))
+    tiles_url = tiles_url.replace("/0/0/0.mvt", "/{z}/{x}/{y}.mvt")
+    try:
+        return await run_in_threadpool(get_tile_service().metadata, file_path, tiles_url)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+
+@router.get("/tiles/{filename:path}/{z}/{x}/{y}.mvt", name="get_tile")
+async def get_tile(filename: str, z: int, x: int, y: int):
+    """
+    Serve one Mapbox Vector Tile of a layer file.
+
+    Tiles are rendered on first request and cached on disk afterwards.
+
+    Raises:
+        HTTPException: 404 if the file doesn't exist, 400 for tile addresses
+            outside the grid, 422 if the file is not a readable vector layer
+    """
+    file_path = get_file_path(filename)
+    service = get_tile_service()
+    try:
+        service.validate(z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        data = await run_in_threadpool(service.tile, file_path, z, x, y)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+    headers = {"Cache-Control": "public, max-age=3600"}
+    if not data:
+        return Response(status_code=status.HTTP_204_NO_CONTENT, headers=headers)
+    return Response(content=data, media_type=MVT_MEDIA_TYPE, headers=headers)
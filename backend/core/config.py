@@ -44,6 +44,87 @@ COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "lax")  # "lax", "strict", or "no
 # File size limit (100MB)
 MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB in bytes
 
+# In-process cache for parsed vector layers (services/storage/layer_cache.py)
+LAYER_CACHE_MAX_BYTES = int(os.getenv("LAYER_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Shared outbound HTTP client (services/http_client.py); per-host defaults
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "10"))
+# Connections of the client shared by all hosts without a host policy
+HTTP_SHARED_MAX_CONNECTIONS = int(os.getenv("HTTP_SHARED_MAX_CONNECTIONS", "100"))
+HTTP_DEFAULT_TIMEOUT = float(os.getenv("HTTP_DEFAULT_TIMEOUT", "30"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Vector tiles for local layers (services/tiles): generated tiles are cached on
+# disk, parsed + indexed layers are kept in memory for the most recent sources
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", os.path.join(LOCAL_UPLOAD_DIR, ".tiles"))
+TILE_MAX_ZOOM = int(os.getenv("TILE_MAX_ZOOM", "22"))
+TILE_SOURCE_CACHE_SIZE = int(os.getenv("TILE_SOURCE_CACHE_SIZE", "8"))
+
+# File streaming (api/file_streaming.py): disk reads run on a dedicated pool of
+# this many threads, so large downloads never block the event loop nor take
+# threads from the default pool used by other endpoints
+FILE_STREAM_WORKERS = int(os.getenv("FILE_STREAM_WORKERS", "8"))
+
+# Precompressed variants of large uploads (services/compression/variants.py),
+# built in the background on the low-priority pool. Encodings whose library
+# is not installed (brotli, zstandard) are skipped.
+RAW_PRECOMPRESS_ENCODINGS = os.getenv("PRECOMPRESS_ENCODINGS", "br,zstd,gzip")
+PRECOMPRESS_ENCODINGS = [
+    e.strip().lower() for e in RAW_PRECOMPRESS_ENCODINGS.split(",") if e.strip()
+]
+
+# Uploaded layers at least this large are converted in the background to an
+# indexed GeoPackage copy (services/storage/indexed_layers.py), so bbox and
+# column-restricted reads don't parse the whole file. The copy is written
+# BATCH_FEATURES features at a time to bound the converter's memory.
+LAYER_INDEX_MIN_SIZE = int(os.getenv("LAYER_INDEX_MIN_MB", "20")) * 1024 * 1024
+LAYER_INDEX_BATCH_FEATURES = int(os.getenv("LAYER_INDEX_BATCH_FEATURES", "50000"))
+
+# Partitioned spatial joins, overlays and clips (services/tools/geoprocessing/
+# parallel.py): inputs of at least MIN_FEATURES features are split into
+# spatially coherent chunks and processed on this many worker processes.
+# 1 (or less) disables the process pool.
+GEOPROCESSING_WORKERS = int(os.getenv("GEOPROCESSING_WORKERS", str(os.cpu_count() or 1)))
+GEOPROCESSING_PARALLEL_MIN_FEATURES = int(os.getenv("GEOPROCESSING_PARALLEL_MIN_FEATURES", "50000"))
+
+# Attribute filters, field selections and sorts (services/tools/attributes/
+# chunked.py) on uploads at least this large stream batches of CHUNK_FEATURES
+# features from the layer's indexed copy instead of loading it whole
+ATTRIBUTE_CHUNKED_MIN_SIZE = int(os.getenv("ATTRIBUTE_CHUNKED_MIN_MB", "200")) * 1024 * 1024
+ATTRIBUTE_CHUNK_FEATURES = int(os.getenv("ATTRIBUTE_CHUNK_FEATURES", "50000"))
+
+# Compiled agent graphs and LLM clients (services/single_agent.py) are reused
+# across chat requests with the same model, tools, MCP servers and system
+# prompt. The least recently used are evicted beyond CACHE_SIZE entries, and
+# graphs are rebuilt after TTL seconds so tools added to MCP servers show up.
+AGENT_CACHE_SIZE = int(os.getenv("AGENT_CACHE_SIZE", "32"))
+AGENT_CACHE_TTL = float(os.getenv("AGENT_CACHE_TTL", "900"))
+
+# Dynamic tool selection (services/tool_selector.py): tool description
+# embeddings are computed once per embedding model and tool metadata, and kept
+# in this directory across restarts. The embeddings of the last QUERY_CACHE_SIZE
+# distinct queries are kept in memory.
+TOOL_EMBEDDING_CACHE_DIR = os.getenv("TOOL_EMBEDDING_CACHE_DIR", "data/tool_embeddings")
+TOOL_QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("TOOL_QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+
+# Performance metrics (utility/metrics_storage.py) are aggregated per time
+# bucket of BUCKET_SECONDS. If METRICS_DB_PATH is set, request metrics are also
+# written to that SQLite file and replayed at startup, so statistics survive
+# restarts.
+METRICS_BUCKET_SECONDS = float(os.getenv("METRICS_BUCKET_SECONDS", "60"))
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH", "")
+
+# Request tracing (utility/tracing.py): SAMPLE_RATE is the fraction (0-1) of
+# chat requests recorded as traces; the last BUFFER_SIZE traces are kept for the
+# debug trace viewer. Finished traces are also appended to TRACE_FILE_PATH (JSON
+# lines) and/or sent to an OTLP/HTTP collector, e.g.
+# http://localhost:4318/v1/traces, when those are set.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+TRACE_FILE_PATH = os.getenv("TRACE_FILE_PATH", "")
+OTEL_EXPORTER_OTLP_TRACES_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT", "")
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "nalamap-backend")
+
 
 # Database
 
@@ -130,6 +211,27 @@ GEOSERVER_VECTOR_DB_ENV = "NALAMAP_GEOSERVER_VECTOR_DB"
 GEOSERVER_EMBEDDING_FACTORY_ENV = "NALAMAP_GEOSERVER_EMBEDDING_FACTORY"
 DEFAULT_GEOSERVER_VECTOR_DB_PATH = Path("data/geoserver_vectors.db")
 
+# In-memory similarity index: partitions with at least this many layers are
+# searched through an inverted-file (IVF) coarse index instead of exhaustively.
+# 0 disables IVF (exact search); NPROBE is the number of clusters visited.
+GEOSERVER_IVF_MIN_LAYERS = int(os.getenv("NALAMAP_GEOSERVER_IVF_MIN_LAYERS", "0"))
+GEOSERVER_IVF_NPROBE = int(os.getenv("NALAMAP_GEOSERVER_IVF_NPROBE", "8"))
+
+# Layer embedding pipeline: texts are embedded in batches of this size, with up
+# to PARALLEL_BATCHES batches in flight on the background pool. Each batch is
+# committed in its own transaction so an interrupted preload can resume.
+GEOSERVER_EMBEDDING_BATCH_SIZE = int(os.getenv("NALAMAP_GEOSERVER_EMBEDDING_BATCH_SIZE", "128"))
+GEOSERVER_EMBEDDING_PARALLEL_BATCHES = int(
+    os.getenv("NALAMAP_GEOSERVER_EMBEDDING_PARALLEL_BATCHES", "4")
+)
+
+# GetCapabilities documents are cached with their ETag/Last-Modified validators
+# (up to CACHE_SIZE documents) so repeated preloads send conditional requests.
+GEOSERVER_CAPABILITIES_CACHE_SIZE = int(
+    os.getenv("NALAMAP_GEOSERVER_CAPABILITIES_CACHE_SIZE", "64")
+)
+GEOSERVER_CAPABILITIES_TIMEOUT = float(os.getenv("NALAMAP_GEOSERVER_CAPABILITIES_TIMEOUT", "30"))
+
 # Embedding provider configuration
 # Determines which embedding provider to use for GeoServer vector store
 # Options: "hashing" (default), "openai", "azure"
@@ -7,7 +7,7 @@ from logging.handlers import RotatingFileHandler
 from fastapi import FastAPI, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from api import (
@@ -24,12 +24,15 @@ from api import (
     nalamap,
     proxy,
     settings,
+    tiles,
 )
 
 # from sqlalchemy.ext.asyncio import AsyncSession
 from core.config import ALLOWED_CORS_ORIGINS, LOCAL_UPLOAD_DIR
 from services.deployment_config_loader import load_and_validate_config
 from services.startup_preloader import schedule_startup_preload
+from utility import metrics_exporter
+from utility.metrics_exporter import OPENMETRICS_CONTENT_TYPE, PROMETHEUS_CONTENT_TYPE
 
 # Configure logging with environment variable support
 # Set LOG_LEVEL=WARNING in production to reduce noise, DEBUG for verbose output
@@ -100,6 +103,12 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("NaLaMap API shutting down...")
+    from services.http_client import get_http_client
+
+    await get_http_client().aclose()
+    from services.tools.geoprocessing.parallel import shutdown_process_pool
+
+    shutdown_process_pool()
     if engine is not None:
         await engine.dispose()
 
@@ -157,6 +166,7 @@ app.include_router(auto_styling.router, prefix="/api")  # Automatic styling
 app.include_router(settings.router, prefix="/api")
 app.include_router(geocoding_settings.router, prefix="/api")  # OSM tag embedding management
 app.include_router(file_streaming.router, prefix="/api")  # Streaming files
+app.include_router(tiles.router, prefix="/api")  # Vector tiles for layer files
 app.include_router(mcp.router, prefix="/api")  # MCP server endpoint
 app.include_router(proxy.router, prefix="/api/proxy")  # CORS proxy for external data
 app.include_router(maps.router, prefix="/api")
@@ -173,6 +183,16 @@ async def health_check():
     return {"status": "healthy", "message": "NaLaMap API is running"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Agent and server metrics in the OpenMetrics (or Prometheus text) format."""
+    openmetrics = "application/openmetrics-text" in request.headers.get("accept", "")
+    return Response(
+        content=metrics_exporter.render(openmetrics=openmetrics),
+        media_type=OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE,
+    )
+
+
 # Exception handlers
 
 
@@ -7,6 +7,7 @@ from shapely.ops import unary_union
 
 # LLM import
 from services.ai.llm_config import get_llm
+from utility import tracing
 
 # ========== Tool Implementations ==========
 
@@ -237,7 +238,8 @@ async def geoprocess_executor(state: Dict[str, Any]) -> Dict[str, Any]:
         params = step.get("params", {})
         func = TOOL_REGISTRY.get(op_name)
         if func:
-            result = func(result, **params)
+            with tracing.span(f"geoprocess.{op_name}", operation=op_name):
+                result = func(result, **params)
             executed_ops.append(op_name)
 
     return {"tool_sequence": executed_ops, "result_layers": result}
@@ -101,6 +101,10 @@ class BackgroundTaskManager:
         self._active_tasks: dict[str, Any] = {}
         self._task_lock = threading.Lock()
 
+        # Submitted-minus-started task counts per pool, exported as queue depth
+        self._queued = {"high": 0, "low": 0}
+        self._queued_lock = threading.Lock()
+
         self._initialized = True
 
     def submit_task(
@@ -126,19 +130,28 @@ class BackgroundTaskManager:
         # Choose executor based on priority
         if priority == TaskPriority.HIGH:
             executor = self._high_priority_executor
+            pool = "high"
         else:
             executor = self._low_priority_executor
+            pool = "low"
 
-        # For preprocessing tasks, acquire semaphore first
-        if priority == TaskPriority.LOW:
-
-            def wrapped_func(*args, **kwargs):
+        def wrapped_func(*args, **kwargs):
+            self._dequeue(pool)
+            # For preprocessing tasks, acquire semaphore first
+            if priority == TaskPriority.LOW:
                 with self._preload_semaphore:
                     return func(*args, **kwargs)
+            return func(*args, **kwargs)
 
+        with self._queued_lock:
+            self._queued[pool] += 1
+        try:
             future = executor.submit(wrapped_func, *args, **kwargs)
-        else:
-            future = executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._dequeue(pool)
+            raise
+        # A task cancelled before it started never reaches wrapped_func
+        future.add_done_callback(lambda f: f.cancelled() and self._dequeue(pool))
 
         # Track task if ID provided
         if task_id:
@@ -212,6 +225,24 @@ class BackgroundTaskManager:
                 "total_tracked_tasks": len(self._active_tasks),
             }
 
+    def _dequeue(self, pool: str):
+        """Record that a task submitted to ``pool`` has left the queue.
+
+        Args:
+            pool: Pool priority ("high" or "low")
+        """
+        with self._queued_lock:
+            self._queued[pool] -= 1
+
+    def get_queue_depths(self) -> dict:
+        """Get the number of submitted tasks waiting for a free thread.
+
+        Returns:
+            Dict of pool priority ("high", "low") to queued task count
+        """
+        with self._queued_lock:
+            return dict(self._queued)
+
     def shutdown(self, wait: bool = True):
         """Shutdown all thread pools.
 
@@ -237,3 +268,15 @@ def get_task_manager() -> BackgroundTaskManager:
     if _task_manager is None:
         _task_manager = BackgroundTaskManager()
     return _task_manager
+
+
+def get_queue_depths() -> dict:
+    """Get the number of tasks waiting for a thread in each pool.
+
+    Returns:
+        Dict of pool priority ("high", "low") to queued task count, empty if
+        the task manager has not been started
+    """
+    if _task_manager is None:
+        return {}
+    return _task_manager.get_queue_depths()
@@ -2,12 +2,22 @@
 Gzip compression utilities for GeoJSON files.
 
 Pre-compresses large GeoJSON files to reduce transfer size and improve performance.
+
+Compressed files are written with a full deflate flush every ``INDEX_SPAN``
+bytes of input, and the (uncompressed, compressed) offset of each flush point
+is stored next to the ``.gz`` file in a ``.gz.idx`` index. Decompression can
+restart at any flush point, so a byte range of the original content can be
+read from the ``.gz`` file without inflating everything before it.
 """
 
+import bisect
 import gzip
+import json
 import logging
+import os
+import zlib
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, Optional
 
 from core.config import LOCAL_UPLOAD_DIR
 from utility.string_methods import sanitize_filename
@@ -17,6 +27,9 @@ logger = logging.getLogger(__name__)
 # Minimum file size for compression (1MB)
 MIN_COMPRESSION_SIZE = 1024 * 1024
 
+# Uncompressed bytes between two flush points of the offset index (1MB)
+INDEX_SPAN = 1024 * 1024
+
 
 def should_compress_file(file_path: Path) -> bool:
     """
@@ -65,6 +78,19 @@ def get_compressed_path(file_path: Path) -> Path:
     return file_path.with_suffix(file_path.suffix + ".gz")
 
 
+def get_index_path(compressed_path: Path) -> Path:
+    """
+    Get the path of the offset index of a compressed file.
+
+    Args:
+        compressed_path: Path to the compressed file (.gz)
+
+    Returns:
+        Path to the index (.gz.idx)
+    """
+    return compressed_path.with_suffix(compressed_path.suffix + ".idx")
+
+
 def compress_file(file_path: Path, compression_level: int = 6) -> Optional[Path]:
     """
     Compress a file using gzip.
@@ -81,15 +107,20 @@ def compress_file(file_path: Path, compression_level: int = 6) -> Optional[Path]
 
         logger.info(f"Compressing {file_path.name}...")
 
-        with open(file_path, "rb") as f_in:
-            with gzip.open(compressed_path, "wb", compresslevel=compression_level) as f_out:
-                # Read and write in chunks
-                chunk_size = 1024 * 1024  # 1MB chunks
+        # (uncompressed offset, compressed offset) of each flush point
+        points = []
+        with open(file_path, "rb") as f_in, open(compressed_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=compression_level) as f_out:
+                offset = 0
                 while True:
-                    chunk = f_in.read(chunk_size)
+                    chunk = f_in.read(INDEX_SPAN)
                     if not chunk:
                         break
+                    # Full flush: the deflate stream restarts here without history
+                    f_out.flush(zlib.Z_FULL_FLUSH)
+                    points.append([offset, raw.tell()])
                     f_out.write(chunk)
+                    offset += len(chunk)
 
         # Log compression ratio
         original_size = file_path.stat().st_size
@@ -103,6 +134,16 @@ def compress_file(file_path: Path, compression_level: int = 6) -> Optional[Path]
             f"({ratio:.1f}% reduction)"
         )
 
+        _write_index(
+            compressed_path,
+            {
+                "span": INDEX_SPAN,
+                "size": offset,
+                "compressed_size": compressed_size,
+                "points": points,
+            },
+        )
+
         return compressed_path
 
     except Exception as e:
@@ -110,6 +151,87 @@ def compress_file(file_path: Path, compression_level: int = 6) -> Optional[Path]
         return None
 
 
+def _write_index(compressed_path: Path, index: Dict[str, Any]) -> None:
+    index_path = get_index_path(compressed_path)
+    tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+    try:
+        tmp_path.write_text(json.dumps(index), encoding="utf-8")
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        logger.warning(f"Could not write offset index for {compressed_path.name}: {e}")
+
+
+def load_gzip_index(compressed_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Load the offset index of a compressed file.
+
+    Args:
+        compressed_path: Path to the compressed file (.gz)
+
+    Returns:
+        The index, or None if it is missing or doesn't match the compressed file
+    """
+    try:
+        index = json.loads(get_index_path(compressed_path).read_text(encoding="utf-8"))
+        if index["compressed_size"] != compressed_path.stat().st_size or not index["points"]:
+            return None
+        return index
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def iter_gzip_range(
+    compressed_path: Path,
+    index: Dict[str, Any],
+    start: int,
+    end: int,
+    chunk_size: int = 1024 * 1024,
+) -> Iterator[bytes]:
+    """
+    Yield bytes ``start`` to ``end`` (inclusive) of the uncompressed content.
+
+    Inflating starts at the last flush point at or before ``start``, so at most
+    ``INDEX_SPAN`` bytes are decompressed and discarded before the range.
+
+    Args:
+        compressed_path: Path to the compressed file (.gz)
+        index: Offset index from load_gzip_index
+        start: First uncompressed byte
+        end: Last uncompressed byte
+        chunk_size: Maximum size of the compressed reads and of the yielded chunks
+
+    Yields:
+        Chunks of uncompressed data
+    """
+    points = index["points"]
+    position = bisect.bisect_right([point[0] for point in points], start) - 1
+    offset, compressed_offset = points[max(position, 0)]
+    skip = start - offset
+    remaining = end - start + 1
+
+    # Raw deflate: there is no gzip header at a flush point
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    with open(compressed_path, "rb") as f:
+        f.seek(compressed_offset)
+        while remaining > 0 and not decompressor.eof:
+            pending = f.read(chunk_size)
+            if not pending:
+                break
+            while pending and remaining > 0:
+                data = decompressor.decompress(pending, chunk_size)
+                pending = decompressor.unconsumed_tail
+                if skip:
+                    dropped = min(skip, len(data))
+                    data = data[dropped:]
+                    skip -= dropped
+                if data:
+                    data = data[:remaining]
+                    remaining -= len(data)
+                    yield data
+                if decompressor.eof:
+                    break
+
+
 def compress_directory(directory: Optional[Path] = None, min_size_mb: float = 1.0) -> list[Path]:
     """
     Compress all eligible files in a directory.
@@ -0,0 +1,261 @@
+"""
+Precompressed variants (gzip, brotli, zstd) of files in the upload directory.
+
+Compressing a large file inside the request that first downloads it makes that
+user wait for the whole compression. Instead, storing a file schedules
+``precompress`` on the low-priority background pool, which writes one variant
+per encoding next to the file (``.gz``, ``.br``, ``.zst``) and records them in
+a ``.variants.json`` manifest. The manifest is keyed by the file's size and
+modification time, so variants of an older version are never served.
+
+The streaming endpoint negotiates the best ready variant from the client's
+``Accept-Encoding`` header and serves the uncompressed file until one exists.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from core.config import PRECOMPRESS_ENCODINGS
+from services.compression.gzip_utils import (
+    MIN_COMPRESSION_SIZE,
+    compress_file,
+    get_compressed_path,
+)
+from services.storage.layer_cache import local_fingerprint
+from services.storage.sidecars import BackgroundFileJob, load_sidecar, write_sidecar
+
+try:
+    import brotli
+
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# File types worth precompressing (text formats)
+COMPRESSIBLE_SUFFIXES = frozenset({".geojson", ".json"})
+
+# Read size while compressing (1MB)
+_CHUNK_SIZE = 1024 * 1024
+
+# Background levels: far better ratios than the fastest settings, while a
+# 100MB file still compresses in seconds rather than minutes
+BROTLI_QUALITY = 9
+ZSTD_LEVEL = 9
+
+
+@dataclass(frozen=True)
+class Encoding:
+    """A content coding that files can be precompressed with."""
+
+    name: str
+    suffix: str
+    compress: Callable[[Path, Path], None]
+    available: bool = True
+
+
+def _compress_brotli(source: Path, target: Path) -> None:
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    with open(source, "rb") as f_in, open(target, "wb") as f_out:
+        while chunk := f_in.read(_CHUNK_SIZE):
+            f_out.write(compressor.process(chunk))
+        f_out.write(compressor.finish())
+
+
+def _compress_zstd(source: Path, target: Path) -> None:
+    compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    with open(source, "rb") as f_in, open(target, "wb") as f_out:
+        compressor.copy_stream(f_in, f_out, size=source.stat().st_size)
+
+
+def _compress_gzip(source: Path, target: Path) -> None:
+    # compress_file also writes the offset index used for ranges over the .gz
+    if compress_file(source) is None:
+        raise OSError(f"gzip compression of {source.name} failed")
+
+
+# In order of preference when the client accepts several equally
+ENCODINGS: Dict[str, Encoding] = {
+    "br": Encoding("br", ".br", _compress_brotli, BROTLI_AVAILABLE),
+    "zstd": Encoding("zstd", ".zst", _compress_zstd, ZSTD_AVAILABLE),
+    "gzip": Encoding("gzip", ".gz", _compress_gzip),
+}
+
+
+def enabled_encodings() -> List[Encoding]:
+    """Configured encodings whose compressor is installed, in preference order."""
+    return [
+        encoding
+        for name, encoding in ENCODINGS.items()
+        if encoding.available and name in PRECOMPRESS_ENCODINGS
+    ]
+
+
+def get_variant_path(file_path: Path, encoding: str) -> Path:
+    """Path of the ``encoding`` variant of ``file_path``."""
+    if encoding == "gzip":
+        return get_compressed_path(file_path)
+    return file_path.with_suffix(file_path.suffix + ENCODINGS[encoding].suffix)
+
+
+def get_manifest_path(file_path: Path) -> Path:
+    """Path of the variant manifest of ``file_path``."""
+    return file_path.with_suffix(file_path.suffix + ".variants.json")
+
+
+def should_precompress(file_path: Path) -> bool:
+    """Whether ``file_path`` is large enough and of a type worth precompressing."""
+    try:
+        size = file_path.stat().st_size
+    except OSError:
+        return False
+    return file_path.suffix.lower() in COMPRESSIBLE_SUFFIXES and size >= MIN_COMPRESSION_SIZE
+
+
+def _load_manifest(file_path: Path) -> Optional[Dict[str, Any]]:
+    return load_sidecar(get_manifest_path(file_path), file_path)
+
+
+def _write_manifest(file_path: Path, manifest: Dict[str, Any]) -> None:
+    write_sidecar(get_manifest_path(file_path), manifest)
+
+
+def ready_variants(file_path: Path) -> Dict[str, Path]:
+    """Variants of the current version of ``file_path`` that can be served."""
+    manifest = _load_manifest(file_path)
+    if manifest is None:
+        return {}
+    ready = {}
+    for name, variant in manifest["variants"].items():
+        path = file_path.with_name(variant["file"])
+        try:
+            if path.stat().st_size == variant["size"]:
+                ready[name] = path
+        except OSError:
+            continue
+    return ready
+
+
+def negotiate_encoding(accept_encoding: str, available: Dict[str, Path]) -> Optional[str]:
+    """
+    Pick the encoding to serve from an ``Accept-Encoding`` header.
+
+    The encoding with the highest q-value wins; ties go to the order of
+    ENCODINGS (brotli, zstd, gzip). Encodings with ``q=0`` are never chosen,
+    ``*`` matches any encoding not listed explicitly.
+
+    Args:
+        accept_encoding: Value of the Accept-Encoding header
+        available: Ready variants by encoding name
+
+    Returns:
+        Encoding name, or None to serve the uncompressed file
+    """
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for name in ENCODINGS:
+        if name not in available:
+            continue
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+def precompress(file_path: Path) -> Dict[str, Path]:
+    """
+    Write every enabled variant of ``file_path`` and record it in the manifest.
+
+    Variants are published one at a time, so the first one can be served
+    while the others are still being compressed. Variants that don't make the
+    file smaller are discarded.
+
+    Returns:
+        The ready variants by encoding name
+    """
+    version = local_fingerprint(str(file_path))
+    size = file_path.stat().st_size
+    manifest = _load_manifest(file_path) or {"version": version, "variants": {}}
+    manifest["complete"] = False
+
+    # Fastest (and most widely accepted) first: gzip, zstd, then brotli
+    for encoding in reversed(enabled_encodings()):
+        if encoding.name in manifest["variants"]:
+            continue
+        target = get_variant_path(file_path, encoding.name)
+        # gzip_utils writes the .gz (and its index) itself
+        tmp_path = target if encoding.name == "gzip" else target.with_name(target.name + ".tmp")
+        try:
+            encoding.compress(file_path, tmp_path)
+            if local_fingerprint(str(file_path)) != version:
+                logger.info(f"{file_path.name} changed while compressing; skipping variants")
+                tmp_path.unlink(missing_ok=True)
+                return {}
+            if tmp_path != target:
+                os.replace(tmp_path, target)
+        except Exception as e:
+            logger.warning(f"Could not write {encoding.name} variant of {file_path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            continue
+
+        compressed_size = target.stat().st_size
+        if compressed_size >= size:
+            target.unlink(missing_ok=True)
+            continue
+        manifest["variants"][encoding.name] = {"file": target.name, "size": compressed_size}
+        _write_manifest(file_path, manifest)
+        logger.info(
+            f"Precompressed {file_path.name} ({encoding.name}): "
+            f"{size / 1024 / 1024:.2f} MB -> {compressed_size / 1024 / 1024:.2f} MB"
+        )
+
+    manifest["complete"] = True
+    _write_manifest(file_path, manifest)
+    return ready_variants(file_path)
+
+
+_precompression = BackgroundFileJob(precompress, "precompression")
+
+
+def schedule_precompression(file_path: Path) -> bool:
+    """
+    Queue ``precompress`` for ``file_path`` on the low-priority background pool.
+
+    Does nothing if the file isn't worth compressing, its variants are already
+    complete, or a task for it is already queued.
+
+    Returns:
+        True if a task was queued
+    """
+    file_path = Path(file_path)
+    if not should_precompress(file_path):
+        return False
+    manifest = _load_manifest(file_path)
+    if manifest is not None and manifest.get("complete"):
+        return False
+    return _precompression.schedule(file_path)
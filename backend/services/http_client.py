@@ -0,0 +1,295 @@
+"""Shared, pooled HTTP client for calls to external data services.
+
+External tools (Overpass, Nominatim, GeoNames, NASA FIRMS, World Bank,
+Open-Meteo, the CORS proxy) used to call ``requests.get``/``requests.post``
+directly, paying a TCP + TLS handshake on every call. This module keeps one
+``httpx`` client per host in ``HOST_POLICIES`` instead, and one shared client
+for every other host (the CORS proxy forwards arbitrary user-supplied hosts,
+so per-host clients for those would accumulate without bound):
+
+- keep-alive connection pools, sized per host
+- HTTP/2 when the ``h2`` package is installed and the server negotiates it
+- a per-host concurrency limit (e.g. Nominatim's one-request-at-a-time policy)
+- per-host default timeouts, overridable per call
+- sync callers can pass ``verify=False`` for backends configured to skip TLS
+  certificate checks; those requests get their own per-host client instead of
+  touching process-wide ``ssl`` state
+
+Sync callers (tools running in worker threads) use ``get``/``post``/``request``
+(or ``stream`` for large bodies);
+async callers (FastAPI handlers) use ``aget``/``apost``/``arequest``/``astream``
+so the event loop is never blocked on network I/O.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+
+from core.config import (
+    HTTP_DEFAULT_TIMEOUT,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP_SHARED_MAX_CONNECTIONS,
+)
+from utility import tracing
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional "h2" package (httpx[http2]); fall back to HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Connection and concurrency settings for one host."""
+
+    max_connections: int = HTTP_MAX_CONNECTIONS_PER_HOST
+    # Concurrent in-flight requests; defaults to max_connections
+    max_concurrency: Optional[int] = None
+    timeout: float = HTTP_DEFAULT_TIMEOUT
+
+    @property
+    def concurrency(self) -> int:
+        return self.max_concurrency or self.max_connections
+
+
+# Hosts with usage policies or unusually slow responses
+HOST_POLICIES: Dict[str, HostPolicy] = {
+    # Overpass grants ~2 query slots per client IP; queries run for minutes
+    "overpass-api.de": HostPolicy(max_connections=2, timeout=310),
+    # Nominatim usage policy: at most one request at a time
+    "nominatim.openstreetmap.org": HostPolicy(max_connections=2, max_concurrency=1, timeout=20),
+    "api.geonames.org": HostPolicy(max_connections=4, timeout=20),
+    "firms.modaps.eosdis.nasa.gov": HostPolicy(max_connections=4, timeout=60),
+    "api.worldbank.org": HostPolicy(max_connections=8, timeout=60),
+}
+
+
+# Pool key of the client shared by hosts without a policy
+SHARED_CLIENT_KEY = "*"
+
+
+def _host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _http_span(method: str, host: str):
+    # Only the host is recorded: paths and queries of some services carry API keys
+    return tracing.span(
+        f"HTTP {method.upper()}",
+        "CLIENT",
+        **{"http.request.method": method.upper(), "server.address": host},
+    )
+
+
+def _record_status(span: Optional[tracing.Span], response: httpx.Response) -> None:
+    if span is not None:
+        span.set_attribute("http.response.status_code", response.status_code)
+
+
+class HttpClientPool:
+    """Sync and async ``httpx`` clients for hosts with a policy, plus one shared client."""
+
+    def __init__(
+        self,
+        policies: Optional[Dict[str, HostPolicy]] = None,
+        http2: bool = HTTP2_AVAILABLE,
+        shared_policy: Optional[HostPolicy] = None,
+    ):
+        self.policies = dict(HOST_POLICIES if policies is None else policies)
+        self.shared_policy = shared_policy or HostPolicy(
+            max_connections=HTTP_SHARED_MAX_CONNECTIONS
+        )
+        self.http2 = http2
+        self._lock = threading.Lock()
+        self._sync: Dict[str, Tuple[httpx.Client, threading.BoundedSemaphore]] = {}
+        # Clients that skip certificate verification, kept apart from the verified ones
+        self._sync_insecure: Dict[str, Tuple[httpx.Client, threading.BoundedSemaphore]] = {}
+        # Async clients and semaphores are bound to the event loop that created them
+        self._async: Dict[
+            str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient, asyncio.Semaphore]
+        ] = {}
+
+    def policy_for(self, host: str) -> HostPolicy:
+        return self.policies.get(host, HostPolicy())
+
+    def _client_key(self, host: str) -> Tuple[str, HostPolicy]:
+        """The key of the client serving ``host`` and that client's policy."""
+        policy = self.policies.get(host)
+        if policy is None:
+            return SHARED_CLIENT_KEY, self.shared_policy
+        return host, policy
+
+    def _client_kwargs(self, policy: HostPolicy) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "follow_redirects": True,
+            "timeout": httpx.Timeout(policy.timeout),
+            "limits": httpx.Limits(
+                max_connections=policy.max_connections,
+                max_keepalive_connections=policy.max_connections,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+        }
+
+    def _sync_entry(
+        self, host: str, verify: bool = True
+    ) -> Tuple[httpx.Client, threading.BoundedSemaphore]:
+        entries = self._sync if verify else self._sync_insecure
+        key, policy = self._client_key(host)
+        with self._lock:
+            entry = entries.get(key)
+            if entry is None:
+                kwargs = self._client_kwargs(policy)
+                if not verify:
+                    kwargs["verify"] = False
+                entry = (
+                    httpx.Client(**kwargs),
+                    threading.BoundedSemaphore(policy.concurrency),
+                )
+                entries[key] = entry
+            return entry
+
+    def _async_entry(self, host: str) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        key, policy = self._client_key(host)
+        with self._lock:
+            entry = self._async.get(key)
+            if entry is None or entry[0] is not loop:
+                # First use, or the previous loop is gone (e.g. a restarted app)
+                entry = (
+                    loop,
+                    httpx.AsyncClient(**self._client_kwargs(policy)),
+                    asyncio.Semaphore(policy.concurrency),
+                )
+                self._async[key] = entry
+            return entry[1], entry[2]
+
+    def request(self, method: str, url: str, verify: bool = True, **kwargs: Any) -> httpx.Response:
+        """Send a request through the host's pooled client (body fully read)."""
+        host = _host_of(url)
+        client, slots = self._sync_entry(host, verify)
+        with _http_span(method, host) as span, slots:
+            response = client.request(method, url, **kwargs)
+            _record_status(span, response)
+            return response
+
+    @contextmanager
+    def stream(
+        self, method: str, url: str, verify: bool = True, **kwargs: Any
+    ) -> Iterator[httpx.Response]:
+        """Stream a response; the host's concurrency slot is held until exit."""
+        host = _host_of(url)
+        client, slots = self._sync_entry(host, verify)
+        with _http_span(method, host) as span, slots:
+            with client.stream(method, url, **kwargs) as response:
+                _record_status(span, response)
+                yield response
+
+    async def arequest(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        """Async variant of ``request``."""
+        host = _host_of(url)
+        client, slots = self._async_entry(host)
+        with _http_span(method, host) as span:
+            async with slots:
+                response = await client.request(method, url, **kwargs)
+            _record_status(span, response)
+            return response
+
+    @asynccontextmanager
+    async def astream(self, method: str, url: str, **kwargs: Any) -> AsyncIterator[httpx.Response]:
+        """Async variant of ``stream``."""
+        host = _host_of(url)
+        client, slots = self._async_entry(host)
+        with _http_span(method, host) as span:
+            async with slots:
+                async with client.stream(method, url, **kwargs) as response:
+                    _record_status(span, response)
+                    yield response
+
+    def close(self) -> None:
+        """Close all sync clients (async clients are closed by ``aclose``)."""
+        with self._lock:
+            clients = [client for client, _ in self._sync.values()]
+            clients.extend(client for client, _ in self._sync_insecure.values())
+            self._sync.clear()
+            self._sync_insecure.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close all clients; async clients of other event loops are dropped."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = list(self._async.values())
+            self._async.clear()
+        for owner, client, _ in entries:
+            if owner is loop:
+                await client.aclose()
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "http2": self.http2,
+                "sync_hosts": sorted(self._sync),
+                "insecure_sync_hosts": sorted(self._sync_insecure),
+                "async_hosts": sorted(self._async),
+            }
+
+
+_pool: Optional[HttpClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClientPool:
+    """Get the process-wide HTTP client pool."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = HttpClientPool()
+    return _pool
+
+
+def request(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    return get_http_client().request(method, url, **kwargs)
+
+
+def stream(method: str, url: str, **kwargs: Any):
+    """``with http_client.stream("POST", url) as response: ...``"""
+    return get_http_client().stream(method, url, **kwargs)
+
+
+def get(url: str, **kwargs: Any) -> httpx.Response:
+    return get_http_client().request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs: Any) -> httpx.Response:
+    return get_http_client().request("POST", url, **kwargs)
+
+
+async def arequest(method: str, url: str, **kwargs: Any) -> httpx.Response:
+    return await get_http_client().arequest(method, url, **kwargs)
+
+
+async def aget(url: str, **kwargs: Any) -> httpx.Response:
+    return await get_http_client().arequest("GET", url, **kwargs)
+
+
+async def apost(url: str, **kwargs: Any) -> httpx.Response:
+    return await get_http_client().arequest("POST", url, **kwargs)
+
+
+def astream(method: str, url: str, **kwargs: Any):
+    """``async with http_client.astream("GET", url) as response: ...``"""
+    return get_http_client().astream(method, url, **kwargs)
@@ -1,12 +1,17 @@
+import hashlib
+import json
 import logging
+import threading
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from langchain_core.messages import BaseMessage, SystemMessage
 from langchain_core.tools import BaseTool
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import create_react_agent
 
+from core.config import AGENT_CACHE_SIZE, AGENT_CACHE_TTL
 from models.settings_model import ModelSettings, ToolConfig
 from models.states import GeoDataAgentState, get_minimal_debug_state
 from services.ai.llm_config import get_llm
@@ -15,6 +20,7 @@ from services.default_agent_settings import (
     DEFAULT_AVAILABLE_TOOLS,
     DEFAULT_SYSTEM_PROMPT,
 )
+from services.planner import build_plan_system_addendum
 from services.tools.attribute_tool2 import attribute_tool2
 from services.tools.attribute_tools import attribute_tool
 from services.tools.geocoding import (
@@ -29,6 +35,7 @@ from services.tools.styling_tools import (
     check_and_auto_style_layers,
     style_map_layers,
 )
+from utility import tracing
 from utility.tool_configurator import create_configured_tools
 
 logger = logging.getLogger(__name__)
@@ -247,6 +254,144 @@ def get_conversation_manager(session_id: str, message_window_size: int) -> Conve
     return conversation_managers[session_id]["manager"]
 
 
+# Compiled agent graphs and LLM clients, reused across requests
+# Format: {key: (created_at, graph)} / {key: (llm, capabilities)}
+_agent_cache: "OrderedDict[Tuple, Tuple[float, CompiledStateGraph]]" = OrderedDict()
+_llm_cache: "OrderedDict[Tuple, Tuple[Any, Any]]" = OrderedDict()
+_agent_cache_lock = threading.Lock()
+
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _get_cached_llm(model_settings: Optional[ModelSettings]) -> Tuple[Any, Any]:
+    """The LLM client and capabilities for ``model_settings`` (env defaults if None)."""
+    from services.ai.llm_config import ModelCapabilities, get_llm_for_provider
+
+    if model_settings is None:
+        key: Tuple = ("env",)
+    else:
+        key = (
+            model_settings.model_provider.lower(),
+            model_settings.model_name,
+            model_settings.max_tokens,
+        )
+    with _agent_cache_lock:
+        cached = _llm_cache.get(key)
+        if cached is not None:
+            _llm_cache.move_to_end(key)
+            return cached
+
+    if model_settings is None:
+        # No capabilities available for default LLM
+        cached = (get_llm(), ModelCapabilities())
+    else:
+        cached = get_llm_for_provider(
+            provider_name=model_settings.model_provider,
+            max_tokens=model_settings.max_tokens,
+            model_name=model_settings.model_name,
+        )
+    with _agent_cache_lock:
+        _llm_cache[key] = cached
+        _llm_cache.move_to_end(key)
+        while len(_llm_cache) > AGENT_CACHE_SIZE:
+            _llm_cache.popitem(last=False)
+    return cached
+
+
+def _agent_cache_key(
+    model_settings: Optional[ModelSettings],
+    system_prompt: str,
+    selected_tools: Optional[List[ToolConfig]],
+    mcp_servers: Optional[List],
+    parallel_tool_calls: bool,
+    debug_enabled: bool,
+) -> Tuple:
+    """Everything a compiled agent graph depends on, except a dynamic tool selection."""
+    if model_settings is None:
+        model: Tuple = ("env",)
+    else:
+        model = (
+            model_settings.model_provider.lower(),
+            model_settings.model_name,
+            model_settings.max_tokens,
+        )
+    tool_config = tuple(
+        (cfg.name, cfg.enabled, cfg.prompt_override) for cfg in (selected_tools or [])
+    )
+    # Credentials are hashed rather than kept in the key
+    servers = tuple(
+        (
+            server.url,
+            _hash([getattr(server, "api_key", None), getattr(server, "headers", None)]),
+        )
+        for server in (mcp_servers or [])
+    )
+    return (
+        model,
+        _hash(system_prompt),
+        _hash(tool_config),
+        servers,
+        parallel_tool_calls,
+        debug_enabled,
+    )
+
+
+def _get_cached_agent(key: Tuple) -> Optional[CompiledStateGraph]:
+    with _agent_cache_lock:
+        cached = _agent_cache.get(key)
+        if cached is None:
+            return None
+        created_at, agent = cached
+        if time.time() - created_at > AGENT_CACHE_TTL:
+            del _agent_cache[key]
+            return None
+        _agent_cache.move_to_end(key)
+    logger.debug("[AGENT] reusing compiled agent graph")
+    return agent
+
+
+def _store_agent(key: Tuple, agent: CompiledStateGraph) -> None:
+    with _agent_cache_lock:
+        _agent_cache[key] = (time.time(), agent)
+        _agent_cache.move_to_end(key)
+        while len(_agent_cache) > AGENT_CACHE_SIZE:
+            _agent_cache.popitem(last=False)
+
+
+def clear_agent_cache() -> None:
+    """Drop all cached agent graphs and LLM clients."""
+    with _agent_cache_lock:
+        _agent_cache.clear()
+        _llm_cache.clear()
+
+
+def _agent_prompt(system_prompt: str) -> Callable[[Any], List[BaseMessage]]:
+    """
+    The agent's prompt: the system prompt, followed by the execution plan of
+    the current state if there is one, then the conversation.
+
+    Reading the plan from the state on every model call lets one compiled
+    graph serve requests with and without a plan, and shows the model the
+    current step statuses.
+    """
+
+    def prompt(state: Any) -> List[BaseMessage]:
+        if isinstance(state, dict):
+            plan = state.get("execution_plan")
+            messages = state.get("messages", [])
+        else:
+            plan = getattr(state, "execution_plan", None)
+            messages = getattr(state, "messages", [])
+        content = system_prompt
+        if plan is not None:
+            content += build_plan_system_addendum(plan)
+        return [SystemMessage(content=content), *messages]
+
+    return prompt
+
+
 async def create_geo_agent(
     model_settings: Optional[ModelSettings] = None,
     selected_tools: Optional[List[ToolConfig]] = None,
@@ -268,8 +413,9 @@ async def create_geo_agent(
             (used for conversation summarization)
         mcp_servers: List of MCPServer objects to load external tools from
             (optional, supports authentication via api_key and headers fields)
-        system_prompt_addendum: Optional text to append to the system prompt
-            (used by the planner to inject execution plan instructions)
+        system_prompt_addendum: Optional text to append to the system prompt.
+            The execution plan does not need it: the plan in the agent state
+            is appended to the system prompt on every model call.
 
     Returns:
         Tuple of (CompiledStateGraph, llm) - the agent graph and the LLM instance.
@@ -289,31 +435,33 @@ async def create_geo_agent(
 
         MCP server integration allows loading external tools from Model Context Protocol
         servers, enabling NaLaMap to use third-party tools seamlessly.
+
+        Compiled graphs are cached per model, system prompt, tool configuration,
+        selected tools and MCP servers (see _agent_cache_key), so most requests
+        reuse a graph instead of reloading MCP tools and recompiling. LLM clients
+        are cached per provider, model and max_tokens.
     """
 
-    # Use model_settings if provided, otherwise use env defaults
     if model_settings is not None:
-        from services.ai.llm_config import get_llm_for_provider
-
-        llm, model_capabilities = get_llm_for_provider(
-            provider_name=model_settings.model_provider,
-            max_tokens=model_settings.max_tokens,
-            model_name=model_settings.model_name,
-        )
+        llm, model_capabilities = _get_cached_llm(model_settings)
         system_prompt = (
             model_settings.system_prompt if model_settings.system_prompt else DEFAULT_SYSTEM_PROMPT
         )
     else:
         # Fall back to env-configured provider
-        llm = get_llm()
-        # No capabilities available for default LLM
-        from services.ai.llm_config import ModelCapabilities
-
-        model_capabilities = ModelCapabilities()
+        llm, model_capabilities = _get_cached_llm(None)
         system_prompt = DEFAULT_SYSTEM_PROMPT
 
-    tools_dict: Dict[str, BaseTool] = create_configured_tools(
-        DEFAULT_AVAILABLE_TOOLS, selected_tools or []
+    # Append a fixed addendum to the system prompt if provided (the execution
+    # plan of the current state is added per invocation, see _agent_prompt)
+    if system_prompt_addendum:
+        system_prompt = system_prompt + system_prompt_addendum
+        logger.info("Appended addendum to system prompt")
+
+    # Determine if parallel tool calling should be enabled
+    # State reducers now handle concurrent updates safely
+    parallel_tool_calls = bool(
+        enable_parallel_tools and model_settings and model_capabilities.supports_parallel_tool_calls
     )
 
     # Apply dynamic tool selection if enabled
@@ -322,10 +470,31 @@ async def create_geo_agent(
         if model_settings and hasattr(model_settings, "enable_dynamic_tools")
         else False
     )
+    dynamic = bool(enable_dynamic_tools and query)
+
+    # Enable langgraph debug logging when global log level is DEBUG
+    debug_enabled = logger.isEnabledFor(logging.DEBUG)
+
+    cache_key = _agent_cache_key(
+        model_settings,
+        system_prompt,
+        selected_tools,
+        mcp_servers,
+        parallel_tool_calls,
+        debug_enabled,
+    )
+    if not dynamic:
+        agent = _get_cached_agent(cache_key)
+        if agent is not None:
+            return agent, llm
+
+    tools_dict: Dict[str, BaseTool] = create_configured_tools(
+        DEFAULT_AVAILABLE_TOOLS, selected_tools or []
+    )
 
     logger.info(f"[AGENT] tools_available={sorted(tools_dict.keys())}")
 
-    if enable_dynamic_tools and query:
+    if dynamic:
         from services.tool_selector import create_tool_selector
 
         # Get embeddings from LLM if available
@@ -362,11 +531,19 @@ async def create_geo_agent(
         )
 
         # Select relevant tools
-        tools: List[BaseTool] = await selector.select_tools(query, tools_dict)
+        with tracing.span("tools.select", available=len(tools_dict)) as select_span:
+            tools: List[BaseTool] = await selector.select_tools(query, tools_dict)
+            if select_span is not None:
+                select_span.set_attribute("selected", len(tools))
         logger.info(
             f"[AGENT] dynamic tool selection: {len(tools)}/{len(tools_dict)} selected="
             f"{sorted(t.name for t in tools)}"
         )
+        # The selection depends on the query: graphs are shared per tool subset
+        cache_key = cache_key + (tuple(sorted(t.name for t in tools)),)
+        agent = _get_cached_agent(cache_key)
+        if agent is not None:
+            return agent, llm
     else:
         tools: List[BaseTool] = list(tools_dict.values())
         logger.info(f"[AGENT] tools_active={sorted(t.name for t in tools)}")
@@ -392,43 +569,27 @@ async def create_geo_agent(
         except Exception as e:
             logger.error(f"Failed to import MCP integration: {e}")
 
-    # Enable langgraph debug logging when global log level is DEBUG
-    debug_enabled = logger.isEnabledFor(logging.DEBUG)
-
-    # Determine if parallel tool calling should be enabled
-    # State reducers now handle concurrent updates safely
-    parallel_tool_calls = False
-    if enable_parallel_tools:
-        # Check if model supports parallel tool calls
-        if model_settings:
-            parallel_tool_calls = model_capabilities.supports_parallel_tool_calls
-
-            if parallel_tool_calls:
-                logger.info(
-                    "Parallel tool execution ENABLED. "
-                    "State reducers will handle concurrent updates."
-                )
-        else:
-            logger.warning(
-                "enable_parallel_tools=True but no model_settings provided, "
-                "falling back to sequential execution"
-            )
-
-    # Append planning addendum to system prompt if provided
-    if system_prompt_addendum:
-        system_prompt = system_prompt + system_prompt_addendum
-        logger.info("Appended execution plan to system prompt")
+    if parallel_tool_calls:
+        logger.info(
+            "Parallel tool execution ENABLED. State reducers will handle concurrent updates."
+        )
+    elif enable_parallel_tools and not model_settings:
+        logger.warning(
+            "enable_parallel_tools=True but no model_settings provided, "
+            "falling back to sequential execution"
+        )
 
     agent = create_react_agent(
         name="GeoAgent",
         state_schema=GeoDataAgentState,
         tools=tools,
         model=llm.bind_tools(tools, parallel_tool_calls=parallel_tool_calls),
-        prompt=system_prompt,
+        prompt=_agent_prompt(system_prompt),
         debug=debug_enabled,
         # config_schema=GeoData,
         # response_format=GeoData
     )
+    _store_agent(cache_key, agent)
     return agent, llm
 
 
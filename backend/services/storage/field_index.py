@@ -0,0 +1,318 @@
+"""
+Per-layer field statistics, computed once per layer version.
+
+``list_fields``, ``summarize``, ``unique_values`` and the planner's schema
+context each rescanned the whole GeoDataFrame on every question about a layer.
+``compute_field_index`` makes one vectorized pass over the attributes instead
+and records, per field:
+
+- dtype, null and non-null counts and an example value,
+- min / max / mean / quartiles of numeric fields,
+- the ``FIELD_INDEX_TOP_K`` most frequent values with their counts for text
+  and low-cardinality fields (``top_values_complete`` when that is all of them),
+- the number of distinct values: exact where values were counted, otherwise
+  a HyperLogLog estimate, which needs 4 KB per field however many there are.
+
+Indexes are keyed by layer version. Local files get a ``.fields.json`` sidecar
+that carries the file's size and modification time, like the statistics
+sidecar, so an index survives restarts and is dropped when the file changes.
+Remote layers are keyed by the content hash the layer cache computed for the
+download and kept in memory.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from services.storage.layer_cache import local_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Most frequent values kept per field
+FIELD_INDEX_TOP_K = 50
+# Indexes of remote layers (and recently used local ones) kept in memory
+FIELD_INDEX_CACHE_SIZE = 64
+# HyperLogLog registers: 2**12, about 1.6% standard error
+HLL_PRECISION = 12
+
+INDEX_SUFFIX = ".fields.json"
+
+_QUARTILES = (0.25, 0.5, 0.75)
+
+
+class HyperLogLog:
+    """Distinct-count sketch over 64-bit hashes of the added values."""
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        p = np.uint64(self.precision)
+        buckets = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # Rank of the first set bit among the next 32 bits (33 if none is)
+        rest = ((hashes << p) >> np.uint64(32)).astype(np.float64)
+        with np.errstate(divide="ignore"):
+            ranks = np.where(rest > 0, 32 - np.floor(np.log2(rest)), 33).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+
+    def add_values(self, values: np.ndarray) -> None:
+        """Add an array of (non-missing) values."""
+        values = np.asarray(values)
+        if len(values) == 0:
+            return
+        try:
+            hashes = pd.util.hash_array(values)
+        except TypeError:
+            # Unhashable objects (lists, dicts) count by their text
+            hashes = pd.util.hash_array(values.astype(str).astype(object))
+        self.add_hashes(hashes)
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _is_numeric(column: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(
+        column.dtype
+    )
+
+
+def _field_entry(name: Any, column: pd.Series) -> Dict[str, Any]:
+    present = column.notna().to_numpy()
+    values = column[present]
+    count = len(values)
+    entry: Dict[str, Any] = {
+        "name": str(name),
+        "type": str(column.dtype),
+        "null_count": int(len(column) - count),
+        "count": count,
+        "example": _jsonable(values.iloc[0]) if count else None,
+    }
+    if count == 0:
+        entry["distinct"] = 0
+        return entry
+
+    numeric = _is_numeric(column)
+    distinct = None
+    if numeric:
+        array = values.to_numpy(dtype=np.float64)
+        p25, p50, p75 = np.quantile(array, _QUARTILES)
+        entry.update(
+            {
+                "min": _jsonable(values.min()),
+                "max": _jsonable(values.max()),
+                "mean": float(array.mean()),
+                "p25": float(p25),
+                "p50": float(p50),
+                "p75": float(p75),
+            }
+        )
+        sketch = HyperLogLog()
+        sketch.add_values(array)
+        distinct = min(sketch.estimate(), count)
+
+    # Count values of text fields, and of numeric codes with few distinct values
+    if distinct is None or distinct <= 2 * FIELD_INDEX_TOP_K:
+        try:
+            counts = values.value_counts()
+        except TypeError:
+            # Unhashable objects (lists, dicts)
+            sketch = HyperLogLog()
+            sketch.add_values(values.to_numpy(dtype=object))
+            distinct = min(sketch.estimate(), count)
+        else:
+            distinct = len(counts)
+            entry["top_values"] = [
+                {"value": _jsonable(value), "count": int(n)}
+                for value, n in counts.head(FIELD_INDEX_TOP_K).items()
+            ]
+            entry["top_values_complete"] = distinct <= FIELD_INDEX_TOP_K
+    entry["distinct"] = int(distinct)
+    return entry
+
+
+def compute_field_index(gdf: pd.DataFrame) -> Dict[str, Any]:
+    """Field statistics of every attribute column of ``gdf``."""
+    geom_name = gdf.active_geometry_name if isinstance(gdf, gpd.GeoDataFrame) else None
+    fields = []
+    for name in gdf.columns:
+        if name == geom_name:
+            continue
+        column = gdf[name]
+        if isinstance(column.dtype, gpd.array.GeometryDtype):
+            # Secondary geometry columns
+            fields.append(
+                {"name": str(name), "type": "geometry", "null_count": int(column.isna().sum())}
+            )
+            continue
+        fields.append(_field_entry(name, column))
+    return {"row_count": int(len(gdf)), "geometry_column": geom_name, "fields": fields}
+
+
+def field_entry(index: Dict[str, Any], name: str) -> Optional[Dict[str, Any]]:
+    """The entry of field ``name`` in ``index``."""
+    for field in index.get("fields", []):
+        if field["name"] == name:
+            return field
+    return None
+
+
+# ===================================
+# Storage
+# ===================================
+def get_index_path(file_path: Path) -> Path:
+    """Path of the field index sidecar of ``file_path``."""
+    return file_path.with_suffix(file_path.suffix + INDEX_SUFFIX)
+
+
+_memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _memory_key(file_path: Optional[Path], version: Optional[str]) -> Optional[str]:
+    if file_path is not None:
+        try:
+            return f"file:{os.path.abspath(file_path)}:{local_fingerprint(str(file_path))}"
+        except OSError:
+            return None
+    if version is not None:
+        return f"content:{version}"
+    return None
+
+
+def _remember(key: str, index: Dict[str, Any]) -> None:
+    with _memory_lock:
+        _memory[key] = index
+        _memory.move_to_end(key)
+        while len(_memory) > FIELD_INDEX_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _load_sidecar(file_path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        index = json.loads(get_index_path(file_path).read_text(encoding="utf-8"))
+        if index.get("version") != local_fingerprint(str(file_path)):
+            return None
+        return index
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _write_sidecar(file_path: Path, index: Dict[str, Any]) -> None:
+    index_path = get_index_path(file_path)
+    tmp_path = index_path.with_suffix(index_path.suffix + ".tmp")
+    try:
+        tmp_path.write_text(json.dumps(index, default=str), encoding="utf-8")
+        os.replace(tmp_path, index_path)
+    except OSError as e:
+        logger.warning(f"Could not write field index for {file_path.name}: {e}")
+
+
+def find_field_index(
+    file_path: Optional[Path] = None, version: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    The stored field index of a layer version, without computing one.
+
+    Args:
+        file_path: A local layer file (its current version)
+        version: Content hash of a remote layer
+
+    Returns:
+        The index, or None if the version has not been indexed
+    """
+    key = _memory_key(file_path, version)
+    if key is None:
+        return None
+    with _memory_lock:
+        index = _memory.get(key)
+        if index is not None:
+            _memory.move_to_end(key)
+            return index
+    if file_path is not None:
+        index = _load_sidecar(Path(file_path))
+        if index is not None:
+            _remember(key, index)
+        return index
+    return None
+
+
+def get_field_index(
+    gdf: pd.DataFrame, file_path: Optional[Path] = None, version: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    The field index of ``gdf``, computed only if its layer version has none yet.
+
+    Args:
+        gdf: The layer's features
+        file_path: The local file ``gdf`` was read from
+        version: Content hash of the remote layer ``gdf`` was downloaded from
+
+    Without ``file_path`` or ``version`` the index is computed and not stored.
+    """
+    index = find_field_index(file_path, version)
+    if index is not None:
+        return index
+    key = _memory_key(file_path, version)
+    if file_path is not None:
+        file_version = local_fingerprint(str(file_path))
+        index = {"version": file_version, **compute_field_index(gdf)}
+        _write_sidecar(Path(file_path), index)
+    else:
+        index = compute_field_index(gdf)
+    if key is not None:
+        _remember(key, index)
+    return index
+
+
+def clear_field_index_cache() -> None:
+    """Forget the indexes held in memory (sidecars stay)."""
+    with _memory_lock:
+        _memory.clear()
+
+
+def field_summaries(index: Dict[str, Any], top_k: int = 5) -> List[Dict[str, Any]]:
+    """Compact per-field summaries for the agent's layer metadata."""
+    summaries = []
+    for field in index.get("fields", []):
+        summary: Dict[str, Any] = {"name": field["name"], "type": field.get("type")}
+        if "distinct" in field:
+            summary["distinct"] = field["distinct"]
+        if field.get("null_count"):
+            summary["null_count"] = field["null_count"]
+        if "min" in field:
+            summary["range"] = [field["min"], field["max"]]
+        elif field.get("top_values"):
+            summary["top_values"] = [entry["value"] for entry in field["top_values"][:top_k]]
+        summaries.append(summary)
+    return summaries
@@ -2,7 +2,8 @@ import gzip
 import os
 import uuid
 from datetime import datetime, timedelta
-from typing import BinaryIO, Tuple
+from pathlib import Path
+from typing import BinaryIO, Iterable, Optional, Tuple
 
 from core.config import (
     AZ_CONN,
@@ -12,6 +13,13 @@ from core.config import (
     LOCAL_UPLOAD_DIR,
     USE_AZURE,
 )
+from services.compression.variants import schedule_precompression
+from services.storage.indexed_layers import schedule_indexing
+from services.storage.layer_stats import (
+    GEOJSON_SUFFIXES,
+    GeoJSONStatsCollector,
+    write_layer_stats,
+)
 from utility.string_methods import sanitize_filename
 
 # Minimum file size for compression (1MB)
@@ -44,6 +52,33 @@ def _compress_for_azure(content: bytes) -> bytes:
     return gzip.compress(content, compresslevel=6)
 
 
+def _stats_collector(filename: str) -> Optional[GeoJSONStatsCollector]:
+    """Collector for the layer statistics of a GeoJSON upload, None for other files."""
+    if os.path.splitext(filename)[1].lower() in GEOJSON_SUFFIXES:
+        return GeoJSONStatsCollector()
+    return None
+
+
+def _finish_local_file(dest_path: str, collector: Optional[GeoJSONStatsCollector]) -> None:
+    """Write the statistics sidecar and queue precompression and indexing of a stored file."""
+    if collector is not None:
+        write_layer_stats(Path(dest_path), collector.finish())
+    schedule_precompression(Path(dest_path))
+    schedule_indexing(Path(dest_path))
+
+
+def local_upload_path(link: str) -> Optional[str]:
+    """Path of the local upload a data link points to, or None for other links.
+
+    Handles BASE_URL/api/stream/ links and legacy BASE_URL/uploads/ links.
+    """
+    for prefix in (f"{BASE_URL}/api/stream/", f"{BASE_URL}/uploads/"):
+        if link.startswith(prefix):
+            path = os.path.join(LOCAL_UPLOAD_DIR, os.path.basename(link))
+            return path if os.path.isfile(path) else None
+    return None
+
+
 def _generate_sas_url(blob_url: str, blob_name: str) -> str:
     """Generate a time-limited SAS URL for secure blob access.
 
@@ -91,6 +126,7 @@ def store_file(name: str, content: bytes) -> Tuple[str, str]:
 
     Returns a time-limited SAS URL for Azure Blob Storage (more secure than public URLs).
     For GeoJSON files >1MB, automatically compresses with gzip to save bandwidth and storage.
+    Locally stored files get precompressed variants built in the background.
     """
     # Generate unique file name
     safe_name = sanitize_filename(name)
@@ -134,12 +170,50 @@ def store_file(name: str, content: bytes) -> Tuple[str, str]:
         url = _generate_sas_url(blob_url, unique_name)
     else:
         dest_path = os.path.join(LOCAL_UPLOAD_DIR, unique_name)
+        collector = _stats_collector(safe_name)
         with open(dest_path, "wb") as f:
             f.write(content)
+        if collector is not None:
+            collector.feed(content)
+        _finish_local_file(dest_path, collector)
         url = f"{BASE_URL}/api/stream/{unique_name}"
     return url, unique_name
 
 
+def store_file_chunks(name: str, chunks: Iterable[bytes]) -> Tuple[str, str]:
+    """Store content that is produced incrementally (e.g. by a serializer).
+
+    Locally, chunks are written straight to disk so the full document never has
+    to exist in memory. Azure uploads compress the whole payload, so chunks are
+    joined and handed to store_file.
+    """
+    if USE_AZURE:
+        return store_file(name, b"".join(chunks))
+
+    safe_name = sanitize_filename(name)
+    unique_name = f"{uuid.uuid4().hex}_{safe_name}"
+    os.makedirs(LOCAL_UPLOAD_DIR, exist_ok=True)
+    dest_path = os.path.join(LOCAL_UPLOAD_DIR, unique_name)
+    collector = _stats_collector(safe_name)
+    try:
+        with open(dest_path, "wb") as out:
+            for chunk in chunks:
+                out.write(chunk)
+                if collector is not None:
+                    collector.feed(chunk)
+    except Exception:
+        # Remove partial file
+        try:
+            if os.path.exists(dest_path):
+                os.remove(dest_path)
+        except Exception:
+            pass
+        raise
+    _finish_local_file(dest_path, collector)
+    url = f"{BASE_URL}/api/stream/{unique_name}"
+    return url, unique_name
+
+
 def store_file_stream(name: str, stream: BinaryIO) -> Tuple[str, str]:
     """Store file by streaming from a file-like object without loading into memory.
 
@@ -233,6 +307,8 @@ def store_file_stream(name: str, stream: BinaryIO) -> Tuple[str, str]:
             raise
     else:
         dest_path = os.path.join(LOCAL_UPLOAD_DIR, unique_name)
+        # Layer statistics are collected while the upload streams to disk
+        collector = _stats_collector(safe_name)
         try:
             with open(dest_path, "wb") as out:
                 while True:
@@ -243,6 +319,9 @@ def store_file_stream(name: str, stream: BinaryIO) -> Tuple[str, str]:
                     if total > MAX_FILE_SIZE:
                         raise RuntimeError("MAX_FILE_SIZE_EXCEEDED")
                     out.write(data)
+                    if collector is not None:
+                        collector.feed(data)
+            _finish_local_file(dest_path, collector)
             url = f"{BASE_URL}/api/stream/{unique_name}"
             return url, unique_name
         except Exception as e:
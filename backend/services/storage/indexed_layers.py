@@ -0,0 +1,311 @@
+"""
+Spatially indexed copies of large uploaded layers.
+
+GeoJSON (and zipped shapefiles) can only be read from start to end, so every
+consumer of a country-wide upload parsed the whole file even when it needed a
+city's worth of features. Storing a layer above ``LAYER_INDEX_MIN_SIZE``
+schedules ``build_indexed_copy`` on the low-priority background pool, which
+writes a GeoPackage copy (``<file>.gpkg``) with an R-tree next to it,
+``LAYER_INDEX_BATCH_FEATURES`` features at a time. A ``.gpkg.json`` manifest
+records the source file's size and modification time, so a copy of an older
+version is never read.
+
+``read_layer`` then reads through the copy when it is ready: a ``bbox`` only
+touches the index pages and the features that intersect it, ``columns`` skips
+decoding the other attributes and a ``where`` expression is evaluated by OGR
+while decoding. Until the copy exists the source file is read.
+
+``iter_layer_batches`` reads the copy a fixed number of features at a time
+for operations on layers too large to hold in memory.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pyogrio
+from pyproj import CRS, Transformer
+
+from core.config import LAYER_INDEX_BATCH_FEATURES, LAYER_INDEX_MIN_SIZE
+from services.storage.layer_cache import local_fingerprint
+from services.storage.sidecars import BackgroundFileJob, load_sidecar, write_sidecar
+from services.tools.attributes.where import compile_where
+
+logger = logging.getLogger(__name__)
+
+# Source formats worth converting (the formats uploads arrive in)
+INDEXABLE_SUFFIXES = frozenset({".geojson", ".json", ".zip", ".shp", ".gpkg", ".kml"})
+
+INDEXED_SUFFIX = ".gpkg"
+
+WGS84 = "EPSG:4326"
+
+BBox = Tuple[float, float, float, float]
+
+
+def get_indexed_path(file_path: Path) -> Path:
+    """Path of the indexed GeoPackage copy of ``file_path``."""
+    return file_path.with_suffix(file_path.suffix + INDEXED_SUFFIX)
+
+
+def get_manifest_path(file_path: Path) -> Path:
+    """Path of the manifest describing the indexed copy of ``file_path``."""
+    return file_path.with_suffix(file_path.suffix + INDEXED_SUFFIX + ".json")
+
+
+def should_index(file_path: Path) -> bool:
+    """Whether ``file_path`` is a vector upload large enough to convert."""
+    try:
+        size = file_path.stat().st_size
+    except OSError:
+        return False
+    return file_path.suffix.lower() in INDEXABLE_SUFFIXES and size >= LAYER_INDEX_MIN_SIZE
+
+
+def indexed_copy(file_path: Path) -> Optional[Path]:
+    """The indexed copy of the current version of ``file_path``, if it is ready."""
+    file_path = Path(file_path)
+    manifest = load_sidecar(get_manifest_path(file_path), file_path)
+    if manifest is None:
+        return None
+    path = get_indexed_path(file_path)
+    try:
+        if path.stat().st_size != manifest["size"]:
+            return None
+    except OSError:
+        return None
+    return path
+
+
+def _window_frame(gdf: gpd.GeoDataFrame, dtypes: Dict[str, str]) -> gpd.GeoDataFrame:
+    """Keep integer fields integer in windows where they hold missing values."""
+    for name, dtype in dtypes.items():
+        if dtype.startswith("int") and name in gdf and gdf[name].dtype.kind == "f":
+            gdf[name] = gdf[name].astype(dtype.replace("int", "Int"))
+    if gdf.crs is None:
+        gdf = gdf.set_crs(WGS84)
+    return gdf
+
+
+def build_indexed_copy(file_path: Path) -> Optional[Path]:
+    """
+    Convert ``file_path`` to GeoPackage with a spatial index.
+
+    The source is read and appended ``LAYER_INDEX_BATCH_FEATURES`` features at
+    a time, so memory stays bounded however large the upload is. Formats that
+    can't seek to a feature (GeoJSON) are re-scanned up to each window, which
+    costs time but not memory.
+
+    The copy is written to a temporary file and published (with its manifest)
+    only once complete, so readers never see a partial copy.
+
+    Returns:
+        Path of the indexed copy, or None if the file changed while converting
+    """
+    file_path = Path(file_path)
+    version = local_fingerprint(str(file_path))
+    target = get_indexed_path(file_path)
+    tmp_path = target.with_name(target.stem + ".tmp" + INDEXED_SUFFIX)
+    tmp_path.unlink(missing_ok=True)
+
+    info = pyogrio.read_info(str(file_path))
+    dtypes = dict(zip(info["fields"], info["dtypes"]))
+    window = max(1, LAYER_INDEX_BATCH_FEATURES)
+    features = 0
+    crs = None
+    try:
+        while True:
+            gdf = pyogrio.read_dataframe(
+                str(file_path), skip_features=features, max_features=window
+            )
+            gdf = _window_frame(gdf, dtypes)
+            crs = crs or gdf.crs
+            # Layers mixing geometry types are written with the "Unknown" type
+            pyogrio.write_dataframe(
+                gdf,
+                str(tmp_path),
+                driver="GPKG",
+                layer=file_path.stem,
+                append=features > 0,
+                geometry_type=info.get("geometry_type") or "Unknown",
+                promote_to_multi=False,
+            )
+            features += len(gdf)
+            if len(gdf) < window:
+                break
+        if local_fingerprint(str(file_path)) != version:
+            logger.info(f"{file_path.name} changed while converting; discarding copy")
+            tmp_path.unlink(missing_ok=True)
+            return None
+        os.replace(tmp_path, target)
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    manifest = {
+        "version": version,
+        "size": target.stat().st_size,
+        "features": features,
+        "crs": crs.to_string(),
+    }
+    write_sidecar(get_manifest_path(file_path), manifest)
+    logger.info(
+        f"Indexed {file_path.name}: {features} features, "
+        f"{file_path.stat().st_size / 1024 / 1024:.2f} MB -> "
+        f"{manifest['size'] / 1024 / 1024:.2f} MB GeoPackage"
+    )
+    return target
+
+
+_indexing = BackgroundFileJob(build_indexed_copy, "indexing")
+
+
+def schedule_indexing(file_path: Path) -> bool:
+    """
+    Queue ``build_indexed_copy`` for ``file_path`` on the low-priority background pool.
+
+    Does nothing if the file is too small or not a vector upload, its copy is
+    already up to date, or a task for it is already queued.
+
+    Returns:
+        True if a task was queued
+    """
+    file_path = Path(file_path)
+    if not should_index(file_path) or indexed_copy(file_path) is not None:
+        return False
+    return _indexing.schedule(file_path)
+
+
+def _to_source_bbox(source: Path, bbox: BBox, bbox_crs: str) -> BBox:
+    """Transform ``bbox`` from ``bbox_crs`` to the CRS of ``source``."""
+    source_crs = pyogrio.read_info(str(source)).get("crs") or WGS84
+    if CRS.from_user_input(source_crs) == CRS.from_user_input(bbox_crs):
+        return tuple(bbox)
+    transformer = Transformer.from_crs(bbox_crs, source_crs, always_xy=True)
+    return transformer.transform_bounds(*bbox)
+
+
+def _attribute_filter(source: Path, where: str) -> Optional[str]:
+    """``where`` as an OGR SQL filter on ``source``, if it matches the same features there."""
+    try:
+        compiled = compile_where(where)
+    except ValueError:
+        return None
+    info = pyogrio.read_info(str(source))
+    return compiled.to_ogr_sql(dict(zip(info["fields"], info["dtypes"])))
+
+
+def read_layer(
+    file_path: Path,
+    bbox: Optional[Sequence[float]] = None,
+    columns: Optional[List[str]] = None,
+    bbox_crs: str = WGS84,
+    where: Optional[str] = None,
+) -> gpd.GeoDataFrame:
+    """
+    Read a local vector layer, through its indexed copy when one is ready.
+
+    Args:
+        file_path: The uploaded file
+        bbox: Only read features whose envelope intersects (minx, miny, maxx, maxy)
+        columns: Only read these attribute columns (the geometry is always read)
+        bbox_crs: CRS of ``bbox``
+        where: CQL-lite expression to evaluate while reading the indexed copy.
+            A prefilter: expressions OGR can't evaluate exactly (fuzzy field
+            names, mismatched literal types) and reads of the source file
+            return every feature, so callers still apply the filter.
+
+    Returns:
+        The features in the layer's own CRS
+    """
+    file_path = Path(file_path)
+    source = indexed_copy(file_path)
+    kwargs: Dict[str, Any] = {}
+    if source is None:
+        source = file_path
+        schedule_indexing(file_path)
+    elif where is not None:
+        sql = _attribute_filter(source, where)
+        if sql is not None:
+            kwargs["where"] = sql
+
+    if bbox is not None:
+        kwargs["bbox"] = _to_source_bbox(source, tuple(bbox), bbox_crs)
+    if columns is not None:
+        kwargs["columns"] = list(columns)
+    gdf = gpd.read_file(str(source), **kwargs)
+    if gdf.crs is None:
+        gdf = gdf.set_crs(WGS84)
+    return gdf
+
+
+def iter_layer_batches(
+    file_path: Path, batch_size: int, columns: Optional[List[str]] = None
+) -> Iterator[gpd.GeoDataFrame]:
+    """
+    Read the indexed copy of ``file_path`` ``batch_size`` features at a time.
+
+    Batches are read by feature id, which GeoPackage resolves through its
+    primary key, so a batch costs the same however far into the layer it
+    starts (skipping to an offset would step over every feature before it).
+    The copy is written in one pass, so its ids run from 1 without gaps.
+
+    Raises:
+        FileNotFoundError: If the indexed copy is not ready
+    """
+    source = indexed_copy(Path(file_path))
+    if source is None:
+        raise FileNotFoundError(f"No indexed copy of {Path(file_path).name}")
+    info = pyogrio.read_info(str(source))
+    total = int(info.get("features") or 0)
+    kwargs: Dict[str, Any] = {}
+    if columns is not None:
+        kwargs["columns"] = list(columns)
+    for start in range(0, total, batch_size):
+        fids = np.arange(start + 1, min(start + batch_size, total) + 1)
+        gdf = gpd.read_file(str(source), fids=fids, **kwargs)
+        if gdf.crs is None:
+            gdf = gdf.set_crs(WGS84)
+        yield gdf
+
+
+def indexed_schema(file_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Attribute fields and feature count of an indexed layer, from the GeoPackage metadata.
+
+    Returns:
+        None if the indexed copy is not ready
+    """
+    source = indexed_copy(Path(file_path))
+    if source is None:
+        return None
+    info = pyogrio.read_info(str(source))
+    return {"fields": [str(f) for f in info["fields"]], "features": int(info.get("features") or 0)}
+
+
+def layer_extent(file_path: Path) -> Optional[Dict[str, Any]]:
+    """
+    Bounds (in EPSG:4326), feature count and geometry type of an indexed layer.
+
+    Read from the GeoPackage metadata, without touching the features.
+
+    Returns:
+        None if the indexed copy is not ready
+    """
+    source = indexed_copy(Path(file_path))
+    if source is None:
+        return None
+    info = pyogrio.read_info(str(source))
+    bounds = tuple(float(v) for v in info["total_bounds"])
+    crs = info.get("crs") or WGS84
+    if CRS.from_user_input(crs) != CRS.from_user_input(WGS84):
+        bounds = Transformer.from_crs(crs, WGS84, always_xy=True).transform_bounds(*bounds)
+    geometry_type = info.get("geometry_type")
+    return {
+        "bbox": [float(v) for v in bounds],
+        "features": int(info.get("features") or 0),
+        "geometry_type": None if geometry_type in (None, "Unknown") else geometry_type,
+    }
@@ -0,0 +1,200 @@
+"""Process-wide cache of parsed vector layers.
+
+Attribute and geoprocessing tools load the same layer over and over: once per
+tool call, and once per step of a multi-step plan. For large layers, parsing
+GeoJSON dominates the cost of those tools, so parsed GeoDataFrames are kept in
+memory keyed by the layer's data link plus a content fingerprint:
+
+- local files: size and modification time (uploads are write-once)
+- remote URLs: a SHA-256 of the response body; the ETag/Last-Modified
+  validators are remembered so re-fetches can be conditional requests
+
+GeoDataFrames are already columnar (numpy-backed attribute columns plus a
+shapely geometry array), so entries are held as-is. They are evicted
+least-recently-used once their estimated in-memory size exceeds
+``LAYER_CACHE_MAX_BYTES``. Callers always receive a copy, so tools may mutate
+the returned frame without corrupting the cache.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+import geopandas as gpd
+
+from core.config import LAYER_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _CacheEntry:
+    gdf: gpd.GeoDataFrame
+    fingerprint: str
+    nbytes: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+def local_fingerprint(path: str) -> str:
+    """Return a cheap fingerprint for a local file (size + mtime)."""
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def content_fingerprint(content: bytes) -> str:
+    """Return a fingerprint for downloaded content."""
+    return hashlib.sha256(content).hexdigest()
+
+
+def estimate_gdf_nbytes(gdf: gpd.GeoDataFrame) -> int:
+    """Estimate the in-memory footprint of a GeoDataFrame.
+
+    ``memory_usage(deep=True)`` only counts the pointer array for geometries,
+    so coordinates are added on top (two float64 per vertex plus per-object
+    overhead).
+    """
+    try:
+        nbytes = int(gdf.memory_usage(deep=True, index=True).sum())
+    except Exception:
+        nbytes = 0
+    try:
+        nbytes += int(gdf.geometry.count_coordinates().sum()) * 16 + len(gdf) * 64
+    except Exception:
+        # No active geometry column
+        pass
+    return max(nbytes, 1)
+
+
+class LayerCache:
+    """Thread-safe LRU of parsed GeoDataFrames, bounded by estimated bytes."""
+
+    def __init__(self, max_bytes: int = LAYER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _CacheEntry] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, link: str, fingerprint: Optional[str] = None) -> Optional[gpd.GeoDataFrame]:
+        """Return a copy of the cached layer, or None on a miss.
+
+        If ``fingerprint`` is given, the cached entry must match it; a stale
+        entry is dropped. Without a fingerprint any cached version is returned
+        (used after a 304 Not Modified response).
+        """
+        with self._lock:
+            entry = self._entries.get(link)
+            if entry is None or (fingerprint is not None and entry.fingerprint != fingerprint):
+                if entry is not None:
+                    self._drop(link)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(link)
+            self._hits += 1
+            gdf = entry.gdf
+        return gdf.copy()
+
+    def put(
+        self,
+        link: str,
+        fingerprint: str,
+        gdf: gpd.GeoDataFrame,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Store a parsed layer. The frame must not be mutated afterwards."""
+        nbytes = estimate_gdf_nbytes(gdf)
+        if nbytes > self.max_bytes:
+            logger.info(
+                f"Layer {link} (~{nbytes} bytes) exceeds layer cache size "
+                f"({self.max_bytes} bytes); not caching"
+            )
+            return
+        with self._lock:
+            if link in self._entries:
+                self._drop(link)
+            self._entries[link] = _CacheEntry(gdf, fingerprint, nbytes, etag, last_modified)
+            self._total_bytes += nbytes
+            while self._total_bytes > self.max_bytes and self._entries:
+                evicted, _ = next(iter(self._entries.items()))
+                logger.debug(f"Evicting layer {evicted} from layer cache")
+                self._drop(evicted)
+
+    def get_or_load(
+        self, link: str, fingerprint: str, loader: Callable[[], gpd.GeoDataFrame]
+    ) -> gpd.GeoDataFrame:
+        """Return the cached layer for ``(link, fingerprint)`` or load and cache it."""
+        cached = self.get(link, fingerprint)
+        if cached is not None:
+            return cached
+        gdf = loader()
+        self.put(link, fingerprint, gdf)
+        return gdf.copy()
+
+    def conditional_headers(self, link: str) -> Dict[str, str]:
+        """Return If-None-Match/If-Modified-Since headers for a cached remote layer."""
+        with self._lock:
+            entry = self._entries.get(link)
+            if entry is None:
+                return {}
+            headers = {}
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+            return headers
+
+    def fingerprint(self, link: str) -> Optional[str]:
+        """Return the content fingerprint of the cached version of a layer."""
+        with self._lock:
+            entry = self._entries.get(link)
+            return entry.fingerprint if entry is not None else None
+
+    def invalidate(self, link: str) -> None:
+        with self._lock:
+            if link in self._entries:
+                self._drop(link)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self._hits = 0
+            self._misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+    def _drop(self, link: str) -> None:
+        entry = self._entries.pop(link)
+        self._total_bytes -= entry.nbytes
+
+
+# Global singleton instance
+_layer_cache: Optional[LayerCache] = None
+_layer_cache_lock = threading.Lock()
+
+
+def get_layer_cache() -> LayerCache:
+    """Get the process-wide layer cache."""
+    global _layer_cache
+    if _layer_cache is None:
+        with _layer_cache_lock:
+            if _layer_cache is None:
+                _layer_cache = LayerCache()
+    return _layer_cache
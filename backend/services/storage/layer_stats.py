@@ -0,0 +1,547 @@
+"""Layer statistics collected while an upload is being stored.
+
+Styling, the attribute tool and the agent's layer metadata only need a few
+facts about a layer (feature count, geometry types, bounding box, fields with
+example values, CRS), yet each used to download or parse the whole file to get
+them. Instead, uploads are scanned once while they stream to disk:
+
+- GeoJSONStatsCollector: push-based incremental parser. Chunks are fed as
+  they are written; only the current feature and one chunk are held in memory.
+  Features are validated on the way (GeoJSON structure, geometry types,
+  coordinates) and invalid ones are counted and reported.
+- The result is written next to the file as a ``.stats.json`` sidecar, keyed
+  by the file's size and modification time.
+- Other vector formats (GeoPackage, zipped shapefiles, ...) are described on
+  first use from their metadata and a small sample of features (pyogrio).
+
+``get_layer_stats`` returns the sidecar, computing it for files stored before
+it existed.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import logging
+import math
+import re
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from services.storage.layer_cache import local_fingerprint
+from services.storage.sidecars import load_sidecar, write_sidecar
+
+logger = logging.getLogger(__name__)
+
+GEOJSON_SUFFIXES = frozenset({".geojson", ".json"})
+
+# Distinct example values kept per field, and their maximum text length
+MAX_SAMPLE_VALUES = 12
+SAMPLE_TEXT_LENGTH = 80
+# Validation messages kept in the sidecar (all invalid features are counted)
+MAX_ERRORS = 10
+# Feature properties kept as sample rows: first and last few features
+HEAD_ROWS = 3
+TAIL_ROWS = 2
+# Features read from non-GeoJSON files for field examples
+OGR_SAMPLE_FEATURES = 1000
+# A value still incomplete after this much text is treated as malformed
+MAX_PENDING_CHARS = 64 * 1024 * 1024
+
+# Nesting depth of the coordinate arrays per geometry type
+_COORDINATE_DEPTH = {
+    "Point": 0,
+    "MultiPoint": 1,
+    "LineString": 1,
+    "MultiLineString": 2,
+    "Polygon": 2,
+    "MultiPolygon": 3,
+}
+
+_SEPARATORS = re.compile(r"[\s,]*")
+_COLON = re.compile(r"\s*:\s*")
+
+# Parser states
+_START, _MEMBERS, _FEATURES, _DONE = range(4)
+
+
+def get_stats_path(file_path: Path) -> Path:
+    """Path of the statistics sidecar of ``file_path``."""
+    return file_path.with_suffix(file_path.suffix + ".stats.json")
+
+
+def _coordinate_rings(geometry_type: str, coordinates: Any) -> List[Any]:
+    """Coordinate sequences of a geometry, one per point list."""
+    depth = _COORDINATE_DEPTH[geometry_type]
+    if depth == 0:
+        return [[coordinates]]
+    sequences = [coordinates]
+    for _ in range(depth - 1):
+        if not isinstance(sequences, list) or not all(isinstance(s, list) for s in sequences):
+            raise ValueError("coordinates are not nested lists")
+        sequences = [part for sequence in sequences for part in sequence]
+    return sequences
+
+
+def geometry_bounds(geometry: Dict[str, Any]) -> Optional[List[float]]:
+    """
+    Bounds ``[minx, miny, maxx, maxy]`` of a GeoJSON geometry dict.
+
+    Returns:
+        The bounds, or None for an empty geometry
+
+    Raises:
+        ValueError: If the geometry is not valid GeoJSON
+    """
+    geometry_type = geometry.get("type")
+    if geometry_type == "GeometryCollection":
+        parts = geometry.get("geometries")
+        if not isinstance(parts, list):
+            raise ValueError("GeometryCollection without 'geometries'")
+        bounds = [geometry_bounds(part) for part in parts if isinstance(part, dict)]
+        if len(bounds) != len(parts):
+            raise ValueError("GeometryCollection member is not a geometry")
+        bounds = [b for b in bounds if b is not None]
+        if not bounds:
+            return None
+        array = np.array(bounds)
+        return [*array[:, :2].min(axis=0).tolist(), *array[:, 2:].max(axis=0).tolist()]
+
+    if geometry_type not in _COORDINATE_DEPTH:
+        raise ValueError(f"unknown geometry type {geometry_type!r}")
+    if "coordinates" not in geometry:
+        raise ValueError(f"{geometry_type} without 'coordinates'")
+
+    minx = miny = math.inf
+    maxx = maxy = -math.inf
+    for sequence in _coordinate_rings(geometry_type, geometry["coordinates"]):
+        try:
+            points = np.asarray(sequence, dtype=float)
+        except (TypeError, ValueError):
+            raise ValueError(f"{geometry_type} has non-numeric or ragged coordinates")
+        if points.size == 0:
+            continue
+        if points.ndim != 2 or points.shape[1] < 2:
+            raise ValueError(f"{geometry_type} positions need at least two numbers")
+        if not np.isfinite(points[:, :2]).all():
+            raise ValueError(f"{geometry_type} has non-finite coordinates")
+        lo = points[:, :2].min(axis=0)
+        hi = points[:, :2].max(axis=0)
+        minx, miny = min(minx, lo[0]), min(miny, lo[1])
+        maxx, maxy = max(maxx, hi[0]), max(maxy, hi[1])
+    if minx == math.inf:
+        return None
+    return [float(minx), float(miny), float(maxx), float(maxy)]
+
+
+class _FieldStats:
+    """Type, null count, range and example values of one property."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.kinds: Counter = Counter()
+        self.non_null = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.samples: Dict[Any, None] = {}
+
+    def add(self, value: Any) -> None:
+        if value is None:
+            return
+        self.non_null += 1
+        if isinstance(value, bool):
+            kind = "bool"
+        elif isinstance(value, int):
+            kind = "int"
+        elif isinstance(value, float):
+            kind = "float"
+        elif isinstance(value, str):
+            kind = "str"
+        else:
+            kind = "object"
+        self.kinds[kind] += 1
+
+        if kind in ("int", "float"):
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+        if len(self.samples) < MAX_SAMPLE_VALUES:
+            if kind == "str":
+                value = value[:SAMPLE_TEXT_LENGTH]
+            elif kind == "object":
+                value = json.dumps(value, default=str)[:SAMPLE_TEXT_LENGTH]
+            self.samples.setdefault(value, None)
+
+    def dtype(self, row_count: int) -> str:
+        """pandas dtype the column gets when the layer is read."""
+        kinds = set(self.kinds)
+        if not kinds:
+            return "object"
+        if kinds == {"bool"}:
+            return "bool" if self.non_null == row_count else "object"
+        if kinds == {"int"}:
+            # Missing values turn integer columns into floats
+            return "int64" if self.non_null == row_count else "float64"
+        if kinds <= {"int", "float"}:
+            return "float64"
+        return "object"
+
+    def to_dict(self, row_count: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {
+            "name": self.name,
+            "type": self.dtype(row_count),
+            "null_count": row_count - self.non_null,
+            "samples": list(self.samples),
+        }
+        if self.minimum is not None:
+            out["min"] = self.minimum
+            out["max"] = self.maximum
+        return out
+
+
+class GeoJSONStatsCollector:
+    """
+    Incrementally parse a GeoJSON document and collect layer statistics.
+
+    Feed raw bytes with ``feed`` as they arrive, then call ``finish``. Parsing
+    problems never raise: a document that can't be parsed yields statistics
+    with ``complete`` set to False.
+    """
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8-sig")()
+        self._decoder = json.JSONDecoder()
+        self._buf = ""
+        self._state = _START
+        # Buffer length to wait for before retrying an incomplete value
+        self._wait_for = 0
+        self._members: Dict[str, Any] = {}
+        self._error: Optional[str] = None
+
+        self.feature_count = 0
+        self.invalid_features = 0
+        self.errors: List[str] = []
+        self.geometry_types: Counter = Counter()
+        self.bbox: Optional[List[float]] = None
+        self._fields: Dict[str, _FieldStats] = {}
+        self._head: List[Dict[str, Any]] = []
+        self._tail: deque = deque(maxlen=TAIL_ROWS)
+
+    def feed(self, chunk: bytes) -> None:
+        """Consume the next chunk of the document."""
+        if self._error is not None or self._state == _DONE:
+            return
+        try:
+            self._buf += self._text.decode(chunk)
+            if len(self._buf) >= self._wait_for:
+                self._process(final=False)
+        except Exception as e:
+            self._fail(f"Invalid GeoJSON: {e}")
+
+    def finish(self) -> Dict[str, Any]:
+        """Statistics of everything fed so far."""
+        if self._error is None and self._state != _DONE:
+            try:
+                self._buf += self._text.decode(b"", final=True)
+                self._process(final=True)
+                if self._state != _DONE:
+                    self._fail("Invalid GeoJSON: document ended unexpectedly")
+            except Exception as e:
+                self._fail(f"Invalid GeoJSON: {e}")
+        if self._error is None:
+            self._finish_single_object()
+        return self._stats()
+
+    def _fail(self, message: str) -> None:
+        self._error = message
+        self._buf = ""
+
+    def _decode(self, pos: int, final: bool):
+        """Decode the JSON value at ``pos``; None if it is not complete yet."""
+        try:
+            return self._decoder.raw_decode(self._buf, pos)
+        except json.JSONDecodeError:
+            if final or len(self._buf) - pos > MAX_PENDING_CHARS:
+                raise
+            # Wait until the buffer has doubled so huge values parse in linear time
+            self._buf = self._buf[pos:]
+            self._wait_for = 2 * len(self._buf)
+            return None
+
+    def _process(self, final: bool) -> None:
+        buf_pos = 0
+        self._wait_for = 0
+        while True:
+            buf = self._buf
+            pos = _SEPARATORS.match(buf, buf_pos).end()
+            if pos >= len(buf):
+                self._buf = ""
+                return
+
+            if self._state == _START:
+                if buf[pos] != "{":
+                    raise ValueError("document is not a JSON object")
+                self._state = _MEMBERS
+                buf_pos = pos + 1
+                continue
+
+            if self._state == _MEMBERS:
+                if buf[pos] == "}":
+                    self._state = _DONE
+                    self._buf = ""
+                    return
+                decoded = self._decode(pos, final)
+                if decoded is None:
+                    return
+                key, end = decoded
+                colon = _COLON.match(buf, end)
+                value_pos = colon.end() if colon else end
+                if not colon or value_pos >= len(buf):
+                    if final:
+                        raise ValueError(f"member {key!r} has no value")
+                    self._buf, self._wait_for = buf[pos:], 0
+                    return
+                if key == "features" and buf[value_pos] == "[":
+                    self._state = _FEATURES
+                    buf_pos = value_pos + 1
+                    continue
+                decoded = self._decode(value_pos, final)
+                if decoded is None:
+                    # Re-read the key once the value is complete
+                    self._buf = buf[pos:]
+                    return
+                self._members[key], buf_pos = decoded
+                continue
+
+            # _FEATURES
+            if buf[pos] == "]":
+                self._state = _MEMBERS
+                buf_pos = pos + 1
+                continue
+            decoded = self._decode(pos, final)
+            if decoded is None:
+                return
+            feature, buf_pos = decoded
+            self._add_feature(feature)
+
+    def _finish_single_object(self) -> None:
+        """A document that is a single Feature or geometry counts as one feature."""
+        kind = self._members.get("type")
+        if self.feature_count or kind == "FeatureCollection":
+            return
+        if kind == "Feature":
+            self._add_feature(self._members)
+        elif kind in _COORDINATE_DEPTH or kind == "GeometryCollection":
+            self._add_feature({"type": "Feature", "geometry": self._members, "properties": {}})
+        else:
+            self._fail(f"Invalid GeoJSON: unsupported document type {kind!r}")
+
+    def _invalid(self, message: str) -> None:
+        self.invalid_features += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append(f"Feature {self.feature_count}: {message}")
+
+    def _add_feature(self, feature: Any) -> None:
+        if not isinstance(feature, dict) or feature.get("type") != "Feature":
+            self._invalid("not a GeoJSON Feature")
+            return
+
+        properties = feature.get("properties")
+        if properties is not None and not isinstance(properties, dict):
+            self._invalid("'properties' is not an object")
+            properties = None
+        properties = properties or {}
+
+        geometry = feature.get("geometry")
+        geometry_type = "None"
+        if geometry is not None:
+            if not isinstance(geometry, dict):
+                self._invalid("'geometry' is not an object")
+            else:
+                try:
+                    bounds = geometry_bounds(geometry)
+                    geometry_type = geometry["type"]
+                    if bounds is not None:
+                        self._extend_bbox(bounds)
+                except ValueError as e:
+                    self._invalid(str(e))
+
+        self.feature_count += 1
+        self.geometry_types[geometry_type] += 1
+        for name, value in properties.items():
+            field = self._fields.get(name)
+            if field is None:
+                field = self._fields[name] = _FieldStats(name)
+            field.add(value)
+        if len(self._head) < HEAD_ROWS:
+            self._head.append(properties)
+        else:
+            self._tail.append(properties)
+
+    def _extend_bbox(self, bounds: List[float]) -> None:
+        if self.bbox is None:
+            self.bbox = list(bounds)
+            return
+        self.bbox[0] = min(self.bbox[0], bounds[0])
+        self.bbox[1] = min(self.bbox[1], bounds[1])
+        self.bbox[2] = max(self.bbox[2], bounds[2])
+        self.bbox[3] = max(self.bbox[3], bounds[3])
+
+    def _crs(self) -> str:
+        crs = self._members.get("crs")
+        name = crs.get("properties", {}).get("name") if isinstance(crs, dict) else None
+        if not name:
+            # RFC 7946: GeoJSON coordinates are WGS 84
+            return "EPSG:4326"
+        try:
+            from pyproj import CRS
+
+            return CRS.from_user_input(name).to_string()
+        except Exception:
+            return str(name)
+
+    def _stats(self) -> Dict[str, Any]:
+        if self._error is not None:
+            return {"format": "geojson", "complete": False, "errors": [self._error]}
+        return {
+            "format": "geojson",
+            "complete": True,
+            "feature_count": self.feature_count,
+            "geometry_types": dict(self.geometry_types),
+            "bbox": self.bbox,
+            "crs": self._crs(),
+            "fields": [field.to_dict(self.feature_count) for field in self._fields.values()],
+            "sample_rows": self._head + list(self._tail),
+            "invalid_features": self.invalid_features,
+            "errors": self.errors,
+        }
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+def _ogr_stats(path: Path) -> Dict[str, Any]:
+    """Describe a non-GeoJSON vector file from its metadata and a sample."""
+    import pyogrio
+
+    info = pyogrio.read_info(str(path), force_feature_count=True, force_total_bounds=True)
+    sample = pyogrio.read_dataframe(
+        str(path), max_features=OGR_SAMPLE_FEATURES, read_geometry=False
+    )
+    feature_count = int(info.get("features") or 0)
+    bounds = info.get("total_bounds")
+    bbox = [float(v) for v in bounds] if bounds is not None else None
+    if bbox is not None and not all(math.isfinite(v) for v in bbox):
+        bbox = None
+
+    fields = []
+    for name, dtype in zip(info["fields"], info["dtypes"]):
+        column = sample[name] if name in sample.columns else None
+        entry: Dict[str, Any] = {"name": str(name), "type": str(dtype), "samples": []}
+        if column is not None:
+            non_null = column.dropna()
+            entry["null_count"] = int(column.isna().sum())
+            entry["samples"] = [
+                _jsonable(v) for v in non_null.astype(str).str.slice(0, SAMPLE_TEXT_LENGTH).unique()
+            ][:MAX_SAMPLE_VALUES]
+            numeric = pd.api.types.is_numeric_dtype(column.dtype)
+            if numeric and not pd.api.types.is_bool_dtype(column.dtype) and len(non_null):
+                entry["min"] = _jsonable(non_null.min())
+                entry["max"] = _jsonable(non_null.max())
+        fields.append(entry)
+
+    rows = sample.head(HEAD_ROWS).to_dict("records")
+    return {
+        "format": str(info.get("driver") or path.suffix.lstrip(".")).lower(),
+        "complete": True,
+        "feature_count": feature_count,
+        "geometry_types": {str(info.get("geometry_type") or "Unknown"): feature_count},
+        "bbox": bbox,
+        "crs": info.get("crs"),
+        "fields": fields,
+        "sample_rows": [{k: _jsonable(v) for k, v in row.items()} for row in rows],
+        "invalid_features": 0,
+        "errors": [],
+        # Field statistics come from the first features only
+        "sampled": min(feature_count, OGR_SAMPLE_FEATURES),
+    }
+
+
+def collect_geojson_stats(chunks: Iterable[bytes]) -> Dict[str, Any]:
+    """Statistics of a GeoJSON document given as byte chunks."""
+    collector = GeoJSONStatsCollector()
+    for chunk in chunks:
+        collector.feed(chunk)
+    return collector.finish()
+
+
+def _iter_file(path: Path, chunk_size: int = 1024 * 1024) -> Iterable[bytes]:
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            yield chunk
+
+
+def compute_layer_stats(path: Path) -> Optional[Dict[str, Any]]:
+    """Statistics of a vector file, or None if it can't be read as one."""
+    if path.suffix.lower() in GEOJSON_SUFFIXES:
+        return collect_geojson_stats(_iter_file(path))
+    try:
+        return _ogr_stats(path)
+    except Exception as e:
+        logger.info(f"Could not describe {path.name} as a vector layer: {e}")
+        return None
+
+
+def write_layer_stats(path: Path, stats: Dict[str, Any]) -> None:
+    """Store ``stats`` as the sidecar of the current version of ``path``."""
+    try:
+        write_sidecar(get_stats_path(path), {**stats, "version": local_fingerprint(str(path))})
+    except OSError as e:
+        logger.warning(f"Could not write layer statistics for {path.name}: {e}")
+
+
+def load_layer_stats(path: Path) -> Optional[Dict[str, Any]]:
+    """The sidecar of ``path`` if it describes the current version of the file."""
+    return load_sidecar(get_stats_path(path), path)
+
+
+def get_layer_stats(path: Path, compute: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Statistics of a local layer file, from its sidecar.
+
+    Args:
+        path: Path to the layer file
+        compute: Compute (and store) the statistics if there is no current sidecar
+
+    Returns:
+        The statistics if the whole file could be described, else None
+    """
+    path = Path(path)
+    stats = load_layer_stats(path)
+    if stats is None and compute and path.is_file():
+        stats = compute_layer_stats(path)
+        if stats is not None:
+            write_layer_stats(path, stats)
+    if stats is None or not stats.get("complete"):
+        return None
+    return stats
+
+
+def dominant_geometry_type(stats: Dict[str, Any]) -> Optional[str]:
+    """The layer's geometry type, ``"Mixed"`` for several, None if there is none."""
+    types = [t for t in stats.get("geometry_types", {}) if t not in ("None", "Unknown")]
+    if not types:
+        return None
+    return types[0] if len(types) == 1 else "Mixed"
@@ -0,0 +1,104 @@
+"""
+Versioned sidecar files and deduplicated background jobs for local files.
+
+Data derived from an upload (compressed variants, an indexed copy, layer
+statistics) is described by a JSON sidecar next to the file. The sidecar
+records the file's ``local_fingerprint`` (size and modification time) as its
+``version``, so data of an older version of the file is never used.
+
+``BackgroundFileJob`` runs the work that produces such data on the
+low-priority background pool, with at most one queued task per file.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from services.background_tasks import TaskPriority, get_task_manager
+from services.storage.layer_cache import local_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def load_sidecar(sidecar_path: Path, file_path: Path) -> Optional[Dict[str, Any]]:
+    """The sidecar at ``sidecar_path`` if it describes the current version of ``file_path``."""
+    try:
+        data = json.loads(Path(sidecar_path).read_text(encoding="utf-8"))
+        if data.get("version") != local_fingerprint(str(file_path)):
+            return None
+        return data
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def write_sidecar(sidecar_path: Path, data: Dict[str, Any]) -> None:
+    """Atomically replace the sidecar at ``sidecar_path`` with ``data``."""
+    sidecar_path = Path(sidecar_path)
+    tmp_path = sidecar_path.with_suffix(sidecar_path.suffix + ".tmp")
+    tmp_path.write_text(json.dumps(data, default=str), encoding="utf-8")
+    os.replace(tmp_path, sidecar_path)
+
+
+class BackgroundFileJob:
+    """
+    Run ``func(file_path)`` on the low-priority background pool.
+
+    A file with a task still queued or running is not scheduled again.
+    Failures are logged, never raised: callers fall back to the source file.
+    """
+
+    def __init__(self, func: Callable[[Path], Any], description: str):
+        self.func = func
+        self.description = description
+        self._in_flight: set = set()
+        self._lock = threading.Lock()
+
+    def _run(self, file_path: Path) -> None:
+        try:
+            self.func(file_path)
+        except FileNotFoundError:
+            # Deleted before the task ran
+            pass
+        except Exception as e:
+            logger.error(
+                f"{self.description.capitalize()} of {file_path.name} failed: {e}", exc_info=True
+            )
+        finally:
+            with self._lock:
+                self._in_flight.discard(str(file_path))
+
+    def schedule(self, file_path: Path) -> bool:
+        """
+        Queue the job for ``file_path`` unless a task for it is already queued.
+
+        Returns:
+            True if a task was queued
+        """
+        file_path = Path(file_path)
+        key = str(file_path)
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+
+        try:
+            get_task_manager().submit_task(self._run, file_path, priority=TaskPriority.LOW)
+        except Exception as e:
+            logger.warning(f"Could not schedule {self.description} of {file_path.name}: {e}")
+            with self._lock:
+                self._in_flight.discard(key)
+            return False
+        return True
+
+    def in_flight(self) -> int:
+        """Number of files with a queued or running task."""
+        with self._lock:
+            return len(self._in_flight)
+
+    def clear(self) -> None:
+        """Forget queued tasks (for tests)."""
+        with self._lock:
+            self._in_flight.clear()
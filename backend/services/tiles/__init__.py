@@ -0,0 +1 @@
+"""Vector tile (MVT) generation for local layer files."""
@@ -0,0 +1,265 @@
+"""Minimal Mapbox Vector Tile (MVT 2.1) encoder.
+
+Encodes shapely geometries that are already in tile coordinates (integer grid
+of ``extent`` units, origin top-left, y down) into the protobuf wire format
+without a protobuf dependency: a tile only needs varints, length-delimited
+fields and packed ``uint32`` command streams.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+# Protobuf wire types
+_VARINT = 0
+_FIXED64 = 1
+_BYTES = 2
+
+# Feature.type
+GEOM_POINT = 1
+GEOM_LINESTRING = 2
+GEOM_POLYGON = 3
+
+# Geometry commands
+_MOVE_TO = 1
+_LINE_TO = 2
+_CLOSE_PATH = 7
+
+DEFAULT_EXTENT = 4096
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    value &= 0xFFFFFFFFFFFFFFFF
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _bytes_field(field: int, payload: bytes) -> bytes:
+    return _key(field, _BYTES) + _varint(len(payload)) + payload
+
+
+def _varint_field(field: int, value: int) -> bytes:
+    return _key(field, _VARINT) + _varint(value)
+
+
+def _packed_field(field: int, values: Sequence[int]) -> bytes:
+    return _bytes_field(field, b"".join(_varint(v) for v in values))
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _command(command: int, count: int) -> int:
+    return (command & 0x7) | (count << 3)
+
+
+def _encode_value(value: Any) -> Optional[bytes]:
+    """Encode a property value as a ``Tile.Value`` message; None to skip it."""
+    if value is None:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return _varint_field(7, int(bool(value)))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        if value < 0:
+            return _varint_field(6, _zigzag(value))
+        return _varint_field(5, value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        if math.isnan(value):
+            return None
+        return _key(3, _FIXED64) + struct.pack("<d", value)
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str, ensure_ascii=False)
+    return _bytes_field(1, value.encode("utf-8"))
+
+
+class _Cursor:
+    """Pen position shared by all parts of a feature's geometry."""
+
+    def __init__(self) -> None:
+        self.x = 0
+        self.y = 0
+
+    def deltas(self, points: np.ndarray) -> List[int]:
+        out: List[int] = []
+        for x, y in points.tolist():
+            out.append(_zigzag(x - self.x))
+            out.append(_zigzag(y - self.y))
+            self.x, self.y = x, y
+        return out
+
+
+def _dedupe(points: np.ndarray) -> np.ndarray:
+    """Drop consecutive duplicates left over after snapping to the tile grid."""
+    if len(points) < 2:
+        return points
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    return points[keep]
+
+
+def _signed_area(ring: np.ndarray) -> float:
+    x, y = ring[:, 0], ring[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def _grid(geometry: BaseGeometry) -> np.ndarray:
+    return np.rint(shapely.get_coordinates(geometry)).astype(np.int64)
+
+
+def _encode_points(geometry: BaseGeometry, cursor: _Cursor) -> List[int]:
+    points = _grid(geometry)
+    if not len(points):
+        return []
+    return [_command(_MOVE_TO, len(points))] + cursor.deltas(points)
+
+
+def _encode_lines(parts: Iterable[BaseGeometry], cursor: _Cursor) -> List[int]:
+    commands: List[int] = []
+    for part in parts:
+        points = _dedupe(_grid(part))
+        if len(points) < 2:
+            continue
+        commands.append(_command(_MOVE_TO, 1))
+        commands.extend(cursor.deltas(points[:1]))
+        commands.append(_command(_LINE_TO, len(points) - 1))
+        commands.extend(cursor.deltas(points[1:]))
+    return commands
+
+
+def _encode_ring(points: np.ndarray, exterior: bool, cursor: _Cursor) -> List[int]:
+    points = _dedupe(points)
+    if len(points) > 1 and np.array_equal(points[0], points[-1]):
+        points = points[:-1]
+    if len(points) < 3:
+        return []
+    area = _signed_area(points)
+    if area == 0:
+        return []
+    # Exterior rings have positive area in tile coordinates (y down), holes negative
+    if (area > 0) != exterior:
+        points = points[::-1]
+    return (
+        [_command(_MOVE_TO, 1)]
+        + cursor.deltas(points[:1])
+        + [_command(_LINE_TO, len(points) - 1)]
+        + cursor.deltas(points[1:])
+        + [_command(_CLOSE_PATH, 1)]
+    )
+
+
+def _encode_polygons(parts: Iterable[BaseGeometry], cursor: _Cursor) -> List[int]:
+    commands: List[int] = []
+    for polygon in parts:
+        exterior = _encode_ring(_grid(polygon.exterior), True, cursor)
+        if not exterior:
+            # A collapsed shell drops its holes too
+            continue
+        commands.extend(exterior)
+        for interior in polygon.interiors:
+            commands.extend(_encode_ring(_grid(interior), False, cursor))
+    return commands
+
+
+def encode_geometry(geometry: BaseGeometry) -> Optional[Tuple[int, List[int]]]:
+    """Return ``(feature_type, commands)``, or None if nothing survives snapping."""
+    if geometry is None or geometry.is_empty:
+        return None
+    cursor = _Cursor()
+    kind = geometry.geom_type
+    if kind in ("Point", "MultiPoint"):
+        feature_type, commands = GEOM_POINT, _encode_points(geometry, cursor)
+    elif kind == "LineString":
+        feature_type, commands = GEOM_LINESTRING, _encode_lines([geometry], cursor)
+    elif kind == "MultiLineString":
+        feature_type, commands = GEOM_LINESTRING, _encode_lines(geometry.geoms, cursor)
+    elif kind == "Polygon":
+        feature_type, commands = GEOM_POLYGON, _encode_polygons([geometry], cursor)
+    elif kind == "MultiPolygon":
+        feature_type, commands = GEOM_POLYGON, _encode_polygons(geometry.geoms, cursor)
+    else:
+        # GeometryCollections carry mixed types; MVT features have exactly one
+        return None
+    if not commands:
+        return None
+    return feature_type, commands
+
+
+class LayerEncoder:
+    """Accumulates features for one ``Tile.Layer``, interning keys and values."""
+
+    def __init__(self, name: str, extent: int = DEFAULT_EXTENT):
+        self.name = name
+        self.extent = extent
+        self._features: List[bytes] = []
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[bytes, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _intern(self, table: Dict, item) -> int:
+        index = table.get(item)
+        if index is None:
+            index = table[item] = len(table)
+        return index
+
+    def add_feature(
+        self,
+        geometry: BaseGeometry,
+        properties: Optional[Dict[str, Any]] = None,
+        feature_id: Optional[int] = None,
+    ) -> bool:
+        """Add a feature in tile coordinates; returns False if it was dropped."""
+        encoded = encode_geometry(geometry)
+        if encoded is None:
+            return False
+        feature_type, commands = encoded
+
+        tags: List[int] = []
+        for key, value in (properties or {}).items():
+            encoded_value = _encode_value(value)
+            if encoded_value is None:
+                continue
+            tags.append(self._intern(self._keys, str(key)))
+            tags.append(self._intern(self._values, encoded_value))
+
+        message = b""
+        if feature_id is not None and feature_id >= 0:
+            message += _varint_field(1, feature_id)
+        if tags:
+            message += _packed_field(2, tags)
+        message += _varint_field(3, feature_type)
+        message += _packed_field(4, commands)
+        self._features.append(message)
+        return True
+
+    def encode(self) -> bytes:
+        message = _varint_field(15, 2) + _bytes_field(1, self.name.encode("utf-8"))
+        message += b"".join(_bytes_field(2, feature) for feature in self._features)
+        message += b"".join(_bytes_field(3, key.encode("utf-8")) for key in self._keys)
+        message += b"".join(_bytes_field(4, value) for value in self._values)
+        message += _varint_field(5, self.extent)
+        return message
+
+
+def encode_tile(layers: Iterable[LayerEncoder]) -> bytes:
+    """Serialize non-empty layers into a ``Tile`` message (empty bytes if none)."""
+    return b"".join(_bytes_field(3, layer.encode()) for layer in layers if len(layer))
@@ -0,0 +1,262 @@
+"""Vector tiles (MVT) rendered on demand from local layer files.
+
+Large uploads and tool outputs (OSM extracts, WFS downloads) used to reach the
+map only as complete GeoJSON documents. Instead, a layer file can be served as
+``/{z}/{x}/{y}.mvt`` tiles:
+
+- On the first tile request the file is parsed once, reprojected to Web
+  Mercator and indexed with an STR-tree (``TileSource``). The most recently
+  used sources stay in memory.
+- A tile selects its features through the index, clips them to the tile (plus
+  a small buffer against seams), simplifies them with a tolerance of one tile
+  unit for that zoom, drops features smaller than that, and encodes the result.
+- Rendered tiles are written to ``TILE_CACHE_DIR`` keyed by the file's size and
+  modification time, so each tile is generated at most once per file version.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from core.config import TILE_CACHE_DIR, TILE_MAX_ZOOM, TILE_SOURCE_CACHE_SIZE
+from services.storage.layer_cache import local_fingerprint
+from services.tiles.mvt import DEFAULT_EXTENT, LayerEncoder, encode_tile
+
+logger = logging.getLogger(__name__)
+
+WEB_MERCATOR_HALF_WORLD = 20037508.342789244
+MAX_LATITUDE = 85.0511287798066
+# Extra tile units rendered around each tile so strokes don't break at edges
+TILE_BUFFER = 64
+
+TILE_SUFFIXES = frozenset({".geojson", ".json", ".gpkg", ".fgb", ".parquet"})
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Web Mercator bounds ``(minx, miny, maxx, maxy)`` of an XYZ tile."""
+    span = 2 * WEB_MERCATOR_HALF_WORLD / (1 << z)
+    minx = -WEB_MERCATOR_HALF_WORLD + x * span
+    maxy = WEB_MERCATOR_HALF_WORLD - y * span
+    return minx, maxy - span, minx + span, maxy
+
+
+def _read_layer(path: Path) -> gpd.GeoDataFrame:
+    if path.suffix.lower() == ".parquet":
+        return gpd.read_parquet(path)
+    return gpd.read_file(path)
+
+
+class TileSource:
+    """A layer file in Web Mercator with a spatial index over its features."""
+
+    def __init__(self, gdf: gpd.GeoDataFrame, name: str, extent: int = DEFAULT_EXTENT):
+        gdf = gdf[gdf.geometry.notna() & ~gdf.geometry.is_empty]
+        if gdf.crs is None:
+            gdf = gdf.set_crs(4326)
+        gdf = gdf.to_crs(4326)
+        if len(gdf):
+            minx, miny, maxx, maxy = gdf.total_bounds
+            if miny < -MAX_LATITUDE or maxy > MAX_LATITUDE:
+                # Web Mercator is undefined at the poles
+                gdf = gdf.set_geometry(
+                    shapely.clip_by_rect(
+                        gdf.geometry.values, -180, -MAX_LATITUDE, 180, MAX_LATITUDE
+                    )
+                )
+                gdf = gdf[~gdf.geometry.is_empty]
+        self.bounds = tuple(float(v) for v in gdf.total_bounds) if len(gdf) else None
+        gdf = gdf.to_crs(3857)
+
+        self.name = name
+        self.extent = extent
+        self.geometries = np.asarray(gdf.geometry.values, dtype=object)
+        self.attributes = gdf.drop(columns=gdf.geometry.name).reset_index(drop=True)
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "TileSource":
+        return cls(_read_layer(path), name=path.stem)
+
+    def __len__(self) -> int:
+        return len(self.geometries)
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        """Encode tile ``z/x/y``; empty bytes if no feature touches it."""
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        span = maxx - minx
+        pad = span * TILE_BUFFER / self.extent
+        clip = (minx - pad, miny - pad, maxx + pad, maxy + pad)
+
+        rows = np.sort(self.tree.query(shapely.box(*clip)))
+        if not len(rows):
+            return b""
+
+        # One tile unit at this zoom
+        tolerance = span / self.extent
+        geometries = shapely.clip_by_rect(self.geometries[rows], *clip)
+        # Drop lines/polygons that would collapse to less than a unit
+        bounds = shapely.bounds(geometries)
+        size = np.maximum(bounds[:, 2] - bounds[:, 0], bounds[:, 3] - bounds[:, 1])
+        points = np.isin(shapely.get_type_id(geometries), (0, 4))
+        keep = ~shapely.is_empty(geometries) & (points | (size >= tolerance))
+        rows, geometries = rows[keep], geometries[keep]
+        if not len(rows):
+            return b""
+
+        geometries = shapely.simplify(geometries, tolerance, preserve_topology=True)
+        scale = self.extent / span
+        geometries = shapely.transform(
+            geometries,
+            lambda coords: np.column_stack(
+                ((coords[:, 0] - minx) * scale, (maxy - coords[:, 1]) * scale)
+            ),
+        )
+
+        layer = LayerEncoder(self.name, self.extent)
+        records = self.attributes.iloc[rows].to_dict("records")
+        for row, geometry, properties in zip(rows, geometries, records):
+            layer.add_feature(geometry, properties, feature_id=int(row))
+        return encode_tile([layer])
+
+
+class VectorTileService:
+    """Tiles for files in the upload directory, with memory and disk caches."""
+
+    def __init__(
+        self,
+        cache_dir: str = TILE_CACHE_DIR,
+        max_sources: int = TILE_SOURCE_CACHE_SIZE,
+        max_zoom: int = TILE_MAX_ZOOM,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.max_sources = max_sources
+        self.max_zoom = max_zoom
+        self._lock = threading.Lock()
+        self._sources: OrderedDict[Tuple[str, str], TileSource] = OrderedDict()
+        # One lock per source being built, so concurrent first requests parse once
+        self._building: Dict[Tuple[str, str], threading.Lock] = {}
+
+    def validate(self, z: int, x: int, y: int) -> None:
+        if not 0 <= z <= self.max_zoom:
+            raise ValueError(f"Zoom must be between 0 and {self.max_zoom}")
+        if not (0 <= x < (1 << z) and 0 <= y < (1 << z)):
+            raise ValueError(f"Tile {z}/{x}/{y} is outside the tile grid")
+
+    def source(self, path: Path) -> TileSource:
+        """Parsed, indexed source for ``path`` (built on first use)."""
+        if path.suffix.lower() not in TILE_SUFFIXES:
+            raise ValueError(f"Cannot build vector tiles from {path.suffix or 'this'} files")
+        key = (str(path), local_fingerprint(str(path)))
+        with self._lock:
+            source = self._sources.get(key)
+            if source is not None:
+                self._sources.move_to_end(key)
+                return source
+            build_lock = self._building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            try:
+                with self._lock:
+                    source = self._sources.get(key)
+                if source is None:
+                    logger.info("Building vector tile index for %s", path.name)
+                    try:
+                        source = TileSource.from_file(path)
+                    except Exception as exc:
+                        raise ValueError(
+                            f"Could not read {path.name} as a vector layer: {exc}"
+                        ) from exc
+                    with self._lock:
+                        self._sources[key] = source
+                        while len(self._sources) > self.max_sources:
+                            self._sources.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+        return source
+
+    def _tile_dir(self, path: Path) -> Path:
+        """Disk cache directory for the current version of ``path``."""
+        version = hashlib.sha1(local_fingerprint(str(path)).encode("utf-8")).hexdigest()[:16]
+        file_dir = self.cache_dir / path.name
+        tile_dir = file_dir / version
+        if not tile_dir.exists() and file_dir.exists():
+            # Tiles of a previous version of the file
+            for stale in file_dir.iterdir():
+                shutil.rmtree(stale, ignore_errors=True)
+        return tile_dir
+
+    def tile(self, path: Path, z: int, x: int, y: int) -> bytes:
+        """Tile ``z/x/y`` of ``path`` from the disk cache, rendering it if needed.
+
+        Raises:
+            ValueError: If the tile address is invalid or the file is not a vector layer
+        """
+        self.validate(z, x, y)
+        cached = self._tile_dir(path) / str(z) / str(x) / f"{y}.mvt"
+        try:
+            return cached.read_bytes()
+        except FileNotFoundError:
+            pass
+
+        data = self.source(path).render(z, x, y)
+        try:
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=cached.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, cached)
+        except OSError as exc:
+            logger.warning("Could not cache tile %s/%s/%s of %s: %s", z, x, y, path.name, exc)
+        return data
+
+    def metadata(self, path: Path, tiles_url: str) -> Dict[str, Any]:
+        """TileJSON describing the tiles of ``path``."""
+        source = self.source(path)
+        metadata: Dict[str, Any] = {
+            "tilejson": "3.0.0",
+            "name": source.name,
+            "tiles": [tiles_url],
+            "minzoom": 0,
+            "maxzoom": self.max_zoom,
+            "vector_layers": [
+                {
+                    "id": source.name,
+                    "fields": {str(column): "" for column in source.attributes.columns},
+                }
+            ],
+            "feature_count": len(source),
+        }
+        if source.bounds is not None:
+            metadata["bounds"] = list(source.bounds)
+        return metadata
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sources.clear()
+
+
+_service: Optional[VectorTileService] = None
+_service_lock = threading.Lock()
+
+
+def get_tile_service() -> VectorTileService:
+    """Get the process-wide vector tile service."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = VectorTileService()
+    return _service
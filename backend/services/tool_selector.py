@@ -3,16 +3,33 @@ Dynamic Tool Selector for NaLaMap Agent.
 
 Intelligently selects relevant tools based on query analysis using semantic similarity
 instead of keyword matching to support multiple languages.
+
+Tool description embeddings are shared by all selectors: they are computed once
+per embedding model and TOOL_METADATA version, kept as one normalized matrix and
+saved to TOOL_EMBEDDING_CACHE_DIR, so a restart doesn't re-embed them. A query is
+scored against every tool with one matrix product, and the embeddings of recent
+queries are kept in memory so a repeated prompt needs no embedding call.
+Embedding models without a recognizable model name are not shared across
+selectors nor saved.
 """
 
+import hashlib
+import json
 import logging
+import os
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 from langchain_core.embeddings import Embeddings
 from langchain_core.tools import BaseTool
 
+from core.config import TOOL_EMBEDDING_CACHE_DIR, TOOL_QUERY_EMBEDDING_CACHE_SIZE
+
 logger = logging.getLogger(__name__)
 
 # Module-level storage for last selector metrics (Week 3 - Performance Monitoring)
@@ -151,6 +168,85 @@ TOOL_METADATA = {
 }
 
 
+@dataclass
+class ToolEmbeddings:
+    """Embeddings of the tool descriptions, one unit-length row per tool."""
+
+    names: List[str]
+    matrix: np.ndarray
+
+    def similarities(self, query_vector: np.ndarray) -> Dict[str, float]:
+        """Cosine similarity of a (unit-length) query embedding to every tool."""
+        scores = self.matrix @ query_vector
+        return {name: float(score) for name, score in zip(self.names, scores)}
+
+
+# Shared tool embeddings: {cache key: ToolEmbeddings}
+_tool_embeddings: Dict[str, ToolEmbeddings] = {}
+# Recent query embeddings: {(embedding model, query): unit-length vector}
+_query_embeddings: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+
+def _normalized(vectors: Sequence) -> np.ndarray:
+    """Vectors scaled to unit length (zero vectors stay zero)."""
+    array = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=-1, keepdims=True)
+    return np.divide(array, norms, out=np.zeros_like(array), where=norms > 0)
+
+
+def _embedding_model_id(embeddings: Embeddings) -> Optional[str]:
+    """A name identifying the embedding model, or None if it has none."""
+    cls = type(embeddings)
+    for attr in ("model", "model_name", "deployment", "azure_deployment"):
+        value = getattr(embeddings, attr, None)
+        if isinstance(value, str) and value:
+            dimensions = getattr(embeddings, "dimensions", None)
+            suffix = f":{dimensions}" if isinstance(dimensions, int) else ""
+            return f"{cls.__module__}.{cls.__qualname__}:{value}{suffix}"
+    return None
+
+
+def _tool_metadata_hash() -> str:
+    descriptions = [[name, metadata.description] for name, metadata in TOOL_METADATA.items()]
+    return hashlib.sha256(json.dumps(descriptions).encode()).hexdigest()
+
+
+def _tool_embeddings_path(cache_key: str) -> Path:
+    return Path(TOOL_EMBEDDING_CACHE_DIR) / f"{cache_key}.npz"
+
+
+def _load_tool_embeddings(cache_key: str) -> Optional[ToolEmbeddings]:
+    try:
+        with np.load(_tool_embeddings_path(cache_key), allow_pickle=False) as data:
+            names = [str(name) for name in data["names"]]
+            matrix = data["matrix"]
+    except (OSError, ValueError, KeyError):
+        return None
+    if names != list(TOOL_METADATA.keys()):
+        return None
+    return ToolEmbeddings(names=names, matrix=matrix)
+
+
+def _save_tool_embeddings(cache_key: str, tool_embeddings: ToolEmbeddings) -> None:
+    path = _tool_embeddings_path(cache_key)
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            np.savez(f, names=np.array(tool_embeddings.names), matrix=tool_embeddings.matrix)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Could not save tool embeddings to {path}: {e}")
+
+
+def clear_embedding_cache() -> None:
+    """Forget the tool and query embeddings held in memory (saved files stay)."""
+    with _embedding_cache_lock:
+        _tool_embeddings.clear()
+        _query_embeddings.clear()
+
+
 class DynamicToolSelector:
     """
     Intelligently select tools based on query analysis.
@@ -179,7 +275,8 @@ class DynamicToolSelector:
         self.strategy = strategy
         self.similarity_threshold = similarity_threshold
         self.max_tools = max_tools
-        self._tool_embeddings_cache: Optional[Dict[str, List[float]]] = None
+        self._model_id = _embedding_model_id(embeddings) if embeddings else None
+        self._tool_embeddings_cache: Optional[ToolEmbeddings] = None
 
         # Metrics tracking for Week 3
         self.metrics = {
@@ -190,13 +287,33 @@ class DynamicToolSelector:
             "strategy_usage": {"all": 0, "semantic": 0, "conservative": 0, "minimal": 0},
         }
 
-    async def _compute_tool_embeddings(self) -> Dict[str, List[float]]:
-        """Compute and cache embeddings for all tool descriptions."""
+    async def _compute_tool_embeddings(self) -> Optional[ToolEmbeddings]:
+        """
+        Embeddings of all tool descriptions.
+
+        Shared by all selectors using the same embedding model, and saved to
+        disk; computed only if neither has them for the current TOOL_METADATA.
+        """
         if self._tool_embeddings_cache is not None:
             return self._tool_embeddings_cache
 
         if not self.embeddings:
-            return {}
+            return None
+
+        cache_key = None
+        if self._model_id is not None:
+            model_hash = hashlib.sha256(self._model_id.encode()).hexdigest()[:16]
+            cache_key = f"{model_hash}-{_tool_metadata_hash()[:16]}"
+            with _embedding_cache_lock:
+                shared = _tool_embeddings.get(cache_key)
+            if shared is None:
+                shared = _load_tool_embeddings(cache_key)
+                if shared is not None:
+                    with _embedding_cache_lock:
+                        _tool_embeddings[cache_key] = shared
+            if shared is not None:
+                self._tool_embeddings_cache = shared
+                return shared
 
         try:
             # Gather all tool descriptions
@@ -206,28 +323,36 @@ class DynamicToolSelector:
             # Compute embeddings in batch
             embeddings_list = await self.embeddings.aembed_documents(tool_descriptions)
 
-            # Cache results
-            self._tool_embeddings_cache = dict(zip(tool_names, embeddings_list))
-            logger.info(f"Computed embeddings for {len(self._tool_embeddings_cache)} tools")
-
-            return self._tool_embeddings_cache
-
+            tool_embeddings = ToolEmbeddings(names=tool_names, matrix=_normalized(embeddings_list))
+            logger.info(f"Computed embeddings for {len(tool_names)} tools")
         except Exception as e:
             logger.error(f"Failed to compute tool embeddings: {e}")
-            return {}
-
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        import math
-
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = math.sqrt(sum(a * a for a in vec1))
-        magnitude2 = math.sqrt(sum(b * b for b in vec2))
-
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
-
-        return dot_product / (magnitude1 * magnitude2)
+            return None
+
+        if cache_key is not None:
+            with _embedding_cache_lock:
+                _tool_embeddings[cache_key] = tool_embeddings
+            _save_tool_embeddings(cache_key, tool_embeddings)
+        self._tool_embeddings_cache = tool_embeddings
+        return tool_embeddings
+
+    async def _embed_query(self, query: str) -> np.ndarray:
+        """Unit-length embedding of ``query``, reused for recently seen queries."""
+        key = (self._model_id, query) if self._model_id is not None else None
+        if key is not None:
+            with _embedding_cache_lock:
+                vector = _query_embeddings.get(key)
+                if vector is not None:
+                    _query_embeddings.move_to_end(key)
+                    return vector
+
+        vector = _normalized(await self.embeddings.aembed_query(query))
+        if key is not None:
+            with _embedding_cache_lock:
+                _query_embeddings[key] = vector
+                while len(_query_embeddings) > TOOL_QUERY_EMBEDDING_CACHE_SIZE:
+                    _query_embeddings.popitem(last=False)
+        return vector
 
     async def _semantic_tool_selection(
         self, query: str, available_tools: Dict[str, BaseTool]
@@ -248,20 +373,20 @@ class DynamicToolSelector:
 
         try:
             # Compute query embedding
-            query_embedding = await self.embeddings.aembed_query(query)
+            query_vector = await self._embed_query(query)
 
             # Get tool embeddings
             tool_embeddings = await self._compute_tool_embeddings()
 
-            if not tool_embeddings:
+            if tool_embeddings is None:
                 return list(available_tools.keys()), {}
 
-            # Calculate similarities
-            similarities: Dict[str, float] = {}
-            for tool_name, tool_embedding in tool_embeddings.items():
-                if tool_name in available_tools:
-                    similarity = self._cosine_similarity(query_embedding, tool_embedding)
-                    similarities[tool_name] = similarity
+            # Calculate similarities to all tools at once
+            similarities: Dict[str, float] = {
+                tool_name: score
+                for tool_name, score in tool_embeddings.similarities(query_vector).items()
+                if tool_name in available_tools
+            }
 
             # Select tools above threshold
             selected_tools = [
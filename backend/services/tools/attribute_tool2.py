@@ -26,21 +26,34 @@ from typing_extensions import Annotated
 
 from models.geodata import DataType
 from models.states import GeoDataAgentState
+from services.storage.indexed_layers import indexed_schema
 from services.tools.attribute_tools import (
+    _CHUNKED_OPERATIONS,
+    _INDEXED_OPERATIONS,
+    _available_fields,
+    _chunked_batches,
+    _chunked_source,
     _clean_layer_name,
+    _field_index,
     _generate_smart_layer_name,
     _load_gdf,
+    _save_batches_as_geojson,
     _save_gdf_as_geojson,
     build_schema_context,
     describe_dataset_gdf,
     filter_where_gdf,
     get_attribute_values_gdf,
     list_fields_gdf,
+    list_fields_index,
+    schema_context_from_index,
     select_fields_gdf,
     sort_by_gdf,
     summarize_gdf,
+    summarize_index,
     unique_values_gdf,
+    unique_values_index,
 )
+from services.tools.attributes.chunked import peek_batches
 from services.tools.utils import get_all_available_layers, match_layer_names
 
 logger = logging.getLogger(__name__)
@@ -222,40 +235,63 @@ def attribute_tool2(
             }
         )
 
+    # Filters, selections and sorts of very large layers run batch by batch
+    chunked_path = None
+    if operation in _CHUNKED_OPERATIONS:
+        chunked_path = _chunked_source(layer.data_link)
+
     # Load GeoDataFrame
-    try:
-        gdf = _load_gdf(layer.data_link)
-    except Exception as e:
-        return Command(
-            update={
-                "messages": [
-                    ToolMessage(
-                        name="attribute_tool2",
-                        content=f"Error loading GeoJSON into GeoDataFrame: {e}",
-                        tool_call_id=tool_call_id,
-                        status="error",
-                    )
-                ]
-            }
-        )
+    gdf = None
+    if chunked_path is None:
+        try:
+            gdf = _load_gdf(layer.data_link)
+        except Exception as e:
+            return Command(
+                update={
+                    "messages": [
+                        ToolMessage(
+                            name="attribute_tool2",
+                            content=f"Error loading GeoJSON into GeoDataFrame: {e}",
+                            tool_call_id=tool_call_id,
+                            status="error",
+                        )
+                    ]
+                }
+            )
+
+    # Informational operations are answered from the layer's field index
+    # where it holds the answer; it is computed once per layer version
+    index = None
+    if operation in _INDEXED_OPERATIONS or operation == "describe_dataset":
+        try:
+            index = _field_index(layer.data_link, gdf)
+        except Exception as e:
+            logger.warning(f"Could not index fields of layer '{layer.name}': {e}")
 
     # Execute operation
     try:
         if operation == "list_fields":
-            result = _handle_list_fields(gdf, layer, tool_call_id)
+            result = _handle_list_fields(gdf, layer, tool_call_id, index)
 
         elif operation == "summarize":
-            result = _handle_summarize(gdf, layer, fields, tool_call_id)
+            result = _handle_summarize(gdf, layer, fields, tool_call_id, index)
 
         elif operation == "unique_values":
-            result = _handle_unique_values(gdf, layer, field, top_k, tool_call_id)
+            result = _handle_unique_values(gdf, layer, field, top_k, tool_call_id, index)
 
         elif operation == "filter_where":
-            result = _handle_filter_where(gdf, layer, where, state, tool_call_id)
+            result = _handle_filter_where(gdf, layer, where, state, tool_call_id, chunked_path)
 
         elif operation == "select_fields":
             result = _handle_select_fields(
-                gdf, layer, include_fields, exclude_fields, keep_geometry, state, tool_call_id
+                gdf,
+                layer,
+                include_fields,
+                exclude_fields,
+                keep_geometry,
+                state,
+                tool_call_id,
+                chunked_path,
             )
 
         elif operation == "sort_by":
@@ -273,10 +309,12 @@ def attribute_tool2(
                         sort_fields_tuples.append(tuple(sf))
                     else:
                         logger.warning(f"Invalid sort field format: {sf}")
-            result = _handle_sort_by(gdf, layer, sort_fields_tuples, state, tool_call_id)
+            result = _handle_sort_by(
+                gdf, layer, sort_fields_tuples, state, tool_call_id, chunked_path
+            )
 
         elif operation == "describe_dataset":
-            result = _handle_describe_dataset(gdf, layer, tool_call_id)
+            result = _handle_describe_dataset(gdf, layer, tool_call_id, index)
 
         elif operation == "get_attribute_values":
             result = _handle_get_attribute_values(gdf, layer, columns, row_filter, tool_call_id)
@@ -329,9 +367,11 @@ def attribute_tool2(
 # =============================================================================
 
 
-def _handle_list_fields(gdf: gpd.GeoDataFrame, layer, tool_call_id: str) -> Command:
+def _handle_list_fields(
+    gdf: gpd.GeoDataFrame, layer, tool_call_id: str, index: Optional[Dict[str, Any]] = None
+) -> Command:
     """Handle list_fields operation."""
-    result = list_fields_gdf(gdf)
+    result = list_fields_index(index) if index is not None else list_fields_gdf(gdf)
     return Command(
         update={
             "messages": [
@@ -352,7 +392,11 @@ def _handle_list_fields(gdf: gpd.GeoDataFrame, layer, tool_call_id: str) -> Comm
 
 
 def _handle_summarize(
-    gdf: gpd.GeoDataFrame, layer, fields: Optional[List[str]], tool_call_id: str
+    gdf: gpd.GeoDataFrame,
+    layer,
+    fields: Optional[List[str]],
+    tool_call_id: str,
+    index: Optional[Dict[str, Any]] = None,
 ) -> Command:
     """Handle summarize operation."""
     if not fields:
@@ -391,7 +435,9 @@ def _handle_summarize(
             }
         )
 
-    result = summarize_gdf(gdf, fields)
+    result = summarize_index(index, fields) if index is not None else None
+    if result is None:
+        result = summarize_gdf(gdf, fields)
     return Command(
         update={
             "messages": [
@@ -417,6 +463,7 @@ def _handle_unique_values(
     field: Optional[str],
     top_k: Optional[int],
     tool_call_id: str,
+    index: Optional[Dict[str, Any]] = None,
 ) -> Command:
     """Handle unique_values operation."""
     if not field:
@@ -453,7 +500,9 @@ def _handle_unique_values(
             }
         )
 
-    result = unique_values_gdf(gdf, field, top_k)
+    result = unique_values_index(index, field, top_k) if index is not None else None
+    if result is None:
+        result = unique_values_gdf(gdf, field, top_k)
     return Command(
         update={
             "messages": [
@@ -474,13 +523,14 @@ def _handle_unique_values(
 
 
 def _handle_filter_where(
-    gdf: gpd.GeoDataFrame,
+    gdf: Optional[gpd.GeoDataFrame],
     layer,
     where: Optional[str],
     state: GeoDataAgentState,
     tool_call_id: str,
+    chunked_path: Optional[str] = None,
 ) -> Command:
-    """Handle filter_where operation."""
+    """Handle filter_where operation (on ``chunked_path`` batch by batch if given)."""
     if not where:
         return Command(
             update={
@@ -498,8 +548,15 @@ def _handle_filter_where(
             }
         )
 
+    field_suggestions: Dict[str, str] = {}
+    batches = None
     try:
-        filtered_gdf, field_suggestions = filter_where_gdf(gdf, where)
+        if chunked_path is not None:
+            filtered_gdf, batches = peek_batches(
+                _chunked_batches(chunked_path, "filter_where", {"where": where}, field_suggestions)
+            )
+        else:
+            filtered_gdf, field_suggestions = filter_where_gdf(gdf, where)
     except Exception as e:
         return Command(
             update={
@@ -508,7 +565,7 @@ def _handle_filter_where(
                         name="attribute_tool2",
                         content=(
                             f"Error parsing/applying WHERE clause: {e}. "
-                            f"Available fields: {sorted(gdf.columns.tolist())}"
+                            f"Available fields: {_available_fields(gdf, chunked_path)}"
                         ),
                         tool_call_id=tool_call_id,
                         status="error",
@@ -516,9 +573,10 @@ def _handle_filter_where(
                 ]
             }
         )
+    original_count = len(gdf) if gdf is not None else indexed_schema(chunked_path)["features"]
 
     # Check if filter returned any features
-    if len(filtered_gdf) == 0:
+    if filtered_gdf is None or len(filtered_gdf) == 0:
         return Command(
             update={
                 "messages": [
@@ -527,7 +585,7 @@ def _handle_filter_where(
                         content=(
                             f"Filter applied to '{layer.name}' but no features matched "
                             f"the condition: {where}. "
-                            f"Original layer had {len(gdf)} features."
+                            f"Original layer had {original_count} features."
                         ),
                         tool_call_id=tool_call_id,
                     )
@@ -548,15 +606,20 @@ def _handle_filter_where(
     )
 
     # Create detailed description
-    detailed_desc = (
-        f"Filtered features from '{layer.title or layer.name}' using condition: "
-        f"{where}. Result contains {len(filtered_gdf)} feature(s) out of "
-        f"{len(gdf)} original features."
-    )
+    def describe(count: int) -> str:
+        return (
+            f"Filtered features from '{layer.title or layer.name}' using condition: "
+            f"{where}. Result contains {count} feature(s) out of "
+            f"{original_count} original features."
+        )
 
-    obj = _save_gdf_as_geojson(
-        filtered_gdf, title, keep_geometry=True, detailed_description=detailed_desc
-    )
+    if batches is not None:
+        obj, feature_count = _save_batches_as_geojson(batches, title, describe)
+    else:
+        feature_count = len(filtered_gdf)
+        obj = _save_gdf_as_geojson(
+            filtered_gdf, title, keep_geometry=True, detailed_description=describe(feature_count)
+        )
     new_results = (state.get("geodata_results") or []) + [obj]
 
     # Build actionable layer info
@@ -565,8 +628,8 @@ def _handle_filter_where(
         "title": obj.title,
         "id": obj.id,
         "data_source_id": obj.data_source_id,
-        "feature_count": len(filtered_gdf),
-        "original_count": len(gdf),
+        "feature_count": feature_count,
+        "original_count": original_count,
         "filter": where,
     }
 
@@ -580,7 +643,7 @@ def _handle_filter_where(
     # Provide user guidance
     tool_message_content = (
         f"Successfully filtered '{layer.name}' using condition: {where}. "
-        f"Result contains {len(filtered_gdf)} feature(s) out of {len(gdf)} original features. "
+        f"Result contains {feature_count} feature(s) out of {original_count} original features. "
         f"New layer '{obj.title}' created and stored in geodata_results. "
         f"Actionable layer details: {json.dumps(actionable_layer_info)}. "
         f"{suggestion_info}\n"
@@ -610,8 +673,10 @@ def _handle_select_fields(
     keep_geometry: bool,
     state: GeoDataAgentState,
     tool_call_id: str,
+    chunked_path: Optional[str] = None,
 ) -> Command:
-    """Handle select_fields operation."""
+    """Handle select_fields operation (on ``chunked_path`` batch by batch if given)."""
+    available = _available_fields(gdf, chunked_path)
     if not include_fields and not exclude_fields:
         return Command(
             update={
@@ -620,7 +685,7 @@ def _handle_select_fields(
                         name="attribute_tool2",
                         content=(
                             "Error: Either 'include_fields' or 'exclude_fields' must be provided. "
-                            f"Available fields: {sorted(gdf.columns.tolist())}"
+                            f"Available fields: {available}"
                         ),
                         tool_call_id=tool_call_id,
                         status="error",
@@ -631,7 +696,7 @@ def _handle_select_fields(
 
     # Validate fields
     fields_to_check = (include_fields or []) + (exclude_fields or [])
-    missing = [f for f in fields_to_check if f not in gdf.columns]
+    missing = [f for f in fields_to_check if f not in available]
     if missing:
         return Command(
             update={
@@ -640,7 +705,7 @@ def _handle_select_fields(
                         name="attribute_tool2",
                         content=(
                             f"Error: Unknown fields in select_fields: {missing}. "
-                            f"Available: {sorted(gdf.columns.tolist())}"
+                            f"Available: {available}"
                         ),
                         tool_call_id=tool_call_id,
                         status="error",
@@ -650,9 +715,18 @@ def _handle_select_fields(
         )
 
     # Perform selection
-    result_gdf = select_fields_gdf(
-        gdf, include=include_fields, exclude=exclude_fields, keep_geometry=keep_geometry
-    )
+    batches = None
+    if chunked_path is not None:
+        params = {
+            "include": include_fields,
+            "exclude": exclude_fields,
+            "keep_geometry": keep_geometry,
+        }
+        result_gdf, batches = peek_batches(_chunked_batches(chunked_path, "select_fields", params))
+    else:
+        result_gdf = select_fields_gdf(
+            gdf, include=include_fields, exclude=exclude_fields, keep_geometry=keep_geometry
+        )
 
     # Save as new layer
     source_name = _clean_layer_name(layer.title or layer.name)
@@ -686,9 +760,14 @@ def _handle_select_fields(
         f"Result has {len(result_gdf.columns)} columns."
     )
 
-    obj = _save_gdf_as_geojson(
-        result_gdf, title, keep_geometry=keep_geometry, detailed_description=detailed_desc
-    )
+    if batches is not None:
+        obj, _ = _save_batches_as_geojson(
+            batches, title, lambda count: detailed_desc, keep_geometry=keep_geometry
+        )
+    else:
+        obj = _save_gdf_as_geojson(
+            result_gdf, title, keep_geometry=keep_geometry, detailed_description=detailed_desc
+        )
     new_results = (state.get("geodata_results") or []) + [obj]
 
     return Command(
@@ -711,8 +790,9 @@ def _handle_sort_by(
     sort_fields: Optional[List[Tuple[str, str]]],
     state: GeoDataAgentState,
     tool_call_id: str,
+    chunked_path: Optional[str] = None,
 ) -> Command:
-    """Handle sort_by operation."""
+    """Handle sort_by operation (on ``chunked_path`` batch by batch if given)."""
     if not sort_fields:
         return Command(
             update={
@@ -732,7 +812,8 @@ def _handle_sort_by(
 
     # Validate fields
     field_names = [f[0] for f in sort_fields]
-    missing = [f for f in field_names if f not in gdf.columns]
+    available = _available_fields(gdf, chunked_path)
+    missing = [f for f in field_names if f not in available]
     if missing:
         return Command(
             update={
@@ -741,7 +822,7 @@ def _handle_sort_by(
                         name="attribute_tool2",
                         content=(
                             f"Error: Unknown fields in sort_by: {missing}. "
-                            f"Available: {sorted(gdf.columns.tolist())}"
+                            f"Available: {available}"
                         ),
                         tool_call_id=tool_call_id,
                         status="error",
@@ -751,7 +832,12 @@ def _handle_sort_by(
         )
 
     # Perform sorting
-    sorted_gdf = sort_by_gdf(gdf, sort_fields)
+    batches = None
+    if chunked_path is not None:
+        params = {"fields": sort_fields}
+        sorted_gdf, batches = peek_batches(_chunked_batches(chunked_path, "sort_by", params))
+    else:
+        sorted_gdf = sort_by_gdf(gdf, sort_fields)
 
     # Save as new layer
     source_name = _clean_layer_name(layer.title or layer.name)
@@ -768,14 +854,19 @@ def _handle_sort_by(
 
     # Create detailed description
     sort_desc = ", ".join([f"{fld} {order}" for fld, order in sort_fields])
-    detailed_desc = (
-        f"Sorted '{layer.title or layer.name}' by: {sort_desc}. "
-        f"Result contains {len(sorted_gdf)} features in sorted order."
-    )
 
-    obj = _save_gdf_as_geojson(
-        sorted_gdf, title, keep_geometry=True, detailed_description=detailed_desc
-    )
+    def describe(count: int) -> str:
+        return (
+            f"Sorted '{layer.title or layer.name}' by: {sort_desc}. "
+            f"Result contains {count} features in sorted order."
+        )
+
+    if batches is not None:
+        obj, _ = _save_batches_as_geojson(batches, title, describe)
+    else:
+        obj = _save_gdf_as_geojson(
+            sorted_gdf, title, keep_geometry=True, detailed_description=describe(len(sorted_gdf))
+        )
     new_results = (state.get("geodata_results") or []) + [obj]
 
     return Command(
@@ -792,9 +883,13 @@ def _handle_sort_by(
     )
 
 
-def _handle_describe_dataset(gdf: gpd.GeoDataFrame, layer, tool_call_id: str) -> Command:
+def _handle_describe_dataset(
+    gdf: gpd.GeoDataFrame, layer, tool_call_id: str, index: Optional[Dict[str, Any]] = None
+) -> Command:
     """Handle describe_dataset operation."""
-    schema_ctx = build_schema_context(gdf)
+    schema_ctx = (
+        schema_context_from_index(index) if index is not None else build_schema_context(gdf)
+    )
     result = describe_dataset_gdf(gdf, schema_ctx)
 
     return Command(
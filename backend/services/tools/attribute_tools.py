@@ -1,10 +1,10 @@
-import difflib
 import json
 import logging
 import os
 import re
 import uuid
-from typing import Any, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import geopandas as gpd
 import pandas as pd
@@ -14,15 +14,50 @@ from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
-from shapely.geometry import mapping
+from shapely.geometry import box
 from typing_extensions import Annotated
 
-from core.config import BASE_URL, LOCAL_UPLOAD_DIR
+from core.config import (
+    ATTRIBUTE_CHUNK_FEATURES,
+    ATTRIBUTE_CHUNKED_MIN_SIZE,
+    BASE_URL,
+    LOCAL_UPLOAD_DIR,
+)
 from models.geodata import DataOrigin, DataType, GeoDataObject
 from models.states import GeoDataAgentState
 from services.ai.llm_config import get_llm, get_llm_for_provider
-from services.storage.file_management import store_file
+from services.storage.field_index import field_entry, find_field_index, get_field_index
+from services.storage.file_management import local_upload_path, store_file_chunks
+from services.storage.geojson_writer import (
+    gdf_to_feature_collection,
+    iter_batched_feature_collection,
+    iter_feature_collection,
+)
+from services.storage.indexed_layers import (
+    indexed_copy,
+    indexed_schema,
+    iter_layer_batches,
+    read_layer,
+)
+from services.storage.layer_cache import (
+    content_fingerprint,
+    get_layer_cache,
+    local_fingerprint,
+)
+from services.storage.layer_stats import get_layer_stats
+from services.tools.attributes.chunked import (
+    BatchCounter,
+    filter_batches,
+    peek_batches,
+    sort_batches,
+)
+from services.tools.attributes.where import (  # noqa: F401
+    _find_closest_field,
+    compile_where,
+    parse_where,
+)
 from services.tools.utils import get_all_available_layers, match_layer_names
+from utility.tracing import traced
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
@@ -69,58 +104,6 @@ def _get_llm_from_options(state: Optional[GeoDataAgentState] = None):
     return get_llm()
 
 
-# =========================
-# CQL-lite tokenizer/parser
-# =========================
-_token = re.compile(
-    r"""
-    \s*(?:
-        (?P<kw>AND|OR|NOT|IN|IS|NULL)\b
-      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
-      | "(?P<identq>[^"]+)"
-      | '(?P<string>[^']*)'
-      | (?P<num>-?\d+(?:\.\d+)?)
-      | (?P<op>>=|<=|!=|=|>|<)
-      | (?P<lpar>\()
-      | (?P<rpar>\))
-      | (?P<comma>,)
-    )
-""",
-    re.X | re.IGNORECASE,
-)
-
-
-def _tokenize(s: str):
-    pos = 0
-    while pos < len(s):
-        m = _token.match(s, pos)
-        if not m:
-            raise ValueError(f"Bad token near: {s[pos:pos+20]}")
-        pos = m.end()
-        yield m
-
-
-def _read(tokens):
-    return next(tokens, None)
-
-
-def _advance(state, tokens):
-    state["cur"] = _read(tokens)
-    return state["cur"]
-
-
-def _peek(state):
-    return state["cur"]
-
-
-def _field_name(tok) -> str:
-    if tok.group("ident"):
-        return tok.group("ident")
-    if tok.group("identq"):
-        return tok.group("identq")
-    raise ValueError("Expected field name")
-
-
 # --- NEW: dataset description helpers ---------------------------------
 def _geometry_type_counts(gdf: gpd.GeoDataFrame) -> Dict[str, int]:
     if gdf.geometry is None:
@@ -230,12 +213,55 @@ def describe_dataset_gdf(
     - short natural-language summary text
     - suggested next steps (actions)
     """
-    row_count = int(len(gdf))
     geom_col = gdf.geometry.name if gdf.geometry is not None else None
-    geom_types = _geometry_type_counts(gdf)
-    crs = str(gdf.crs) if gdf.crs is not None else None
-    bbox_vals = _bbox(gdf)
+    # Sample rows: up to 3 from top and 2 from bottom (or all if fewer)
+    total = len(gdf)
+    if total >= 5:
+        sample = pd.concat([gdf.head(3), gdf.tail(2)])
+    else:
+        sample = gdf.head(total)
+    # Drop geometry column for readability if present
+    if geom_col in sample.columns:
+        sample = sample.drop(columns=[geom_col])
+
+    return _describe_dataset(
+        row_count=int(total),
+        geom_col=geom_col,
+        geom_types=_geometry_type_counts(gdf),
+        crs=str(gdf.crs) if gdf.crs is not None else None,
+        bbox_vals=_bbox(gdf),
+        schema_ctx=schema_ctx,
+        sample_rows=sample.to_dict(orient="records"),
+        llm=llm,
+    )
+
+
+def describe_dataset_stats(
+    stats: Dict[str, Any], schema_ctx: Dict[str, Any], llm=None
+) -> Dict[str, Any]:
+    """describe_dataset_gdf for a layer known only from its statistics sidecar."""
+    return _describe_dataset(
+        row_count=int(stats["feature_count"]),
+        geom_col="geometry",
+        geom_types={k: v for k, v in stats.get("geometry_types", {}).items() if k != "None"},
+        crs=stats.get("crs"),
+        bbox_vals=stats.get("bbox"),
+        schema_ctx=schema_ctx,
+        sample_rows=stats.get("sample_rows", []),
+        llm=llm,
+    )
 
+
+def _describe_dataset(
+    row_count: int,
+    geom_col: Optional[str],
+    geom_types: Dict[str, int],
+    crs: Optional[str],
+    bbox_vals: Optional[List[float]],
+    schema_ctx: Dict[str, Any],
+    sample_rows: List[Dict[str, Any]],
+    llm=None,
+) -> Dict[str, Any]:
     # Pick 5 "key" columns to preview (prefer name-like then numeric/text variety)
     cols_meta = schema_ctx.get("columns", [])
     name_like = [
@@ -286,21 +312,6 @@ def describe_dataset_gdf(
     try:
         if llm is None:
             llm = get_llm()
-        # Prepare sample rows: up to 3 from top and 2 from bottom (or all if fewer)
-        total = len(gdf)
-        if total >= 5:
-            top_n = min(3, total)
-            bot_n = min(2, total - top_n)
-            sample_top = gdf.head(top_n)
-            sample_bot = gdf.tail(bot_n)
-            sample = pd.concat([sample_top, sample_bot])
-        else:
-            sample = gdf.head(total)
-        # Drop geometry column for readability if present
-        if geom_col in sample.columns:
-            sample = sample.drop(columns=[geom_col])
-        sample_rows = sample.to_dict(orient="records")
-
         sys = (
             "You are a GIS data assistant. "
             "Provide a concise description and practical next steps for this specific dataset. "
@@ -336,163 +347,121 @@ def describe_dataset_gdf(
     return result
 
 
-def _parse_literal(tok):
-    if tok.group("string") is not None:
-        return tok.group("string")
-    if tok.group("num") is not None:
-        s = tok.group("num")
-        return float(s) if "." in s else int(s)
-    return None
-
-
-def _expect_kw(state, kw):
-    cur = _peek(state)
-    if not (cur and cur.group("kw") and cur.group("kw").upper() == kw.upper()):
-        raise ValueError(f"Expected {kw}")
-    _advance(state, state["tokens"])
-
-
-def _expect_op(state, ops):
-    cur = _peek(state)
-    if not (cur and cur.group("op") in ops):
-        raise ValueError(f"Expected one of {ops}")
-    op = cur.group("op")
-    _advance(state, state["tokens"])
-    return op
-
-
-def _parse_primary(state):
-    cur = _peek(state)
-    if cur and cur.group("lpar"):
-        _advance(state, state["tokens"])
-        node = _parse_expr(state)
-        if not (_peek(state) and _peek(state).group("rpar")):
-            raise ValueError("Missing )")
-        _advance(state, state["tokens"])
-        return node
-    if cur and (cur.group("ident") or cur.group("identq")):
-        field = _field_name(cur)
-        _advance(state, state["tokens"])
-        cur = _peek(state)
-        if cur and cur.group("kw") and cur.group("kw").upper() == "IS":
-            _advance(state, state["tokens"])
-            cur = _peek(state)
-            is_not = False
-            if cur and cur.group("kw") and cur.group("kw").upper() == "NOT":
-                is_not = True
-                _advance(state, state["tokens"])
-            _expect_kw(state, "NULL")
-            return ("isnull", field, is_not)
-        if cur and cur.group("kw") and cur.group("kw").upper() == "IN":
-            _advance(state, state["tokens"])
-            if not (_peek(state) and _peek(state).group("lpar")):
-                raise ValueError("Expected ( after IN")
-            _advance(state, state["tokens"])
-            values = []
-            while True:
-                cur = _peek(state)
-                if not cur:
-                    raise ValueError("Unterminated IN list")
-                if cur.group("rpar"):
-                    _advance(state, state["tokens"])
-                    break
-                if cur.group("comma"):
-                    _advance(state, state["tokens"])
-                    continue
-                v = _parse_literal(cur)
-                if v is None:
-                    raise ValueError("Expected literal in IN list")
-                values.append(v)
-                _advance(state, state["tokens"])
-            return ("in", field, values)
-        op = _expect_op(state, {">=", "<=", "!=", "=", ">", "<"})
-        cur = _peek(state)
-        if not cur:
-            raise ValueError("Expected literal after op")
-        lit = _parse_literal(cur)
-        if lit is None:
-            raise ValueError("Expected literal after op")
-        _advance(state, state["tokens"])
-        return ("cmp", field, op, lit)
-    raise ValueError("Expected expression")
-
-
-def _parse_not(state):
-    cur = _peek(state)
-    if cur and cur.group("kw") and cur.group("kw").upper() == "NOT":
-        _advance(state, state["tokens"])
-        node = _parse_not(state)
-        return ("not", node)
-    return _parse_primary(state)
-
-
-def _parse_and(state):
-    node = _parse_not(state)
-    while _peek(state) and _peek(state).group("kw") and _peek(state).group("kw").upper() == "AND":
-        _advance(state, state["tokens"])
-        rhs = _parse_not(state)
-        node = ("and", node, rhs)
-    return node
-
-
-def _parse_expr(state):
-    node = _parse_and(state)
-    while _peek(state) and _peek(state).group("kw") and _peek(state).group("kw").upper() == "OR":
-        _advance(state, state["tokens"])
-        rhs = _parse_and(state)
-        node = ("or", node, rhs)
-    return node
-
-
-def parse_where(where: str):
-    tokens = iter(_tokenize(where))
-    state = {"tokens": tokens, "cur": None}
-    _advance(state, tokens)
-    ast = _parse_expr(state)
-    if _peek(state):
-        raise ValueError("Unexpected trailing tokens")
-    return ast
-
-
 # ===================================
-# Field name fuzzy matching helper
+# GeoPandas-based operations & IO
 # ===================================
-def _find_closest_field(
-    field_name: str, available_fields: List[str], cutoff: float = 0.6
-) -> Tuple[Optional[str], bool]:
+def _read_local_gdf(
+    path: str,
+    bbox: Optional[List[float]] = None,
+    columns: Optional[List[str]] = None,
+    where: Optional[str] = None,
+) -> gpd.GeoDataFrame:
+    """Read a local vector file, reusing the parsed layer from the layer cache.
+
+    Reads restricted to a bbox (EPSG:4326), to some columns or by a WHERE
+    prefilter go through the layer's indexed copy when it is ready and are not
+    cached. Without an indexed copy a WHERE prefilter is dropped: the whole
+    (cached) layer is filtered by the caller instead.
     """
-    Find the closest matching field name in the available fields.
+    key = os.path.abspath(path)
+    if where is not None and indexed_copy(key) is None:
+        where = None
+    if bbox is not None or columns is not None or where is not None:
+        return read_layer(key, bbox=bbox, columns=columns, where=where)
+    return get_layer_cache().get_or_load(key, local_fingerprint(key), lambda: read_layer(key))
 
-    Args:
-        field_name: The field name to match
-        available_fields: List of available field names
-        cutoff: Similarity threshold for fuzzy matching (0 to 1)
 
-    Returns:
-        Tuple of (matched_field_name, is_exact_match)
-        Returns (None, False) if no match found above cutoff
+def _subset_gdf(
+    gdf: gpd.GeoDataFrame, bbox: Optional[List[float]], columns: Optional[List[str]]
+) -> gpd.GeoDataFrame:
+    """Apply a bbox (EPSG:4326) and column selection to an already loaded layer."""
+    if bbox is not None and not gdf.empty:
+        window = gpd.GeoSeries([box(*bbox)], crs="EPSG:4326")
+        if gdf.crs is not None:
+            window = window.to_crs(gdf.crs)
+        # Envelope test, as for indexed reads
+        gdf = gdf.iloc[sorted(gdf.sindex.query(window.iloc[0].envelope))]
+    if columns is not None:
+        keep = [c for c in gdf.columns if c in columns or c == gdf.geometry.name]
+        gdf = gdf[keep]
+    return gdf
+
+
+def _header_value(resp, name: str) -> Optional[str]:
+    headers = getattr(resp, "headers", None)
+    value = headers.get(name) if hasattr(headers, "get") else None
+    return value if isinstance(value, str) else None
+
+
+def _local_file(link: str) -> Optional[str]:
+    """The local file behind ``link``, if it is one.
+
+    Handles BASE_URL/uploads/ (legacy local uploads) and BASE_URL/api/stream/
+    (central file management local) URLs, direct local file paths, and any
+    other link whose file name exists in LOCAL_UPLOAD_DIR.
     """
-    # Try exact match first (case-sensitive)
-    if field_name in available_fields:
-        return (field_name, True)
+    for prefix in (f"{BASE_URL}/uploads/", f"{BASE_URL}/api/stream/"):
+        if link.startswith(prefix):
+            local_path = os.path.join(LOCAL_UPLOAD_DIR, os.path.basename(link))
+            if os.path.isfile(local_path):
+                return local_path
+    if os.path.isfile(link):
+        return link
+    # Fall back to the upload directory by file name (e.g. links built with
+    # another BASE_URL)
+    filename = os.path.basename(link)
+    if filename:
+        local_path = os.path.join(LOCAL_UPLOAD_DIR, filename)
+        if os.path.isfile(local_path):
+            return local_path
+    return None
 
-    # Try case-insensitive exact match
-    for field in available_fields:
-        if field.lower() == field_name.lower():
-            return (field, True)
 
-    # Try fuzzy matching
-    matches = difflib.get_close_matches(field_name, available_fields, n=1, cutoff=cutoff)
-    if matches:
-        return (matches[0], False)
+def _request_url(link: str) -> str:
+    """The URL a remote layer is requested from (WFS requests get srsName=EPSG:4326)."""
+    request_url = link
+    # For WFS requests, ensure srsName=EPSG:4326 is set for consistent coordinate system
+    try:
+        from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
 
-    return (None, False)
+        parsed = urlparse(link)
+        params = parse_qs(parsed.query)
 
+        # Check if this is a WFS request
+        is_wfs = (
+            "wfs" in parsed.path.lower()
+            or "wfs" in parsed.query.lower()
+            or (params.get("service", [""])[0].upper() == "WFS")
+        )
 
-# ===================================
-# GeoPandas-based operations & IO
-# ===================================
-def _load_gdf(link: str) -> gpd.GeoDataFrame:
+        # Add srsName if WFS and not already present
+        if is_wfs and "srsName" not in params and "srsname" not in params:
+            params["srsName"] = ["EPSG:4326"]
+            # Rebuild URL with updated params
+            new_query = urlencode(params, doseq=True)
+            request_url = urlunparse(
+                (
+                    parsed.scheme,
+                    parsed.netloc,
+                    parsed.path,
+                    parsed.params,
+                    new_query,
+                    parsed.fragment,
+                )
+            )
+            logger.info(f"Added srsName=EPSG:4326 to WFS URL: {request_url}")
+    except Exception as e:
+        logger.warning(f"Failed to parse URL for WFS detection: {e}")
+    return request_url
+
+
+@traced("gdf.load")
+def _load_gdf(
+    link: str,
+    bbox: Optional[List[float]] = None,
+    columns: Optional[List[str]] = None,
+    where: Optional[str] = None,
+) -> gpd.GeoDataFrame:
     """Load GeoJSON (local or remote) into a GeoDataFrame.
 
     Supports:
@@ -503,64 +472,44 @@ def _load_gdf(link: str) -> gpd.GeoDataFrame:
     - HTTP/HTTPS URLs (external GeoJSON)
     - WFS URLs (adds srsName=EPSG:4326 if missing)
     - Local file paths
-    """
-    # Handle BASE_URL/uploads/ format (legacy local uploads)
-    if link.startswith(f"{BASE_URL}/uploads/"):
-        fn = os.path.basename(link)
-        local_path = os.path.join(LOCAL_UPLOAD_DIR, fn)
-        if os.path.isfile(local_path):
-            return gpd.read_file(local_path)
 
-    # Handle BASE_URL/api/stream/ format (central file management local)
-    if link.startswith(f"{BASE_URL}/api/stream/"):
-        fn = os.path.basename(link)
-        local_path = os.path.join(LOCAL_UPLOAD_DIR, fn)
-        if os.path.isfile(local_path):
-            return gpd.read_file(local_path)
+    Parsed layers are served from the process-wide layer cache when the
+    underlying content has not changed.
 
-    # Handle direct local file paths
-    if os.path.isfile(link):
-        return gpd.read_file(link)
+    ``bbox`` (minx, miny, maxx, maxy in EPSG:4326) keeps only the features
+    whose envelope intersects it, ``columns`` only those attribute columns.
+    Large local uploads answer both from their spatially indexed copy without
+    parsing the whole file; other sources are filtered after loading.
+
+    ``where`` is a prefilter: large local uploads skip features that can't
+    match it while reading, every other source returns all features. Callers
+    apply the filter (``filter_where_gdf``) to the result either way.
+    """
+    local_path = _local_file(link)
+    if local_path is not None:
+        return _read_local_gdf(local_path, bbox, columns, where)
 
     # Handle HTTP/HTTPS URLs (including Azure Blob Storage with SAS tokens)
     if link.startswith("http://") or link.startswith("https://"):
-        request_url = link
-        # For WFS requests, ensure srsName=EPSG:4326 is set for consistent coordinate system
-        try:
-            from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+        request_url = _request_url(link)
+
+        # Conditional request when a previous version of this layer is cached
+        cache = get_layer_cache()
+        conditional = cache.conditional_headers(request_url)
+        resp = requests.get(request_url, timeout=30, headers=conditional)
+        if resp.status_code == 304:
+            cached = cache.get(request_url)
+            if cached is not None:
+                return _subset_gdf(cached, bbox, columns)
+            resp = requests.get(request_url, timeout=30)
+        resp.raise_for_status()
 
-            parsed = urlparse(link)
-            params = parse_qs(parsed.query)
-
-            # Check if this is a WFS request
-            is_wfs = (
-                "wfs" in parsed.path.lower()
-                or "wfs" in parsed.query.lower()
-                or (params.get("service", [""])[0].upper() == "WFS")
-            )
-
-            # Add srsName if WFS and not already present
-            if is_wfs and "srsName" not in params and "srsname" not in params:
-                params["srsName"] = ["EPSG:4326"]
-                # Rebuild URL with updated params
-                new_query = urlencode(params, doseq=True)
-                request_url = urlunparse(
-                    (
-                        parsed.scheme,
-                        parsed.netloc,
-                        parsed.path,
-                        parsed.params,
-                        new_query,
-                        parsed.fragment,
-                    )
-                )
-                logger.info(f"Added srsName=EPSG:4326 to WFS URL: {request_url}")
-        except Exception as e:
-            logger.warning(f"Failed to parse URL for WFS detection: {e}")
+        fingerprint = content_fingerprint(resp.content)
+        cached = cache.get(request_url, fingerprint)
+        if cached is not None:
+            return _subset_gdf(cached, bbox, columns)
 
         # Download to temp file for reliable driver support
-        resp = requests.get(request_url, timeout=30)
-        resp.raise_for_status()
         # Ensure upload dir exists (CI environments or tests may not create it).
         # Use a local variable to avoid rebinding the module-level LOCAL_UPLOAD_DIR.
         upload_dir = LOCAL_UPLOAD_DIR or "."
@@ -573,7 +522,15 @@ def _load_gdf(link: str) -> gpd.GeoDataFrame:
         with open(tmp, "wb") as f:
             f.write(resp.content)
         try:
-            return gpd.read_file(tmp)
+            gdf = gpd.read_file(tmp)
+            cache.put(
+                request_url,
+                fingerprint,
+                gdf,
+                etag=_header_value(resp, "ETag"),
+                last_modified=_header_value(resp, "Last-Modified"),
+            )
+            return _subset_gdf(gdf.copy(), bbox, columns)
         finally:
             try:
                 os.remove(tmp)
@@ -583,6 +540,107 @@ def _load_gdf(link: str) -> gpd.GeoDataFrame:
     raise IOError(f"Unsupported path or URL: {link}")
 
 
+def _layer_version(link: str) -> Tuple[Optional[Path], Optional[str]]:
+    """
+    The version a layer's field index is keyed by.
+
+    Local files are versioned by their size and modification time, remote
+    layers by the content hash of the download in the layer cache.
+    """
+    local_path = _local_file(link)
+    if local_path is not None:
+        return Path(local_path), None
+    if link.startswith("http://") or link.startswith("https://"):
+        return None, get_layer_cache().fingerprint(_request_url(link))
+    return None, None
+
+
+# Operations a layer's field index can answer without reading its features
+_INDEXED_OPERATIONS = ("list_fields", "summarize", "unique_values")
+
+
+def _answer_from_index(
+    index: Dict[str, Any], op: str, params: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """The result of ``op`` from the field index, or None if it does not hold it."""
+    if op == "list_fields":
+        return list_fields_index(index)
+    if op == "summarize":
+        return summarize_index(index, params.get("fields", []))
+    if op == "unique_values" and params.get("field"):
+        return unique_values_index(index, params["field"], params.get("top_k"))
+    return None
+
+
+def _field_index(link: str, gdf: gpd.GeoDataFrame) -> Dict[str, Any]:
+    """The field index of a loaded layer, computed once per layer version."""
+    file_path, version = _layer_version(link)
+    return get_field_index(gdf, file_path=file_path, version=version)
+
+
+# Operations that run batch by batch on layers too large to load whole
+_CHUNKED_OPERATIONS = ("filter_where", "select_fields", "sort_by")
+
+
+def _chunked_source(link: str) -> Optional[str]:
+    """
+    The local file behind ``link`` if it is large enough to process in batches.
+
+    Batches are read from the layer's indexed copy; until that is ready the
+    layer is loaded whole.
+    """
+    local_path = _local_file(link)
+    if local_path is None:
+        return None
+    try:
+        if os.path.getsize(local_path) < ATTRIBUTE_CHUNKED_MIN_SIZE:
+            return None
+    except OSError:
+        return None
+    schema = indexed_schema(local_path)
+    if schema is None or schema["features"] == 0:
+        return None
+    return local_path
+
+
+def _chunked_batches(
+    path: str,
+    op: str,
+    params: Dict[str, Any],
+    field_suggestions: Optional[Dict[str, str]] = None,
+) -> Iterator[gpd.GeoDataFrame]:
+    """The result of ``op`` on the layer at ``path``, computed a batch at a time."""
+    batches = iter_layer_batches(path, ATTRIBUTE_CHUNK_FEATURES)
+    if op == "filter_where":
+        return filter_batches(batches, params["where"], field_suggestions)
+    if op == "select_fields":
+        include = params.get("include")
+        exclude = params.get("exclude")
+        keep_geometry = bool(params.get("keep_geometry", True))
+        return (
+            select_fields_gdf(batch, include=include, exclude=exclude, keep_geometry=keep_geometry)
+            for batch in batches
+        )
+    if op == "sort_by":
+        fields = params.get("fields") or []
+        return sort_batches(
+            batches,
+            [c for c, _ in fields],
+            [(d or "asc").lower() != "desc" for _, d in fields],
+            # Runs are spilled next to the layer, on disk rather than a RAM-backed /tmp
+            spill_dir=os.path.dirname(os.path.abspath(path)),
+        )
+    raise ValueError(f"Operation '{op}' can't run in batches")
+
+
+def _available_fields(gdf: Optional[gpd.GeoDataFrame], chunked_path: Optional[str]) -> List[str]:
+    """Field names of a loaded layer, or of a layer processed in batches."""
+    if gdf is not None:
+        return sorted(gdf.columns.tolist())
+    schema = indexed_schema(chunked_path) if chunked_path else None
+    return sorted(schema["fields"] + ["geometry"]) if schema else []
+
+
 def _jsonify_scalar(v):
     # Convert numpy/pandas scalars to native JSON types
     if pd.isna(v):
@@ -599,16 +657,7 @@ def _jsonify_scalar(v):
 
 def _fc_from_gdf(gdf: gpd.GeoDataFrame, keep_geometry: bool = True) -> Dict[str, Any]:
     """Convert a GeoDataFrame to a GeoJSON FeatureCollection dict."""
-    features = []
-    geom_col = gdf.geometry.name if gdf.geometry is not None else None
-
-    # Build clean properties (only JSON-serializable, exclude geometry column)
-    prop_cols = [c for c in gdf.columns if c != geom_col]
-    for _, row in gdf.iterrows():
-        props = {c: _jsonify_scalar(row[c]) for c in prop_cols}
-        geom = mapping(row[geom_col]) if keep_geometry and geom_col else None
-        features.append({"type": "Feature", "properties": props, "geometry": geom})
-    return {"type": "FeatureCollection", "features": features}
+    return gdf_to_feature_collection(gdf, keep_geometry=keep_geometry)
 
 
 def _slug(text: str) -> str:
@@ -756,7 +805,7 @@ Generate a concise layer name (2-5 words) for this {operation} layer."""
 
 
 def _save_gdf_as_geojson(
-    gdf: gpd.GeoDataFrame,
+    gdf: Union[gpd.GeoDataFrame, Iterable[gpd.GeoDataFrame]],
     display_title: str,
     keep_geometry: bool = True,
     detailed_description: Optional[str] = None,
@@ -765,7 +814,7 @@ def _save_gdf_as_geojson(
     Save a GeoDataFrame as GeoJSON using central file management.
 
     Args:
-        gdf: GeoDataFrame to save
+        gdf: GeoDataFrame to save, or the batches of a result computed batch by batch
         display_title: Short title for the layer
         keep_geometry: Whether to include geometry
         detailed_description: Optional detailed description of the operation performed
@@ -773,15 +822,16 @@ def _save_gdf_as_geojson(
     Returns:
         GeoDataObject with the saved layer information
     """
-    fc = _fc_from_gdf(gdf, keep_geometry=keep_geometry)
     slug = _slug(display_title)
     filename = f"{slug}_{uuid.uuid4().hex[:8]}.geojson"
 
-    # Convert to JSON bytes
-    content = json.dumps(fc).encode("utf-8")
-
-    # Use central file management (supports both local and Azure Blob)
-    url, _ = store_file(filename, content)
+    # Serialize straight from column arrays and stream into central file
+    # management (supports both local and Azure Blob)
+    if isinstance(gdf, pd.DataFrame):
+        chunks = iter_feature_collection(gdf, keep_geometry=keep_geometry)
+    else:
+        chunks = iter_batched_feature_collection(gdf, keep_geometry=keep_geometry)
+    url, _ = store_file_chunks(filename, chunks)
 
     # Use detailed description if provided, otherwise create a simple one
     description = (
@@ -807,6 +857,28 @@ def _save_gdf_as_geojson(
     )
 
 
+def _save_batches_as_geojson(
+    batches: Iterable[gpd.GeoDataFrame],
+    display_title: str,
+    describe: Callable[[int], str],
+    keep_geometry: bool = True,
+) -> Tuple[GeoDataObject, int]:
+    """
+    _save_gdf_as_geojson for a result computed batch by batch.
+
+    ``describe`` builds the detailed description from the feature count,
+    which is known once every batch has been written.
+
+    Returns:
+        The saved layer and its feature count
+    """
+    counter = BatchCounter(batches)
+    obj = _save_gdf_as_geojson(counter, display_title, keep_geometry=keep_geometry)
+    description = describe(counter.count)
+    obj = obj.model_copy(update={"description": description, "llm_description": description})
+    return obj, counter.count
+
+
 # ============ NEW: schema context from GeoDataFrame ============
 def build_schema_context(
     gdf: gpd.GeoDataFrame,
@@ -871,6 +943,66 @@ def build_schema_context(
     }
 
 
+def schema_context_from_stats(
+    stats: Dict[str, Any], topk_per_text_col: int = 12, max_cols: int = 40
+) -> Dict[str, Any]:
+    """
+    build_schema_context for a layer known only from its statistics sidecar.
+
+    Text columns list the sampled values instead of the most frequent ones.
+    """
+    cols_ctx = []
+    for field in stats.get("fields", [])[: max_cols - 1]:
+        col_ctx = {"name": field["name"], "type": field.get("type", "object")}
+        if "min" in field:
+            col_ctx["min"] = field["min"]
+            col_ctx["max"] = field["max"]
+        elif field.get("samples"):
+            col_ctx["top_values"] = [str(v) for v in field["samples"][:topk_per_text_col]]
+        cols_ctx.append(col_ctx)
+    cols_ctx.append({"name": "geometry", "type": "geometry"})
+
+    return {
+        "row_count": int(stats["feature_count"]),
+        "geometry_column": "geometry",
+        "columns": cols_ctx,
+    }
+
+
+def schema_context_from_index(
+    index: Dict[str, Any], topk_per_text_col: int = 12, max_cols: int = 40
+) -> Dict[str, Any]:
+    """
+    build_schema_context from a layer's field index.
+
+    Unlike a sample of the first rows, the index covers every feature: text
+    columns list their most frequent values and numeric columns their true
+    range, and each column says how many distinct values it has.
+    """
+    geom_name = index.get("geometry_column")
+    cols_ctx = []
+    for field in index.get("fields", [])[: max_cols - 1]:
+        col_ctx = {"name": field["name"], "type": field.get("type", "object")}
+        if "distinct" in field:
+            col_ctx["distinct"] = field["distinct"]
+        if "min" in field:
+            col_ctx["min"] = field["min"]
+            col_ctx["max"] = field["max"]
+        elif field.get("top_values"):
+            col_ctx["top_values"] = [
+                str(entry["value"])[:80] for entry in field["top_values"][:topk_per_text_col]
+            ]
+        cols_ctx.append(col_ctx)
+    if geom_name:
+        cols_ctx.append({"name": geom_name, "type": "geometry"})
+
+    return {
+        "row_count": int(index["row_count"]),
+        "geometry_column": geom_name,
+        "columns": cols_ctx,
+    }
+
+
 # ---------- Attribute ops on GeoDataFrame ----------
 def list_fields_gdf(gdf: gpd.GeoDataFrame, sample: int = 2000) -> Dict[str, Any]:
     sample_df = gdf.head(sample)
@@ -904,6 +1036,89 @@ def list_fields_gdf(gdf: gpd.GeoDataFrame, sample: int = 2000) -> Dict[str, Any]
     return {"fields": fields, "row_count": int(len(gdf)), "sampled": int(len(sample_df))}
 
 
+def list_fields_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """list_fields_gdf for a layer known only from its statistics sidecar."""
+    fields = [
+        {
+            "name": field["name"],
+            "type": field.get("type", "object"),
+            "null_count": int(field.get("null_count", 0)),
+            "example": (field.get("samples") or [None])[0],
+        }
+        for field in stats.get("fields", [])
+    ]
+    fields.append({"name": "geometry", "type": "geometry", "null_count": 0, "example": None})
+    fields.sort(key=lambda field: field["name"])
+    row_count = int(stats["feature_count"])
+    return {"fields": fields, "row_count": row_count, "sampled": stats.get("sampled", row_count)}
+
+
+def list_fields_index(index: Dict[str, Any]) -> Dict[str, Any]:
+    """list_fields_gdf from a layer's field index, with distinct value counts."""
+    fields = []
+    for field in index.get("fields", []):
+        entry = {
+            "name": field["name"],
+            "type": field.get("type", "object"),
+            "null_count": int(field.get("null_count", 0)),
+            "example": field.get("example"),
+        }
+        if "distinct" in field:
+            entry["distinct"] = field["distinct"]
+        fields.append(entry)
+    geom_name = index.get("geometry_column")
+    if geom_name:
+        fields.append({"name": geom_name, "type": "geometry", "null_count": 0, "example": None})
+    fields.sort(key=lambda field: field["name"])
+    row_count = int(index["row_count"])
+    return {"fields": fields, "row_count": row_count, "sampled": row_count}
+
+
+def summarize_index(index: Dict[str, Any], fields: List[str]) -> Optional[Dict[str, Any]]:
+    """
+    summarize_gdf from a layer's field index.
+
+    Returns None when a field has no numeric statistics (text that may hold
+    numbers, unknown fields); summarize_gdf has to read the values then.
+    """
+    out = {}
+    for fld in fields:
+        field = field_entry(index, fld)
+        if field is None or "mean" not in field:
+            return None
+        out[fld] = {
+            "count": int(field["count"]),
+            "mean": float(field["mean"]),
+            "min": float(field["min"]),
+            "max": float(field["max"]),
+            "p25": float(field["p25"]),
+            "p50": float(field["p50"]),
+            "p75": float(field["p75"]),
+        }
+    return out
+
+
+def unique_values_index(
+    index: Dict[str, Any], field: str, top_k: Optional[int] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    unique_values_gdf from a layer's field index.
+
+    Returns None when the index does not hold all the values asked for.
+    """
+    entry = field_entry(index, field)
+    if entry is None or "top_values" not in entry:
+        return None
+    values = entry["top_values"]
+    if top_k:
+        if int(top_k) > len(values) and not entry.get("top_values_complete"):
+            return None
+        values = values[: int(top_k)]
+    elif not entry.get("top_values_complete"):
+        return None
+    return {"field": field, "values": [dict(value) for value in values]}
+
+
 def summarize_gdf(gdf: gpd.GeoDataFrame, fields: List[str]) -> Dict[str, Any]:
     out = {}
     for fld in fields:
@@ -978,125 +1193,6 @@ def select_fields_gdf(
 
 
 # ----- WHERE predicate -> boolean mask (vectorized) -----
-def _series_cmp(a: pd.Series, op: str, b):
-    """
-    Compare series with value, handling type mismatches gracefully.
-
-    Args:
-        a: pandas Series to compare
-        op: Comparison operator (=, !=, >, <, >=, <=)
-        b: Value to compare against
-
-    Returns:
-        Boolean series with comparison results, False for type mismatches
-    """
-    # Autocast numeric comparisons sensibly
-    if pd.api.types.is_numeric_dtype(a):
-        b_cast = pd.to_numeric(pd.Series([b]), errors="coerce").iloc[0]
-    else:
-        b_cast = b
-
-    # Handle type mismatches for relational operators
-    # For non-numeric series compared to numeric values with >, <, >=, <=
-    # return all False instead of crashing
-    if op in (">", "<", ">=", "<="):
-        if not pd.api.types.is_numeric_dtype(a) and isinstance(b, (int, float)):
-            # String/object field compared to number - return all False
-            logger.warning(
-                f"Type mismatch: comparing non-numeric field to numeric value "
-                f"with '{op}' - returning all False"
-            )
-            return pd.Series([False] * len(a), index=a.index)
-
-    try:
-        if op == "=":
-            return a.eq(b_cast)
-        if op == "!=":
-            return a.ne(b_cast)
-        if op == ">":
-            return a.gt(b_cast)
-        if op == "<":
-            return a.lt(b_cast)
-        if op == ">=":
-            return a.ge(b_cast)
-        if op == "<=":
-            return a.le(b_cast)
-        raise ValueError(f"Unsupported op {op}")
-    except TypeError as e:
-        # Catch any remaining type errors and return all False
-        logger.warning(f"Type error in comparison '{op}': {e} - returning all False")
-        return pd.Series([False] * len(a), index=a.index)
-
-
-def _eval_ast_to_mask(
-    ast, gdf: gpd.GeoDataFrame, field_suggestions: Optional[Dict[str, str]] = None
-) -> pd.Series:
-    """
-    Evaluate AST to boolean mask with fuzzy field matching.
-
-    Args:
-        ast: Parsed WHERE clause AST
-        gdf: GeoDataFrame to evaluate against
-        field_suggestions: Dict to track {requested_field: actual_field} mappings
-
-    Returns:
-        Boolean series mask
-    """
-    if field_suggestions is None:
-        field_suggestions = {}
-
-    kind = ast[0]
-    if kind == "cmp":
-        _, fld, op, lit = ast
-        # Try fuzzy field matching
-        matched_field, is_exact = _find_closest_field(fld, list(gdf.columns))
-        if matched_field is None:
-            available = ", ".join(sorted(gdf.columns))
-            raise ValueError(f"Field '{fld}' not found. Available fields: {available}")
-        if not is_exact:
-            field_suggestions[fld] = matched_field
-            logger.info(f"Field '{fld}' not found, using close match '{matched_field}'")
-        s = gdf[matched_field]
-        m = _series_cmp(s, op, lit)
-        return m.fillna(False)
-    if kind == "in":
-        _, fld, values = ast
-        matched_field, is_exact = _find_closest_field(fld, list(gdf.columns))
-        if matched_field is None:
-            available = ", ".join(sorted(gdf.columns))
-            raise ValueError(f"Field '{fld}' not found. Available fields: {available}")
-        if not is_exact:
-            field_suggestions[fld] = matched_field
-            logger.info(f"Field '{fld}' not found, using close match '{matched_field}'")
-        s = gdf[matched_field]
-        m = s.isin(set(values))
-        return m.fillna(False)
-    if kind == "isnull":
-        _, fld, is_not = ast
-        matched_field, is_exact = _find_closest_field(fld, list(gdf.columns))
-        if matched_field is None:
-            available = ", ".join(sorted(gdf.columns))
-            raise ValueError(f"Field '{fld}' not found. Available fields: {available}")
-        if not is_exact:
-            field_suggestions[fld] = matched_field
-            logger.info(f"Field '{fld}' not found, using close match '{matched_field}'")
-        m = gdf[matched_field].isna()
-        return (~m) if is_not else m
-    if kind == "and":
-        return (
-            _eval_ast_to_mask(ast[1], gdf, field_suggestions)
-            & _eval_ast_to_mask(ast[2], gdf, field_suggestions)
-        ).fillna(False)
-    if kind == "or":
-        return (
-            _eval_ast_to_mask(ast[1], gdf, field_suggestions)
-            | _eval_ast_to_mask(ast[2], gdf, field_suggestions)
-        ).fillna(False)
-    if kind == "not":
-        return (~_eval_ast_to_mask(ast[1], gdf, field_suggestions)).fillna(False)
-    raise ValueError(f"Unknown node {kind}")
-
-
 def filter_where_gdf(gdf: gpd.GeoDataFrame, where: str) -> Tuple[gpd.GeoDataFrame, Dict[str, str]]:
     """
     Filter GeoDataFrame by WHERE clause with fuzzy field matching.
@@ -1109,9 +1205,8 @@ def filter_where_gdf(gdf: gpd.GeoDataFrame, where: str) -> Tuple[gpd.GeoDataFram
         Tuple of (filtered_gdf, field_suggestions_dict)
         field_suggestions_dict maps {requested_field: actual_field_used}
     """
-    ast = parse_where(where)
     field_suggestions: Dict[str, str] = {}
-    mask = _eval_ast_to_mask(ast, gdf, field_suggestions)
+    mask = compile_where(where).mask(gdf, field_suggestions)
     return gdf[mask].copy(), field_suggestions
 
 
@@ -1506,10 +1601,7 @@ def attribute_tool(
             }
         )
 
-    # Load as GeoDataFrame
-    try:
-        gdf = _load_gdf(layer.data_link)
-    except Exception as e:
+    def _load_error(e: Exception) -> Command:
         return Command(
             update={
                 "messages": [
@@ -1523,10 +1615,32 @@ def attribute_tool(
             }
         )
 
+    # Uploads carry a statistics sidecar (and a field index once queried):
+    # plan from them, and only parse the layer once the operation needs its features
+    local_path = local_upload_path(layer.data_link)
+    stats = get_layer_stats(local_path, compute=False) if local_path else None
+    index = find_field_index(Path(local_path)) if local_path else None
+
+    # Load as GeoDataFrame
+    gdf = None
+    if stats is None:
+        try:
+            gdf = _load_gdf(layer.data_link)
+        except Exception as e:
+            return _load_error(e)
+        if index is None:
+            # Remote layers are indexed by the version just downloaded
+            index = find_field_index(*_layer_version(layer.data_link))
+
     # Get LLM from state options for consistent model usage
     llm = _get_llm_from_options(state)
 
-    schema_ctx = build_schema_context(gdf)
+    if index is not None:
+        schema_ctx = schema_context_from_index(index)
+    elif gdf is not None:
+        schema_ctx = build_schema_context(gdf)
+    else:
+        schema_ctx = schema_context_from_stats(stats)
 
     # Plan
     try:
@@ -1547,15 +1661,46 @@ def attribute_tool(
 
     op = plan.get("operation")
     params = plan.get("params") or {}
+
+    # The sidecar has the layer's feature count, so a filter can be pushed
+    # down into the read and only (roughly) the matching features parsed
+    prefilter = None
+    if gdf is None and op == "filter_where" and isinstance(params.get("where"), str):
+        prefilter = params["where"]
+    indexed = _answer_from_index(index, op, params) if index is not None else None
+    # Filters, selections and sorts of very large layers run batch by batch
+    chunked_path = None
+    if gdf is None and op in _CHUNKED_OPERATIONS:
+        chunked_path = _chunked_source(layer.data_link)
+    if (
+        gdf is None
+        and indexed is None
+        and chunked_path is None
+        and op not in ("list_fields", "describe_dataset")
+    ):
+        try:
+            gdf = _load_gdf(layer.data_link, where=prefilter)
+        except Exception as e:
+            return _load_error(e)
+    if indexed is None and index is None and gdf is not None and op in _INDEXED_OPERATIONS:
+        # Index the layer now so that later questions about it skip the scan
+        index = _field_index(layer.data_link, gdf)
+        indexed = _answer_from_index(index, op, params)
     # result_handling = plan.get("result_handling") or "chat"  # Not used in current logic
 
     # Validate fields where meaningful
     def _check_fields(names: List[str]) -> List[str]:
-        return [n for n in names if n not in gdf.columns]
+        columns = gdf.columns if gdf is not None else _available_fields(None, chunked_path)
+        return [n for n in names if n not in columns]
 
     try:
         if op == "list_fields":
-            out = list_fields_gdf(gdf)
+            if indexed is not None:
+                out = indexed
+            elif gdf is not None:
+                out = list_fields_gdf(gdf)
+            else:
+                out = list_fields_stats(stats)
             return Command(
                 update={
                     "messages": [
@@ -1571,7 +1716,7 @@ def attribute_tool(
             )
 
         if op == "summarize":
-            missing = _check_fields(params.get("fields", []))
+            missing = _check_fields(params.get("fields", [])) if indexed is None else []
             if missing:
                 return Command(
                     update={
@@ -1588,7 +1733,7 @@ def attribute_tool(
                         ]
                     }
                 )
-            out = summarize_gdf(gdf, params.get("fields", []))
+            out = indexed if indexed is not None else summarize_gdf(gdf, params.get("fields", []))
             return Command(
                 update={
                     "messages": [
@@ -1605,7 +1750,7 @@ def attribute_tool(
 
         if op == "unique_values":
             fld = params.get("field")
-            if not fld or fld not in gdf.columns:
+            if indexed is None and (not fld or fld not in gdf.columns):
                 return Command(
                     update={
                         "messages": [
@@ -1621,7 +1766,10 @@ def attribute_tool(
                         ]
                     }
                 )
-            out = unique_values_gdf(gdf, fld, params.get("top_k"))
+            if indexed is not None:
+                out = indexed
+            else:
+                out = unique_values_gdf(gdf, fld, params.get("top_k"))
             return Command(
                 update={
                     "messages": [
@@ -1637,9 +1785,18 @@ def attribute_tool(
             )
 
         if op == "filter_where":
+            # The layer was read filtered or is streamed: count from the sidecar
+            whole = prefilter is None and chunked_path is None
+            original_count = len(gdf) if whole else stats["feature_count"]
             field_suggestions = {}
+            batches = None
             try:
-                out_gdf, field_suggestions = filter_where_gdf(gdf, params["where"])
+                if chunked_path is not None:
+                    out_gdf, batches = peek_batches(
+                        _chunked_batches(chunked_path, op, params, field_suggestions)
+                    )
+                else:
+                    out_gdf, field_suggestions = filter_where_gdf(gdf, params["where"])
             except Exception as e:
                 return Command(
                     update={
@@ -1648,7 +1805,7 @@ def attribute_tool(
                                 name="attribute_tool",
                                 content=(
                                     f"Error parsing/applying WHERE: {e}. "
-                                    f"Available fields: {sorted(gdf.columns.tolist())}"
+                                    f"Available fields: {_available_fields(gdf, chunked_path)}"
                                 ),
                                 tool_call_id=tool_call_id,
                                 status="error",
@@ -1658,7 +1815,7 @@ def attribute_tool(
                 )
 
             # Check if filter returned any features
-            if len(out_gdf) == 0:
+            if out_gdf is None or len(out_gdf) == 0:
                 return Command(
                     update={
                         "messages": [
@@ -1667,7 +1824,7 @@ def attribute_tool(
                                 content=(
                                     f"Filter applied to '{layer.name}' but no features matched "
                                     f"the condition: {params['where']}. "
-                                    f"Original layer had {len(gdf)} features."
+                                    f"Original layer had {original_count} features."
                                 ),
                                 tool_call_id=tool_call_id,
                             )
@@ -1688,15 +1845,20 @@ def attribute_tool(
             )
 
             # Create detailed description
-            detailed_desc = (
-                f"Filtered features from '{layer.title or layer.name}' using condition: "
-                f"{params['where']}. Result contains {len(out_gdf)} feature(s) out of "
-                f"{len(gdf)} original features."
-            )
+            def describe(count: int) -> str:
+                return (
+                    f"Filtered features from '{layer.title or layer.name}' using condition: "
+                    f"{params['where']}. Result contains {count} feature(s) out of "
+                    f"{original_count} original features."
+                )
 
-            obj = _save_gdf_as_geojson(
-                out_gdf, title, keep_geometry=True, detailed_description=detailed_desc
-            )
+            if batches is not None:
+                obj, feature_count = _save_batches_as_geojson(batches, title, describe)
+            else:
+                feature_count = len(out_gdf)
+                obj = _save_gdf_as_geojson(
+                    out_gdf, title, keep_geometry=True, detailed_description=describe(feature_count)
+                )
             new_results = (state.get("geodata_results") or []) + [obj]
 
             # Build actionable layer info with field suggestions
@@ -1705,8 +1867,8 @@ def attribute_tool(
                 "title": obj.title,
                 "id": obj.id,
                 "data_source_id": obj.data_source_id,
-                "feature_count": len(out_gdf),
-                "original_count": len(gdf),
+                "feature_count": feature_count,
+                "original_count": original_count,
                 "filter": params["where"],
             }
 
@@ -1720,7 +1882,7 @@ def attribute_tool(
             # Provide user guidance similar to geocoding tools
             tool_message_content = (
                 f"Successfully filtered '{layer.name}' using condition: {params['where']}. "
-                f"Result contains {len(out_gdf)} feature(s) out of {len(gdf)} original features. "
+                f"Result contains {feature_count} feature(s) out of {original_count} original features. "
                 f"New layer '{obj.title}' created and stored in geodata_results. "
                 f"Actionable layer details: {json.dumps(actionable_layer_info)}. "
                 f"{suggestion_info}"
@@ -1760,7 +1922,7 @@ def attribute_tool(
                                 name="attribute_tool",
                                 content=(
                                     f"Error: Unknown fields in select_fields: {missing}. "
-                                    f"Available: {sorted(gdf.columns.tolist())}"
+                                    f"Available: {_available_fields(gdf, chunked_path)}"
                                 ),
                                 tool_call_id=tool_call_id,
                                 status="error",
@@ -1769,9 +1931,13 @@ def attribute_tool(
                     }
                 )
             keep_geometry = bool(params.get("keep_geometry", True))
-            out_gdf = select_fields_gdf(
-                gdf, include=include, exclude=exclude, keep_geometry=keep_geometry
-            )
+            batches = None
+            if chunked_path is not None:
+                out_gdf, batches = peek_batches(_chunked_batches(chunked_path, op, params))
+            else:
+                out_gdf = select_fields_gdf(
+                    gdf, include=include, exclude=exclude, keep_geometry=keep_geometry
+                )
 
             # Create detailed description
             field_info = []
@@ -1805,12 +1971,17 @@ def attribute_tool(
                 state=state,
             )
 
-            obj = _save_gdf_as_geojson(
-                out_gdf,
-                title,
-                keep_geometry=keep_geometry,
-                detailed_description=detailed_desc,
-            )
+            if batches is not None:
+                obj, _ = _save_batches_as_geojson(
+                    batches, title, lambda count: detailed_desc, keep_geometry=keep_geometry
+                )
+            else:
+                obj = _save_gdf_as_geojson(
+                    out_gdf,
+                    title,
+                    keep_geometry=keep_geometry,
+                    detailed_description=detailed_desc,
+                )
             new_results = (state.get("geodata_results") or []) + [obj]
             return Command(
                 update={
@@ -1828,14 +1999,23 @@ def attribute_tool(
 
         if op == "sort_by":
             fields = params.get("fields", [])
-            out_gdf = sort_by_gdf(gdf, fields)
+            batches = None
+            if chunked_path is not None:
+                missing = _check_fields([c for c, _ in fields])
+                if missing:
+                    raise ValueError(f"Unknown field in sort_by: {missing[0]}")
+                out_gdf, batches = peek_batches(_chunked_batches(chunked_path, op, params))
+            else:
+                out_gdf = sort_by_gdf(gdf, fields)
 
             # Create detailed description
             sort_desc = ", ".join([f"{fld} {order}" for fld, order in fields])
-            detailed_desc = (
-                f"Sorted '{layer.title or layer.name}' by: {sort_desc}. "
-                f"Result contains {len(out_gdf)} features in sorted order."
-            )
+
+            def describe(count: int) -> str:
+                return (
+                    f"Sorted '{layer.title or layer.name}' by: {sort_desc}. "
+                    f"Result contains {count} features in sorted order."
+                )
 
             # Clean the source layer name
             source_name = _clean_layer_name(layer.title or layer.name)
@@ -1850,12 +2030,15 @@ def attribute_tool(
                 state=state,
             )
 
-            obj = _save_gdf_as_geojson(
-                out_gdf,
-                title,
-                keep_geometry=True,
-                detailed_description=detailed_desc,
-            )
+            if batches is not None:
+                obj, _ = _save_batches_as_geojson(batches, title, describe)
+            else:
+                obj = _save_gdf_as_geojson(
+                    out_gdf,
+                    title,
+                    keep_geometry=True,
+                    detailed_description=describe(len(out_gdf)),
+                )
             new_results = (state.get("geodata_results") or []) + [obj]
             return Command(
                 update={
@@ -1873,7 +2056,10 @@ def attribute_tool(
 
         if op == "describe_dataset":
             # Use schema context + gdf to produce a friendly overview
-            out = describe_dataset_gdf(gdf, schema_ctx, llm=llm)
+            if gdf is not None:
+                out = describe_dataset_gdf(gdf, schema_ctx, llm=llm)
+            else:
+                out = describe_dataset_stats(stats, schema_ctx, llm=llm)
             # Optional: add a short, humanized paragraph on top
             # out["summary"] already has a one-liner; keep the payload JSON-safe.
             return Command(
@@ -0,0 +1,171 @@
+"""
+Attribute operations on layers too large to hold in memory.
+
+``filter_where``, ``select_fields`` and ``sort_by`` used to load the whole
+layer before touching it. Here they consume an iterator of GeoDataFrame
+batches (``indexed_layers.iter_layer_batches``) and yield result batches, so
+only a bounded number of features is in memory at any time:
+
+- ``filter_batches`` applies a compiled WHERE mask to each batch,
+- ``sort_batches`` is an external merge sort: every batch is sorted and
+  spilled to disk as a run, then the runs are merged a block at a time.
+
+Field selection needs no state across batches and is mapped over them by the
+caller. Results are written as they are produced
+(``geojson_writer.iter_batched_feature_collection``).
+"""
+
+import itertools
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+
+from services.tools.attributes.where import compile_where
+
+# Rows per block of a spilled run, and the fewest rows read from a run at once
+MERGE_BLOCK_FEATURES = 1000
+
+
+def filter_batches(
+    batches: Iterable[gpd.GeoDataFrame],
+    where: str,
+    field_suggestions: Optional[Dict[str, str]] = None,
+) -> Iterator[gpd.GeoDataFrame]:
+    """Yield the features of each batch matching ``where`` (batches without matches are skipped)."""
+    compiled = compile_where(where)
+    for batch in batches:
+        mask = compiled.mask(batch, field_suggestions)
+        if mask.any():
+            yield batch[mask]
+
+
+def peek_batches(
+    batches: Iterable[gpd.GeoDataFrame],
+) -> Tuple[Optional[gpd.GeoDataFrame], Iterator[gpd.GeoDataFrame]]:
+    """
+    The first non-empty batch, and an iterator over all batches from it on.
+
+    Lets callers report errors and empty results (and name the result from a
+    sample) before anything is written.
+    """
+    batches = iter(batches)
+    for batch in batches:
+        if len(batch):
+            return batch, itertools.chain([batch], batches)
+    return None, iter(())
+
+
+class BatchCounter:
+    """Pass batches through, counting their features."""
+
+    def __init__(self, batches: Iterable[gpd.GeoDataFrame]):
+        self.batches = batches
+        self.count = 0
+
+    def __iter__(self) -> Iterator[gpd.GeoDataFrame]:
+        for batch in self.batches:
+            self.count += len(batch)
+            yield batch
+
+
+class _Run:
+    """A sorted run spilled to disk as consecutive pickled blocks."""
+
+    def __init__(self, path: Path, frame: gpd.GeoDataFrame):
+        self.path = path
+        with open(path, "wb") as f:
+            for start in range(0, len(frame), MERGE_BLOCK_FEATURES):
+                block = frame.iloc[start : start + MERGE_BLOCK_FEATURES]
+                pickle.dump(block, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.remaining = -(-len(frame) // MERGE_BLOCK_FEATURES)
+        self._offset = 0
+
+    def read(self, rows: int) -> List[gpd.GeoDataFrame]:
+        """The next blocks of the run, at least ``rows`` rows unless it ends first."""
+        blocks: List[gpd.GeoDataFrame] = []
+        n = 0
+        # Reopened per read: a merge may hold more runs than open file handles
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            while n < rows and self.remaining:
+                blocks.append(pickle.load(f))
+                n += len(blocks[-1])
+                self.remaining -= 1
+            self._offset = f.tell()
+        if not self.remaining:
+            os.remove(self.path)
+        return blocks
+
+
+def _sorted(frame: pd.DataFrame, by: List[str], ascending: List[bool]) -> pd.DataFrame:
+    # Stable, so rows of one run keep their relative order in the merge
+    return frame.sort_values(by=by, ascending=ascending, na_position="last", kind="stable")
+
+
+def sort_batches(
+    batches: Iterable[gpd.GeoDataFrame],
+    by: List[str],
+    ascending: List[bool],
+    spill_dir: Optional[str] = None,
+) -> Iterator[gpd.GeoDataFrame]:
+    """
+    Yield the features of all batches sorted by ``by`` (missing values last).
+
+    Each batch is sorted and spilled to a temporary directory under
+    ``spill_dir`` as a run. The merge keeps a block of every run in memory:
+    after sorting the buffered rows together, everything up to the last
+    buffered row of the run that ends first (among runs with rows left on
+    disk) precedes any row not read yet, so it is emitted and that run is
+    read further. Memory use is about one batch, or one block per run when
+    there are more runs than a batch has blocks.
+    """
+    with tempfile.TemporaryDirectory(prefix="sort_", dir=spill_dir) as tmp:
+        runs: List[_Run] = []
+        batch_rows = 0
+        for batch in batches:
+            if len(batch) == 0:
+                continue
+            batch_rows = max(batch_rows, len(batch))
+            runs.append(_Run(Path(tmp) / f"run_{len(runs)}.pkl", _sorted(batch, by, ascending)))
+        if not runs:
+            return
+        block_rows = max(batch_rows // len(runs), MERGE_BLOCK_FEATURES)
+
+        buffer: Optional[pd.DataFrame] = None
+        buffer_runs = np.empty(0, dtype=np.intp)
+        while True:
+            pieces = [] if buffer is None else [buffer]
+            piece_runs = [buffer_runs]
+            buffered = np.bincount(buffer_runs, minlength=len(runs))
+            for i, run in enumerate(runs):
+                if buffered[i] == 0 and run.remaining:
+                    for block in run.read(block_rows):
+                        pieces.append(block)
+                        piece_runs.append(np.full(len(block), i, dtype=np.intp))
+            if not pieces:
+                return
+
+            combined = pd.concat(pieces, ignore_index=True)
+            combined = _sorted(combined, by, ascending)
+            order = combined.index.to_numpy()
+            run_of = np.concatenate(piece_runs)[order]
+
+            pending = [i for i, run in enumerate(runs) if run.remaining]
+            if pending:
+                last = np.full(len(runs), -1, dtype=np.intp)
+                np.maximum.at(last, run_of, np.arange(len(run_of)))
+                cut = int(last[pending].min()) + 1
+            else:
+                cut = len(combined)
+
+            yield combined.iloc[:cut].reset_index(drop=True)
+            if cut == len(combined):
+                buffer, buffer_runs = None, np.empty(0, dtype=np.intp)
+            else:
+                buffer, buffer_runs = combined.iloc[cut:], run_of[cut:]
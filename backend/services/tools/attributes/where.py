@@ -0,0 +1,538 @@
+"""
+CQL-lite WHERE expressions, compiled once and evaluated on column arrays.
+
+The grammar covers what the attribute tools expose to the agent::
+
+    expr    := and (OR and)*
+    and     := not (AND not)*
+    not     := NOT not | primary
+    primary := ( expr ) | field IS [NOT] NULL | field IN (literal, ...)
+             | field op literal
+
+``parse_where`` caches ASTs by expression string and ``compile_where`` lowers
+each AST once to a tree of closures. Evaluating a compiled expression reads
+every referenced column as a numpy array once, compares arrays against
+literals and combines the boolean masks in place, so filtering a large layer
+costs a few vectorized passes instead of a pandas Series per node.
+
+``CompiledWhere.to_ogr_sql`` translates an expression into an OGR SQL
+attribute filter, so readers of indexed (GeoPackage) layers only decode the
+matching features.
+"""
+
+import difflib
+import logging
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Distinct expressions kept parsed / compiled
+WHERE_CACHE_SIZE = 256
+
+# =========================
+# Tokenizer / parser
+# =========================
+_token = re.compile(
+    r"""
+    \s*(?:
+        (?P<kw>AND|OR|NOT|IN|IS|NULL)\b
+      | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+      | "(?P<identq>[^"]+)"
+      | '(?P<string>[^']*)'
+      | (?P<num>-?\d+(?:\.\d+)?)
+      | (?P<op>>=|<=|!=|=|>|<)
+      | (?P<lpar>\()
+      | (?P<rpar>\))
+      | (?P<comma>,)
+    )
+""",
+    re.X | re.IGNORECASE,
+)
+
+_COMPARISONS = {">=", "<=", "!=", "=", ">", "<"}
+
+
+def _tokenize(s: str):
+    pos = 0
+    while pos < len(s):
+        m = _token.match(s, pos)
+        if not m:
+            raise ValueError(f"Bad token near: {s[pos:pos+20]}")
+        pos = m.end()
+        yield m
+
+
+def _read(tokens):
+    return next(tokens, None)
+
+
+def _advance(state, tokens):
+    state["cur"] = _read(tokens)
+    return state["cur"]
+
+
+def _peek(state):
+    return state["cur"]
+
+
+def _is_kw(tok, kw: str) -> bool:
+    return bool(tok and tok.group("kw") and tok.group("kw").upper() == kw)
+
+
+def _field_name(tok) -> str:
+    if tok.group("ident"):
+        return tok.group("ident")
+    if tok.group("identq"):
+        return tok.group("identq")
+    raise ValueError("Expected field name")
+
+
+def _parse_literal(tok):
+    if tok.group("string") is not None:
+        return tok.group("string")
+    if tok.group("num") is not None:
+        s = tok.group("num")
+        return float(s) if "." in s else int(s)
+    return None
+
+
+def _expect_kw(state, kw):
+    if not _is_kw(_peek(state), kw):
+        raise ValueError(f"Expected {kw}")
+    _advance(state, state["tokens"])
+
+
+def _expect_op(state, ops):
+    cur = _peek(state)
+    if not (cur and cur.group("op") in ops):
+        raise ValueError(f"Expected one of {ops}")
+    op = cur.group("op")
+    _advance(state, state["tokens"])
+    return op
+
+
+def _parse_primary(state):
+    cur = _peek(state)
+    if cur and cur.group("lpar"):
+        _advance(state, state["tokens"])
+        node = _parse_expr(state)
+        if not (_peek(state) and _peek(state).group("rpar")):
+            raise ValueError("Missing )")
+        _advance(state, state["tokens"])
+        return node
+    if cur and (cur.group("ident") or cur.group("identq")):
+        field = _field_name(cur)
+        _advance(state, state["tokens"])
+        cur = _peek(state)
+        if _is_kw(cur, "IS"):
+            _advance(state, state["tokens"])
+            is_not = False
+            if _is_kw(_peek(state), "NOT"):
+                is_not = True
+                _advance(state, state["tokens"])
+            _expect_kw(state, "NULL")
+            return ("isnull", field, is_not)
+        if _is_kw(cur, "IN"):
+            _advance(state, state["tokens"])
+            if not (_peek(state) and _peek(state).group("lpar")):
+                raise ValueError("Expected ( after IN")
+            _advance(state, state["tokens"])
+            values = []
+            while True:
+                cur = _peek(state)
+                if not cur:
+                    raise ValueError("Unterminated IN list")
+                if cur.group("rpar"):
+                    _advance(state, state["tokens"])
+                    break
+                if cur.group("comma"):
+                    _advance(state, state["tokens"])
+                    continue
+                v = _parse_literal(cur)
+                if v is None:
+                    raise ValueError("Expected literal in IN list")
+                values.append(v)
+                _advance(state, state["tokens"])
+            return ("in", field, tuple(values))
+        op = _expect_op(state, _COMPARISONS)
+        cur = _peek(state)
+        if not cur:
+            raise ValueError("Expected literal after op")
+        lit = _parse_literal(cur)
+        if lit is None:
+            raise ValueError("Expected literal after op")
+        _advance(state, state["tokens"])
+        return ("cmp", field, op, lit)
+    raise ValueError("Expected expression")
+
+
+def _parse_not(state):
+    if _is_kw(_peek(state), "NOT"):
+        _advance(state, state["tokens"])
+        return ("not", _parse_not(state))
+    return _parse_primary(state)
+
+
+def _parse_and(state):
+    node = _parse_not(state)
+    while _is_kw(_peek(state), "AND"):
+        _advance(state, state["tokens"])
+        node = ("and", node, _parse_not(state))
+    return node
+
+
+def _parse_expr(state):
+    node = _parse_and(state)
+    while _is_kw(_peek(state), "OR"):
+        _advance(state, state["tokens"])
+        node = ("or", node, _parse_and(state))
+    return node
+
+
+@lru_cache(maxsize=WHERE_CACHE_SIZE)
+def parse_where(where: str):
+    """
+    Parse a WHERE expression into a nested tuple AST.
+
+    Nodes are ``("cmp", field, op, literal)``, ``("in", field, values)``,
+    ``("isnull", field, is_not)``, ``("and", lhs, rhs)``, ``("or", lhs, rhs)``
+    and ``("not", node)``. ASTs are immutable and cached by expression.
+
+    Raises:
+        ValueError: If the expression does not parse
+    """
+    tokens = iter(_tokenize(where))
+    state = {"tokens": tokens, "cur": None}
+    _advance(state, tokens)
+    ast = _parse_expr(state)
+    if _peek(state):
+        raise ValueError("Unexpected trailing tokens")
+    return ast
+
+
+def where_fields(ast) -> List[str]:
+    """Field names referenced by an AST, in order of first use."""
+    kind = ast[0]
+    if kind in ("cmp", "in", "isnull"):
+        return [ast[1]]
+    fields: List[str] = []
+    for child in ast[1:]:
+        fields.extend(f for f in where_fields(child) if f not in fields)
+    return fields
+
+
+# ===================================
+# Field name fuzzy matching
+# ===================================
+def _find_closest_field(
+    field_name: str, available_fields: List[str], cutoff: float = 0.6
+) -> Tuple[Optional[str], bool]:
+    """
+    Find the closest matching field name in the available fields.
+
+    Args:
+        field_name: The field name to match
+        available_fields: List of available field names
+        cutoff: Similarity threshold for fuzzy matching (0 to 1)
+
+    Returns:
+        Tuple of (matched_field_name, is_exact_match)
+        Returns (None, False) if no match found above cutoff
+    """
+    # Try exact match first (case-sensitive)
+    if field_name in available_fields:
+        return (field_name, True)
+
+    # Try case-insensitive exact match
+    for field in available_fields:
+        if field.lower() == field_name.lower():
+            return (field, True)
+
+    # Try fuzzy matching
+    matches = difflib.get_close_matches(field_name, available_fields, n=1, cutoff=cutoff)
+    if matches:
+        return (matches[0], False)
+
+    return (None, False)
+
+
+# ===================================
+# Vectorized evaluation
+# ===================================
+_OPS: Dict[str, Callable[[Any, Any], Any]] = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+_ORDERING = {">", "<", ">=", "<="}
+
+
+class _Frame:
+    """Columns of the frame being filtered, resolved and converted once per evaluation."""
+
+    def __init__(self, frame: pd.DataFrame, field_suggestions: Dict[str, str]):
+        self.frame = frame
+        self.field_suggestions = field_suggestions
+        self.length = len(frame)
+        self._columns: Dict[str, pd.Series] = {}
+        self._numeric: Dict[str, np.ndarray] = {}
+
+    def column(self, field: str) -> pd.Series:
+        column = self._columns.get(field)
+        if column is None:
+            available = list(self.frame.columns)
+            matched_field, is_exact = _find_closest_field(field, available)
+            if matched_field is None:
+                raise ValueError(
+                    f"Field '{field}' not found. Available fields: {', '.join(sorted(available))}"
+                )
+            if not is_exact:
+                self.field_suggestions[field] = matched_field
+                logger.info(f"Field '{field}' not found, using close match '{matched_field}'")
+            column = self.frame[matched_field]
+            self._columns[field] = column
+        return column
+
+    def numeric(self, field: str) -> np.ndarray:
+        """Values of a numeric column, with NaN for missing values of nullable dtypes."""
+        values = self._numeric.get(field)
+        if values is None:
+            column = self.column(field)
+            if isinstance(column.dtype, np.dtype):
+                values = column.to_numpy()
+            else:
+                values = column.to_numpy(dtype="float64", na_value=np.nan)
+            self._numeric[field] = values
+        return values
+
+
+def _is_numeric(column: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(column.dtype)
+
+
+def _is_text(column: pd.Series) -> bool:
+    dtype = column.dtype
+    return pd.api.types.is_object_dtype(dtype) or (
+        pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+    )
+
+
+def _numeric_literal(value):
+    """A literal as a number, NaN if it is not one."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _series_cmp(a: pd.Series, op: str, b) -> np.ndarray:
+    """Compare a column of any other dtype (datetimes, categoricals) using pandas' coercions."""
+    try:
+        return _OPS[op](a, b).to_numpy(dtype=bool, na_value=False)
+    except TypeError as e:
+        logger.warning(f"Type error in comparison '{op}': {e} - returning all False")
+        return np.zeros(len(a), dtype=bool)
+
+
+def _compile_cmp(field: str, op: str, lit):
+    compare = _OPS[op]
+    numeric_lit = _numeric_literal(lit)
+    # Missing values only satisfy "!=", whatever the dtype
+    missing_matches = op == "!="
+
+    def evaluate(frame: _Frame) -> np.ndarray:
+        column = frame.column(field)
+        if _is_numeric(column):
+            with np.errstate(invalid="ignore"):
+                return np.asarray(compare(frame.numeric(field), numeric_lit), dtype=bool)
+        if op in _ORDERING and isinstance(lit, (int, float)):
+            # String/object field compared to number - return all False
+            logger.warning(
+                f"Type mismatch: comparing non-numeric field to numeric value "
+                f"with '{op}' - returning all False"
+            )
+            return np.zeros(frame.length, dtype=bool)
+        if not _is_text(column):
+            return _series_cmp(column, op, lit)
+        # Zero-copy for object and string columns
+        values = np.asarray(column.array, dtype=object)
+        try:
+            out = compare(values, lit)
+            if isinstance(out, np.ndarray) and out.dtype == bool:
+                return out
+        except TypeError:
+            pass
+        # Missing values (None, NaN, pd.NA) don't order against strings
+        present = ~pd.isna(values)
+        out = np.full(frame.length, missing_matches, dtype=bool)
+        try:
+            out[present] = compare(values[present], lit)
+        except TypeError as e:
+            logger.warning(f"Type error in comparison '{op}': {e} - returning all False")
+            return np.zeros(frame.length, dtype=bool)
+        return out
+
+    return evaluate
+
+
+def _compile_in(field: str, values: Tuple):
+    numbers = [v for v in values if isinstance(v, (int, float))]
+
+    def evaluate(frame: _Frame) -> np.ndarray:
+        column = frame.column(field)
+        if _is_numeric(column):
+            return np.isin(frame.numeric(field), numbers)
+        matches = column.array.isin(list(values))
+        if isinstance(matches, np.ndarray):
+            return matches
+        return matches.to_numpy(dtype=bool, na_value=False)
+
+    return evaluate
+
+
+def _compile_isnull(field: str, is_not: bool):
+    def evaluate(frame: _Frame) -> np.ndarray:
+        # A copy: masked arrays return their own mask
+        missing = np.array(frame.column(field).array.isna(), dtype=bool)
+        return np.logical_not(missing, out=missing) if is_not else missing
+
+    return evaluate
+
+
+def _compile_node(ast) -> Callable[[_Frame], np.ndarray]:
+    kind = ast[0]
+    if kind == "cmp":
+        return _compile_cmp(*ast[1:])
+    if kind == "in":
+        return _compile_in(*ast[1:])
+    if kind == "isnull":
+        return _compile_isnull(*ast[1:])
+    if kind in ("and", "or"):
+        lhs, rhs = _compile_node(ast[1]), _compile_node(ast[2])
+        combine = np.logical_and if kind == "and" else np.logical_or
+
+        def evaluate(frame: _Frame) -> np.ndarray:
+            # Every node returns a fresh mask, so combine in place
+            mask = lhs(frame)
+            return combine(mask, rhs(frame), out=mask)
+
+        return evaluate
+    if kind == "not":
+        child = _compile_node(ast[1])
+
+        def evaluate(frame: _Frame) -> np.ndarray:
+            mask = child(frame)
+            return np.logical_not(mask, out=mask)
+
+        return evaluate
+    raise ValueError(f"Unknown node {kind}")
+
+
+# ===================================
+# OGR SQL translation
+# ===================================
+def _sql_field(field: str) -> str:
+    return '"' + field.replace('"', '""') + '"'
+
+
+def _sql_literal(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def _literal_fits(value, dtype: str) -> bool:
+    """Whether OGR compares ``value`` with a field of ``dtype`` like pandas would."""
+    if isinstance(value, str):
+        return dtype == "object"
+    return dtype.startswith(("int", "uint", "float"))
+
+
+def _to_sql(ast, schema: Mapping[str, str]) -> Optional[str]:
+    kind = ast[0]
+    if kind in ("cmp", "in", "isnull"):
+        field = ast[1]
+        dtype = schema.get(field)
+        if dtype is None:
+            return None
+        name = _sql_field(field)
+        if kind == "isnull":
+            return f"{name} IS {'NOT ' if ast[2] else ''}NULL"
+        # SQL comparisons with NULL are unknown, pandas' are False (True for
+        # "!="); spell out the NULL case so NOT and OR combine the same way
+        if kind == "in":
+            if not ast[2] or not all(_literal_fits(v, dtype) for v in ast[2]):
+                return None
+            listed = ", ".join(_sql_literal(v) for v in ast[2])
+            return f"({name} IN ({listed}) AND {name} IS NOT NULL)"
+        _, _, op, lit = ast
+        if not _literal_fits(lit, dtype):
+            return None
+        if op == "!=":
+            return f"({name} <> {_sql_literal(lit)} OR {name} IS NULL)"
+        return f"({name} {op} {_sql_literal(lit)} AND {name} IS NOT NULL)"
+    if kind == "not":
+        child = _to_sql(ast[1], schema)
+        return None if child is None else f"(NOT {child})"
+    lhs, rhs = _to_sql(ast[1], schema), _to_sql(ast[2], schema)
+    if lhs is None or rhs is None:
+        return None
+    return f"({lhs} {kind.upper()} {rhs})"
+
+
+class CompiledWhere:
+    """A parsed WHERE expression lowered to vectorized mask evaluation."""
+
+    def __init__(self, where: str):
+        self.where = where
+        self.ast = parse_where(where)
+        self.fields = where_fields(self.ast)
+        self._evaluate = _compile_node(self.ast)
+
+    def mask(
+        self, frame: pd.DataFrame, field_suggestions: Optional[Dict[str, str]] = None
+    ) -> np.ndarray:
+        """
+        Boolean mask of the rows of ``frame`` matching the expression.
+
+        Field names are matched fuzzily; corrections are recorded in
+        ``field_suggestions`` as {requested_field: actual_field}.
+
+        Raises:
+            ValueError: If a field has no close match in ``frame``
+        """
+        if field_suggestions is None:
+            field_suggestions = {}
+        return self._evaluate(_Frame(frame, field_suggestions))
+
+    def to_ogr_sql(self, schema: Mapping[str, str]) -> Optional[str]:
+        """
+        The expression as an OGR SQL attribute filter.
+
+        Args:
+            schema: Field name -> dtype, as reported by ``pyogrio.read_info``
+
+        Returns:
+            None unless every field exists under its exact name and every
+            literal has the field's type, i.e. whenever OGR could match
+            different features than ``mask``
+        """
+        return _to_sql(self.ast, schema)
+
+
+@lru_cache(maxsize=WHERE_CACHE_SIZE)
+def compile_where(where: str) -> CompiledWhere:
+    """Parse and compile ``where``, once per distinct expression."""
+    return CompiledWhere(where)
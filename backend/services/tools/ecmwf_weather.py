@@ -23,7 +23,6 @@ import json
 import logging
 from typing import Any, Dict, List, Optional
 
-import requests
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
@@ -33,6 +32,7 @@ from typing_extensions import Annotated
 
 from models.geodata import DataOrigin, DataType, GeoDataObject
 from models.states import GeoDataAgentState
+from services import http_client
 from services.storage.file_management import store_file
 
 logger = logging.getLogger(__name__)
@@ -140,7 +140,7 @@ def geocode_location(location: str) -> Optional[Dict[str, float]]:
         }
         headers = {"User-Agent": "NaLaMap-Weather/1.0"}
 
-        response = requests.get(url, params=params, headers=headers, timeout=30)
+        response = http_client.get(url, params=params, headers=headers, timeout=30)
         response.raise_for_status()
         data = response.json()
 
@@ -197,7 +197,7 @@ def get_weather_data_simple(
     }
 
     try:
-        response = requests.get(url, params=query_params, timeout=30)
+        response = http_client.get(url, params=query_params, timeout=30)
         response.raise_for_status()
         return response.json()
     except Exception as e:
@@ -247,7 +247,7 @@ def get_forecast_data(
     }
 
     try:
-        response = requests.get(url, params=query_params, timeout=30)
+        response = http_client.get(url, params=query_params, timeout=30)
         response.raise_for_status()
         data = response.json()
 
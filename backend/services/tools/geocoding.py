@@ -1,9 +1,9 @@
 import hashlib
 import json
 import logging
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
-import requests
+import httpx
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
@@ -13,16 +13,20 @@ from typing_extensions import Annotated
 
 from models.geodata import DataOrigin, DataType, GeoDataObject, ProcessingMetadata
 from models.states import GeoDataAgentState
+from services import http_client
 from services.storage.file_management import store_file
 
 from .constants import AMENITY_MAPPING, OSM_GEOMETRY_PREFERENCES
 from .geocoding.tag_resolver import SemanticTagResolver
 from .overpass import (
+    OVERPASS_STREAM_MIN_RESULTS,
     OverpassClient,
+    OverpassFeatureWriter,
     OverpassLocation,
     OverpassQueryBuilder,
+    OverpassQueryError,
     OverpassResultConverter,
-    create_feature_collection_geodata,
+    create_spooled_collection_geodata,
     is_linear_feature_query,
 )
 
@@ -352,7 +356,7 @@ def geocode_using_geonames(location: str, maxRows: int = 3) -> str:
         f"http://api.geonames.org/searchJSON?q={location}&maxRows={maxRows}"
         f"&username={getenv('GEONAMES_USER', 'nalamap')}"
     )
-    response = requests.get(url)
+    response = http_client.get(url)
 
     if response.status_code == 200:
         data = response.json()
@@ -375,7 +379,7 @@ def geocode_using_nominatim(query: str, geojson: bool = False, maxRows: int = 3)
         f"?q={query}&format=json&polygon_kml={1 if geojson else 0}"
         f"&addressdetails=1&limit={maxRows}"
     )
-    response = requests.get(url, headers=headers_nalamap)
+    response = http_client.get(url, headers=headers_nalamap)
     if response.status_code == 200:
         data = response.json()
         if len(data):
@@ -551,7 +555,7 @@ def geocode_using_nominatim_to_geostate(
         f"?q={query}&format=json&polygon_geojson={1 if geojson else 0}"
         f"&addressdetails=0&limit={maxRows}"
     )
-    response = requests.get(url, headers=headers_nalamap)
+    response = http_client.get(url, headers=headers_nalamap)
     if response.status_code == 200:
         data = response.json()
         if len(data):
@@ -1213,136 +1217,85 @@ def geocode_using_overpass_to_geostate(
             }
         )
 
-    # Execute the query
+    # Execute the query. Linear features (road and river networks) and large
+    # result limits are streamed element by element instead of loaded whole.
     client = OverpassClient()
-    overpass_data, error_msg = client.execute_query(overpass_query, timeout=timeout)
-
-    if error_msg:
-        return Command(
-            update={
-                "messages": [
-                    *state["messages"],
-                    ToolMessage(
-                        name="geocode_using_overpass_to_geostate",
-                        content=(
-                            f"Error querying Overpass for '{amenity_key_display}' "
-                            f"{search_mode_description}: {error_msg}"
-                        ),
-                        tool_call_id=tool_call_id,
-                    ),
-                ]
-            }
-        )
+    stream_response = (
+        is_linear_feature_query(osm_query_key, osm_query_value)
+        or max_results > OVERPASS_STREAM_MIN_RESULTS
+    )
 
-    # 4. Process elements
-    if "elements" not in overpass_data or not overpass_data["elements"]:
-        return Command(
-            update={
-                "messages": [
-                    *state["messages"],
-                    ToolMessage(
-                        name="geocode_using_overpass_to_geostate",
-                        content=(f"No '{amenity_key_display}' found {search_mode_description}."),
-                        tool_call_id=tool_call_id,
-                    ),
-                ]
-            }
+    # 4. Process elements into per-geometry-type spools
+    with OverpassFeatureWriter() as writer:
+        element_count, error_msg = _write_overpass_features(
+            client,
+            overpass_query,
+            timeout,
+            stream_response,
+            writer,
+            resolved_tags,
+            osm_query_key,
+            osm_query_value,
         )
 
-    # Convert elements to GeoJSON features
-    converter = OverpassResultConverter()
-    all_features = []
-    processed_osm_ids = set()
-
-    for element in overpass_data["elements"]:
-        osm_element_id = f"{element.get('type', '')}/{element.get('id', '')}"
-        if osm_element_id in processed_osm_ids:
-            continue
-
-        # Apply geometry preferences filtering on raw elements
-        # For multi-tag queries: include if any tag's preferences allow it
-        if resolved_tags:
-            if not any(
-                should_include_element_in_results(element, t["key"], t["value"])
-                for t in resolved_tags
-            ):
-                continue
-        else:
-            if not should_include_element_in_results(element, osm_query_key, osm_query_value):
-                continue
-
-        # For multi-tag: skip converter-level filtering (handled below via is_tagged)
-        if resolved_tags:
-            feature = converter.convert_element_to_geojson(element, osm_tag_filter=None)
-        else:
-            feature = converter.convert_element_to_geojson(
-                element, osm_tag_filter=(osm_query_key, osm_query_value)
+        if error_msg:
+            return Command(
+                update={
+                    "messages": [
+                        *state["messages"],
+                        ToolMessage(
+                            name="geocode_using_overpass_to_geostate",
+                            content=(
+                                f"Error querying Overpass for '{amenity_key_display}' "
+                                f"{search_mode_description}: {error_msg}"
+                            ),
+                            tool_call_id=tool_call_id,
+                        ),
+                    ]
+                }
             )
 
-        if feature and feature.get("geometry"):
-            # Check tag matching
-            element_tags = feature.get("properties", {})
-            if resolved_tags:
-                # Multi-tag: match if element carries any of the resolved tags
-                is_tagged = any(
-                    (t["value"] == "*" and t["key"] in element_tags)
-                    or element_tags.get(t["key"]) == t["value"]
-                    for t in resolved_tags
-                )
-            elif osm_query_value == "*":
-                is_tagged = osm_query_key in element_tags
-            else:
-                is_tagged = element_tags.get(osm_query_key) == osm_query_value
-
-            if element["type"] == "node" or is_tagged:
-                # Check if this GeoJSON geometry type should be included
-                geom_type = feature["geometry"]["type"]
-                if resolved_tags:
-                    geom_ok = any(
-                        should_include_geojson_geometry(geom_type, t["key"]) for t in resolved_tags
-                    )
-                else:
-                    geom_ok = should_include_geojson_geometry(
-                        geom_type, osm_query_key, osm_query_value
-                    )
-                if not geom_ok:
-                    continue
-
-                processed_osm_ids.add(osm_element_id)
-                all_features.append(feature)
-
-    # Deduplicate features
-    all_features = converter.deduplicate_features(all_features)
+        if not element_count:
+            return Command(
+                update={
+                    "messages": [
+                        *state["messages"],
+                        ToolMessage(
+                            name="geocode_using_overpass_to_geostate",
+                            content=(
+                                f"No '{amenity_key_display}' found {search_mode_description}."
+                            ),
+                            tool_call_id=tool_call_id,
+                        ),
+                    ]
+                }
+            )
 
-    # Group by geometry type
-    point_features, polygon_features, linestring_features = converter.group_features_by_geometry(
-        all_features
-    )
+        if writer.duplicates:
+            logger.info(f"Skipped {writer.duplicates} duplicate features")
 
-    # Filter out point noise for linear feature queries when lines/areas exist
-    if is_linear_feature_query(osm_query_key, osm_query_value):
-        point_features = converter.filter_point_noise(
-            point_features, polygon_features, linestring_features
-        )
+        # Filter out point noise for linear feature queries when lines/areas exist
+        if is_linear_feature_query(osm_query_key, osm_query_value):
+            if writer.count("Points") and (writer.count("Areas") or writer.count("Lines")):
+                logger.info(
+                    f"Filtering out {writer.count('Points')} point features "
+                    f"(have {writer.count('Areas')} polygons and {writer.count('Lines')} lines)"
+                )
+                writer.discard("Points")
 
-    # 5. Create GeoDataObject collections
-    created_collections: List[GeoDataObject] = []
-    actionable_layers_info = []
+        # 5. Create GeoDataObject collections
+        created_collections: List[GeoDataObject] = []
+        actionable_layers_info = []
 
-    # Build the list of OSM tags actually used in the query
-    if resolved_tags:
-        osm_tags_used_list = [f"{t['key']}={t['value']}" for t in resolved_tags]
-    else:
-        osm_tags_used_list = [osm_tag_kv] if osm_tag_kv else []
+        # Build the list of OSM tags actually used in the query
+        if resolved_tags:
+            osm_tags_used_list = [f"{t['key']}={t['value']}" for t in resolved_tags]
+        else:
+            osm_tags_used_list = [osm_tag_kv] if osm_tag_kv else []
 
-    for features, collection_type in [
-        (point_features, "Points"),
-        (polygon_features, "Areas"),
-        (linestring_features, "Lines"),
-    ]:
-        if features:
-            collection_obj = create_feature_collection_geodata(
-                features,
+        for collection_type in ["Points", "Areas", "Lines"]:
+            collection_obj = create_spooled_collection_geodata(
+                writer,
                 collection_type,
                 amenity_key_display,
                 location.display_name,
@@ -1370,7 +1323,7 @@ def geocode_using_overpass_to_geostate(
                     {
                         "name": collection_obj.name,
                         "type": collection_type,
-                        "count": len(features),
+                        "count": writer.count(collection_type),
                         "id": collection_obj.id,
                         "data_source_id": "geocodeOverpassCollection",
                         "geometry_label": props.get("geometry_label", collection_type.lower()),
@@ -1380,6 +1333,8 @@ def geocode_using_overpass_to_geostate(
                     }
                 )
 
+        total_features = writer.total_count
+
     if not created_collections:
         return Command(
             update={
@@ -1400,8 +1355,6 @@ def geocode_using_overpass_to_geostate(
     # Collect only the NEW results — reducers handle merging
     new_geodata = list(created_collections)
 
-    total_features = len(point_features) + len(polygon_features) + len(linestring_features)
-
     # Build response message
     tool_message_content = _build_overpass_response_message(
         amenity_key_display,
@@ -1434,6 +1387,106 @@ def geocode_using_overpass_to_geostate(
     return Command(update=state_update)
 
 
+def _overpass_element_to_feature(
+    element: Dict[str, Any],
+    converter: OverpassResultConverter,
+    resolved_tags: Optional[List[Dict[str, str]]],
+    osm_query_key: str,
+    osm_query_value: str,
+) -> Optional[Dict[str, Any]]:
+    """Convert one Overpass element, applying the query's tag and geometry preferences."""
+    # Apply geometry preferences filtering on raw elements
+    # For multi-tag queries: include if any tag's preferences allow it
+    if resolved_tags:
+        if not any(
+            should_include_element_in_results(element, t["key"], t["value"]) for t in resolved_tags
+        ):
+            return None
+    else:
+        if not should_include_element_in_results(element, osm_query_key, osm_query_value):
+            return None
+
+    # For multi-tag: skip converter-level filtering (handled below via is_tagged)
+    if resolved_tags:
+        feature = converter.convert_element_to_geojson(element, osm_tag_filter=None)
+    else:
+        feature = converter.convert_element_to_geojson(
+            element, osm_tag_filter=(osm_query_key, osm_query_value)
+        )
+
+    if not feature or not feature.get("geometry"):
+        return None
+
+    # Check tag matching
+    element_tags = feature.get("properties", {})
+    if resolved_tags:
+        # Multi-tag: match if element carries any of the resolved tags
+        is_tagged = any(
+            (t["value"] == "*" and t["key"] in element_tags)
+            or element_tags.get(t["key"]) == t["value"]
+            for t in resolved_tags
+        )
+    elif osm_query_value == "*":
+        is_tagged = osm_query_key in element_tags
+    else:
+        is_tagged = element_tags.get(osm_query_key) == osm_query_value
+
+    if element["type"] != "node" and not is_tagged:
+        return None
+
+    # Check if this GeoJSON geometry type should be included
+    geom_type = feature["geometry"]["type"]
+    if resolved_tags:
+        geom_ok = any(should_include_geojson_geometry(geom_type, t["key"]) for t in resolved_tags)
+    else:
+        geom_ok = should_include_geojson_geometry(geom_type, osm_query_key, osm_query_value)
+    return feature if geom_ok else None
+
+
+def _write_overpass_features(
+    client: OverpassClient,
+    overpass_query: str,
+    timeout: int,
+    stream_response: bool,
+    writer: OverpassFeatureWriter,
+    resolved_tags: Optional[List[Dict[str, str]]],
+    osm_query_key: str,
+    osm_query_value: str,
+) -> Tuple[int, Optional[str]]:
+    """
+    Run an Overpass query and spool the matching features into ``writer``.
+
+    Returns:
+        Tuple of (element_count, error_message)
+    """
+    converter = OverpassResultConverter()
+    element_count = 0
+
+    def consume(elements: Iterable[Dict[str, Any]]) -> None:
+        nonlocal element_count
+        for element in elements:
+            element_count += 1
+            feature = _overpass_element_to_feature(
+                element, converter, resolved_tags, osm_query_key, osm_query_value
+            )
+            if feature:
+                writer.add(feature)
+
+    if stream_response:
+        try:
+            with client.stream_query(overpass_query, timeout=timeout) as elements:
+                consume(elements)
+        except OverpassQueryError as e:
+            return element_count, str(e)
+        return element_count, None
+
+    overpass_data, error_msg = client.execute_query(overpass_query, timeout=timeout)
+    if error_msg:
+        return 0, error_msg
+    consume(overpass_data.get("elements") or [])
+    return element_count, None
+
+
 def _geocode_location_for_overpass(
     location_name: str,
 ) -> tuple[Optional[OverpassLocation], Optional[str]]:
@@ -1449,7 +1502,7 @@ def _geocode_location_for_overpass(
     )
 
     try:
-        response = requests.get(nominatim_url, headers=headers_nalamap, timeout=20)
+        response = http_client.get(nominatim_url, headers=headers_nalamap, timeout=20)
         response.raise_for_status()
         location_data_list = response.json()
 
@@ -1508,7 +1561,7 @@ def _geocode_location_for_overpass(
             None,
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return None, f"Error geocoding '{location_name}': {str(e)}"
     except (KeyError, IndexError, ValueError) as e:
         return None, f"Could not parse geocoding result for '{location_name}': {str(e)}"
@@ -16,6 +16,9 @@ import threading
 from pathlib import Path
 from typing import Dict, List
 
+from utility.metrics_exporter import VECTOR_SEARCH_DURATION_SECONDS
+from utility.tracing import traced
+
 logger = logging.getLogger(__name__)
 
 OSM_TAG_VECTOR_DB_PATH = os.getenv("NALAMAP_OSM_TAG_VECTOR_DB", "data/osm_tag_vectors.db")
@@ -235,6 +238,8 @@ class TagVectorStore:
     # Read operations
     # ------------------------------------------------------------------
 
+    @VECTOR_SEARCH_DURATION_SECONDS.time("osm_tags")
+    @traced("vector_store.search.osm_tags")
     def similarity_search(self, query: str, k: int = 20, min_count: int = 100) -> List[Dict]:
         """Search for tags similar to the query text.
 
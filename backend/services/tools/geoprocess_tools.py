@@ -1,13 +1,10 @@
 # services/agents/geoprocessing_agent.py
 import json
 import logging
-import os
 import re
 import uuid
 from typing import Any, Dict, List, Optional, Union
 
-import requests
-
 # LLM import
 from langchain_core.messages import HumanMessage, ToolMessage
 from langchain_core.tools import tool
@@ -16,11 +13,13 @@ from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
 from typing_extensions import Annotated
 
-from core.config import BASE_URL, LOCAL_UPLOAD_DIR
 from models.geodata import DataOrigin, DataType, GeoDataObject
 from models.states import GeoDataAgentState
 from services.ai.llm_config import get_llm
-from services.storage.file_management import store_file
+from services.storage.file_management import local_upload_path, store_file_chunks
+from services.storage.indexed_layers import layer_extent
+from services.tools.attribute_tools import _load_gdf
+from services.tools.geoprocessing.layer import DeferredLayer, GeoLayer, ensure_geo_layer
 from services.tools.geoprocessing.ops.area import op_area
 from services.tools.geoprocessing.ops.buffer import op_buffer
 from services.tools.geoprocessing.ops.centroid import op_centroid
@@ -35,6 +34,7 @@ from services.tools.geoprocessing.ops.sjoin_nearest import op_sjoin_nearest
 # Imports of operation functions from geoprocessing ops and utils
 from services.tools.geoprocessing.utils import get_last_human_content
 from services.tools.utils import get_all_available_layers, match_layer_names
+from utility import tracing
 
 
 def slugify(text: str) -> str:
@@ -118,38 +118,110 @@ TOOL_REGISTRY = {
 }
 
 
+# Predicates that can only match features whose envelopes intersect
+_INTERSECTING_PREDICATES = {
+    "intersects",
+    "contains",
+    "contains_properly",
+    "within",
+    "covers",
+    "covered_by",
+    "overlaps",
+    "crosses",
+    "touches",
+}
+
+
+def read_window(step: Dict[str, Any], bboxes: List[Optional[List[float]]]) -> Optional[List[float]]:
+    """
+    The extent that the inputs of ``step`` need to be read in, if any.
+
+    Clip, intersection overlays and inner spatial joins only keep features
+    that intersect every input layer, so they only need the features within
+    the intersection of the input extents (EPSG:4326). Other operations
+    need whole layers. Clip and sjoin consume exactly two layers; with any
+    other number of inputs the layers are read in full, since an extent the
+    operation does not use must not narrow the window.
+
+    Returns:
+        The window as (minx, miny, maxx, maxy); min > max when the extents
+        don't intersect. None if the layers must be read in full.
+    """
+    op_name = step.get("operation")
+    params = step.get("params") or {}
+    if op_name == "clip":
+        windowed = len(bboxes) == 2
+    elif op_name == "overlay":
+        windowed = params.get("how", "intersection") == "intersection"
+    elif op_name == "sjoin":
+        windowed = (
+            len(bboxes) == 2
+            and params.get("how", "inner") == "inner"
+            and params.get("predicate", "intersects") in _INTERSECTING_PREDICATES
+        )
+    else:
+        windowed = False
+    if not windowed or len(bboxes) < 2 or any(b is None for b in bboxes):
+        return None
+    return [
+        max(b[0] for b in bboxes),
+        max(b[1] for b in bboxes),
+        min(b[2] for b in bboxes),
+        min(b[3] for b in bboxes),
+    ]
+
+
 # ========== Geoprocess Executor ==========
 def geoprocess_executor(state: Dict[str, Any]) -> Dict[str, Any]:
     """
     Uses an LLM to plan a sequence of geoprocessing operations based on a natural-language query
-    and executes them in order against the input GeoJSON layers.
+    and executes them in order against the input layers (GeoJSON dicts or GeoLayers).
 
     Returns:
       - tool_sequence: List of operation names executed
-      - result_layers: List of GeoJSON Feature dicts
+      - result_layers: List of GeoLayers; serialize them once, at output
       - result_name: Descriptive name for the result layer
       - result_description: Detailed description of the operation
       - operation_details: JSON object with details of operations performed
     """
     query = state.get("query", "")
-    layers: List[Dict[str, Any]] = state.get("input_layers", [])
+    # Parse once; operations then pass GeoDataFrames between steps. Deferred
+    # (large, indexed) layers are read once the plan is known.
+    layers: List[Union[GeoLayer, DeferredLayer]] = [
+        layer if isinstance(layer, DeferredLayer) else ensure_geo_layer(layer)
+        for layer in state.get("input_layers", [])
+    ]
     available_ops: List[str] = state.get("available_operations_and_params", [])
     model_settings = state.get("model_settings")  # Get user's model configuration
 
     # 0) Summarize layers to metadata to reduce context size
     layer_meta = []
-    for feat in layers:
-        props = feat.get("properties", {})
-        geom = feat.get("geometry", {})
-        # get geometry type and bbox if present
-        gtype = geom.get("type")
-        # simplistic bbox extraction: assume Feature has 'bbox' prop
-        bbox = feat.get("bbox") or props.get("bbox")
+    for layer in layers:
+        if isinstance(layer, DeferredLayer):
+            layer_meta.append(
+                {
+                    "resource_id": None,
+                    "name": layer.name,
+                    "title": layer.title or layer.name,
+                    "geometry_type": layer.geometry_type,
+                    "bbox": layer.bbox,
+                }
+            )
+            continue
+        props = layer.metadata
+        gdf = layer.gdf
+        # dominant geometry type and bbox of the layer's features
+        gtype = None
+        bbox = props.get("bbox")
+        if not gdf.empty:
+            gtype = gdf.geom_type.mode().iloc[0] if gdf.geom_type.notna().any() else None
+            bbox = bbox or [float(v) for v in layer.to_wgs84().total_bounds]
+        name = layer.name or props.get("name")
         layer_meta.append(
             {
                 "resource_id": props.get("resource_id"),
-                "name": props.get("name"),
-                "title": props.get("title", props.get("name")),
+                "name": name,
+                "title": layer.title or props.get("title", name),
                 "geometry_type": gtype,
                 "bbox": bbox,
             }
@@ -280,8 +352,15 @@ def geoprocess_executor(state: Dict[str, Any]) -> Dict[str, Any]:
     result_name = plan.get("result_name", "")
     result_description = plan.get("result_description", "")
 
-    # 2) Execute each step on full geojson layers on full geojson layers
-    result = layers
+    # 2) Execute each step on the full layers, staying in GeoDataFrame space
+    # Later steps consume the output of the first, so only a single-step
+    # plan can be read within a window
+    window = None
+    if len(steps) == 1:
+        window = read_window(steps[0], [meta["bbox"] for meta in layer_meta])
+    result = [
+        layer.materialize(window) if isinstance(layer, DeferredLayer) else layer for layer in layers
+    ]
     executed_ops = []
     executed_steps = []
 
@@ -329,7 +408,8 @@ def geoprocess_executor(state: Dict[str, Any]) -> Dict[str, Any]:
                     # Disable auto-optimization when user specifies CRS
                     params["auto_optimize_crs"] = False
 
-            result = func(result, **params)
+            with tracing.span(f"geoprocess.{op_name}", operation=op_name):
+                result = [ensure_geo_layer(layer) for layer in func(result, **params)]
             executed_ops.append(op_name)
             executed_steps.append({"operation": op_name, "params": params})
 
@@ -413,8 +493,8 @@ def geoprocess_tool(
     # Name derived from input layer
     result_name = selected[0].name if selected else ""
 
-    # Load GeoJSONs from either local disk or remote URL
-    input_layers: List[Dict[str, Any]] = []
+    # Load layers (local disk or remote URL) through the shared parsed-layer cache
+    input_layers: List[Union[GeoLayer, DeferredLayer]] = []
     layer_titles: List[str] = []  # Track layer titles for origin_layers metadata
     for layer in selected:
         if layer.data_type not in (DataType.GEOJSON, DataType.UPLOADED):
@@ -424,117 +504,37 @@ def geoprocess_tool(
         layer_titles.append(layer.title or layer.name)
 
         url = layer.data_link
-        gj: Optional[Dict[str, Any]] = None
-
-        # 1) If the URL matches BASE_URL/uploads/, load from LOCAL_UPLOAD_DIR
-        if url.startswith(f"{BASE_URL}/uploads/"):
-            filename = os.path.basename(url)
-            local_path = os.path.join(LOCAL_UPLOAD_DIR, filename)
-            try:
-                with open(local_path, "r", encoding="utf-8") as f:
-                    gj = json.load(f)
-            except Exception as exc:
-                return {
-                    "update": {
-                        "messages": [
-                            ToolMessage(
-                                name="geoprocess_tool",
-                                content=f"Error: Failed to read local file '{local_path}': {exc}",
-                                tool_call_id=tool_call_id,
-                                status="error",
-                            )
-                        ]
-                    }
-                }
-
-        # 2) Else if url is a local filesystem path
-        elif os.path.isfile(url):
-            try:
-                with open(url, "r", encoding="utf-8") as f:
-                    gj = json.load(f)
-            except Exception as exc:
-                return {
-                    "update": {
-                        "messages": [
-                            ToolMessage(
-                                name="geoprocess_tool",
-                                content=f"Error: Failed to read local file '{url}': {exc}",
-                                tool_call_id=tool_call_id,
-                                status="error",
-                            )
-                        ]
-                    }
-                }
-
-        # 3) Else if url is under LOCAL_UPLOAD_DIR by filename
-        else:
-            filename = os.path.basename(url)
-            local_path = os.path.join(LOCAL_UPLOAD_DIR, filename)
-            if os.path.isfile(local_path):
-                try:
-                    with open(local_path, "r", encoding="utf-8") as f:
-                        gj = json.load(f)
-                except Exception as exc:
-                    return {
-                        "update": {
-                            "messages": [
-                                ToolMessage(
-                                    name="geoprocess_tool",
-                                    content=f"Error: Failed to read local file '{local_path}': {exc}",
-                                    tool_call_id=tool_call_id,
-                                    status="error",
-                                )
-                            ]
-                        }
-                    }
-
-        # 4) Else if it looks like a remote URL, fetch via requests
-        if gj is None:
-            if url.startswith("http://") or url.startswith("https://"):
-                try:
-                    resp = requests.get(url, timeout=20)
-                    if resp.status_code != 200:
-                        raise IOError(f"HTTP {resp.status_code} when fetching {url}")
-                    gj = resp.json()
-                except Exception as exc:
-                    return {
-                        "update": {
-                            "messages": [
-                                ToolMessage(
-                                    name="geoprocess_tool",
-                                    content=f"Error: Failed to fetch GeoJSON from '{url}': {exc}",
-                                    tool_call_id=tool_call_id,
-                                    status="error",
-                                )
-                            ]
-                        }
-                    }
-            else:
-                return {
-                    "update": {
-                        "messages": [
-                            ToolMessage(
-                                name="geoprocess_tool",
-                                content=f"Error: GeoJSON path '{url}' is neither a local file nor a valid HTTP URL.",
-                                tool_call_id=tool_call_id,
-                                status="error",
-                            )
-                        ]
-                    }
-                }
-
-        # Normalize to FeatureCollection
-        if isinstance(gj, list):
-            gj = gj[0]
-        if gj.get("type") == "FeatureCollection":
-            input_layers.append(gj)
-        elif gj.get("type") == "Feature":
-            input_layers.append(
-                {
-                    "type": "FeatureCollection",
-                    "features": [gj],
+        try:
+            # Large uploads with an indexed copy are read once the operation
+            # is planned, restricted to the extent it needs
+            local_path = local_upload_path(url)
+            extent = layer_extent(local_path) if local_path else None
+            if extent is not None:
+                input_layers.append(
+                    DeferredLayer(
+                        load=lambda bbox, url=url: _load_gdf(url, bbox=bbox),
+                        bbox=extent["bbox"],
+                        geometry_type=extent["geometry_type"],
+                        name=layer.name,
+                        title=layer.title,
+                    )
+                )
+                continue
+            gdf = _load_gdf(url)
+        except Exception as exc:
+            return {
+                "update": {
+                    "messages": [
+                        ToolMessage(
+                            name="geoprocess_tool",
+                            content=f"Error: Failed to load GeoJSON from '{url}': {exc}",
+                            tool_call_id=tool_call_id,
+                            status="error",
+                        )
+                    ]
                 }
-            )
+            }
+        input_layers.append(GeoLayer(gdf, name=layer.name, title=layer.title))
 
     query = get_last_human_content(messages)
     # If operation was specified, add it to the query for better context
@@ -668,60 +668,47 @@ def geoprocess_tool(
 
         # Extract CRS metadata if present in the layer
         processing_metadata = None
-        if isinstance(layer, dict) and "properties" in layer:
-            layer_props = layer.get("properties", {})
-            if "_crs_metadata" in layer_props:
-                crs_meta = layer_props["_crs_metadata"]
-                # Get the operation name from the last executed step
-                last_operation = (
-                    operation_details.get("steps", [{}])[-1].get("operation", "unknown")
-                    if operation_details.get("steps")
-                    else "unknown"
-                )
-
-                # Import ProcessingMetadata here to avoid circular imports
-                from models.geodata import ProcessingMetadata
-
-                # Filter out None values from origin_layers
-                origin_layer_names = [
-                    name
-                    for name in operation_details.get("input_layers", [])
-                    if name is not None and name != ""
-                ]
+        crs_meta = layer.metadata.get("_crs_metadata")
+        if crs_meta:
+            # Get the operation name from the last executed step
+            last_operation = (
+                operation_details.get("steps", [{}])[-1].get("operation", "unknown")
+                if operation_details.get("steps")
+                else "unknown"
+            )
 
-                processing_metadata = ProcessingMetadata(
-                    operation=last_operation,
-                    crs_used=crs_meta.get("epsg_code") or crs_meta.get("authority", "EPSG:4326"),
-                    crs_name=crs_meta.get("crs_name", "Unknown"),
-                    authority=crs_meta.get("authority"),
-                    wkt=crs_meta.get("wkt"),
-                    wkt_hash=crs_meta.get("wkt_hash"),
-                    wkt_params=crs_meta.get("wkt_params"),
-                    auto_selected=crs_meta.get("auto_selected", False),
-                    selection_reason=crs_meta.get("selection_reason"),
-                    origin_layers=origin_layer_names,
-                )
-                # Remove the internal metadata from properties before storing
-                del layer_props["_crs_metadata"]
+            # Import ProcessingMetadata here to avoid circular imports
+            from models.geodata import ProcessingMetadata
+
+            # Filter out None values from origin_layers
+            origin_layer_names = [
+                name
+                for name in operation_details.get("input_layers", [])
+                if name is not None and name != ""
+            ]
+
+            processing_metadata = ProcessingMetadata(
+                operation=last_operation,
+                crs_used=crs_meta.get("epsg_code") or crs_meta.get("authority", "EPSG:4326"),
+                crs_name=crs_meta.get("crs_name", "Unknown"),
+                authority=crs_meta.get("authority"),
+                wkt=crs_meta.get("wkt"),
+                wkt_hash=crs_meta.get("wkt_hash"),
+                wkt_params=crs_meta.get("wkt_params"),
+                auto_selected=crs_meta.get("auto_selected", False),
+                selection_reason=crs_meta.get("selection_reason"),
+                origin_layers=origin_layer_names,
+            )
 
-        # Create a filename with the unique name and serialize to JSON
+        # Serialize once, streaming the features straight to the file store
+        # (supports both local and Azure Blob Storage)
         filename = f"{unique_name}_{short_uuid}.geojson"
+        logger.info(f"geoprocess_tool: Storing file: {filename}")
         try:
-            logger.info(f"geoprocess_tool: Serializing layer to JSON: {filename}")
-            json_content = json.dumps(layer).encode("utf-8")
-            logger.info(
-                f"geoprocess_tool: JSON serialization successful, size: {len(json_content)} bytes"
-            )
+            url, stored_filename = store_file_chunks(filename, layer.iter_geojson())
         except Exception as e:
-            logger.error(f"geoprocess_tool: JSON serialization failed for {filename}: {e}")
-            logger.error(
-                f"geoprocess_tool: Layer type: {type(layer)}, keys: {layer.keys() if isinstance(layer, dict) else 'N/A'}"
-            )
+            logger.error(f"geoprocess_tool: Failed to serialize/store {filename}: {e}")
             raise
-
-        # Use centralized file management (supports both local and Azure Blob Storage)
-        logger.info(f"geoprocess_tool: Storing file: {filename}")
-        url, stored_filename = store_file(filename, json_content)
         logger.info(f"geoprocess_tool: File stored successfully: {url}")
         out_urls.append(url)
 
@@ -0,0 +1,190 @@
+"""
+In-memory layer representation shared by the geoprocessing operations.
+
+Operations used to exchange GeoJSON dicts, so every step of a plan rebuilt a
+GeoDataFrame with ``from_features`` and serialized it back with ``to_json``.
+``GeoLayer`` keeps the GeoDataFrame (and therefore its CRS) between steps;
+conversion to GeoJSON happens once, where the result leaves the executor.
+
+Operations decorated with ``geolayer_op`` accept GeoJSON dicts, ``GeoLayer``
+objects or a mix. If any input is a ``GeoLayer`` they return ``GeoLayer``
+objects; otherwise they return GeoJSON dicts as before.
+"""
+
+import functools
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+
+import geopandas as gpd
+import pandas as pd
+
+from services.storage.geojson_writer import gdf_to_feature_collection, iter_feature_collection
+from services.tools.geoprocessing.utils import flatten_features
+
+logger = logging.getLogger(__name__)
+
+WGS84 = "EPSG:4326"
+
+
+@dataclass
+class GeoLayer:
+    """A vector layer held as a GeoDataFrame plus FeatureCollection-level metadata.
+
+    Attributes:
+        gdf: The features. Its CRS is authoritative; GeoJSON output is EPSG:4326.
+        metadata: FeatureCollection-level ``properties`` (e.g. ``_crs_metadata``)
+        name: Optional layer name, used for planning context and error messages
+        title: Optional human-readable title
+    """
+
+    gdf: gpd.GeoDataFrame
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    name: Optional[str] = None
+    title: Optional[str] = None
+
+    @property
+    def crs(self):
+        return self.gdf.crs
+
+    @classmethod
+    def from_geojson(cls, obj: Dict[str, Any], **kwargs) -> "GeoLayer":
+        """Build a layer from a GeoJSON Feature or FeatureCollection dict."""
+        layer = cls(gdf=_features_to_gdf(flatten_features([obj])), **kwargs)
+        props = obj.get("properties") if obj.get("type") == "FeatureCollection" else None
+        if isinstance(props, dict):
+            layer.metadata = dict(props)
+        return layer
+
+    def to_wgs84(self) -> gpd.GeoDataFrame:
+        """Return the features in EPSG:4326 (assumed when the CRS is missing)."""
+        return _as_wgs84(self.gdf)
+
+    def iter_geojson(self, batch_size: Optional[int] = None) -> Iterator[bytes]:
+        """Stream the features as a GeoJSON FeatureCollection (metadata excluded)."""
+        kwargs = {"batch_size": batch_size} if batch_size else {}
+        return iter_feature_collection(self.to_wgs84(), include_id=True, **kwargs)
+
+    def to_geojson(self) -> Dict[str, Any]:
+        """Convert to a FeatureCollection dict, with metadata as its ``properties``."""
+        fc = gdf_to_feature_collection(self.to_wgs84(), include_id=True)
+        if self.metadata:
+            fc["properties"] = dict(self.metadata)
+        return fc
+
+
+@dataclass
+class DeferredLayer:
+    """A large layer whose features are only read once the operation is known.
+
+    Operations whose result lies within the extent of every input (clip,
+    intersection overlay, inner spatial joins) only need the features inside
+    that common extent. Large uploads with a spatially indexed copy are
+    therefore passed to the executor as a ``DeferredLayer``, planned from
+    its header metadata and read with ``materialize`` afterwards.
+
+    Attributes:
+        load: Reads the features, optionally only those intersecting a bbox
+            (minx, miny, maxx, maxy in EPSG:4326)
+        bbox: Extent of the layer in EPSG:4326
+        geometry_type: Geometry type of the features, if uniform
+        name: Optional layer name
+        title: Optional human-readable title
+    """
+
+    load: Callable[[Optional[List[float]]], gpd.GeoDataFrame]
+    bbox: Optional[List[float]] = None
+    geometry_type: Optional[str] = None
+    name: Optional[str] = None
+    title: Optional[str] = None
+
+    def materialize(self, bbox: Optional[List[float]] = None) -> GeoLayer:
+        """Read the features (within ``bbox`` if given) into a ``GeoLayer``."""
+        if bbox is not None and (bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+            # Empty window: nothing can intersect it
+            return GeoLayer(
+                gpd.GeoDataFrame(geometry=[], crs=WGS84), name=self.name, title=self.title
+            )
+        return GeoLayer(self.load(bbox), name=self.name, title=self.title)
+
+
+LayerLike = Union[GeoLayer, Dict[str, Any]]
+
+
+def _features_to_gdf(features: List[Dict[str, Any]]) -> gpd.GeoDataFrame:
+    if not features:
+        return gpd.GeoDataFrame(geometry=[], crs=WGS84)
+    # GeoJSON requires 'properties'; tolerate features that omit it
+    features = [f if "properties" in f else {**f, "properties": {}} for f in features]
+    gdf = gpd.GeoDataFrame.from_features(features)
+    return gdf.set_crs(WGS84)
+
+
+def _as_wgs84(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    if gdf._geometry_column_name not in gdf.columns:
+        return gdf
+    if gdf.crs is None:
+        return gdf.set_crs(WGS84)
+    if gdf.crs != WGS84:
+        return gdf.to_crs(WGS84)
+    return gdf
+
+
+def layer_to_gdf(layer: LayerLike) -> gpd.GeoDataFrame:
+    """Return a layer's features as a GeoDataFrame in the layer's current CRS.
+
+    GeoJSON dicts are parsed (EPSG:4326). ``GeoLayer`` frames keep the CRS a
+    previous operation left them in, so chained operations only reproject
+    when ``prepare_gdf_for_operation`` selects another CRS; they are
+    returned without copying, so operations must not modify them in place.
+    """
+    if isinstance(layer, GeoLayer):
+        gdf = layer.gdf
+        if gdf._geometry_column_name in gdf.columns and gdf.crs is None:
+            return gdf.set_crs(WGS84)
+        return gdf
+    return _features_to_gdf(flatten_features([layer]))
+
+
+def layers_to_gdf(layers: List[LayerLike]) -> gpd.GeoDataFrame:
+    """Concatenate the features of several layers into one GeoDataFrame.
+
+    The result is in the CRS of the first non-empty layer; the others are
+    reprojected to it if needed.
+    """
+    frames = [layer_to_gdf(layer) for layer in layers]
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return gpd.GeoDataFrame(geometry=[], crs=WGS84)
+    if len(frames) == 1:
+        return frames[0]
+    crs = frames[0].crs
+    frames = [f if f.crs == crs else f.to_crs(crs) for f in frames]
+    return gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs=crs)
+
+
+def ensure_geo_layer(layer: LayerLike) -> GeoLayer:
+    """Return ``layer`` as a ``GeoLayer``, parsing GeoJSON dicts."""
+    if isinstance(layer, GeoLayer):
+        return layer
+    if isinstance(layer, DeferredLayer):
+        return layer.materialize()
+    return GeoLayer.from_geojson(layer)
+
+
+def geolayer_op(func: Callable[..., List[LayerLike]]) -> Callable[..., List[LayerLike]]:
+    """Adapt an operation to both GeoJSON-dict and ``GeoLayer`` callers.
+
+    Operations return ``GeoLayer`` results (or pass inputs through unchanged).
+    Callers passing only dicts get dicts back, converted once here; callers
+    passing ``GeoLayer`` objects get ``GeoLayer`` objects and no serialization.
+    """
+
+    @functools.wraps(func)
+    def wrapper(layers, *args, **kwargs):
+        result = func(layers, *args, **kwargs)
+        if any(isinstance(layer, GeoLayer) for layer in layers or []):
+            return [ensure_geo_layer(r) for r in result]
+        return [r.to_geojson() if isinstance(r, GeoLayer) else r for r in result]
+
+    return wrapper
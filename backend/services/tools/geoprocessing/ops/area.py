@@ -5,12 +5,10 @@ Uses smart planar CRS selection with equal-area projections for accurate
 area calculations across different geographic extents.
 """
 
-import json
 import logging
-from typing import Any, Dict, List
-
-import geopandas as gpd
+from typing import List
 
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layer_to_gdf
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
     prepare_gdf_for_operation,
@@ -19,14 +17,15 @@ from services.tools.geoprocessing.projection_utils import (
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_area(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     unit: str = "square_meters",
     crs: str = "EPSG:3857",
     area_column: str = "area",
     auto_optimize_crs: bool = False,
     projection_metadata: bool = False,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
     Calculate the area of each geometry and add it as a property.
 
@@ -34,7 +33,7 @@ def op_area(
     accurate area calculations (<1% error) for most geographic extents.
 
     Args:
-        layers: List of GeoJSON Feature or FeatureCollection dicts
+        layers: List of GeoJSON Feature/FeatureCollection dicts or GeoLayers
         unit: Area unit ('square_meters', 'square_kilometers', 'hectares',
               'square_miles', 'acres')
         crs: Default CRS for area calculation (default EPSG:3857)
@@ -43,7 +42,7 @@ def op_area(
         projection_metadata: Include CRS metadata in response
 
     Returns:
-        List of FeatureCollections with area property added to each feature
+        List of layers with area property added to each feature
     """
     if not layers:
         logger.warning("op_area called with no layers")
@@ -69,26 +68,16 @@ def op_area(
     result_layers = []
 
     for layer in layers:
-        layer_type = layer.get("type")
-
-        # Extract features
-        if layer_type == "FeatureCollection":
-            features = layer.get("features", [])
-        elif layer_type == "Feature":
-            features = [layer]
-        else:
-            logger.debug(f"Skipping layer with invalid type: {layer_type}")
-            continue
-
-        if not features:
-            result_layers.append(layer)
+        if isinstance(layer, dict) and layer.get("type") not in ("FeatureCollection", "Feature"):
+            logger.debug(f"Skipping layer with invalid type: {layer.get('type')}")
             continue
 
         try:
             # Create GeoDataFrame
-            gdf = gpd.GeoDataFrame.from_features(features)
-            if gdf.crs is None:
-                gdf.set_crs("EPSG:4326", inplace=True)
+            gdf = layer_to_gdf(layer)
+            if gdf.empty:
+                result_layers.append(layer)
+                continue
 
             # Planar area calculation with smart CRS selection
             if auto_optimize_crs:
@@ -112,23 +101,15 @@ def op_area(
             # Calculate area in the selected CRS (assumed square meters)
             gdf_calc[area_column] = gdf_calc.geometry.area * factor
 
-            # Reproject back to EPSG:4326
-            gdf_result = gdf_calc.to_crs("EPSG:4326")
-
-            # Convert back to GeoJSON
-            fc = json.loads(gdf_result.to_json())
+            # Keep the working CRS; output is converted to EPSG:4326 once
+            gdf_result = gdf_calc
 
             # Include metadata if requested or if auto_optimize is on
-            if (
-                (projection_metadata or auto_optimize_crs)
-                and isinstance(fc, dict)
-                and fc.get("features")
-            ):
-                if "properties" not in fc:
-                    fc["properties"] = {}
-                fc["properties"]["_crs_metadata"] = crs_info
-
-            result_layers.append(fc)
+            metadata = {}
+            if projection_metadata or auto_optimize_crs:
+                metadata["_crs_metadata"] = crs_info
+
+            result_layers.append(GeoLayer(gdf_result, metadata))
 
         except Exception as exc:
             logger.exception(f"Error calculating area for layer: {exc}")
@@ -1,9 +1,9 @@
-import json
 import logging
 
 import geopandas as gpd
 from shapely.ops import unary_union
 
+from services.tools.geoprocessing.layer import GeoLayer, geolayer_op, layer_to_gdf
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
     prepare_gdf_for_operation,
@@ -12,6 +12,7 @@ from services.tools.geoprocessing.projection_utils import (
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_buffer(
     layers,
     radius=10000,
@@ -30,7 +31,7 @@ def op_buffer(
     based on data location and extent.
 
     Args:
-        layers: List containing a single GeoJSON layer (FeatureCollection or Feature)
+        layers: List containing a single layer (GeoJSON FeatureCollection/Feature or GeoLayer)
         radius: Buffer radius in specified units (default: 10000)
         buffer_crs: Default CRS for buffering (default: EPSG:3857)
         radius_unit: Unit of radius ("meters", "kilometers", "miles")
@@ -40,7 +41,7 @@ def op_buffer(
         override_crs: Force specific CRS instead of auto-selection
 
     Returns:
-        List containing one FeatureCollection with buffered features
+        List containing one layer with buffered features
 
     Raises:
         ValueError: If multiple layers are provided
@@ -65,6 +66,8 @@ def op_buffer(
                         props = first_feat.get("properties", {})
                         if props:
                             name = props.get("name") or props.get("title")
+            elif isinstance(layer, GeoLayer):
+                name = layer.title or layer.name
             layer_info.append(f"Layer {i+1}" + (f": {name}" if name else ""))
 
         layer_desc = ", ".join(layer_info)
@@ -81,35 +84,21 @@ def op_buffer(
 
     actual_radius_meters = float(radius) * factor
 
-    current_features = []
-    if isinstance(layer_item, dict):
-        if layer_item.get("type") == "FeatureCollection":
-            current_features = layer_item.get("features", [])
-        elif layer_item.get("type") == "Feature":
-            current_features = [layer_item]
-
-    if not current_features:
-        # This case might occur if the single layer_item was an empty FeatureCollection or invalid
-        print(
-            f"Warning: The provided layer item is empty or not a recognizable Feature/FeatureCollection: {type(layer_item)}"
-        )
-        return []
-
-    # Ensure all features have 'properties' field (GeoJSON spec requirement)
-    # This prevents KeyError when geopandas tries to access feature["properties"]
-    for feature in current_features:
-        if isinstance(feature, dict) and "properties" not in feature:
-            feature["properties"] = {}
-
     try:
-        logger.info(f"op_buffer: Starting buffer operation with {len(current_features)} features")
+        gdf = layer_to_gdf(layer_item)
+        if gdf.empty:
+            # This case might occur if the single layer_item was an empty FeatureCollection or invalid
+            logger.warning(
+                f"op_buffer: The provided layer item is empty or not a recognizable Feature/FeatureCollection: {type(layer_item)}"
+            )
+            return []
+
+        logger.info(f"op_buffer: Starting buffer operation with {len(gdf)} features")
         logger.info(
             f"op_buffer: Parameters - radius={radius}, unit={radius_unit}, dissolve={dissolve}, "
             f"auto_optimize_crs={auto_optimize_crs}, override_crs={override_crs}"
         )
 
-        gdf = gpd.GeoDataFrame.from_features(current_features)
-        gdf.set_crs("EPSG:4326", inplace=True)
         logger.info(
             f"op_buffer: Created GeoDataFrame with {len(gdf)} rows, bounds: {gdf.total_bounds}"
         )
@@ -152,15 +141,13 @@ def op_buffer(
         logger.info(
             f"op_buffer: Applying buffer with radius {actual_radius_meters} meters in CRS {gdf_reprojected.crs}"
         )
-        gdf_reprojected["geometry"] = gdf_reprojected.geometry.buffer(actual_radius_meters)
+        gdf_reprojected = gdf_reprojected.set_geometry(
+            gdf_reprojected.geometry.buffer(actual_radius_meters)
+        )
         logger.info(f"op_buffer: Buffer applied successfully, {len(gdf_reprojected)} geometries")
 
-        # Reproject back to EPSG:4326
-        logger.info("op_buffer: Reprojecting result back to EPSG:4326")
-        gdf_buffered_individual = gdf_reprojected.to_crs("EPSG:4326")
-        logger.info(
-            f"op_buffer: Reprojection complete, bounds: {gdf_buffered_individual.total_bounds}"
-        )
+        # Keep the working CRS; output is converted to EPSG:4326 once
+        gdf_buffered_individual = gdf_reprojected
 
         # If dissolve is True, merge all buffered geometries into one
         if dissolve:
@@ -171,7 +158,7 @@ def op_buffer(
             props = {}
             if len(gdf.columns) > 1:
                 for col in gdf.columns:
-                    if col != "geometry":
+                    if col != gdf.geometry.name:
                         props[col] = gdf[col].iloc[0]
             gdf_buffered_individual = gpd.GeoDataFrame(
                 [props], geometry=[dissolved_geom], crs=gdf_buffered_individual.crs
@@ -181,20 +168,14 @@ def op_buffer(
             logger.warning("op_buffer: Result is empty after buffering")
             return []  # Resulting GeoDataFrame is empty
 
-        logger.info("op_buffer: Converting result to GeoJSON")
-        fc = json.loads(gdf_buffered_individual.to_json())
-        logger.info(f"op_buffer: GeoJSON created with {len(fc.get('features', []))} features")
-
+        metadata = {}
         # Inject projection metadata if requested
-        if projection_metadata and fc:
+        if projection_metadata:
             logger.info(f"op_buffer: Injecting CRS metadata: {crs_info}")
-            # fc is a FeatureCollection dict
-            if "properties" not in fc:
-                fc["properties"] = {}
-            fc["properties"]["_crs_metadata"] = crs_info
+            metadata["_crs_metadata"] = crs_info
 
         logger.info("op_buffer: Buffer operation completed successfully")
-        return [fc]  # Return a list containing the single FeatureCollection
+        return [GeoLayer(gdf_buffered_individual, metadata)]  # Single result layer
     except Exception as e:
         logger.exception(f"Error in op_buffer: {e}")
         return []
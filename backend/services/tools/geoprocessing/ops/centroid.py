@@ -1,46 +1,40 @@
-import json
 import logging
-from typing import Any, Dict, List
+from typing import List
 
-import geopandas as gpd
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layer_to_gdf
 
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_centroid(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     projection_metadata: bool = False,
     **kwargs,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
-    Compute the centroid of each feature in the first FeatureCollection and
-    return a new FeatureCollection of Point features.
+    Compute the centroid of each feature in the first layer and
+    return a new layer of Point features.
     """
     if not layers:
         return []
-    layer = layers[0]
-    feats = layer.get("features", [])
-    if not feats:
-        return []
 
     try:
-        gdf = gpd.GeoDataFrame.from_features(feats)
-        gdf.set_crs("EPSG:4326", inplace=True)
-        centroids = gdf
-        centroids["geometry"] = gdf.geometry.centroid
-        fc = json.loads(centroids.to_json())
+        gdf = layer_to_gdf(layers[0])
+        if gdf.empty:
+            return []
+        centroids = gdf.set_geometry(gdf.geometry.centroid)
 
-        if projection_metadata and isinstance(fc, dict):
-            if "properties" not in fc:
-                fc["properties"] = {}
-            fc["properties"]["_crs_metadata"] = {
+        metadata = {}
+        if projection_metadata:
+            metadata["_crs_metadata"] = {
                 "epsg_code": "EPSG:4326",
                 "crs_name": "WGS 84 Geographic",
                 "selection_reason": "Centroid operation is projection-insensitive",
                 "auto_selected": True,
             }
 
-        return [fc]
+        return [GeoLayer(centroids, metadata)]
     except Exception as e:
         logger.exception(f"Error in op_centroid: {e}")
         return []
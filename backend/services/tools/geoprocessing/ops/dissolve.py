@@ -2,31 +2,31 @@
 Dissolve operation: merge/dissolve geometries into a single unified geometry.
 """
 
-import json
 import logging
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
 import geopandas as gpd
 from shapely.ops import unary_union
 
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layers_to_gdf
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
     prepare_gdf_for_operation,
 )
-from services.tools.geoprocessing.utils import flatten_features
 
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_dissolve(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     by: Optional[str] = None,
     aggfunc: str = "first",
     crs: str = "EPSG:3857",
     auto_optimize_crs: bool = False,
     projection_metadata: bool = False,
     override_crs: str | None = None,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
     Dissolve geometries into a unified geometry, optionally grouped by an attribute.
 
@@ -34,30 +34,25 @@ def op_dissolve(
     geometry (or multiple geometries if grouping by an attribute).
 
     Args:
-        layers: List of GeoJSON Feature or FeatureCollection dicts
+        layers: List of GeoJSON Feature/FeatureCollection dicts or GeoLayers
         by: Optional attribute name to group by before dissolving
         aggfunc: Aggregation function for non-geometry columns ('first', 'last',
                 'sum', 'mean', 'min', 'max')
         crs: Working CRS for the operation (default EPSG:3857)
 
     Returns:
-        A list containing a single FeatureCollection with dissolved geometries
+        A list containing a single layer with dissolved geometries
     """
     if not layers:
         logger.warning("op_dissolve called with no layers")
         return []
 
-    # Flatten all features from all layers
-    all_features = flatten_features(layers)
-    if not all_features:
-        logger.warning("No features found in layers")
-        return []
-
     try:
-        # Create GeoDataFrame from all features
-        gdf = gpd.GeoDataFrame.from_features(all_features)
-        if gdf.crs is None:
-            gdf.set_crs("EPSG:4326", inplace=True)
+        # Combine features from all layers
+        gdf = layers_to_gdf(layers)
+        if gdf.empty:
+            logger.warning("No features found in layers")
+            return []
 
         # Prepare GeoDataFrame with smart CRS selection
         gdf, crs_info = prepare_gdf_for_operation(
@@ -87,7 +82,7 @@ def op_dissolve(
             if not gdf.empty and len(gdf.columns) > 1:
                 # Get first row properties (excluding geometry)
                 for col in gdf.columns:
-                    if col != "geometry":
+                    if col != gdf.geometry.name:
                         if aggfunc == "first":
                             props[col] = gdf[col].iloc[0]
                         elif aggfunc == "last":
@@ -103,18 +98,11 @@ def op_dissolve(
 
             dissolved = gpd.GeoDataFrame([props], geometry=[dissolved_geom], crs=gdf.crs)
 
-        # Reproject back to EPSG:4326
-        dissolved = dissolved.to_crs("EPSG:4326")
-
-        # Convert to GeoJSON
-        fc = json.loads(dissolved.to_json())
-
-        if projection_metadata and isinstance(fc, dict):
-            if "properties" not in fc:
-                fc["properties"] = {}
-            fc["properties"]["_crs_metadata"] = crs_info
+        metadata = {}
+        if projection_metadata:
+            metadata["_crs_metadata"] = crs_info
 
-        return [fc]
+        return [GeoLayer(dissolved, metadata)]
 
     except Exception as exc:
         logger.exception(f"Error in op_dissolve: {exc}")
@@ -1,48 +1,44 @@
-import json
 import logging
-from typing import Any, Dict, List, Optional
+from typing import List, Optional
 
-import geopandas as gpd
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layer_to_gdf
 
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_merge(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     on: Optional[List[str]] = None,
     how: str = "inner",
     projection_metadata: bool = False,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
     Perform an attribute-based merge (join) between two layers.
-    - layers: expects exactly two FeatureCollections.
+    - layers: expects exactly two layers.
     - on: list of column names to join on; if None, GeoPandas uses common columns.
     - how: one of 'inner', 'left', 'right', 'outer'.
     """
     if len(layers) < 2:
         return layers
     try:
-        gdf1 = gpd.GeoDataFrame.from_features(layers[0].get("features", []))
-        gdf2 = gpd.GeoDataFrame.from_features(layers[1].get("features", []))
-        gdf1.set_crs("EPSG:4326", inplace=True)
-        gdf2.set_crs("EPSG:4326", inplace=True)
+        gdf1 = layer_to_gdf(layers[0])
+        gdf2 = layer_to_gdf(layers[1])
 
-        merged = gdf1.merge(gdf2.drop(columns="geometry"), on=on, how=how)
+        merged = gdf1.merge(gdf2.drop(columns=gdf2.geometry.name), on=on, how=how)
         # Retain geometry from gdf1
-        merged.set_geometry(gdf1.geometry.name, inplace=True)
-        fc = json.loads(merged.to_json())
+        merged = merged.set_geometry(gdf1.geometry.name)
 
-        if projection_metadata and isinstance(fc, dict):
-            if "properties" not in fc:
-                fc["properties"] = {}
-            fc["properties"]["_crs_metadata"] = {
+        metadata = {}
+        if projection_metadata:
+            metadata["_crs_metadata"] = {
                 "epsg_code": "EPSG:4326",
                 "crs_name": "WGS 84 Geographic",
                 "selection_reason": "Merge operation is projection-insensitive (attribute join)",
                 "auto_selected": True,
             }
 
-        return [fc]
+        return [GeoLayer(merged, metadata)]
     except Exception as e:
         logger.exception(f"Error in op_merge: {e}")
         return []
@@ -1,26 +1,27 @@
-import json
 import logging
 from typing import Any, Dict, List
 
 import geopandas as gpd
 
+from services.tools.geoprocessing import parallel
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layer_to_gdf
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
     prepare_gdf_for_operation,
 )
-from services.tools.geoprocessing.utils import flatten_features
 
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_overlay(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     how: str = "intersection",
     crs: str = "EPSG:3857",
     auto_optimize_crs: bool = False,
     projection_metadata: bool = False,
     override_crs: str | None = None,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
     Perform a set-based overlay across N layers. Supports 'intersection', 'union',
     'difference', 'symmetric_difference', and 'identity'. For N > 2, applies the operation iteratively:
@@ -29,10 +30,9 @@ def op_overlay(
       crs : str, default "EPSG:3857"
         Working Coordinate Reference System used *internally* for the overlay.
         Provide a projected CRS (e.g. equal-area or Web Mercator) for more
-        accurate operations. **The output will always be reprojected to
-        EPSG:4326.**
+        accurate operations. **GeoJSON output is always in EPSG:4326.**
       ...
-    Returns a single FeatureCollection (in a list) of the final result.
+    Returns a single layer (in a list) of the final result.
     """
     if len(layers) < 2:
         # Not enough layers to overlay; return original layers unchanged
@@ -40,12 +40,9 @@ def op_overlay(
 
     first_layer_crs_info = None
 
-    def _layer_to_gdf(layer: Dict[str, Any]) -> gpd.GeoDataFrame:
+    def _layer_to_gdf(layer: LayerLike) -> gpd.GeoDataFrame:
         nonlocal first_layer_crs_info
-        feats = flatten_features([layer])
-        gdf = gpd.GeoDataFrame.from_features(feats)
-        if gdf.crs is None:
-            gdf.set_crs("EPSG:4326", inplace=True)
+        gdf = layer_to_gdf(layer)
         # Use smart CRS selection for each layer
         gdf_prepared, crs_info = prepare_gdf_for_operation(
             gdf,
@@ -66,7 +63,7 @@ def op_overlay(
     for layer in layers[1:]:
         try:
             next_gdf = _layer_to_gdf(layer)
-            result_gdf = gpd.overlay(result_gdf, next_gdf, how=how)
+            result_gdf = parallel.overlay(result_gdf, next_gdf, how=how)
 
             # Exit early if the intermediate result is empty
             if result_gdf.empty:
@@ -76,18 +73,8 @@ def op_overlay(
             logger.exception("Error during overlay with layer: %s", exc)
             return []
 
-    try:
-        if not result_gdf.empty:
-            result_gdf = result_gdf.to_crs("EPSG:4326")
-    except Exception as exc:
-        logger.exception("Error reprojecting result to EPSG:4326: %s", exc)
-        return [{"type": "FeatureCollection", "features": []}]
-
-    fc = json.loads(result_gdf.to_json())
-
-    if projection_metadata and isinstance(fc, dict) and first_layer_crs_info:
-        if "properties" not in fc:
-            fc["properties"] = {}
-        fc["properties"]["_crs_metadata"] = first_layer_crs_info
+    metadata: Dict[str, Any] = {}
+    if projection_metadata and first_layer_crs_info:
+        metadata["_crs_metadata"] = first_layer_crs_info
 
-    return [fc]
+    return [GeoLayer(result_gdf, metadata)]
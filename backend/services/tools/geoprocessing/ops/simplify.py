@@ -1,31 +1,30 @@
-import json
 import logging
-from typing import Any, Dict, List
-
-import geopandas as gpd
+from typing import List
 
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layers_to_gdf
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
     prepare_gdf_for_operation,
+    transform_gdf,
 )
-from services.tools.geoprocessing.utils import flatten_features
 
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_simplify(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     tolerance: float = 0.01,
     preserve_topology: bool = True,
     auto_optimize_crs: bool = False,
     projection_metadata: bool = False,
     override_crs: str | None = None,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
     Simplify each feature in the first FeatureCollection with the given tolerance.
 
     Args:
-        layers: Input GeoJSON layers
+        layers: Input layers (GeoJSON dicts or GeoLayers)
         tolerance: Distance parameter for simplification (in CRS units)
         preserve_topology: Whether to preserve topology during simplification
         auto_optimize_crs: If True, automatically select optimal CRS
@@ -33,15 +32,12 @@ def op_simplify(
         override_crs: Manual CRS override
 
     Returns:
-        List containing simplified FeatureCollection
+        List containing the simplified layer
     """
-    feats = flatten_features(layers)
-    if not feats:
-        return []
     try:
-        gdf = gpd.GeoDataFrame.from_features(feats)
-        if gdf.crs is None:
-            gdf.set_crs("EPSG:4326", inplace=True)
+        gdf = layers_to_gdf(layers)
+        if gdf.empty:
+            return []
 
         # Smart CRS selection for simplification (conformal projections preserve shapes)
         if auto_optimize_crs:
@@ -52,31 +48,25 @@ def op_simplify(
                 override_crs=override_crs,
             )
         else:
-            gdf_prepared = gdf
+            # Tolerance is in degrees without optimization
+            gdf_prepared = transform_gdf(gdf, "EPSG:4326")
             crs_info = {
-                "epsg_code": str(gdf.crs) if gdf.crs else "EPSG:4326",
+                "epsg_code": "EPSG:4326",
                 "selection_reason": "No optimization",
                 "auto_selected": False,
             }
 
         # Perform simplification
-        gdf_prepared["geometry"] = gdf_prepared.geometry.simplify(
-            tolerance, preserve_topology=preserve_topology
+        gdf_prepared = gdf_prepared.set_geometry(
+            gdf_prepared.geometry.simplify(tolerance, preserve_topology=preserve_topology)
         )
 
-        # Reproject back to EPSG:4326 if needed
-        if auto_optimize_crs and str(gdf_prepared.crs) != "EPSG:4326":
-            gdf_prepared = gdf_prepared.to_crs("EPSG:4326")
-
-        fc = json.loads(gdf_prepared.to_json())
-
         # Inject metadata if requested
-        if projection_metadata and isinstance(fc, dict):
-            if "properties" not in fc:
-                fc["properties"] = {}
-            fc["properties"]["_crs_metadata"] = crs_info
+        metadata = {}
+        if projection_metadata:
+            metadata["_crs_metadata"] = crs_info
 
-        return [fc]
+        return [GeoLayer(gdf_prepared, metadata)]
     except Exception as e:
         logger.exception(f"Error in op_simplify: {e}")
         return []
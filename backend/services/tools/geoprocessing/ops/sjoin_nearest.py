@@ -1,29 +1,30 @@
-import json
 import logging
 from typing import Any, Dict, List, Optional
 
-import geopandas as gpd
-
+from services.tools.geoprocessing import parallel
+from services.tools.geoprocessing.layer import GeoLayer, LayerLike, geolayer_op, layer_to_gdf
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
-    prepare_gdf_for_operation,
+    prepare_gdfs_for_operation,
+    transform_gdf,
 )
 
 logger = logging.getLogger(__name__)
 
 
+@geolayer_op
 def op_sjoin_nearest(
-    layers: List[Dict[str, Any]],
+    layers: List[LayerLike],
     how: str = "inner",
     max_distance: Optional[float] = None,
     distance_col: Optional[str] = None,
     auto_optimize_crs: bool = False,
     projection_metadata: bool = False,
     override_crs: str | None = None,
-) -> List[Dict[str, Any]]:
+) -> List[LayerLike]:
     """
     Perform a nearest-neighbor spatial join between two layers.
-    - layers: expects exactly two FeatureCollections (left, right).
+    - layers: expects exactly two layers (left, right).
     - how: 'left', 'right', or 'inner'.
     - max_distance: maximum search radius (in layer CRS units).
     - distance_col: name of the output column to store distance.
@@ -31,27 +32,19 @@ def op_sjoin_nearest(
     if len(layers) < 2:
         return layers
     try:
-        left_gdf = gpd.GeoDataFrame.from_features(layers[0].get("features", []))
-        right_gdf = gpd.GeoDataFrame.from_features(layers[1].get("features", []))
-        left_gdf.set_crs("EPSG:4326", inplace=True)
-        right_gdf.set_crs("EPSG:4326", inplace=True)
+        left_gdf = layer_to_gdf(layers[0])
+        right_gdf = layer_to_gdf(layers[1])
 
         if auto_optimize_crs:
-            # Prepare left (auto-select) and force right to same CRS
-            left_prepared, left_info = prepare_gdf_for_operation(
-                left_gdf,
+            # Auto-select for the left layer and put the right one in the same CRS
+            (left_prepared, right_prepared), (left_info, right_info) = prepare_gdfs_for_operation(
+                [left_gdf, right_gdf],
                 OperationType.SJOIN_NEAREST,
                 auto_optimize_crs=auto_optimize_crs,
                 override_crs=override_crs,
             )
-            right_prepared, right_info = prepare_gdf_for_operation(
-                right_gdf,
-                OperationType.SJOIN_NEAREST,
-                auto_optimize_crs=False,
-                override_crs=left_info.get("epsg_code"),
-            )
 
-            joined = gpd.sjoin_nearest(
+            joined = parallel.sjoin_nearest(
                 left_prepared,
                 right_prepared,
                 how=how,
@@ -59,18 +52,20 @@ def op_sjoin_nearest(
                 distance_col=distance_col,
             )
 
-            fc = json.loads(joined.to_json())
-            if projection_metadata and isinstance(fc, dict):
-                if "properties" not in fc:
-                    fc["properties"] = {}
-                fc["properties"]["_crs_metadata"] = {"left": left_info, "right": right_info}
-            return [fc]
+            metadata: Dict[str, Any] = {}
+            if projection_metadata:
+                metadata["_crs_metadata"] = {"left": left_info, "right": right_info}
+            return [GeoLayer(joined, metadata)]
         else:
             # Preserve legacy behavior (operate in EPSG:4326)
-            joined = gpd.sjoin_nearest(
-                left_gdf, right_gdf, how=how, max_distance=max_distance, distance_col=distance_col
+            joined = parallel.sjoin_nearest(
+                transform_gdf(left_gdf, "EPSG:4326"),
+                transform_gdf(right_gdf, "EPSG:4326"),
+                how=how,
+                max_distance=max_distance,
+                distance_col=distance_col,
             )
-            return [json.loads(joined.to_json())]
+            return [GeoLayer(joined)]
     except Exception as e:
         logger.exception(f"Error in op_sjoin_nearest: {e}")
         return []
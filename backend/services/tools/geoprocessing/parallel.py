@@ -0,0 +1,342 @@
+"""
+Partitioned execution of spatial joins, overlays and clips on a process pool.
+
+geopandas joins and overlays hold the GIL for most of their runtime, so a
+point-in-polygon join of a million features used one core however many the
+host had. For left layers of at least ``GEOPROCESSING_PARALLEL_MIN_FEATURES``
+features, the functions here:
+
+1. sort the left layer along a Hilbert curve and cut it into spatially
+   coherent chunks (``GEOPROCESSING_WORKERS`` x ``CHUNKS_PER_WORKER``),
+2. send each chunk, with only the right-hand features whose envelopes can
+   interact with it, to a worker process as WKB plus an attribute frame,
+3. merge the per-chunk results ordered by the positions of the input
+   features, so the output doesn't depend on which worker finished first.
+
+Only partition-safe variants are parallelized: inner and left joins,
+intersection and difference overlays of a single geometry family, and clips.
+Everything else, small inputs, and any failure of the pool run the plain
+geopandas call in the calling thread.
+"""
+
+import logging
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import box
+
+from core.config import GEOPROCESSING_PARALLEL_MIN_FEATURES, GEOPROCESSING_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Chunks per worker: enough to balance uneven chunks without paying the
+# per-task overhead for tiny ones
+CHUNKS_PER_WORKER = 4
+
+# Temporary columns carrying input positions through overlays
+_LEFT_POS = "__nalamap_left_pos"
+_RIGHT_POS = "__nalamap_right_pos"
+
+# Predicates that only hold for features with intersecting envelopes, which
+# are all sent to the chunk along with the left features
+_ENVELOPE_PREDICATES = {
+    "intersects",
+    "contains",
+    "contains_properly",
+    "within",
+    "covers",
+    "covered_by",
+    "overlaps",
+    "crosses",
+    "touches",
+}
+
+# gpd.overlay rejects layers mixing geometry families; such layers (and
+# collections) are left to the in-process call and its error message
+_GEOMETRY_FAMILIES = {
+    "Point": "point",
+    "MultiPoint": "point",
+    "LineString": "line",
+    "MultiLineString": "line",
+    "LinearRing": "line",
+    "Polygon": "polygon",
+    "MultiPolygon": "polygon",
+}
+
+# (attributes, geometry column name, WKB array, CRS as WKT, column order)
+Payload = Tuple[pd.DataFrame, str, np.ndarray, Optional[str], List[str]]
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Return the shared geoprocessing pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Workers must not inherit the server's threads and locks
+                _pool = ProcessPoolExecutor(
+                    max_workers=GEOPROCESSING_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def shutdown_process_pool() -> None:
+    """Stop the worker processes (on application shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _to_payload(gdf: gpd.GeoDataFrame) -> Payload:
+    geom_name = gdf.geometry.name
+    attributes = pd.DataFrame(gdf.drop(columns=geom_name))
+    wkb = shapely.to_wkb(np.asarray(gdf.geometry.values))
+    crs = gdf.crs.to_wkt() if gdf.crs is not None else None
+    return attributes, geom_name, wkb, crs, list(gdf.columns)
+
+
+def _from_payload(payload: Payload) -> gpd.GeoDataFrame:
+    attributes, geom_name, wkb, crs, columns = payload
+    geometry = gpd.GeoSeries(shapely.from_wkb(wkb), index=attributes.index, crs=crs)
+    gdf = gpd.GeoDataFrame(attributes, geometry=geometry, crs=crs)
+    if geom_name != "geometry":
+        gdf = gdf.rename_geometry(geom_name)
+    return gdf[columns]
+
+
+def _run_chunk(op: str, left: Payload, right: Any, kwargs: Dict[str, Any]) -> Payload:
+    """Worker entry point: run ``op`` on one chunk and return the result.
+
+    ``right`` is a payload, or the mask geometry as WKB for clips.
+    """
+    left_gdf = _from_payload(left)
+    if op == "clip":
+        return _to_payload(left_gdf.clip(shapely.from_wkb(right), **kwargs))
+    right_gdf = _from_payload(right)
+    if op == "sjoin":
+        result = gpd.sjoin(left_gdf, right_gdf, **kwargs)
+    elif op == "sjoin_nearest":
+        result = gpd.sjoin_nearest(left_gdf, right_gdf, **kwargs)
+    else:
+        result = gpd.overlay(left_gdf, right_gdf, **kwargs)
+    return _to_payload(result)
+
+
+def _should_partition(left: gpd.GeoDataFrame) -> bool:
+    return GEOPROCESSING_WORKERS > 1 and len(left) >= GEOPROCESSING_PARALLEL_MIN_FEATURES
+
+
+def _hilbert_chunks(gdf: gpd.GeoDataFrame) -> List[np.ndarray]:
+    """Positions of ``gdf`` cut into chunks of neighbouring features."""
+    bounds = gdf.geometry.bounds
+    midpoints = gpd.GeoSeries(
+        gpd.points_from_xy(
+            ((bounds["minx"] + bounds["maxx"]) / 2).fillna(0),
+            ((bounds["miny"] + bounds["maxy"]) / 2).fillna(0),
+        )
+    )
+    order = np.argsort(midpoints.hilbert_distance().to_numpy(), kind="stable")
+    n_chunks = min(GEOPROCESSING_WORKERS * CHUNKS_PER_WORKER, len(gdf))
+    return [chunk for chunk in np.array_split(order, n_chunks) if len(chunk)]
+
+
+def _candidates(
+    right: gpd.GeoDataFrame, chunk: gpd.GeoDataFrame, margin: float = 0.0
+) -> gpd.GeoDataFrame:
+    """Right-hand features whose envelope is within ``margin`` of the chunk's."""
+    minx, miny, maxx, maxy = chunk.total_bounds
+    if not np.isfinite([minx, miny, maxx, maxy]).all():
+        return right.iloc[:0]
+    window = box(minx - margin, miny - margin, maxx + margin, maxy + margin)
+    return right.iloc[np.sort(right.sindex.query(window))]
+
+
+def _map_chunks(
+    op: str,
+    left: gpd.GeoDataFrame,
+    right_for: Callable[[gpd.GeoDataFrame], Any],
+    kwargs: Dict[str, Any],
+) -> List[gpd.GeoDataFrame]:
+    """Run ``op`` for every Hilbert chunk of ``left`` and return the results in chunk order."""
+    pool = _get_process_pool()
+    futures = []
+    for positions in _hilbert_chunks(left):
+        chunk = left.iloc[positions]
+        futures.append(pool.submit(_run_chunk, op, _to_payload(chunk), right_for(chunk), kwargs))
+    return [_from_payload(future.result()) for future in futures]
+
+
+def _concat(frames: List[gpd.GeoDataFrame]) -> gpd.GeoDataFrame:
+    non_empty = [frame for frame in frames if not frame.empty] or frames[:1]
+    if len(non_empty) == 1:
+        return non_empty[0]
+    return gpd.GeoDataFrame(pd.concat(non_empty), crs=non_empty[0].crs)
+
+
+def _partitioned(
+    op: str,
+    serial: Callable[[], gpd.GeoDataFrame],
+    parallel: Callable[[], gpd.GeoDataFrame],
+) -> gpd.GeoDataFrame:
+    try:
+        return parallel()
+    except Exception as e:
+        # A crashed or unavailable pool must not fail the operation
+        logger.warning(f"Partitioned {op} failed, running it in-process: {e}")
+        return serial()
+
+
+def _join(
+    op: str,
+    left: gpd.GeoDataFrame,
+    right: gpd.GeoDataFrame,
+    margin: float,
+    kwargs: Dict[str, Any],
+) -> gpd.GeoDataFrame:
+    """Partitioned sjoin/sjoin_nearest, ordered by left then right position."""
+    left_positions = left.reset_index(drop=True)
+    right_positions = right.reset_index(drop=True)
+    everything = _to_payload(right_positions) if margin == math.inf else None
+
+    def right_for(chunk: gpd.GeoDataFrame) -> Payload:
+        if everything is not None:
+            return everything
+        return _to_payload(_candidates(right_positions, chunk, margin))
+
+    result = _concat(_map_chunks(op, left_positions, right_for, kwargs))
+    right_pos = result["index_right"].to_numpy(dtype=float, na_value=np.nan)
+    order = np.lexsort((right_pos, result.index.to_numpy()))
+    result = result.iloc[order]
+    result.index = left.index[result.index.to_numpy()]
+    # Back from positions to the labels of the right index (NaN where unmatched)
+    matched = result["index_right"].notna().to_numpy()
+    labels = np.full(len(result), np.nan, dtype=object)
+    labels[matched] = right.index.to_numpy()[right_pos[order][matched].astype(int)]
+    result["index_right"] = pd.Series(labels, index=result.index).infer_objects()
+    return result
+
+
+def _joinable(left: gpd.GeoDataFrame, right: gpd.GeoDataFrame, how: str) -> bool:
+    # Right joins keep every right feature once, which no single chunk can decide;
+    # named right indexes change the output column names
+    return (
+        how in ("inner", "left")
+        and right.index.name is None
+        and "index_right" not in left.columns
+        and _should_partition(left)
+    )
+
+
+def sjoin(
+    left: gpd.GeoDataFrame,
+    right: gpd.GeoDataFrame,
+    how: str = "inner",
+    predicate: str = "intersects",
+) -> gpd.GeoDataFrame:
+    """``gpd.sjoin``, partitioned over the process pool for large left layers."""
+
+    def serial() -> gpd.GeoDataFrame:
+        return gpd.sjoin(left, right, how=how, predicate=predicate)
+
+    if not _joinable(left, right, how) or predicate not in _ENVELOPE_PREDICATES:
+        return serial()
+    kwargs = {"how": how, "predicate": predicate}
+    return _partitioned("sjoin", serial, lambda: _join("sjoin", left, right, 0.0, kwargs))
+
+
+def sjoin_nearest(
+    left: gpd.GeoDataFrame,
+    right: gpd.GeoDataFrame,
+    how: str = "inner",
+    max_distance: Optional[float] = None,
+    distance_col: Optional[str] = None,
+) -> gpd.GeoDataFrame:
+    """``gpd.sjoin_nearest``, partitioned over the process pool for large left layers.
+
+    Without ``max_distance`` every chunk is joined against the whole right layer.
+    """
+
+    def serial() -> gpd.GeoDataFrame:
+        return gpd.sjoin_nearest(
+            left, right, how=how, max_distance=max_distance, distance_col=distance_col
+        )
+
+    if not _joinable(left, right, how):
+        return serial()
+    kwargs = {"how": how, "max_distance": max_distance, "distance_col": distance_col}
+    margin = math.inf if max_distance is None else float(max_distance)
+    return _partitioned(
+        "sjoin_nearest", serial, lambda: _join("sjoin_nearest", left, right, margin, kwargs)
+    )
+
+
+def _single_family(gdf: gpd.GeoDataFrame) -> bool:
+    families = {_GEOMETRY_FAMILIES.get(t) for t in gdf.geom_type.dropna().unique()}
+    return len(families) == 1 and None not in families
+
+
+def overlay(df1: gpd.GeoDataFrame, df2: gpd.GeoDataFrame, how: str) -> gpd.GeoDataFrame:
+    """``gpd.overlay``, partitioned over the process pool for large first layers.
+
+    Only intersection and difference are partitioned: the other variants also
+    keep parts of ``df2`` that depend on all of ``df1``.
+    """
+
+    def serial() -> gpd.GeoDataFrame:
+        return gpd.overlay(df1, df2, how=how)
+
+    if (
+        how not in ("intersection", "difference")
+        or not _should_partition(df1)
+        or not _single_family(df1)
+        or _LEFT_POS in df1.columns
+        or _RIGHT_POS in df2.columns
+    ):
+        return serial()
+
+    def parallel() -> gpd.GeoDataFrame:
+        left = df1.assign(**{_LEFT_POS: np.arange(len(df1))})
+        right = df2.assign(**{_RIGHT_POS: np.arange(len(df2))})
+
+        def right_for(chunk: gpd.GeoDataFrame) -> Payload:
+            return _to_payload(_candidates(right, chunk))
+
+        result = _concat(_map_chunks("overlay", left, right_for, {"how": how}))
+        keys = [c for c in (_LEFT_POS, _RIGHT_POS) if c in result.columns]
+        result = result.sort_values(keys, kind="stable").drop(columns=keys)
+        return result.reset_index(drop=True)
+
+    return _partitioned("overlay", serial, parallel)
+
+
+def clip(gdf: gpd.GeoDataFrame, mask) -> gpd.GeoDataFrame:
+    """``GeoDataFrame.clip`` by a single geometry, partitioned for large layers."""
+
+    def serial() -> gpd.GeoDataFrame:
+        return gdf.clip(mask)
+
+    if not _should_partition(gdf):
+        return serial()
+
+    def parallel() -> gpd.GeoDataFrame:
+        positions = gdf.reset_index(drop=True)
+        mask_wkb = shapely.to_wkb(mask)
+        result = _concat(_map_chunks("clip", positions, lambda chunk: mask_wkb, {}))
+        result = result.sort_index(kind="stable")
+        result.index = gdf.index[result.index.to_numpy()]
+        return result
+
+    return _partitioned("clip", serial, parallel)
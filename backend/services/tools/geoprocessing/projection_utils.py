@@ -19,6 +19,14 @@ Key functions:
 - prepare_gdf_for_operation(gdf, operation_type, ...) - Apply optimal projection
 - validate_crs(epsg_code) - Verify CRS validity
 - compute_bbox_metrics(bbox) - Helper for extent analysis
+- prepare_gdfs_for_operation(gdfs, operation_type, ...) - One CRS for several layers
+- transform_gdf(gdf, crs) - Reprojection through cached transformers
+
+A plan typically runs several operations on the same layers, so CRS
+decisions are memoized per bbox (rounded to ``BBOX_BUCKET_DIGITS`` decimals,
+i.e. ~0.1 m) and operation, parsed CRS objects (including the custom WKT
+projections) are cached by their definition, and ``pyproj.Transformer``
+objects are cached per (source, target) pair.
 
 Accuracy expectations:
 - Local operations (<6° extent): <0.1% error
@@ -28,13 +36,16 @@ Accuracy expectations:
 
 """
 
+import copy
 import logging
 import math
 from enum import Enum
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
-from pyproj import CRS
+import shapely
+from pyproj import CRS, Transformer
 
 from services.tools.geoprocessing.wkt_factory import (
     build_albers_wkt,
@@ -118,6 +129,13 @@ REGIONAL_BOUNDARIES = {
 }
 
 
+# Decisions are memoized per bbox rounded to this many decimal degrees
+BBOX_BUCKET_DIGITS = 6
+DECISION_CACHE_SIZE = 1024
+CRS_CACHE_SIZE = 256
+TRANSFORMER_CACHE_SIZE = 256
+
+
 # ========== Helper Functions for Bbox Analysis ==========
 
 
@@ -470,8 +488,21 @@ def get_optimal_crs_for_bbox(
             "decision_inputs": {},
         }
 
-    # Use the enhanced decision algorithm
-    return decide_projection(bbox, operation_type, projection_priority, fallback_crs)
+    # Use the enhanced decision algorithm, memoized per bbox bucket
+    bucket = tuple(round(float(v), BBOX_BUCKET_DIGITS) for v in bbox)
+    decision = _decide_projection_cached(bucket, operation_type, projection_priority, fallback_crs)
+    # Callers annotate the result; never hand out the cached dict
+    return copy.deepcopy(decision)
+
+
+@lru_cache(maxsize=DECISION_CACHE_SIZE)
+def _decide_projection_cached(
+    bucket: Tuple[float, float, float, float],
+    operation_type: OperationType,
+    projection_priority: Optional[ProjectionProperty],
+    fallback_crs: str,
+) -> Dict[str, Any]:
+    return decide_projection(bucket, operation_type, projection_priority, fallback_crs)
 
 
 def _get_required_property(operation_type: OperationType) -> ProjectionProperty:
@@ -593,14 +624,62 @@ def _create_fallback_response(
     return response
 
 
-def validate_crs(epsg_code: str) -> bool:
-    """Validate that CRS exists and is usable."""
+@lru_cache(maxsize=CRS_CACHE_SIZE)
+def parse_crs(definition: str) -> Optional[CRS]:
+    """Parse a CRS from an authority code or WKT, once per definition.
+
+    Returns:
+        The CRS, or None if it is invalid
+    """
     try:
-        crs = CRS.from_string(epsg_code)
-        return crs is not None
+        return CRS.from_user_input(definition)
     except Exception as e:
-        logger.warning(f"Invalid CRS {epsg_code}: {e}")
-        return False
+        logger.warning(f"Invalid CRS {definition[:80]}: {e}")
+        return None
+
+
+@lru_cache(maxsize=TRANSFORMER_CACHE_SIZE)
+def _transformer(source: str, target: str) -> Transformer:
+    return Transformer.from_crs(parse_crs(source), parse_crs(target), always_xy=True)
+
+
+def get_transformer(source: Union[str, CRS], target: Union[str, CRS]) -> Transformer:
+    """Cached always-xy ``Transformer`` between two CRSs (codes, WKT or CRS objects)."""
+    source_key = (source.srs or source.to_wkt()) if isinstance(source, CRS) else source
+    target_key = (target.srs or target.to_wkt()) if isinstance(target, CRS) else target
+    return _transformer(source_key, target_key)
+
+
+def transform_gdf(gdf, crs: Union[str, CRS]):
+    """
+    Reproject ``gdf`` to ``crs`` like ``gdf.to_crs``, reusing cached CRSs and transformers.
+
+    ``to_crs`` parses the target and builds (or hashes its way to) a
+    transformer on every call; here both are looked up by their definition.
+    """
+    target = parse_crs(crs) if isinstance(crs, str) else crs
+    if target is None:
+        raise ValueError(f"Invalid CRS: {crs}")
+    if gdf.crs is None or shapely.has_z(gdf.geometry.values).any():
+        # Let geopandas raise for missing CRSs and handle 3D coordinates
+        return gdf.to_crs(target)
+    if gdf.crs.srs == target.srs or gdf.crs.is_exact_same(target):
+        return gdf.copy()
+
+    transformer = get_transformer(gdf.crs, target)
+
+    def _apply(coords: np.ndarray) -> np.ndarray:
+        return np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+
+    geometry = shapely.transform(np.asarray(gdf.geometry.values), _apply)
+    result = gdf.copy()
+    result[gdf.geometry.name] = geometry
+    return result.set_crs(target, allow_override=True)
+
+
+def validate_crs(epsg_code: str) -> bool:
+    """Validate that CRS exists and is usable."""
+    return parse_crs(epsg_code) is not None
 
 
 def prepare_gdf_for_operation(
@@ -625,7 +704,7 @@ def prepare_gdf_for_operation(
     if override_crs:
         logger.info(f"prepare_gdf_for_operation: Using override CRS: {override_crs}")
         if validate_crs(override_crs):
-            gdf_transformed = gdf.to_crs(override_crs)
+            gdf_transformed = transform_gdf(gdf, override_crs)
             return gdf_transformed, {
                 "epsg_code": override_crs,
                 "crs_name": "User-specified CRS",
@@ -638,7 +717,7 @@ def prepare_gdf_for_operation(
     # Ensure GeoDataFrame is in WGS84 for bbox calculation
     try:
         if gdf.crs and str(gdf.crs) != "EPSG:4326":
-            gdf_wgs84 = gdf.to_crs("EPSG:4326")
+            gdf_wgs84 = transform_gdf(gdf, "EPSG:4326")
         else:
             gdf_wgs84 = gdf
     except Exception:
@@ -663,7 +742,9 @@ def prepare_gdf_for_operation(
     if "wkt" in crs_info and isinstance(crs_info.get("wkt"), str) and crs_info["wkt"]:
         logger.info("prepare_gdf_for_operation: Using WKT projection")
         try:
-            target_crs_obj = CRS.from_wkt(crs_info["wkt"])
+            target_crs_obj = parse_crs(crs_info["wkt"])
+            if target_crs_obj is None:
+                raise ValueError("invalid WKT")
         except Exception as e:
             logger.warning(f"Selected WKT CRS failed to parse: {e}; falling back to EPSG:3857")
             crs_info = _create_fallback_response("EPSG:3857", "Selected CRS invalid")
@@ -685,10 +766,10 @@ def prepare_gdf_for_operation(
     try:
         if target_crs_obj is not None:
             logger.info("prepare_gdf_for_operation: Transforming to WKT CRS object")
-            gdf_transformed = gdf.to_crs(target_crs_obj)
+            gdf_transformed = transform_gdf(gdf, target_crs_obj)
         else:
             logger.info(f"prepare_gdf_for_operation: Transforming to EPSG:{crs_info['epsg_code']}")
-            gdf_transformed = gdf.to_crs(crs_info["epsg_code"])
+            gdf_transformed = transform_gdf(gdf, crs_info["epsg_code"])
         logger.info(
             f"prepare_gdf_for_operation: Transformation successful, new CRS: {gdf_transformed.crs}"
         )
@@ -701,3 +782,39 @@ def prepare_gdf_for_operation(
     crs_info = _convert_to_python_types(crs_info)
     logger.info(f"prepare_gdf_for_operation: Complete, returning CRS info: {crs_info}")
     return gdf_transformed, crs_info
+
+
+def prepare_gdfs_for_operation(
+    gdfs: List[Any],
+    operation_type: OperationType,
+    auto_optimize_crs: bool = True,
+    override_crs: Optional[str] = None,
+    **kwargs,
+):
+    """
+    Prepare several GeoDataFrames in one CRS, selected for the first of them.
+
+    The other frames are reprojected to the first one's CRS, including custom
+    WKT projections (which have no EPSG code to pass as an override).
+
+    Returns tuple (transformed_gdfs, crs_infos), one info per frame
+    """
+    first, first_info = prepare_gdf_for_operation(
+        gdfs[0], operation_type, auto_optimize_crs, override_crs, **kwargs
+    )
+    transformed = [first]
+    infos = [first_info]
+    for gdf in gdfs[1:]:
+        info = {
+            "epsg_code": first_info.get("epsg_code"),
+            "crs_name": first_info.get("crs_name"),
+            "selection_reason": "Same CRS as the first layer",
+            "auto_selected": False,
+        }
+        try:
+            transformed.append(transform_gdf(gdf, first.crs) if first.crs is not None else gdf)
+        except Exception as e:
+            logger.warning("Failed to transform to the first layer's CRS: %s; using original", e)
+            transformed.append(gdf)
+        infos.append(info)
+    return transformed, infos
@@ -0,0 +1,200 @@
+"""Concurrent, conditional GetCapabilities requests for GeoServer backends.
+
+A backend exposes up to four OGC services (WMS, WFS, WCS, WMTS). Their
+capabilities documents are fetched in parallel through the shared HTTP client
+pool. Backends with ``allow_insecure`` use the pool's unverified client for
+that host, so TLS settings apply per request instead of patching ``ssl`` or
+reloading OWSLib process-wide. OWSLib only parses the downloaded XML.
+
+Documents are cached with their ``ETag``/``Last-Modified`` validators. The next
+fetch of the same document is a conditional GET, and a ``304 Not Modified``
+reuses the already parsed OWSLib object instead of parsing the XML again.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+from urllib.parse import urlencode, urljoin
+
+from core.config import GEOSERVER_CAPABILITIES_CACHE_SIZE, GEOSERVER_CAPABILITIES_TIMEOUT
+from models.settings_model import GeoServerBackend
+from services import http_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CapabilitiesService:
+    """An OGC service of a GeoServer backend."""
+
+    name: str
+    # Endpoint relative to the backend URL
+    path: str
+    version: str
+
+
+SERVICES: Tuple[CapabilitiesService, ...] = (
+    CapabilitiesService("WMS", "wms", "1.3.0"),
+    CapabilitiesService("WFS", "wfs", "2.0.0"),
+    CapabilitiesService("WCS", "wcs", "2.0.1"),
+    CapabilitiesService("WMTS", "gwc/service/wmts", "1.0.0"),
+)
+
+
+def service_endpoint(base_url: str, service: CapabilitiesService) -> str:
+    # urljoin drops the last path segment unless the base ends with "/"
+    if not base_url.endswith("/"):
+        base_url = base_url + "/"
+    return urljoin(base_url, service.path)
+
+
+def capabilities_url(base_url: str, service: CapabilitiesService) -> str:
+    params = {"service": service.name, "request": "GetCapabilities", "version": service.version}
+    return f"{service_endpoint(base_url, service)}?{urlencode(params)}"
+
+
+@dataclass
+class CachedCapabilities:
+    xml: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # Parsed OWSLib service object; only read after construction
+    service: Any
+
+
+class CapabilitiesCache:
+    """LRU of capabilities documents with their HTTP validators."""
+
+    def __init__(self, max_entries: int = GEOSERVER_CAPABILITIES_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], CachedCapabilities]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[CachedCapabilities]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Tuple[str, str], entry: CachedCapabilities) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache = CapabilitiesCache()
+
+
+def get_capabilities_cache() -> CapabilitiesCache:
+    return _cache
+
+
+def _parse_capabilities(service: CapabilitiesService, url: str, xml: bytes) -> Any:
+    """Build the OWSLib service object from a downloaded document (no network access)."""
+    if service.name == "WMS":
+        from owslib.wms import WebMapService
+
+        return WebMapService(url, version=service.version, xml=xml)
+    if service.name == "WFS":
+        from owslib.wfs import WebFeatureService
+
+        return WebFeatureService(url, version=service.version, xml=xml)
+    if service.name == "WCS":
+        from owslib.wcs import WebCoverageService
+
+        return WebCoverageService(url, version=service.version, xml=xml)
+    if service.name == "WMTS":
+        from owslib.wmts import WebMapTileService
+
+        return WebMapTileService(url, version=service.version, xml=xml)
+    raise ValueError(f"Unsupported service: {service.name}")
+
+
+def fetch_capabilities(
+    service: CapabilitiesService,
+    backend: GeoServerBackend,
+    cache: Optional[CapabilitiesCache] = None,
+) -> Any:
+    """Fetch and parse one service's capabilities, revalidating a cached copy.
+
+    Raises:
+        httpx.HTTPError: If the request fails or returns an error status
+    """
+    cache = _cache if cache is None else cache
+    url = capabilities_url(backend.url, service)
+    key = (url, backend.username or "")
+    cached = cache.get(key)
+
+    headers: Dict[str, str] = {}
+    if cached is not None:
+        if cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+    kwargs: Dict[str, Any] = {"headers": headers, "timeout": GEOSERVER_CAPABILITIES_TIMEOUT}
+    if backend.username:
+        kwargs["auth"] = (backend.username, backend.password or "")
+
+    response = http_client.request("GET", url, verify=not backend.allow_insecure, **kwargs)
+    if response.status_code == 304 and cached is not None:
+        logger.debug("%s capabilities not modified: %s", service.name, url)
+        return cached.service
+    response.raise_for_status()
+
+    xml = response.content
+    parsed = _parse_capabilities(service, service_endpoint(backend.url, service), xml)
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if etag or last_modified:
+        cache.put(key, CachedCapabilities(xml, etag, last_modified, parsed))
+    else:
+        cache.discard(key)
+    return parsed
+
+
+def fetch_backend_capabilities(
+    backend: GeoServerBackend,
+    services: Sequence[CapabilitiesService] = SERVICES,
+    cache: Optional[CapabilitiesCache] = None,
+) -> Dict[str, Union[Any, Exception]]:
+    """Fetch the capabilities of all services of a backend in parallel.
+
+    Returns:
+        Dict mapping service name to the parsed OWSLib object, or to the
+        exception its request raised. Keys follow the order of ``services``.
+    """
+    if not services:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=len(services), thread_name_prefix="geoserver-capabilities"
+    ) as executor:
+        futures = {
+            service.name: executor.submit(fetch_capabilities, service, backend, cache)
+            for service in services
+        }
+    results: Dict[str, Union[Any, Exception]] = {}
+    for name, future in futures.items():
+        error = future.exception()
+        results[name] = error if error is not None else future.result()
+    return results
@@ -9,17 +9,13 @@ import socket
 import ssl
 from collections import Counter
 from typing import Any, Dict, List, Optional, Tuple, Union
-from urllib.parse import urlencode, urljoin
+from urllib.parse import urlencode
 
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
 from langgraph.prebuilt import InjectedState
 from langgraph.types import Command
-
-# OWSLib imports are done lazily to allow SSL patching before import
-# DO NOT import owslib.wms, owslib.wfs, etc. at module level!
-# They must be imported AFTER patching for allow_insecure to work
 from pydantic import Field
 from pydantic.fields import FieldInfo
 from typing_extensions import Annotated
@@ -34,19 +30,16 @@ from models.settings_model import (
     ToolConfig,
 )
 from models.states import GeoDataAgentState
+from services.tools.geoserver.capabilities import SERVICES as CAPABILITIES_SERVICES
+from services.tools.geoserver.capabilities import fetch_backend_capabilities, service_endpoint
 from services.tools.geoserver.vector_store import (
-    delete_layers,
     get_embedding_status,
     has_layers,
     is_fully_encoded,
 )
 from services.tools.geoserver.vector_store import list_layers as vector_list_layers
-from services.tools.geoserver.vector_store import (
-    similarity_search as vector_similarity_search,
-)
-from services.tools.geoserver.vector_store import (
-    store_layers,
-)
+from services.tools.geoserver.vector_store import similarity_search as vector_similarity_search
+from services.tools.geoserver.vector_store import store_layers
 
 logger = logging.getLogger(__name__)
 
@@ -657,8 +650,6 @@ def fetch_all_service_capabilities_with_status(
         return [], {}, {}
 
     base_url = backend.url
-    username = backend.username
-    password = backend.password
     allow_insecure = backend.allow_insecure
 
     # Log the allow_insecure setting for debugging
@@ -666,215 +657,41 @@ def fetch_all_service_capabilities_with_status(
         f"Processing backend {base_url}: allow_insecure={allow_insecure}, "
         f"enabled={backend.enabled}"
     )
-
-    all_layers: List[GeoDataObject] = []
-    service_status: Dict[str, bool] = {}
-    service_errors: Dict[str, Dict[str, str]] = {}
-
-    # Configure SSL verification for OWSLib
-    import ssl
-
-    import urllib3
-
-    # Store original values for restoration
-    original_ssl_context = None
-    original_openURL = None
-
     if allow_insecure:
-        # Suppress only the InsecureRequestWarning when explicitly allowed
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         logger.warning(
             f"SSL verification disabled for {base_url} (allow_insecure=True). "
             "This is insecure and should only be used in development."
         )
 
-        # Method 1: Patch SSL context globally - affects all SSL connections
-        try:
-            original_ssl_context = ssl._create_default_https_context
-            ssl._create_default_https_context = ssl._create_unverified_context
-            logger.info(f"Patched SSL context for {base_url}")
-        except AttributeError as e:
-            logger.warning(f"Could not patch SSL context: {e}")
-
-        # Method 2: Patch OWSLib's openURL function to force verify=False
-        # This must be done BEFORE importing OWSLib service classes
-        try:
-            # First, reload owslib.util to get a fresh module state
-            import importlib
-
-            import owslib.util
-
-            importlib.reload(owslib.util)
-
-            from owslib.util import openURL as orig_openURL
-
-            original_openURL = orig_openURL
-
-            def patched_openURL(
-                url_base,
-                data=None,
-                method="Get",
-                cookies=None,
-                username=None,
-                password=None,
-                timeout=30,
-                headers=None,
-                verify=True,
-                cert=None,
-                auth=None,
-            ):
-                # Force verify=False regardless of what was passed
-                logger.debug(
-                    f"[PATCHED] openURL called: url={url_base}, "
-                    f"verify={verify} -> forcing verify=False"
-                )
-                return original_openURL(
-                    url_base,
-                    data,
-                    method,
-                    cookies,
-                    username,
-                    password,
-                    timeout,
-                    headers,
-                    verify=False,
-                    cert=cert,
-                    auth=auth,
-                )
-
-            owslib.util.openURL = patched_openURL
-            logger.info(f"Patched owslib.util.openURL for {base_url}")
-        except Exception as e:
-            logger.warning(f"Could not patch owslib.util.openURL: {e}")
-
-    # Re-import OWSLib services AFTER patching to ensure they use the patched openURL
-    # This is critical: the classes must be imported AFTER we patch owslib.util.openURL
-    if allow_insecure:
-        # Force reload of OWSLib modules to pick up the patched openURL
-        import importlib
-
-        import owslib.wcs
-        import owslib.wfs
-        import owslib.wms
-        import owslib.wmts
-
-        importlib.reload(owslib.wcs)
-        importlib.reload(owslib.wfs)
-        importlib.reload(owslib.wms)
-        importlib.reload(owslib.wmts)
-
-        from owslib.util import Authentication  # Import after reload!
-        from owslib.wcs import WebCoverageService as WCS_Local
-        from owslib.wfs import WebFeatureService as WFS_Local
-        from owslib.wms import WebMapService as WMS_Local
-        from owslib.wmts import WebMapTileService as WMTS_Local
-
-        logger.info("Reloaded OWSLib modules after patching")
-    else:
-        # Import normally when not bypassing SSL
-        from owslib.util import Authentication
-        from owslib.wcs import WebCoverageService as WCS_Local
-        from owslib.wfs import WebFeatureService as WFS_Local
-        from owslib.wms import WebMapService as WMS_Local
-        from owslib.wmts import WebMapTileService as WMTS_Local
-
-    # Ensure base_url ends with / for proper urljoin behavior
-    # Without trailing slash:
-    #   urljoin("https://example.com/geoserver", "wms")
-    #   produces: "https://example.com/wms" (incorrect!)
-    # With trailing slash:
-    #   urljoin("https://example.com/geoserver/", "wms")
-    #   produces: "https://example.com/geoserver/wms" (correct)
-    if not base_url.endswith("/"):
-        base_url = base_url + "/"
-
-    # WMS
-    wms_url = urljoin(base_url, "wms")
-    logger.info(f"Fetching WMS capabilities from {wms_url} (allow_insecure={allow_insecure})")
-    try:
-        wms = WMS_Local(wms_url, version="1.3.0", username=username, password=password)
-        all_layers.extend(parse_wms_capabilities(wms, wms_url, search_term))
-        service_status["WMS"] = True
-        logger.info(f"Successfully fetched WMS capabilities from {wms_url}")
-    except Exception as e:
-        logger.warning(f"Could not fetch WMS capabilities from {wms_url}: {e}")
-        service_status["WMS"] = False
-        error_type, message, technical = classify_connection_error(e)
-        service_errors["WMS"] = {
-            "error_type": error_type,
-            "message": message,
-            "technical_details": technical,
-        }
-
-    # WFS
-    wfs_url = urljoin(base_url, "wfs")
-    try:
-        wfs = WFS_Local(wfs_url, version="2.0.0", username=username, password=password)
-        all_layers.extend(parse_wfs_capabilities(wfs, wfs_url, search_term))
-        service_status["WFS"] = True
-    except Exception as e:
-        logger.warning(f"Could not fetch WFS capabilities from {wfs_url}: {e}")
-        service_status["WFS"] = False
-        error_type, message, technical = classify_connection_error(e)
-        service_errors["WFS"] = {
-            "error_type": error_type,
-            "message": message,
-            "technical_details": technical,
-        }
-
-    # WCS
-    wcs_url = urljoin(base_url, "wcs")
-    try:
-        wcs = WCS_Local(wcs_url, version="2.0.1")
-        all_layers.extend(parse_wcs_capabilities(wcs, wcs_url, search_term))
-        service_status["WCS"] = True
-    except Exception as e:
-        logger.warning(f"Could not fetch WCS capabilities from {wcs_url}: {e}")
-        service_status["WCS"] = False
-        error_type, message, technical = classify_connection_error(e)
-        service_errors["WCS"] = {
-            "error_type": error_type,
-            "message": message,
-            "technical_details": technical,
-        }
-
-    # WMTS
-    wmts_url = urljoin(base_url, "gwc/service/wmts")
-    try:
-        # Create Authentication object with verify=False for insecure connections
-        wmts_auth = Authentication(
-            username=username,
-            password=password,
-            verify=(not allow_insecure),  # verify=False when allow_insecure=True
-        )
-
-        wmts = WMTS_Local(wmts_url, auth=wmts_auth)
-        all_layers.extend(parse_wmts_capabilities(wmts, wmts_url, search_term))
-        service_status["WMTS"] = True
-    except Exception as e:
-        logger.warning(f"Could not fetch WMTS capabilities from {wmts_url}: {e}")
-        service_status["WMTS"] = False
-        error_type, message, technical = classify_connection_error(e)
-        service_errors["WMTS"] = {
-            "error_type": error_type,
-            "message": message,
-            "technical_details": technical,
-        }
+    all_layers: List[GeoDataObject] = []
+    service_status: Dict[str, bool] = {}
+    service_errors: Dict[str, Dict[str, str]] = {}
 
-    # Restore original SSL context and openURL if they were patched
-    if original_ssl_context is not None:
-        try:
-            ssl._create_default_https_context = original_ssl_context
-        except Exception:
-            pass
+    parsers = {
+        "WMS": parse_wms_capabilities,
+        "WFS": parse_wfs_capabilities,
+        "WCS": parse_wcs_capabilities,
+        "WMTS": parse_wmts_capabilities,
+    }
+    results = fetch_backend_capabilities(backend)
 
-    if original_openURL is not None:
+    for service in CAPABILITIES_SERVICES:
+        service_url = service_endpoint(base_url, service)
         try:
-            import owslib.util
-
-            owslib.util.openURL = original_openURL
-        except Exception:
-            pass
+            result = results[service.name]
+            if isinstance(result, Exception):
+                raise result
+            all_layers.extend(parsers[service.name](result, service_url, search_term))
+            service_status[service.name] = True
+        except Exception as e:
+            logger.warning(f"Could not fetch {service.name} capabilities from {service_url}: {e}")
+            service_status[service.name] = False
+            error_type, message, technical = classify_connection_error(e)
+            service_errors[service.name] = {
+                "error_type": error_type,
+                "message": message,
+                "technical_details": technical,
+            }
 
     return all_layers, service_status, service_errors
 
@@ -989,13 +806,15 @@ def preload_backend_layers(
             )
 
     annotated_layers = _annotate_layers_with_backend(layers, backend)
-    delete_layers(session_id, [backend.url])
 
     # Update total count now that we know how many layers exist
     if annotated_layers:
         set_processing_state(session_id, backend_url, "processing", total=len(annotated_layers))
 
-    stored_count = store_layers(session_id, backend.url, backend.name, annotated_layers)
+    # Replaces the backend's previous layers, or resumes an interrupted run
+    stored_count = store_layers(
+        session_id, backend.url, backend.name, annotated_layers, replace=True
+    )
     service_counts = Counter(layer.layer_type or "UNKNOWN" for layer in annotated_layers)
     return {
         "session_id": session_id,
@@ -0,0 +1,227 @@
+"""In-memory similarity index over stored GeoServer layers.
+
+The sqlite-vec table is the durable store; searching it meant over-fetching
+``limit * len(backend_urls)`` nearest rows, dropping the ones from other
+sessions/backends in Python and re-validating every hit into a
+``GeoDataObject``. This index keeps, per ``(session_id, backend_url)``
+partition, a contiguous float32 matrix of L2-normalized embeddings plus the
+already parsed layers. A search selects the partitions first and scores each
+with one matrix-vector product.
+
+Large partitions can optionally use an inverted-file (IVF) coarse index: rows
+are clustered with spherical k-means and only the ``nprobe`` clusters closest
+to the query are scored.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from core.config import GEOSERVER_IVF_MIN_LAYERS, GEOSERVER_IVF_NPROBE
+from models.geodata import GeoDataObject
+
+logger = logging.getLogger(__name__)
+
+PartitionKey = Tuple[str, str]
+# Loads (vectors, layers) for one partition
+PartitionLoader = Callable[[str, str], Tuple[Sequence[Sequence[float]], List[GeoDataObject]]]
+# Lists the backend URLs stored for a session
+BackendLister = Callable[[str], Iterable[str]]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+class _InvertedLists:
+    """Spherical k-means clusters of a partition's rows (IVF coarse quantizer)."""
+
+    def __init__(self, vectors: np.ndarray, iterations: int = 8, seed: int = 0):
+        n = len(vectors)
+        nlist = max(1, int(math.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        centroids = vectors[rng.choice(n, size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            assign = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, vectors)
+            counts = np.bincount(assign, minlength=nlist)
+            # Empty clusters keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = _normalize_rows(sums[filled])
+
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assign == c) for c in range(nlist)]
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        nearest = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.concatenate([self.lists[c] for c in nearest])
+
+
+class LayerPartition:
+    """Normalized embedding matrix and parsed layers for one session/backend."""
+
+    def __init__(
+        self,
+        vectors: Sequence[Sequence[float]],
+        layers: List[GeoDataObject],
+        ivf_min_layers: int = GEOSERVER_IVF_MIN_LAYERS,
+    ):
+        if len({len(vector) for vector in vectors}) > 1:
+            # The embedding model fell back mid-run; keep rows matching the latest ones
+            dimension = len(vectors[-1])
+            keep = [i for i, vector in enumerate(vectors) if len(vector) == dimension]
+            logger.warning(
+                "Skipping %d layers embedded with a different dimension than %d",
+                len(layers) - len(keep),
+                dimension,
+            )
+            vectors = [vectors[i] for i in keep]
+            layers = [layers[i] for i in keep]
+        matrix = np.array(vectors, dtype=np.float32)
+        if not layers:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        self.vectors = _normalize_rows(matrix)
+        self.layers = layers
+        self._ivf: Optional[_InvertedLists] = None
+        if ivf_min_layers and len(layers) >= ivf_min_layers:
+            self._ivf = _InvertedLists(self.vectors)
+
+    def __len__(self) -> int:
+        return len(self.layers)
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1] if len(self.layers) else 0
+
+    def score(self, query: np.ndarray, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Cosine similarity of candidate rows to a normalized query.
+
+        Returns:
+            Tuple of (row_indices, similarities)
+        """
+        if self._ivf is not None:
+            rows = self._ivf.candidates(query, nprobe)
+            return rows, self.vectors[rows] @ query
+        return np.arange(len(self.layers)), self.vectors @ query
+
+
+class LayerIndex:
+    """Per-(session, backend) partitions, loaded lazily and dropped on writes."""
+
+    def __init__(self, nprobe: int = GEOSERVER_IVF_NPROBE):
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._partitions: Dict[PartitionKey, LayerPartition] = {}
+        # Sessions whose full backend list has been loaded
+        self._complete: Set[str] = set()
+        # Opaque marker of the underlying store's state, see ``sync``
+        self._generation: object = None
+
+    def sync(self, generation: object) -> None:
+        """Drop everything if the store changed behind our back (e.g. another process)."""
+        with self._lock:
+            if generation != self._generation:
+                self._partitions.clear()
+                self._complete.clear()
+                self._generation = generation
+
+    def invalidate(self, session_id: str, backend_urls: Iterable[str]) -> None:
+        with self._lock:
+            for backend_url in backend_urls:
+                self._partitions.pop((session_id, backend_url), None)
+            self._complete.discard(session_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+            self._complete.clear()
+            self._generation = None
+
+    def partitions(
+        self,
+        session_ids: Iterable[str],
+        backend_urls: Sequence[str],
+        load: PartitionLoader,
+        list_backends: BackendLister,
+    ) -> List[LayerPartition]:
+        """Partitions for the given sessions, restricted to ``backend_urls`` if set."""
+        selected: List[LayerPartition] = []
+        with self._lock:
+            for session_id in session_ids:
+                if backend_urls:
+                    wanted = list(backend_urls)
+                elif session_id in self._complete:
+                    wanted = [key[1] for key in self._partitions if key[0] == session_id]
+                else:
+                    wanted = list(list_backends(session_id))
+                    self._complete.add(session_id)
+
+                for backend_url in wanted:
+                    key = (session_id, backend_url)
+                    partition = self._partitions.get(key)
+                    if partition is None:
+                        vectors, layers = load(session_id, backend_url)
+                        partition = self._partitions[key] = LayerPartition(vectors, layers)
+                    if len(partition):
+                        selected.append(partition)
+        return selected
+
+    def search(
+        self,
+        partitions: Sequence[LayerPartition],
+        query_vector: Sequence[float],
+        limit: int,
+    ) -> List[Tuple[GeoDataObject, float]]:
+        """Top ``limit`` layers as ``(layer_copy, cosine_distance)``, best first."""
+        if limit <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(query))
+        if norm:
+            query = query / norm
+
+        owners: List[Tuple[LayerPartition, np.ndarray]] = []
+        similarities: List[np.ndarray] = []
+        for partition in partitions:
+            if partition.dimension != query.shape[0]:
+                logger.warning(
+                    "Skipping %d layers embedded with dimension %d (query has %d)",
+                    len(partition),
+                    partition.dimension,
+                    query.shape[0],
+                )
+                continue
+            rows, sims = partition.score(query, self.nprobe)
+            owners.append((partition, rows))
+            similarities.append(sims)
+        if not similarities:
+            return []
+
+        sims = np.concatenate(similarities)
+        offsets = np.cumsum([0] + [len(rows) for _, rows in owners])
+        k = min(limit, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k] if k < len(sims) else np.arange(len(sims))
+        # Best first; ties keep storage order
+        top = top[np.lexsort((top, -sims[top]))]
+
+        results: List[Tuple[GeoDataObject, float]] = []
+        for flat in top:
+            owner = int(np.searchsorted(offsets, flat, side="right")) - 1
+            partition, rows = owners[owner]
+            similarity = float(sims[flat])
+            distance = 1.0 - similarity
+            layer = partition.layers[int(rows[flat - offsets[owner]])].model_copy(
+                update={"score": max(0.0, similarity)}, deep=True
+            )
+            results.append((layer, distance))
+        return results
@@ -6,6 +6,9 @@ light-weight hashing embedding to avoid heavyweight ML dependencies while still
 enabling approximate semantic search. Set the ``NALAMAP_GEOSERVER_EMBEDDING_FACTORY``
 environment variable to point to a callable that returns a ``langchain``
 ``Embeddings`` implementation if you need to plug in a different model.
+
+Each vector is stored once per embedding model and layer text; sessions and
+backends list their layers in a membership table that points at those rows.
 """
 
 from __future__ import annotations
@@ -18,9 +21,12 @@ import math
 import re
 import sqlite3
 import threading
+from collections import deque
+from concurrent.futures import Future
 from pathlib import Path
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 from langchain_community.vectorstores import SQLiteVec
 from langchain_core.embeddings import Embeddings
 
@@ -28,7 +34,9 @@ from core.config import (
     AZURE_EMBEDDING_DEPLOYMENT,
     AZURE_EMBEDDING_MODEL,
     EMBEDDING_PROVIDER,
+    GEOSERVER_EMBEDDING_BATCH_SIZE,
     GEOSERVER_EMBEDDING_FACTORY_ENV,
+    GEOSERVER_EMBEDDING_PARALLEL_BATCHES,
     OPENAI_API_KEY,
     OPENAI_EMBEDDING_MODEL,
     USE_AZURE_EMBEDDINGS,
@@ -37,8 +45,18 @@ from core.config import (
     get_geoserver_vector_db_path,
 )
 from models.geodata import GeoDataObject
+from services.background_tasks import TaskPriority, get_task_manager
+from utility.metrics_exporter import VECTOR_SEARCH_DURATION_SECONDS
+from utility.tracing import traced
+
+from .layer_index import LayerIndex
 
+# SQLiteVec table: one vector per (embedding_model, content_hash) in its metadata
 _VECTOR_TABLE = "geoserver_layer_embeddings"
+# Layers stored per session/backend, each pointing at its row in _VECTOR_TABLE
+_MEMBER_TABLE = "geoserver_layer_members"
+# Committed embedding batches of in-flight store_layers runs, for resuming
+_CHECKPOINT_TABLE = "geoserver_embedding_checkpoints"
 
 # Special session ID for globally preloaded embeddings (shared across all users)
 GLOBAL_PRELOAD_SESSION_ID = "__global_preload__"
@@ -111,6 +129,8 @@ class _HashingEmbeddings(Embeddings):
         # Document frequency cache for IDF weighting
         self._doc_freq: dict = {}
         self._total_docs = 0
+        # Batches may be embedded concurrently (see store_layers)
+        self._stats_lock = threading.Lock()
 
     def _extract_tokens(self, text: str) -> List[str]:
         """Extract tokens from text with preprocessing."""
@@ -190,17 +210,24 @@ class _HashingEmbeddings(Embeddings):
 
         return buckets
 
+    @property
+    def model_id(self) -> str:
+        """Identifies the vector space, for the shared embedding cache."""
+        return f"hashing:{self._dimension}:{'ngrams' if self._use_ngrams else 'words'}"
+
+    def observe_documents(self, texts: Iterable[str]) -> None:
+        """Update IDF statistics for documents whose vectors came from the cache."""
+        with self._stats_lock:
+            for text in texts:
+                self._total_docs += 1
+                tokens = set(self._extract_tokens(text))
+                for token in tokens:
+                    self._doc_freq[token] = self._doc_freq.get(token, 0) + 1
+
     def embed_documents(self, texts: Iterable[str]) -> List[List[float]]:  # type: ignore[override]
         """Embed multiple documents and update IDF statistics."""
         texts_list = list(texts)
-
-        # Update document frequency statistics
-        self._total_docs += len(texts_list)
-        for text in texts_list:
-            tokens = set(self._extract_tokens(text))
-            for token in tokens:
-                self._doc_freq[token] = self._doc_freq.get(token, 0) + 1
-
+        self.observe_documents(texts_list)
         return [self._vectorize(text) for text in texts_list]
 
     def embed_query(self, text: str) -> List[float]:  # type: ignore[override]
@@ -258,6 +285,17 @@ class _OpenAIEmbeddings(Embeddings):
         """Check if OpenAI should be used based on configuration."""
         return bool(USE_OPENAI_EMBEDDINGS and OPENAI_API_KEY)
 
+    @property
+    def model_id(self) -> str:
+        """Identifies the vector space; changes once the fallback takes over."""
+        if self._use_fallback or not self._openai_embeddings:
+            return self._fallback_embeddings.model_id
+        return f"openai:{OPENAI_EMBEDDING_MODEL}"
+
+    def observe_documents(self, texts: Iterable[str]) -> None:
+        if self._use_fallback or not self._openai_embeddings:
+            self._fallback_embeddings.observe_documents(texts)
+
     def embed_documents(self, texts: Iterable[str]) -> List[List[float]]:  # type: ignore[override]
         """Embed documents using OpenAI or fallback."""
         texts_list = list(texts)
@@ -352,6 +390,17 @@ class _AzureEmbeddings(Embeddings):
             and getenv("AZURE_OPENAI_API_KEY")
         )
 
+    @property
+    def model_id(self) -> str:
+        """Identifies the vector space; changes once the fallback takes over."""
+        if self._use_fallback or not self._azure_embeddings:
+            return self._fallback_embeddings.model_id
+        return f"azure:{AZURE_EMBEDDING_DEPLOYMENT}:{AZURE_EMBEDDING_MODEL}"
+
+    def observe_documents(self, texts: Iterable[str]) -> None:
+        if self._use_fallback or not self._azure_embeddings:
+            self._fallback_embeddings.observe_documents(texts)
+
     def embed_documents(self, texts: Iterable[str]) -> List[List[float]]:  # type: ignore[override]
         """Embed documents using Azure or fallback."""
         texts_list = list(texts)
@@ -384,6 +433,8 @@ _thread_local = threading.local()
 _embedding_model: Optional[Embeddings] = None
 _use_fallback_store = False
 _fallback_documents: List[dict] = []
+# In-memory counterpart of the shared vectors for the fallback store
+_fallback_embedding_cache: dict[Tuple[str, str], List[float]] = {}
 
 # Progress tracking for embedding status
 # Key: (session_id, backend_url)
@@ -392,6 +443,10 @@ _fallback_documents: List[dict] = []
 _embedding_progress: dict[Tuple[str, str], dict] = {}
 _progress_lock = threading.Lock()
 
+# Parsed layers + normalized embedding matrices for similarity search. Derived
+# from the store above; partitions are dropped on writes and rebuilt lazily.
+_layer_index = LayerIndex()
+
 
 def _get_db_path() -> Path:
     return get_geoserver_vector_db_path()
@@ -480,6 +535,58 @@ def _get_embedding_model() -> Embeddings:
     return _embedding_model
 
 
+def _create_support_tables(connection: sqlite3.Connection) -> None:
+    """Create the membership and checkpoint tables next to the SQLiteVec table.
+
+    Earlier versions stored a vector row per session layer. Those rows are
+    listed in the membership table once, as the vectors of their own layers.
+    """
+    migrate = (
+        connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (_MEMBER_TABLE,)
+        ).fetchone()
+        is None
+    )
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {_CHECKPOINT_TABLE} (
+            session_id TEXT NOT NULL,
+            backend_url TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            batch_index INTEGER NOT NULL,
+            PRIMARY KEY (session_id, backend_url, fingerprint, batch_index)
+        )
+        """)
+    connection.execute(f"""
+        CREATE TABLE IF NOT EXISTS {_MEMBER_TABLE} (
+            rowid INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            backend_url TEXT NOT NULL,
+            vector_rowid INTEGER NOT NULL,
+            metadata TEXT NOT NULL
+        )
+        """)
+    connection.execute(f"""
+        CREATE INDEX IF NOT EXISTS {_MEMBER_TABLE}_partition
+        ON {_MEMBER_TABLE}(session_id, backend_url)
+        """)
+    connection.execute(f"""
+        CREATE INDEX IF NOT EXISTS {_VECTOR_TABLE}_content ON {_VECTOR_TABLE}(
+            json_extract(metadata, '$.embedding_model'),
+            json_extract(metadata, '$.content_hash')
+        )
+        """)
+    if migrate:
+        connection.execute(f"""
+            INSERT INTO {_MEMBER_TABLE}(session_id, backend_url, vector_rowid, metadata)
+            SELECT json_extract(metadata, '$.session_id'), json_extract(metadata, '$.backend_url'),
+                   rowid, metadata
+            FROM {_VECTOR_TABLE}
+            WHERE json_extract(metadata, '$.session_id') IS NOT NULL
+            ORDER BY rowid
+            """)
+    connection.commit()
+
+
 def _create_vector_store() -> Optional[SQLiteVec]:
     global _use_fallback_store
 
@@ -502,11 +609,13 @@ def _create_vector_store() -> Optional[SQLiteVec]:
         # Ensure we always return rows as dictionaries so json_extract calls work predictably
         connection.row_factory = sqlite3.Row
 
-        return SQLiteVec(
+        store = SQLiteVec(
             table=_VECTOR_TABLE,
             connection=connection,
             embedding=_get_embedding_model(),
         )
+        _create_support_tables(connection)
+        return store
     except sqlite3.OperationalError as e:
         logger.warning(f"Failed to initialize SQLite vector store: {e}. Using in-memory fallback.")
         _use_fallback_store = True
@@ -543,6 +652,7 @@ def reset_vector_store_for_tests() -> None:
     global _embedding_model
     global _use_fallback_store
     global _fallback_documents
+    global _fallback_embedding_cache
 
     # Close thread-local vector store if it exists
     if hasattr(_thread_local, "vector_store"):
@@ -557,6 +667,8 @@ def reset_vector_store_for_tests() -> None:
     _embedding_model = None
     _use_fallback_store = False
     _fallback_documents = []
+    _fallback_embedding_cache = {}
+    _layer_index.clear()
 
     # Reset progress tracking
     with _progress_lock:
@@ -629,6 +741,7 @@ def delete_layers(session_id: str, backend_urls: Sequence[str]) -> None:
 
     if not backend_urls:
         return
+    _layer_index.invalidate(session_id, [url.rstrip("/") for url in backend_urls])
     if _use_fallback_store:
         global _fallback_documents
         normalized = {url.rstrip("/") for url in backend_urls}
@@ -647,26 +760,258 @@ def delete_layers(session_id: str, backend_urls: Sequence[str]) -> None:
     placeholders = ",".join(["?"] * len(normalized))
     conn.execute(
         f"""
-        DELETE FROM {_VECTOR_TABLE}
-        WHERE json_extract(metadata, '$.session_id') = ?
-          AND json_extract(metadata, '$.backend_url') IN ({placeholders})
+        DELETE FROM {_MEMBER_TABLE}
+        WHERE session_id = ? AND backend_url IN ({placeholders})
         """,
         (session_id, *normalized),
     )
+    # Shared vectors stay for other sessions; vectors without a model id are per layer
+    conn.execute(f"""
+        DELETE FROM {_VECTOR_TABLE}
+        WHERE json_extract(metadata, '$.embedding_model') IS NULL
+          AND rowid NOT IN (SELECT vector_rowid FROM {_MEMBER_TABLE})
+        """)
     conn.execute(
         f"DELETE FROM {_VECTOR_TABLE}_vec WHERE rowid NOT IN (SELECT rowid FROM {_VECTOR_TABLE})"
     )
+    conn.execute(
+        f"""
+        DELETE FROM {_CHECKPOINT_TABLE}
+        WHERE session_id = ? AND backend_url IN ({placeholders})
+        """,
+        (session_id, *normalized),
+    )
     conn.commit()
 
 
+def _batch_ranges(count: int, batch_size: int) -> List[Tuple[int, int]]:
+    size = max(1, batch_size)
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def _batch_fingerprint(texts: Sequence[str], batch_size: int) -> str:
+    """Identify a layer set + batching so checkpoints are only reused for the same run."""
+    digest = hashlib.sha256(str(batch_size).encode("utf-8"))
+    for text in texts:
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _embedding_model_id(model: Embeddings) -> str:
+    """Identify the vector space of ``model`` for the shared embedding cache."""
+    model_id = getattr(model, "model_id", None)
+    if model_id:
+        return str(model_id)
+    # Custom factories: class plus the model setting most LangChain wrappers expose
+    name = getattr(model, "model", None) or getattr(model, "model_name", None)
+    qualified = f"{type(model).__module__}.{type(model).__qualname__}"
+    return f"{qualified}:{name}" if name else qualified
+
+
+def _observe_documents(model: Embeddings, texts: Sequence[str]) -> None:
+    """Let models that keep corpus statistics (hashing IDF) see cache hits too."""
+    observe = getattr(model, "observe_documents", None)
+    if observe is not None and texts:
+        observe(texts)
+
+
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _shared_vectors(
+    conn: sqlite3.Connection, model_id: str, hashes: Iterable[str]
+) -> Dict[str, int]:
+    """Map content hashes to the rowid of their shared vector for ``model_id``."""
+    unique = list(dict.fromkeys(hashes))
+    found: Dict[str, int] = {}
+    # Stay well below SQLite's bound-parameter limit
+    for start in range(0, len(unique), 500):
+        chunk = unique[start : start + 500]
+        placeholders = ",".join(["?"] * len(chunk))
+        cursor = conn.execute(
+            f"""
+            SELECT json_extract(metadata, '$.content_hash') AS content_hash, min(rowid)
+            FROM {_VECTOR_TABLE}
+            WHERE json_extract(metadata, '$.embedding_model') = ?
+              AND json_extract(metadata, '$.content_hash') IN ({placeholders})
+            GROUP BY 1
+            """,
+            (model_id, *chunk),
+        )
+        found.update((row[0], row[1]) for row in cursor)
+    return found
+
+
+def _plan_embedding(
+    hashes: Sequence[str],
+    ranges: Sequence[Tuple[int, int]],
+    batch_indices: Iterable[int],
+    known: Iterable[str],
+) -> Dict[int, List[int]]:
+    """Rows each batch has to embed: the first occurrence of every unknown hash."""
+    claimed = set(known)
+    owned: Dict[int, List[int]] = {}
+    for index in batch_indices:
+        start, end = ranges[index]
+        owned[index] = []
+        for row in range(start, end):
+            if hashes[row] not in claimed:
+                claimed.add(hashes[row])
+                owned[index].append(row)
+    return owned
+
+
+def _embed_batches(
+    batches: Iterable[Tuple[int, List[str]]],
+) -> Iterator[Tuple[int, Optional[str], List[List[float]]]]:
+    """Embed batches concurrently on the background pool, yielding them in order.
+
+    At most GEOSERVER_EMBEDDING_PARALLEL_BATCHES batches are in flight. A batch
+    no worker has picked up yet is embedded by the calling thread instead, so
+    this cannot deadlock when called from a busy background worker.
+
+    Each result carries the id of the model that produced it, or None if the
+    model switched to its fallback while the batch was in flight.
+    """
+    model = _get_embedding_model()
+    task_manager = get_task_manager()
+    remaining = iter(batches)
+    in_flight: Deque[Tuple[int, List[str], str, Optional[Future]]] = deque()
+
+    def submit_next() -> None:
+        item = next(remaining, None)
+        if item is None:
+            return
+        index, batch = item
+        model_id = _embedding_model_id(model)
+        future = None
+        if batch:
+            future = task_manager.submit_task(
+                model.embed_documents, batch, priority=TaskPriority.NORMAL
+            )
+        in_flight.append((index, batch, model_id, future))
+
+    for _ in range(max(1, GEOSERVER_EMBEDDING_PARALLEL_BATCHES)):
+        submit_next()
+
+    while in_flight:
+        index, batch, model_id, future = in_flight.popleft()
+        if future is None:
+            vectors: List[List[float]] = []
+        elif future.cancel():
+            vectors = model.embed_documents(batch)
+        else:
+            vectors = future.result()
+        submit_next()
+        # Falling back is one-way, so an unchanged id means these vectors are its own
+        yield index, (model_id if _embedding_model_id(model) == model_id else None), vectors
+
+
+def _committed_batches(
+    conn: sqlite3.Connection, session_id: str, backend_url: str, fingerprint: str
+) -> set[int]:
+    cursor = conn.execute(
+        f"""
+        SELECT batch_index FROM {_CHECKPOINT_TABLE}
+        WHERE session_id = ? AND backend_url = ? AND fingerprint = ?
+        """,
+        (session_id, backend_url, fingerprint),
+    )
+    return {row["batch_index"] for row in cursor}
+
+
+def _commit_batch(
+    conn: sqlite3.Connection,
+    session_id: str,
+    backend_url: str,
+    fingerprint: str,
+    batch_index: int,
+    model_id: Optional[str],
+    new_vectors: Sequence[Tuple[str, str, bytes]],
+    members: Sequence[Tuple[dict, str]],
+    vector_rows: Dict[str, int],
+) -> None:
+    """Insert one batch's new vectors, layer rows and checkpoint in a single transaction.
+
+    ``new_vectors`` are ``(text, content_hash, embedding)`` and are shared under
+    ``model_id``; without one they only serve this run. ``members`` are
+    ``(metadata, content_hash)`` and point at the vector found in ``vector_rows``,
+    which is updated with the new vectors once the batch is committed.
+    """
+    inserted: Dict[str, int] = {}
+    conn.execute("BEGIN")
+    try:
+        for text, content_hash, embedding in new_vectors:
+            vector_metadata = {"embedding_model": model_id, "content_hash": content_hash}
+            cursor = conn.execute(
+                f"INSERT INTO {_VECTOR_TABLE}(text, metadata, text_embedding) VALUES (?, ?, ?)",
+                (text, json.dumps(vector_metadata), embedding),
+            )
+            inserted[content_hash] = cursor.lastrowid
+        conn.executemany(
+            f"""
+            INSERT INTO {_MEMBER_TABLE}(session_id, backend_url, vector_rowid, metadata)
+            VALUES (?, ?, ?, ?)
+            """,
+            [
+                (
+                    session_id,
+                    backend_url,
+                    inserted.get(content_hash) or vector_rows[content_hash],
+                    json.dumps(metadata),
+                )
+                for metadata, content_hash in members
+            ],
+        )
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO {_CHECKPOINT_TABLE}
+                (session_id, backend_url, fingerprint, batch_index)
+            VALUES (?, ?, ?, ?)
+            """,
+            (session_id, backend_url, fingerprint, batch_index),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    vector_rows.update(inserted)
+
+
+def _add_encoded(progress_key: Tuple[str, str], count: int) -> None:
+    with _progress_lock:
+        if progress_key in _embedding_progress:
+            _embedding_progress[progress_key]["encoded"] += count
+
+
+def _reused_texts(
+    texts: Sequence[str], batch_range: Tuple[int, int], embedded: Sequence[int]
+) -> List[str]:
+    skip = set(embedded)
+    return [texts[row] for row in range(*batch_range) if row not in skip]
+
+
 def store_layers(
     session_id: str,
     backend_url: str,
     backend_name: Optional[str],
     layers: Sequence[GeoDataObject],
+    replace: bool = False,
 ) -> int:
     """Persist a collection of layers for later retrieval.
 
+    Layers are embedded in batches (several in parallel on the background pool)
+    and each batch is committed in its own transaction, with progress updated
+    per batch. With ``replace=True`` the backend's previous layers for this
+    session are removed first; if an earlier run for the same layers was
+    interrupted, its committed batches are kept and only the rest is embedded.
+
+    Vectors are stored once per embedding model and hash of the layer text, so
+    a layer already embedded for another session or backend is not embedded
+    again; its row points at the shared vector.
+
     Returns the number of stored layers. Also tracks progress for embedding status.
     """
 
@@ -674,6 +1019,8 @@ def store_layers(
     progress_key = (session_id, normalized_backend)
 
     if not layers:
+        if replace:
+            delete_layers(session_id, [normalized_backend])
         # Even with 0 layers, mark as completed
         with _progress_lock:
             if progress_key not in _embedding_progress:
@@ -703,6 +1050,7 @@ def store_layers(
             }
         else:
             _embedding_progress[progress_key]["total"] = len(layers)
+            _embedding_progress[progress_key]["encoded"] = 0
             _embedding_progress[progress_key]["state"] = "processing"
             _embedding_progress[progress_key]["in_progress"] = True
             _embedding_progress[progress_key]["error"] = None
@@ -713,40 +1061,105 @@ def store_layers(
             _metadata_payload(session_id, normalized_backend, backend_name, layer)
             for layer in layers
         ]
+        hashes = [_content_hash(text) for text in texts]
+        for metadata, content_hash in zip(metadatas, hashes):
+            metadata["content_hash"] = content_hash
+        ranges = _batch_ranges(len(texts), GEOSERVER_EMBEDDING_BATCH_SIZE)
 
+        # Opening the store first switches to the fallback if sqlite-vec is unavailable
+        store = get_vector_store()
+        model = _get_embedding_model()
+        model_id = _embedding_model_id(model)
         if _use_fallback_store:
-            embedding_model = _get_embedding_model()
-            for i, (text, metadata) in enumerate(zip(texts, metadatas)):
-                vector = embedding_model.embed_query(text)
-                _fallback_documents.append(
-                    {
-                        "session_id": session_id,
-                        "backend_url": normalized_backend,
-                        "backend_name": backend_name,
-                        "layer": metadata["layer"],
-                        "metadata": metadata,
-                        "text": text,
-                        "vector": vector,
-                    }
-                )
-                # Update progress after each embedding
-                with _progress_lock:
-                    _embedding_progress[progress_key]["encoded"] = i + 1
+            if replace:
+                delete_layers(session_id, [normalized_backend])
+            vectors_by_hash = {
+                content_hash: _fallback_embedding_cache[(model_id, content_hash)]
+                for content_hash in hashes
+                if (model_id, content_hash) in _fallback_embedding_cache
+            }
+            owned = _plan_embedding(hashes, ranges, range(len(ranges)), vectors_by_hash)
+            batches = ((index, [texts[row] for row in owned[index]]) for index in owned)
+            for index, batch_model_id, vectors in _embed_batches(batches):
+                for row, vector in zip(owned[index], vectors):
+                    vectors_by_hash[hashes[row]] = vector
+                    if batch_model_id:
+                        _fallback_embedding_cache[(batch_model_id, hashes[row])] = vector
+                _observe_documents(model, _reused_texts(texts, ranges[index], owned[index]))
+                start, end = ranges[index]
+                for row in range(start, end):
+                    _fallback_documents.append(
+                        {
+                            "session_id": session_id,
+                            "backend_url": normalized_backend,
+                            "backend_name": backend_name,
+                            "layer": metadatas[row]["layer"],
+                            "metadata": metadatas[row],
+                            "text": texts[row],
+                            "vector": vectors_by_hash[hashes[row]],
+                        }
+                    )
+                _add_encoded(progress_key, end - start)
             return len(layers)
 
-        store = get_vector_store()
         if store is None:
             return 0
+        conn = store._connection  # type: ignore[attr-defined]
 
-        # For SQLite store, add all at once (LangChain handles batching internally)
-        store.add_texts(texts=texts, metadatas=metadatas)
-
-        # Mark as complete
-        with _progress_lock:
-            _embedding_progress[progress_key]["encoded"] = len(layers)
+        fingerprint = _batch_fingerprint(texts, GEOSERVER_EMBEDDING_BATCH_SIZE)
+        done = (
+            _committed_batches(conn, session_id, normalized_backend, fingerprint)
+            if replace
+            else set()
+        )
+        if done:
+            logger.info(
+                "Resuming embedding for %s: %d of %d batches already committed",
+                normalized_backend,
+                len(done),
+                len(ranges),
+            )
+            _add_encoded(progress_key, sum(ranges[i][1] - ranges[i][0] for i in done))
+        elif replace:
+            delete_layers(session_id, [normalized_backend])
+
+        pending = [i for i in range(len(ranges)) if i not in done]
+        # content_hash -> rowid of its vector in _VECTOR_TABLE
+        vector_rows = _shared_vectors(
+            conn, model_id, (hashes[row] for i in pending for row in range(*ranges[i]))
+        )
+        owned = _plan_embedding(hashes, ranges, pending, vector_rows)
+        batches = ((index, [texts[row] for row in owned[index]]) for index in pending)
+        for index, batch_model_id, vectors in _embed_batches(batches):
+            new_vectors = [
+                (texts[row], hashes[row], np.asarray(vector, dtype=np.float32).tobytes())
+                for row, vector in zip(owned[index], vectors)
+            ]
+            start, end = ranges[index]
+            members = [(metadatas[row], hashes[row]) for row in range(start, end)]
+            _commit_batch(
+                conn,
+                session_id,
+                normalized_backend,
+                fingerprint,
+                index,
+                batch_model_id,
+                new_vectors,
+                members,
+                vector_rows,
+            )
+            _observe_documents(model, _reused_texts(texts, ranges[index], owned[index]))
+            _add_encoded(progress_key, end - start)
 
+        # Run finished; checkpoints are only needed to resume an interrupted one
+        conn.execute(
+            f"DELETE FROM {_CHECKPOINT_TABLE} WHERE session_id = ? AND backend_url = ?",
+            (session_id, normalized_backend),
+        )
+        conn.commit()
         return len(layers)
     finally:
+        _layer_index.invalidate(session_id, [normalized_backend])
         # Mark embedding as complete (not in progress)
         with _progress_lock:
             if progress_key in _embedding_progress:
@@ -793,15 +1206,15 @@ def list_layers(
     filters = ""
     if normalized:
         placeholders = ",".join(["?"] * len(normalized))
-        filters = f" AND json_extract(metadata, '$.backend_url') IN ({placeholders})"
+        filters = f" AND backend_url IN ({placeholders})"
         params.extend(normalized)
 
     params.append(limit)
     cursor = conn.execute(
         f"""
-        SELECT text, metadata
-        FROM {_VECTOR_TABLE}
-        WHERE json_extract(metadata, '$.session_id') = ?{filters}
+        SELECT metadata
+        FROM {_MEMBER_TABLE}
+        WHERE session_id = ?{filters}
         ORDER BY rowid DESC
         LIMIT ?
         """,
@@ -810,6 +1223,62 @@ def list_layers(
     return _rows_to_layers(cursor.fetchall())
 
 
+def _fallback_partition(session_id: str, backend_url: str):
+    docs = [
+        doc
+        for doc in _fallback_documents
+        if doc["session_id"] == session_id and doc["backend_url"] == backend_url
+    ]
+    return (
+        [doc["vector"] for doc in docs],
+        [GeoDataObject.model_validate(doc["layer"]) for doc in docs],
+    )
+
+
+def _fallback_backends(session_id: str) -> List[str]:
+    backends = (
+        doc["backend_url"] for doc in _fallback_documents if doc["session_id"] == session_id
+    )
+    return list(dict.fromkeys(backends))
+
+
+def _sqlite_partition(conn: sqlite3.Connection, session_id: str, backend_url: str):
+    cursor = conn.execute(
+        f"""
+        SELECT m.metadata, v.text_embedding
+        FROM {_MEMBER_TABLE} AS m
+        JOIN {_VECTOR_TABLE} AS v ON v.rowid = m.vector_rowid
+        WHERE m.session_id = ? AND m.backend_url = ?
+        ORDER BY m.rowid
+        """,
+        (session_id, backend_url),
+    )
+    vectors = []
+    layers: List[GeoDataObject] = []
+    for row in cursor:
+        metadata = json.loads(row["metadata"]) if row["metadata"] else {}
+        payload = metadata.get("layer")
+        if not payload or not row["text_embedding"]:
+            continue
+        vectors.append(np.frombuffer(row["text_embedding"], dtype=np.float32))
+        layers.append(GeoDataObject.model_validate(payload))
+    return vectors, layers
+
+
+def _sqlite_backends(conn: sqlite3.Connection, session_id: str) -> List[str]:
+    cursor = conn.execute(
+        f"""
+        SELECT DISTINCT backend_url
+        FROM {_MEMBER_TABLE}
+        WHERE session_id = ?
+        """,
+        (session_id,),
+    )
+    return [row["backend_url"] for row in cursor if row["backend_url"]]
+
+
+@VECTOR_SEARCH_DURATION_SECONDS.time("geoserver_layers")
+@traced("vector_store.search.geoserver_layers")
 def similarity_search(
     session_id: str,
     backend_urls: Sequence[str],
@@ -818,57 +1287,38 @@ def similarity_search(
 ) -> List[Tuple[GeoDataObject, float]]:
     """Return layers ordered by vector similarity for the provided query.
 
-    Searches both user-specific layers AND globally preloaded layers.
+    Searches both user-specific layers AND globally preloaded layers. Scoring
+    runs against the in-memory layer index (cosine distance, lower is better);
+    only the requested sessions/backends are scored.
     """
     # Sessions to search: user's session + global preload session
-    sessions_to_search = {session_id, GLOBAL_PRELOAD_SESSION_ID}
+    sessions_to_search = [session_id, GLOBAL_PRELOAD_SESSION_ID]
+    normalized = list(dict.fromkeys(url.rstrip("/") for url in backend_urls if url))
 
     if _use_fallback_store:
-        embedding = _get_embedding_model().embed_query(query)
-        normalized = {url.rstrip("/") for url in backend_urls if url}
-        scored: List[Tuple[GeoDataObject, float]] = []
-        for doc in _fallback_documents:
-            if doc["session_id"] not in sessions_to_search:
-                continue
-            if normalized and doc["backend_url"] not in normalized:
-                continue
-            vector = doc["vector"]
-            denom = math.sqrt(sum(v * v for v in vector)) * math.sqrt(sum(v * v for v in embedding))
-            similarity = 0.0
-            if denom:
-                similarity = sum(a * b for a, b in zip(vector, embedding)) / denom
-            layer = GeoDataObject.model_validate(doc["layer"])
-            layer.score = similarity
-            scored.append((layer, 1.0 - similarity))
-        scored.sort(key=lambda item: item[1])
-        return scored[:limit]
+        _layer_index.sync((id(_fallback_documents), len(_fallback_documents)))
+        partitions = _layer_index.partitions(
+            sessions_to_search, normalized, _fallback_partition, _fallback_backends
+        )
+    else:
+        store = get_vector_store()
+        if store is None:
+            return []
+        conn = store._connection  # type: ignore[attr-defined]
+        # Rows written by other processes change count/max(rowid)
+        generation = conn.execute(f"SELECT count(*), max(rowid) FROM {_MEMBER_TABLE}").fetchone()
+        _layer_index.sync(tuple(generation))
+        partitions = _layer_index.partitions(
+            sessions_to_search,
+            normalized,
+            lambda session, backend: _sqlite_partition(conn, session, backend),
+            lambda session: _sqlite_backends(conn, session),
+        )
 
-    store = get_vector_store()
-    if store is None:
+    if not partitions:
         return []
-    candidate_multiplier = max(2, len(backend_urls) or 1)
-    fetch_k = max(limit * candidate_multiplier, limit)
-    documents = store.similarity_search_with_score(query=query, k=fetch_k)
-
-    normalized = {url.rstrip("/") for url in backend_urls if url}
-    results: List[Tuple[GeoDataObject, float]] = []
-    for doc, distance in documents:
-        metadata = doc.metadata or {}
-        # Check if document belongs to user's session OR global preload session
-        if metadata.get("session_id") not in sessions_to_search:
-            continue
-        backend_url = metadata.get("backend_url")
-        if normalized and backend_url not in normalized:
-            continue
-        payload = metadata.get("layer")
-        if not payload:
-            continue
-        layer = GeoDataObject.model_validate(payload)
-        layer.score = max(0.0, 1.0 - float(distance))
-        results.append((layer, distance))
-        if len(results) >= limit:
-            break
-    return results
+    embedding = _get_embedding_model().embed_query(query)
+    return _layer_index.search(partitions, embedding, limit)
 
 
 def has_layers(session_id: str, backend_urls: Sequence[str]) -> bool:
@@ -901,12 +1351,12 @@ def has_layers(session_id: str, backend_urls: Sequence[str]) -> bool:
     filters = ""
     if normalized:
         placeholders = ",".join(["?"] * len(normalized))
-        filters = f" AND json_extract(metadata, '$.backend_url') IN ({placeholders})"
+        filters = f" AND backend_url IN ({placeholders})"
         params.extend(normalized)
     cursor = conn.execute(
         f"""
-        SELECT 1 FROM {_VECTOR_TABLE}
-        WHERE json_extract(metadata, '$.session_id') IN ({session_placeholders}){filters}
+        SELECT 1 FROM {_MEMBER_TABLE}
+        WHERE session_id IN ({session_placeholders}){filters}
         LIMIT 1
         """,
         params,
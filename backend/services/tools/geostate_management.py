@@ -1,4 +1,5 @@
 import json
+from pathlib import Path
 from typing import Any, Dict, List, Set, Tuple, Union
 
 from langchain_core.messages import ToolMessage
@@ -10,6 +11,9 @@ from typing_extensions import Annotated
 
 from models.geodata import GeoDataObject
 from models.states import GeoDataAgentState, get_medium_debug_state
+from services.storage.field_index import field_summaries, find_field_index
+from services.storage.file_management import local_upload_path
+from services.storage.layer_stats import get_layer_stats
 
 """
  Utility tools to manage the GeoData State
@@ -214,6 +218,20 @@ def metadata_search(
             "added_to_map": source == "layer",
         }
 
+        # Uploaded layers: add what their statistics sidecar knows
+        local_path = local_upload_path(dataset.data_link) if dataset.data_link else None
+        stats = get_layer_stats(local_path, compute=False) if local_path else None
+        if stats:
+            metadata["feature_count"] = stats["feature_count"]
+            metadata["geometry_types"] = stats.get("geometry_types")
+            metadata["crs"] = stats.get("crs")
+            metadata["layer_bbox"] = stats.get("bbox")
+            metadata["fields"] = [field["name"] for field in stats.get("fields", [])]
+        # ... and, once the layer has been queried, its field index
+        index = find_field_index(Path(local_path)) if local_path else None
+        if index:
+            metadata["field_summaries"] = field_summaries(index)
+
         # Filter out None values
         metadata = {k: v for k, v in metadata.items() if v is not None}
         response_parts.append(metadata)
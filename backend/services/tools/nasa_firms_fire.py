@@ -31,7 +31,7 @@ from datetime import datetime
 from io import StringIO
 from typing import Any, Dict, List, Optional
 
-import requests
+import httpx
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
@@ -41,6 +41,7 @@ from typing_extensions import Annotated
 
 from models.geodata import DataOrigin, DataType, GeoDataObject
 from models.states import GeoDataAgentState
+from services import http_client
 from services.storage.file_management import store_file
 
 logger = logging.getLogger(__name__)
@@ -88,7 +89,7 @@ def geocode_location_to_bbox(location: str) -> Optional[Dict[str, float]]:
         }
         headers = {"User-Agent": "NaLaMap-OSINT/1.0"}
 
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_client.get(url, params=params, headers=headers, timeout=10)
         response.raise_for_status()
 
         data = response.json()
@@ -147,7 +148,7 @@ def fetch_firms_data(
 
     try:
         logger.info(f"Fetching FIRMS data: {source}, bbox={area_coords}, days={days_back}")
-        response = requests.get(url, timeout=60)
+        response = http_client.get(url, timeout=60)
 
         # Check for API key errors
         if response.status_code == 401:
@@ -172,10 +173,10 @@ def fetch_firms_data(
         logger.info(f"Retrieved {len(records)} fire detections")
         return records
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("NASA FIRMS API request timed out")
         return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"NASA FIRMS API request failed: {e}")
         return None
 
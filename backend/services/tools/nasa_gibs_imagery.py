@@ -36,7 +36,6 @@ import logging
 import uuid
 from typing import Any, Optional
 
-import requests
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
@@ -46,6 +45,7 @@ from typing_extensions import Annotated
 
 from models.geodata import DataOrigin, DataType, GeoDataObject
 from models.states import GeoDataAgentState
+from services import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -242,7 +242,7 @@ def geocode_location_to_bbox(location: str) -> Optional[dict]:
         }
         headers = {"User-Agent": "NaLaMap-OSINT/1.0"}
 
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = http_client.get(url, params=params, headers=headers, timeout=10)
         response.raise_for_status()
 
         data = response.json()
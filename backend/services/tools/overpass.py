@@ -8,22 +8,27 @@ Components:
 - OverpassClient: HTTP client for Overpass API with error handling
 - OverpassQueryBuilder: Builds Overpass QL queries for various search types
 - OverpassResultConverter: Converts OSM elements to GeoJSON features
+
+Streaming parsing and disk-spooled feature output live in overpass_stream.py.
 """
 
-import hashlib
 import json
 import logging
+import os
 import re
 from collections import defaultdict
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import requests
+import httpx
 
 from models.geodata import DataOrigin, DataType, GeoDataObject
-from services.storage.file_management import store_file
+from services import http_client
 
 from .constants import get_geometry_display_label
+from .overpass_cache import OverpassResponseCache, get_overpass_cache
+from .overpass_stream import NodeRefResolver, OverpassElementStream, OverpassFeatureWriter
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +41,14 @@ OVERPASS_HEADERS = {
 # Default Overpass API endpoint
 OVERPASS_API_URL = "https://overpass-api.de/api/interpreter"
 
+# Queries allowed to return more elements than this are parsed as a stream
+OVERPASS_STREAM_MIN_RESULTS = int(os.getenv("NALAMAP_OVERPASS_STREAM_MIN_RESULTS", "10000"))
+
+# Streamed responses up to this size (raw bytes) are kept and written to the cache
+OVERPASS_STREAM_CACHE_MAX_BYTES = (
+    int(os.getenv("NALAMAP_OVERPASS_STREAM_CACHE_MAX_MB", "64")) * 1024 * 1024
+)
+
 
 @dataclass
 class OverpassLocation:
@@ -64,15 +77,27 @@ class OverpassLocation:
 
 
 class OverpassClient:
-    """HTTP client for Overpass API with error handling and retry logic."""
+    """HTTP client for Overpass API with error handling and retry logic.
+
+    Requests go through the shared pooled client (services.http_client), which
+    keeps connections to the endpoint alive and caps concurrent queries.
+    Successful responses are stored in the persistent response cache
+    (overpass_cache.py) and repeated or spatially covered queries are answered
+    from it.
+    """
 
     def __init__(
         self,
         api_url: str = OVERPASS_API_URL,
         headers: Optional[Dict[str, str]] = None,
+        cache: Optional[OverpassResponseCache] = None,
+        use_cache: bool = True,
+        stream_cache_max_bytes: int = OVERPASS_STREAM_CACHE_MAX_BYTES,
     ):
         self.api_url = api_url
         self.headers = headers or OVERPASS_HEADERS
+        self.cache = (cache or get_overpass_cache()) if use_cache else None
+        self.stream_cache_max_bytes = stream_cache_max_bytes
 
     def execute_query(
         self, query: str, timeout: int = 300
@@ -89,36 +114,158 @@ class OverpassClient:
             - If successful: (data_dict, None)
             - If failed: (None, error_message)
         """
+        cached = self._cached(query)
+        if cached is not None:
+            return cached, None
+
         try:
-            response = requests.post(
+            response = http_client.post(
                 self.api_url,
                 data={"data": query},
                 headers=self.headers,
                 timeout=timeout + 10,  # Allow slightly more time than query timeout
             )
             response.raise_for_status()
-            return response.json(), None
+            data = response.json()
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            return None, _describe_query_error(e, timeout)
+
+        self._store(query, data)
+        return data, None
+
+    @contextmanager
+    def stream_query(self, query: str, timeout: int = 300) -> Iterator[Iterator[Dict[str, Any]]]:
+        """
+        Execute an Overpass QL query and iterate its elements as they arrive.
+
+        Elements are parsed incrementally from the response body, and ways that
+        only carry node refs get their geometry from a compact node index, so
+        memory stays bounded however large the answer is. Cached responses are
+        served from the cache. Streamed responses of up to
+        ``stream_cache_max_bytes`` are kept while they are read and cached
+        once they have been read completely; larger ones are not cached.
 
-        except requests.exceptions.Timeout:
-            return None, f"Overpass API query timed out after {timeout} seconds."
+        Usage::
 
-        except requests.exceptions.HTTPError as e:
-            error_detail = e.response.text[:500] if e.response else str(e)
-            status_code = e.response.status_code if e.response else "N/A"
+            with client.stream_query(query) as elements:
+                for element in elements:
+                    ...
 
-            if "runtime error: Query timed out" in error_detail:
-                return None, (
-                    f"Overpass API query was too complex or timed out. "
-                    f"Try a smaller radius or more specific location. Status: {status_code}"
+        Raises:
+            OverpassQueryError: On request, HTTP or parse errors, including
+                errors raised while iterating
+        """
+        cached = self._cached(query)
+        if cached is not None:
+            yield NodeRefResolver().resolve(cached.get("elements", []))
+            return
+
+        with ExitStack() as stack:
+            try:
+                response = stack.enter_context(
+                    http_client.stream(
+                        "POST",
+                        self.api_url,
+                        data={"data": query},
+                        headers=self.headers,
+                        timeout=timeout + 10,
+                    )
                 )
+                if response.is_error:
+                    response.read()  # error details are in the body
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                raise OverpassQueryError(_describe_query_error(e, timeout)) from e
+
+            recorder = _StreamRecorder(self.stream_cache_max_bytes if self.cache else 0)
+            stream = OverpassElementStream(recorder.count(response.iter_bytes()))
+            yield recorder.record(_raising_query_errors(NodeRefResolver().resolve(stream), timeout))
+            if stream.remark:
+                logger.warning(f"Overpass remark: {stream.remark}")
+            if recorder.complete and recorder.elements is not None:
+                self._store(query, {"elements": recorder.elements, "remark": stream.remark})
+
+    def _store(self, query: str, data: Dict[str, Any]) -> None:
+        if self.cache is None:
+            return
+        try:
+            self.cache.put(query, data)
+        except Exception as e:
+            logger.warning(f"Failed to cache Overpass response: {e}")
+
+    def _cached(self, query: str) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.get(query)
+        except Exception as e:
+            logger.warning(f"Overpass cache lookup failed: {e}")
+            return None
+
+
+class OverpassQueryError(Exception):
+    """Raised by OverpassClient.stream_query; the message is user-facing."""
+
+
+class _StreamRecorder:
+    """Keeps the elements of a streamed response for the cache, up to a size cap.
 
-            return None, f"Overpass API error. Status: {status_code}. Details: {error_detail}"
+    Elements are dropped as soon as the response exceeds ``max_bytes``, and
+    ``complete`` is only set once the consumer has read every element.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.elements: Optional[List[Dict[str, Any]]] = [] if max_bytes > 0 else None
+        self.complete = False
+
+    def count(self, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        for chunk in chunks:
+            self.bytes_read += len(chunk)
+            if self.bytes_read > self.max_bytes:
+                self.elements = None
+            yield chunk
+
+    def record(self, elements: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        for element in elements:
+            if self.elements is not None:
+                self.elements.append(element)
+            yield element
+        self.complete = True
+
+
+def _raising_query_errors(
+    elements: Iterator[Dict[str, Any]], timeout: int
+) -> Iterator[Dict[str, Any]]:
+    """Re-raise network and parse errors hit mid-stream as OverpassQueryError."""
+    try:
+        yield from elements
+    except (httpx.HTTPError, ValueError) as e:
+        raise OverpassQueryError(_describe_query_error(e, timeout)) from e
+
+
+def _describe_query_error(error: Exception, timeout: int) -> str:
+    """User-facing message for a failed Overpass request."""
+    if isinstance(error, httpx.TimeoutException):
+        return f"Overpass API query timed out after {timeout} seconds."
+
+    if isinstance(error, httpx.HTTPStatusError):
+        error_detail = error.response.text[:500] if error.response is not None else str(error)
+        status_code = error.response.status_code if error.response is not None else "N/A"
+
+        if "runtime error: Query timed out" in error_detail:
+            return (
+                f"Overpass API query was too complex or timed out. "
+                f"Try a smaller radius or more specific location. Status: {status_code}"
+            )
+
+        return f"Overpass API error. Status: {status_code}. Details: {error_detail}"
 
-        except requests.exceptions.RequestException as e:
-            return None, f"Error connecting to Overpass API: {str(e)}"
+    if isinstance(error, httpx.HTTPError):
+        return f"Error connecting to Overpass API: {str(error)}"
 
-        except json.JSONDecodeError:
-            return None, "Error parsing Overpass API response (invalid JSON)."
+    return "Error parsing Overpass API response (invalid JSON)."
 
 
 class OverpassQueryBuilder:
@@ -488,146 +635,38 @@ class OverpassResultConverter:
 
         return None
 
-    @staticmethod
-    def group_features_by_geometry(
-        features: List[Dict[str, Any]],
-    ) -> Tuple[List[Dict], List[Dict], List[Dict]]:
-        """
-        Group GeoJSON features by their geometry type.
-
-        Args:
-            features: List of GeoJSON Feature dictionaries
-
-        Returns:
-            Tuple of (point_features, polygon_features, linestring_features)
-        """
-        points = []
-        polygons = []
-        linestrings = []
-
-        for feature in features:
-            if not feature or not feature.get("geometry"):
-                continue
-
-            geom_type = feature["geometry"]["type"]
-            if geom_type == "Point":
-                points.append(feature)
-            elif geom_type == "Polygon":
-                polygons.append(feature)
-            elif geom_type == "LineString":
-                linestrings.append(feature)
-
-        return points, polygons, linestrings
 
-    @staticmethod
-    def filter_point_noise(
-        point_features: List[Dict],
-        polygon_features: List[Dict],
-        linestring_features: List[Dict],
-    ) -> List[Dict]:
-        """
-        Filter out point features when polygons/lines are available.
-
-        For highway queries and similar, having way geometries makes point
-        nodes redundant noise on the map.
-
-        Args:
-            point_features: List of point GeoJSON features
-            polygon_features: List of polygon GeoJSON features
-            linestring_features: List of linestring GeoJSON features
-
-        Returns:
-            Filtered list of point features (empty if polygons/lines exist)
-        """
-        if polygon_features or linestring_features:
-            logger.info(
-                f"Filtering out {len(point_features)} point features "
-                f"(have {len(polygon_features)} polygons and {len(linestring_features)} lines)"
-            )
-            return []
-        return point_features
-
-    @staticmethod
-    def deduplicate_features(features: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        Remove duplicate features based on their OSM ID.
-
-        Args:
-            features: List of GeoJSON Feature dictionaries
-
-        Returns:
-            Deduplicated list of features
-        """
-        seen_ids = set()
-        unique_features = []
-
-        for feature in features:
-            feature_id = feature.get("id")
-            if feature_id and feature_id not in seen_ids:
-                seen_ids.add(feature_id)
-                unique_features.append(feature)
-            elif not feature_id:
-                # Keep features without IDs (shouldn't happen normally)
-                unique_features.append(feature)
-
-        if len(features) != len(unique_features):
-            logger.info(f"Deduplicated features: {len(features)} -> {len(unique_features)}")
-
-        return unique_features
-
-
-def create_feature_collection_geodata(
-    features: List[Dict[str, Any]],
-    collection_type: str,  # "Points", "Areas", "Lines"
+def create_spooled_collection_geodata(
+    writer: OverpassFeatureWriter,
+    collection_type: str,
     amenity_display: str,
     location_display: str,
     osm_tag_kv: str,
     location_filename: str,
 ) -> Optional[GeoDataObject]:
     """
-    Create a GeoDataObject for a FeatureCollection of a specific geometry type.
+    Store one collection of an OverpassFeatureWriter and describe it.
 
+    The features are streamed from the writer's spool into the file store.
     Uses user-friendly geometry labels instead of technical terms (e.g.,
     "Hospital locations" instead of "Hospitals (Points)").
 
-    Args:
-        features: List of GeoJSON Feature dictionaries
-        collection_type: Type of collection ("Points", "Areas", "Lines")
-        amenity_display: User-friendly amenity name (e.g., "Restaurants")
-        location_display: User-friendly location name (e.g., "Paris, France")
-        osm_tag_kv: OSM tag key=value (e.g., "amenity=restaurant")
-        location_filename: Clean location name for filenames
-
     Returns:
-        GeoDataObject or None if no features
+        GeoDataObject or None if the writer holds no features of that type
     """
-    if not features:
+    feature_count = writer.count(collection_type)
+    if not feature_count:
         return None
 
-    feature_collection = {"type": "FeatureCollection", "features": features}
-
     # Generate filename
     safe_amenity = amenity_display.lower().replace(" ", "_").replace("=", "_").replace(":", "_")
     safe_location = location_filename.lower().replace(" ", "_").replace(",", "").replace("'", "")
     file_name = f"overpass_{safe_amenity}_{collection_type.lower()}_{safe_location}.json"
 
-    try:
-        content_bytes = json.dumps(
-            feature_collection, ensure_ascii=False, separators=(",", ":")
-        ).encode("utf-8")
-
-        # Validate JSON
-        json.loads(content_bytes.decode("utf-8"))
-    except (json.JSONDecodeError, UnicodeDecodeError) as e:
-        logger.error(f"Error encoding GeoJSON for {file_name}: {e}")
-        return None
-
-    data_url, unique_id = store_file(file_name, content_bytes)
-    sha256_hex = hashlib.sha256(content_bytes).hexdigest()
-    size_bytes = len(content_bytes)
+    data_url, unique_id, sha256_hex, size_bytes = writer.store(collection_type, file_name)
 
     # Calculate bounding box
-    bounding_box_str = _calculate_bbox_string(features)
+    bounding_box_str = writer.bbox_string(collection_type)
 
     # Get user-friendly geometry label
     osm_key = osm_tag_kv.split("=", 1)[0] if "=" in osm_tag_kv else ""
@@ -636,12 +675,12 @@ def create_feature_collection_geodata(
     # Build user-friendly collection name
     collection_name = f"{amenity_display} {geo_label} in {location_display}"
     description = (
-        f"{len(features)} {amenity_display.lower()} {geo_label} ({geo_hint}) "
+        f"{feature_count} {amenity_display.lower()} {geo_label} ({geo_hint}) "
         f"near {location_display}. Data from OpenStreetMap."
     )
 
-    # Extract sample feature names for preview
-    sample_names = _extract_sample_names(features, max_samples=5)
+    # Sample feature names for preview
+    sample_names = writer.sample_names(collection_type)
 
     # Generate spatial extent description
     spatial_extent = _describe_spatial_extent(bounding_box_str)
@@ -661,7 +700,7 @@ def create_feature_collection_geodata(
         bounding_box=bounding_box_str,
         layer_type="GeoJSON",
         properties={
-            "feature_count": len(features),
+            "feature_count": feature_count,
             "query_amenity_key": amenity_display,
             "query_location": location_display,
             "query_osm_tag": osm_tag_kv,
@@ -676,19 +715,6 @@ def create_feature_collection_geodata(
     )
 
 
-def _extract_sample_names(features: List[Dict[str, Any]], max_samples: int = 5) -> List[str]:
-    """Extract sample feature names from a list of GeoJSON features."""
-    names = []
-    for feature in features:
-        props = feature.get("properties", {})
-        name = props.get("name") or props.get("name:en") or props.get("alt_name")
-        if name and name not in names:
-            names.append(name)
-        if len(names) >= max_samples:
-            break
-    return names
-
-
 def _describe_spatial_extent(
     bbox_str: Optional[str],
 ) -> Optional[str]:
@@ -696,7 +722,7 @@ def _describe_spatial_extent(
     Generate a human-readable description of a bounding box extent.
 
     Args:
-        bbox_str: WKT POLYGON string from _calculate_bbox_string
+        bbox_str: WKT POLYGON string from bbox_to_wkt
 
     Returns:
         A plain-language extent description, or None
@@ -733,52 +759,6 @@ def _describe_spatial_extent(
         return None
 
 
-def _calculate_bbox_string(features: List[Dict[str, Any]]) -> Optional[str]:
-    """Calculate a WKT POLYGON bounding box string from GeoJSON features."""
-    all_lons = []
-    all_lats = []
-
-    for feature in features:
-        if not feature.get("geometry"):
-            continue
-
-        geom_type = feature["geometry"]["type"]
-        coords = feature["geometry"]["coordinates"]
-
-        if geom_type == "Point":
-            all_lons.append(coords[0])
-            all_lats.append(coords[1])
-        elif geom_type == "LineString":
-            all_lons.extend([c[0] for c in coords])
-            all_lats.extend([c[1] for c in coords])
-        elif geom_type == "Polygon":
-            poly_coords = coords[0]  # Outer ring
-            all_lons.extend([c[0] for c in poly_coords])
-            all_lats.extend([c[1] for c in poly_coords])
-
-    if not all_lons or not all_lats:
-        return None
-
-    min_lon, max_lon = min(all_lons), max(all_lons)
-    min_lat, max_lat = min(all_lats), max(all_lats)
-
-    # Add buffer for point clusters
-    if (max_lon - min_lon < 0.001) and (max_lat - min_lat < 0.001):
-        buffer = 0.001
-        min_lon -= buffer
-        max_lon += buffer
-        min_lat -= buffer
-        max_lat += buffer
-
-    return (
-        f"POLYGON(({max_lon} {min_lat},"
-        f"{max_lon} {max_lat},"
-        f"{min_lon} {max_lat},"
-        f"{min_lon} {min_lat},"
-        f"{max_lon} {min_lat}))"
-    )
-
-
 def is_highway_query(osm_tag_key: str) -> bool:
     """Check if the query is for highway features."""
     return osm_tag_key == "highway"
@@ -0,0 +1,405 @@
+"""Persistent SQLite cache for Overpass API responses.
+
+Overpass queries take seconds to minutes and are rate limited, while users
+often repeat requests ("hospitals in Nairobi"). Responses are cached on disk
+keyed by the normalized query, with a TTL and size-based LRU eviction.
+
+Keys are spatially aware. A query is split into a *template* (the query with
+its bbox/around filter and result limit replaced by placeholders) and its
+*extent*. A request whose extent is covered by a cached, complete response for
+the same template is answered by clipping the cached elements, e.g. a bbox
+inside a previously fetched, wider bbox.
+
+Follows the same patterns as geocoding/tag_vector_store.py: thread-local
+connections, autocommit mode, lazy initialization.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+OVERPASS_CACHE_DB_PATH = os.getenv("NALAMAP_OVERPASS_CACHE_DB", "data/overpass_cache.db")
+OVERPASS_CACHE_ENABLED = os.getenv("NALAMAP_OVERPASS_CACHE_ENABLED", "true").lower() == "true"
+OVERPASS_CACHE_TTL_SECONDS = int(os.getenv("NALAMAP_OVERPASS_CACHE_TTL_SECONDS", "86400"))
+OVERPASS_CACHE_MAX_BYTES = int(os.getenv("NALAMAP_OVERPASS_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_NUM = r"-?\d+(?:\.\d+)?"
+_BBOX_RE = re.compile(rf"\(\s*({_NUM})\s*,\s*({_NUM})\s*,\s*({_NUM})\s*,\s*({_NUM})\s*\)")
+_AROUND_RE = re.compile(rf"\(around:\s*({_NUM})\s*,\s*({_NUM})\s*,\s*({_NUM})\s*\)")
+_SETTINGS_RE = re.compile(r"\[(?:timeout|maxsize):\d+\]")
+_OUT_LIMIT_RE = re.compile(r"(out\s+geom)\s+(\d+)\s*;")
+
+_EARTH_RADIUS_M = 6_371_008.8
+
+
+@dataclass(frozen=True)
+class QueryExtent:
+    """Spatial extent of a query: a bbox or a radius around a point."""
+
+    kind: str  # "bbox" | "around"
+    south: float
+    west: float
+    north: float
+    east: float
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    radius: Optional[float] = None
+
+    @classmethod
+    def bbox(cls, s: float, w: float, n: float, e: float) -> "QueryExtent":
+        return cls("bbox", s, w, n, e)
+
+    @classmethod
+    def around(cls, radius: float, lat: float, lon: float) -> "QueryExtent":
+        dlat = math.degrees(radius / _EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        return cls("around", lat - dlat, lon - dlon, lat + dlat, lon + dlon, lat, lon, radius)
+
+    def covers(self, other: "QueryExtent") -> bool:
+        """True when every point of ``other`` lies inside this extent."""
+        if self.kind == "bbox":
+            return (
+                self.south <= other.south
+                and self.west <= other.west
+                and self.north >= other.north
+                and self.east >= other.east
+            )
+        if other.kind == "around":
+            gap = _haversine_m(self.lat, self.lon, other.lat, other.lon)
+            return gap + other.radius <= self.radius
+        corners = [
+            (other.south, other.west),
+            (other.south, other.east),
+            (other.north, other.west),
+            (other.north, other.east),
+        ]
+        return all(_haversine_m(self.lat, self.lon, la, lo) <= self.radius for la, lo in corners)
+
+    def contains_point(self, lat: float, lon: float) -> bool:
+        if self.kind == "bbox":
+            return self.south <= lat <= self.north and self.west <= lon <= self.east
+        return _haversine_m(self.lat, self.lon, lat, lon) <= self.radius
+
+    def intersects_segment(self, a: Tuple[float, float], b: Tuple[float, float]) -> bool:
+        """True when the segment between two (lat, lon) points touches this extent."""
+        if self.kind == "bbox":
+            return _segment_hits_box(a, b, self.south, self.west, self.north, self.east)
+        # Distance from the center to the segment in a local equirectangular
+        # projection, accurate for the radii used in queries
+        scale = math.radians(_EARTH_RADIUS_M)
+        kx = scale * math.cos(math.radians(self.lat))
+        ax, ay = (a[1] - self.lon) * kx, (a[0] - self.lat) * scale
+        bx, by = (b[1] - self.lon) * kx, (b[0] - self.lat) * scale
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        t = 0.0 if length2 == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length2))
+        return math.hypot(ax + t * dx, ay + t * dy) <= self.radius
+
+
+@dataclass(frozen=True)
+class NormalizedQuery:
+    key: str
+    template: str
+    extent: Optional[QueryExtent]
+    max_results: Optional[int]
+
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * _EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def normalize_query(query: str) -> NormalizedQuery:
+    """Split an Overpass QL query into cache key, spatial template and extent.
+
+    ``timeout``/``maxsize`` settings do not change the result and are ignored.
+    Only queries with a single distinct bbox or around filter get an extent;
+    others (e.g. area-id queries) are cached by exact text only.
+    """
+    text = _SETTINGS_RE.sub("", query)
+    text = "\n".join(line.strip() for line in text.strip().splitlines() if line.strip())
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    limits = {int(m.group(2)) for m in _OUT_LIMIT_RE.finditer(text)}
+    max_results = limits.pop() if len(limits) == 1 else None
+    template = _OUT_LIMIT_RE.sub(r"\1 {LIMIT};", text) if max_results is not None else text
+
+    extent = None
+    arounds = {m.groups() for m in _AROUND_RE.finditer(template)}
+    bboxes = {m.groups() for m in _BBOX_RE.finditer(template)}
+    if len(arounds) == 1 and not bboxes:
+        r, lat, lon = (float(v) for v in arounds.pop())
+        extent = QueryExtent.around(r, lat, lon)
+        template = _AROUND_RE.sub("{EXTENT}", template)
+    elif len(bboxes) == 1 and not arounds:
+        s, w, n, e = (float(v) for v in bboxes.pop())
+        extent = QueryExtent.bbox(s, w, n, e)
+        template = _BBOX_RE.sub("{EXTENT}", template)
+
+    return NormalizedQuery(key, template, extent, max_results)
+
+
+def _segment_hits_box(
+    a: Tuple[float, float], b: Tuple[float, float], s: float, w: float, n: float, e: float
+) -> bool:
+    """Liang-Barsky test of the segment a-b, as (lat, lon) points, against a box."""
+    t0, t1 = 0.0, 1.0
+    dy, dx = b[0] - a[0], b[1] - a[1]
+    for p, q in ((-dx, a[1] - w), (dx, e - a[1]), (-dy, a[0] - s), (dy, n - a[0])):
+        if p == 0:
+            if q < 0:
+                return False
+            continue
+        t = q / p
+        if p < 0:
+            t0 = max(t0, t)
+        else:
+            t1 = min(t1, t)
+        if t0 > t1:
+            return False
+    return True
+
+
+def _element_paths(element: Dict[str, Any]) -> Iterator[List[Tuple[float, float]]]:
+    """Yield the vertex sequences of an ``out geom`` element (nodes, ways, relations).
+
+    Nodes yield a single point; way geometries are split where a vertex is
+    missing, so no segment is invented across the gap.
+    """
+    if "lat" in element and "lon" in element:
+        yield [(element["lat"], element["lon"])]
+    path: List[Tuple[float, float]] = []
+    for point in element.get("geometry") or []:
+        if point:
+            path.append((point["lat"], point["lon"]))
+        elif path:
+            yield path
+            path = []
+    if path:
+        yield path
+    for member in element.get("members") or []:
+        yield from _element_paths(member)
+
+
+def _element_intersects(element: Dict[str, Any], extent: QueryExtent) -> bool:
+    for path in _element_paths(element):
+        if any(extent.contains_point(lat, lon) for lat, lon in path):
+            return True
+        if any(extent.intersects_segment(a, b) for a, b in zip(path, path[1:])):
+            return True
+    return False
+
+
+def clip_elements(
+    elements: List[Dict[str, Any]], extent: QueryExtent, limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Keep the elements that intersect ``extent``, as Overpass would return them.
+
+    Overpass matches nodes inside the extent, ways with a segment that
+    intersects it (even without a vertex inside) and relations with such a
+    member.
+    """
+    clipped = []
+    for element in elements:
+        bounds = element.get("bounds")
+        if bounds and (
+            bounds["minlat"] > extent.north
+            or bounds["maxlat"] < extent.south
+            or bounds["minlon"] > extent.east
+            or bounds["maxlon"] < extent.west
+        ):
+            continue
+        if _element_intersects(element, extent):
+            clipped.append(element)
+            if limit is not None and len(clipped) >= limit:
+                break
+    return clipped
+
+
+def _is_cacheable(data: Dict[str, Any]) -> bool:
+    # Overpass reports query timeouts/out-of-memory as a 200 with a "remark"
+    remark = str(data.get("remark") or "")
+    return isinstance(data.get("elements"), list) and "error" not in remark.lower()
+
+
+class OverpassResponseCache:
+    """SQLite-backed Overpass response cache with TTL and LRU size eviction."""
+
+    def __init__(
+        self,
+        db_path: str = OVERPASS_CACHE_DB_PATH,
+        ttl_seconds: int = OVERPASS_CACHE_TTL_SECONDS,
+        max_bytes: int = OVERPASS_CACHE_MAX_BYTES,
+    ) -> None:
+        self._db_path = str(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Connection management
+    # ------------------------------------------------------------------
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if getattr(self._local, "conn", None) is None:
+            Path(self._db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._db_path, check_same_thread=False, timeout=10)
+            conn.isolation_level = None  # autocommit
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS overpass_responses (
+                    key TEXT PRIMARY KEY,
+                    template TEXT NOT NULL,
+                    extent TEXT,
+                    max_results INTEGER,
+                    element_count INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_overpass_template "
+                "ON overpass_responses(template)"
+            )
+            self._local.conn = conn
+        return self._local.conn
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return a cached response for ``query``, clipped from a wider one if needed."""
+        nq = normalize_query(query)
+        conn = self._get_connection()
+        now = time.time()
+        min_created = now - self.ttl_seconds
+
+        row = conn.execute(
+            "SELECT body FROM overpass_responses WHERE key = ? AND created_at >= ?",
+            (nq.key, min_created),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE overpass_responses SET accessed_at = ? WHERE key = ?", (now, nq.key)
+            )
+            logger.info("Overpass cache hit (exact)")
+            return json.loads(zlib.decompress(row[0]))
+
+        if nq.extent is None:
+            return None
+
+        # Complete (not truncated) responses for the same template whose
+        # extent covers the request can answer it by clipping
+        rows = conn.execute(
+            "SELECT key, extent, body FROM overpass_responses "
+            "WHERE template = ? AND created_at >= ? AND extent IS NOT NULL "
+            "AND (max_results IS NULL OR element_count < max_results) "
+            "ORDER BY size ASC",
+            (nq.template, min_created),
+        ).fetchall()
+        for key, extent_json, body in rows:
+            cached_extent = QueryExtent(**json.loads(extent_json))
+            if not cached_extent.covers(nq.extent):
+                continue
+            data = json.loads(zlib.decompress(body))
+            data["elements"] = clip_elements(data["elements"], nq.extent, nq.max_results)
+            conn.execute("UPDATE overpass_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            logger.info(
+                f"Overpass cache hit (covered by wider {cached_extent.kind}), "
+                f"{len(data['elements'])} elements after clipping"
+            )
+            return data
+        return None
+
+    def put(self, query: str, data: Dict[str, Any]) -> None:
+        """Store a successful response and evict old entries beyond the size budget."""
+        if not _is_cacheable(data):
+            return
+        nq = normalize_query(query)
+        body = zlib.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"), 6)
+        if len(body) > self.max_bytes:
+            return
+        extent = json.dumps(nq.extent.__dict__) if nq.extent else None
+        now = time.time()
+        with self._write_lock:
+            conn = self._get_connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO overpass_responses "
+                "(key, template, extent, max_results, element_count, body, size, "
+                "created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    nq.key,
+                    nq.template,
+                    extent,
+                    nq.max_results,
+                    len(data["elements"]),
+                    body,
+                    len(body),
+                    now,
+                    now,
+                ),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "DELETE FROM overpass_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM overpass_responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute(
+            "SELECT key, size FROM overpass_responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            conn.execute("DELETE FROM overpass_responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self) -> None:
+        with self._write_lock:
+            self._get_connection().execute("DELETE FROM overpass_responses")
+
+    def stats(self) -> Dict[str, Any]:
+        entries, total = (
+            self._get_connection()
+            .execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM overpass_responses")
+            .fetchone()
+        )
+        return {"entries": entries, "total_bytes": total, "max_bytes": self.max_bytes}
+
+
+_cache: Optional[OverpassResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_overpass_cache() -> Optional[OverpassResponseCache]:
+    """Get the process-wide Overpass response cache (None when disabled)."""
+    global _cache
+    if not OVERPASS_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = OverpassResponseCache()
+    return _cache
@@ -0,0 +1,428 @@
+"""
+Streaming Overpass response handling.
+
+Large Overpass answers (every road in a region, national waterways) used to be
+loaded with ``response.json()`` into one dict, converted into a list of
+features, grouped into more lists and finally ``json.dumps``-ed per geometry
+type — several full copies of the result alive at once. The pieces here keep
+memory bounded by the size of a single element instead:
+
+- OverpassElementStream: incremental parser yielding one element at a time
+  from the ``elements`` array while the response is still downloading
+- NodeIndex / NodeRefResolver: resolve way node refs (``out body``/``out skel``
+  responses) from a compact, array-backed node index instead of dicts
+- OverpassFeatureWriter: spools features to temporary files per geometry type
+  and streams each FeatureCollection into the file store
+"""
+
+import codecs
+import hashlib
+import json
+import logging
+import re
+import tempfile
+from array import array
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from services.storage.file_management import store_file_chunks
+
+logger = logging.getLogger(__name__)
+
+# GeoJSON geometry type -> collection type used for layer names and filenames
+COLLECTION_TYPES = {"Point": "Points", "Polygon": "Areas", "LineString": "Lines"}
+
+_ELEMENTS_START = re.compile(r'"elements"\s*:\s*\[')
+_SEPARATORS = re.compile(r"[\s,]*")
+
+# Target size of the byte chunks handed to the file store
+_WRITE_CHUNK_BYTES = 1 << 20
+
+
+class OverpassElementStream:
+    """
+    Incrementally parse the ``elements`` array of an Overpass JSON response.
+
+    Iterating yields element dicts as soon as each one is complete in the
+    input; only the current element and one network chunk are held in memory.
+    The trailing ``remark`` (Overpass reports runtime errors there) is
+    available on ``remark`` once iteration has finished.
+
+    Args:
+        chunks: Raw response bytes, e.g. ``response.iter_bytes()``
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._exhausted = False
+        self.remark: Optional[str] = None
+        self.element_count = 0
+
+    def _read(self) -> Optional[str]:
+        """Next piece of decoded text, or None once the input is exhausted."""
+        if self._exhausted:
+            return None
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            if text:
+                return text
+        self._exhausted = True
+        return self._text.decode(b"", final=True) or None
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        buf = ""
+        while True:
+            match = _ELEMENTS_START.search(buf)
+            if match:
+                pos = match.end()
+                break
+            more = self._read()
+            if more is None:
+                raise ValueError("Overpass response contains no 'elements' array")
+            buf += more
+
+        while True:
+            pos = _SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                more = self._read()
+                if more is None:
+                    raise ValueError("Overpass response ended inside the 'elements' array")
+                buf, pos = buf[pos:] + more, 0
+                continue
+
+            if buf[pos] == "]":
+                pos += 1
+                break
+
+            try:
+                element, pos = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Element not complete yet. Grow the buffer to at least twice the
+                # pending text before retrying so huge elements parse in linear time.
+                buf, pos = buf[pos:], 0
+                target = 2 * len(buf)
+                grew = False
+                while len(buf) < target:
+                    more = self._read()
+                    if more is None:
+                        break
+                    buf += more
+                    grew = True
+                if not grew:
+                    raise ValueError("Overpass response contains an invalid element")
+                continue
+
+            if isinstance(element, dict):
+                self.element_count += 1
+                yield element
+
+        self._parse_trailer(buf[pos:])
+
+    def _parse_trailer(self, text: str) -> None:
+        """Read the remaining top-level members (``remark``) after the elements."""
+        parts = [text]
+        while True:
+            more = self._read()
+            if more is None:
+                break
+            parts.append(more)
+        trailer = "".join(parts).strip()
+        if '"remark"' not in trailer:
+            return
+        try:
+            members = json.loads("{" + trailer.lstrip(","))
+        except json.JSONDecodeError:
+            logger.debug("Could not parse Overpass response trailer")
+            return
+        self.remark = members.get("remark")
+
+
+class NodeIndex:
+    """
+    Compact node id -> (lon, lat) lookup.
+
+    Ids and coordinates live in typed arrays (24 bytes per node rather than a
+    few hundred for a dict entry); lookups sort once and use binary search.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._lons = array("d")
+        self._lats = array("d")
+        self._sorted: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, node_id: int, lon: float, lat: float) -> None:
+        self._ids.append(int(node_id))
+        self._lons.append(float(lon))
+        self._lats.append(float(lat))
+        self._sorted = None
+
+    def _frozen(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if self._sorted is None:
+            ids = np.array(self._ids, dtype=np.int64)
+            order = np.argsort(ids, kind="stable")
+            self._sorted = (
+                ids[order],
+                np.array(self._lons, dtype=np.float64)[order],
+                np.array(self._lats, dtype=np.float64)[order],
+            )
+        return self._sorted
+
+    def lookup(self, node_ids: List[int]) -> Optional[List[List[float]]]:
+        """
+        Coordinates ``[[lon, lat], ...]`` for ``node_ids``.
+
+        Returns None if any node is missing, since a partial way geometry would
+        be misleading.
+        """
+        if not node_ids or not len(self._ids):
+            return None
+        ids, lons, lats = self._frozen()
+        refs = np.asarray(node_ids, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(ids, refs), len(ids) - 1)
+        if not np.array_equal(ids[pos], refs):
+            return None
+        return np.column_stack((lons[pos], lats[pos])).tolist()
+
+
+class NodeRefResolver:
+    """
+    Attach geometries to ways that only carry node refs.
+
+    Nodes are indexed as they stream past; ways without inline geometry are
+    spooled to a temporary file and emitted, with geometry, once the whole
+    response has been read. Untagged nodes only exist in such responses as
+    way members, so they are indexed but not passed on as features.
+    """
+
+    def __init__(self):
+        self.index = NodeIndex()
+        self.unresolved = 0
+
+    def resolve(self, elements: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as spool:
+            pending = 0
+            for element in elements:
+                osm_type = element.get("type")
+                if osm_type == "node" and "lat" in element and "lon" in element:
+                    self.index.add(element["id"], element["lon"], element["lat"])
+                    if not element.get("tags"):
+                        continue
+                elif osm_type == "way" and "geometry" not in element and element.get("nodes"):
+                    spool.write(json.dumps(element, separators=(",", ":")))
+                    spool.write("\n")
+                    pending += 1
+                    continue
+                yield element
+
+            if not pending:
+                return
+            spool.seek(0)
+            for line in spool:
+                way = json.loads(line)
+                coords = self.index.lookup(way["nodes"])
+                if coords is None:
+                    self.unresolved += 1
+                    continue
+                way["geometry"] = [{"lon": lon, "lat": lat} for lon, lat in coords]
+                yield way
+
+        if self.unresolved:
+            logger.info(f"Dropped {self.unresolved} ways with unresolved node refs")
+
+
+def bbox_to_wkt(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> str:
+    """WKT POLYGON for a bounding box, padded for tight point clusters."""
+    if (max_lon - min_lon < 0.001) and (max_lat - min_lat < 0.001):
+        buffer = 0.001
+        min_lon -= buffer
+        max_lon += buffer
+        min_lat -= buffer
+        max_lat += buffer
+
+    return (
+        f"POLYGON(({max_lon} {min_lat},"
+        f"{max_lon} {max_lat},"
+        f"{min_lon} {max_lat},"
+        f"{min_lon} {min_lat},"
+        f"{max_lon} {min_lat}))"
+    )
+
+
+def _feature_coords(geometry: Dict[str, Any]) -> List[List[float]]:
+    """Coordinates that define a feature's extent (outer ring for polygons)."""
+    geom_type = geometry.get("type")
+    coords = geometry.get("coordinates")
+    if not coords:
+        return []
+    if geom_type == "Point":
+        return [coords]
+    if geom_type == "LineString":
+        return coords
+    if geom_type == "Polygon":
+        return coords[0]
+    return []
+
+
+class _Spool:
+    """One geometry type's spooled features plus running summary stats."""
+
+    def __init__(self):
+        self.file: IO[bytes] = tempfile.TemporaryFile("w+b")
+        self.count = 0
+        self.bounds: Optional[List[float]] = None
+        self.sample_names: List[str] = []
+
+    def add(self, feature: Dict[str, Any], max_samples: int) -> None:
+        self.file.write(json.dumps(feature, ensure_ascii=False, separators=(",", ":")).encode())
+        self.file.write(b"\n")
+        self.count += 1
+
+        coords = _feature_coords(feature["geometry"])
+        if coords:
+            lons = [c[0] for c in coords]
+            lats = [c[1] for c in coords]
+            box = [min(lons), min(lats), max(lons), max(lats)]
+            if self.bounds is None:
+                self.bounds = box
+            else:
+                self.bounds = [
+                    min(self.bounds[0], box[0]),
+                    min(self.bounds[1], box[1]),
+                    max(self.bounds[2], box[2]),
+                    max(self.bounds[3], box[3]),
+                ]
+
+        if len(self.sample_names) < max_samples:
+            props = feature.get("properties") or {}
+            name = props.get("name") or props.get("name:en") or props.get("alt_name")
+            if name and name not in self.sample_names:
+                self.sample_names.append(name)
+
+    def iter_collection(self) -> Iterator[bytes]:
+        """The spooled features as FeatureCollection bytes, in ~1 MB chunks."""
+        self.file.seek(0)
+        parts = [b'{"type":"FeatureCollection","features":[']
+        size = len(parts[0])
+        first = True
+        for line in self.file:
+            if not first:
+                parts.append(b",")
+            parts.append(line.rstrip(b"\n"))
+            size += len(line)
+            first = False
+            if size >= _WRITE_CHUNK_BYTES:
+                yield b"".join(parts)
+                parts, size = [], 0
+        parts.append(b"]}")
+        yield b"".join(parts)
+
+
+class OverpassFeatureWriter:
+    """
+    Collect GeoJSON features per geometry type without keeping them in memory.
+
+    Features are deduplicated by id and appended to a temporary file for their
+    collection type ("Points", "Areas", "Lines"); feature count, bounding box
+    and sample names are tracked on the way in. ``store`` then streams a
+    collection into the file store. Use as a context manager so the spools
+    are removed.
+    """
+
+    def __init__(self, max_sample_names: int = 5):
+        self.max_sample_names = max_sample_names
+        self._spools: Dict[str, _Spool] = {}
+        self._seen_ids: set = set()
+        self.duplicates = 0
+
+    def __enter__(self) -> "OverpassFeatureWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def add(self, feature: Dict[str, Any]) -> bool:
+        """
+        Spool a feature in the collection of its geometry type.
+
+        Args:
+            feature: GeoJSON Feature dictionary
+
+        Returns:
+            True if the feature was written (unsupported geometries and
+            duplicates are skipped)
+        """
+        if not feature or not feature.get("geometry"):
+            return False
+        collection_type = COLLECTION_TYPES.get(feature["geometry"].get("type"))
+        if collection_type is None:
+            return False
+
+        feature_id = feature.get("id")
+        if feature_id:
+            if feature_id in self._seen_ids:
+                self.duplicates += 1
+                return False
+            self._seen_ids.add(feature_id)
+
+        spool = self._spools.get(collection_type)
+        if spool is None:
+            spool = self._spools[collection_type] = _Spool()
+        spool.add(feature, self.max_sample_names)
+        return True
+
+    def count(self, collection_type: str) -> int:
+        spool = self._spools.get(collection_type)
+        return spool.count if spool else 0
+
+    @property
+    def total_count(self) -> int:
+        return sum(spool.count for spool in self._spools.values())
+
+    def discard(self, collection_type: str) -> None:
+        """Drop a collection (e.g. point noise next to lines and areas)."""
+        spool = self._spools.pop(collection_type, None)
+        if spool is not None:
+            spool.file.close()
+
+    def bbox_string(self, collection_type: str) -> Optional[str]:
+        spool = self._spools.get(collection_type)
+        if spool is None or spool.bounds is None:
+            return None
+        return bbox_to_wkt(*spool.bounds)
+
+    def sample_names(self, collection_type: str) -> List[str]:
+        spool = self._spools.get(collection_type)
+        return list(spool.sample_names) if spool else []
+
+    def store(self, collection_type: str, file_name: str) -> Tuple[str, str, str, int]:
+        """
+        Stream one collection into the file store.
+
+        Returns:
+            Tuple of (data_url, unique_id, sha256_hex, size_bytes)
+        """
+        spool = self._spools[collection_type]
+        digest = hashlib.sha256()
+        size = 0
+
+        def hashed_chunks() -> Iterator[bytes]:
+            nonlocal size
+            for chunk in spool.iter_collection():
+                digest.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+        data_url, unique_id = store_file_chunks(file_name, hashed_chunks())
+        return data_url, unique_id, digest.hexdigest(), size
+
+    def close(self) -> None:
+        for collection_type in list(self._spools):
+            self.discard(collection_type)
+        self._seen_ids.clear()
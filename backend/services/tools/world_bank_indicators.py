@@ -31,7 +31,7 @@ import logging
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-import requests
+import httpx
 from langchain_core.messages import ToolMessage
 from langchain_core.tools import tool
 from langchain_core.tools.base import InjectedToolCallId
@@ -41,6 +41,7 @@ from typing_extensions import Annotated
 
 from models.geodata import DataOrigin, DataType, GeoDataObject
 from models.states import GeoDataAgentState
+from services import http_client
 from services.storage.file_management import store_file
 
 logger = logging.getLogger(__name__)
@@ -168,7 +169,7 @@ def get_country_code(country_name: str) -> str:
     try:
         url = f"{WORLD_BANK_API_BASE}/country"
         params = {"format": "json", "per_page": 300}
-        response = requests.get(url, params=params, timeout=30)
+        response = http_client.get(url, params=params, timeout=30)
         response.raise_for_status()
 
         data = response.json()
@@ -216,7 +217,7 @@ def fetch_world_bank_indicator(
         params["date"] = f"{start_year}:{datetime.now().year}"
 
     try:
-        response = requests.get(url, params=params, timeout=60)
+        response = http_client.get(url, params=params, timeout=60)
 
         if response.status_code == 404:
             logger.warning(f"Indicator {indicator} not found for {country}")
@@ -236,10 +237,10 @@ def fetch_world_bank_indicator(
             "data": data[1],
         }
 
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         logger.error("World Bank API request timed out")
         return None
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"World Bank API request failed: {e}")
         return None
     except json.JSONDecodeError as e:
@@ -420,7 +421,7 @@ def create_indicators_geojson(
         }
         headers = {"User-Agent": "NaLaMap-OSINT/1.0"}
 
-        response = requests.get(url, params=params, headers=headers, timeout=30)
+        response = http_client.get(url, params=params, headers=headers, timeout=30)
         response.raise_for_status()
         data = response.json()
 
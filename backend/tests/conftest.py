@@ -318,3 +318,12 @@ async def async_client():
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as client:
         yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_agent_cache():
+    """Build agents from scratch in every test (tests patch the LLM and graph factories)."""
+    yield
+    single_agent = sys.modules.get("services.single_agent")
+    if single_agent is not None:
+        single_agent.clear_agent_cache()
@@ -0,0 +1,158 @@
+"""Tests for reuse of compiled agent graphs and LLM clients across requests."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from models.settings_model import MCPServer, ModelSettings, ToolConfig
+from models.states import ExecutionPlan, PlanStep
+from services import single_agent
+from services.ai.llm_config import ModelCapabilities
+from services.single_agent import create_geo_agent
+
+
+@pytest.fixture
+def factories(monkeypatch):
+    """Count LLM clients, compiled graphs and MCP loads."""
+    calls = {"llm": 0, "compile": [], "mcp": 0}
+
+    def get_llm_for_provider(provider_name, max_tokens=6000, model_name=None):
+        calls["llm"] += 1
+        return MagicMock(), ModelCapabilities(supports_parallel_tool_calls=True)
+
+    def create_react_agent(**kwargs):
+        calls["compile"].append(kwargs)
+        return MagicMock()
+
+    async def load_mcp_tools(server_url, api_key=None, headers=None):
+        calls["mcp"] += 1
+        return []
+
+    monkeypatch.setattr("services.ai.llm_config.get_llm_for_provider", get_llm_for_provider)
+    monkeypatch.setattr(single_agent, "create_react_agent", create_react_agent)
+    monkeypatch.setattr("services.mcp.integration.load_mcp_tools", load_mcp_tools)
+    return calls
+
+
+def _settings(**kwargs):
+    defaults = {
+        "model_provider": "openai",
+        "model_name": "gpt-5-mini",
+        "max_tokens": 4000,
+        "system_prompt": "You are a map assistant.",
+    }
+    return ModelSettings(**{**defaults, **kwargs})
+
+
+@pytest.mark.asyncio
+async def test_same_settings_reuse_the_compiled_graph(factories):
+    servers = [MCPServer(url="http://localhost:8001/mcp", api_key="secret")]
+
+    first, llm = await create_geo_agent(model_settings=_settings(), mcp_servers=servers)
+    second, llm2 = await create_geo_agent(
+        model_settings=_settings(), mcp_servers=servers, session_id="other"
+    )
+
+    assert second is first and llm2 is llm
+    assert factories["llm"] == 1
+    assert len(factories["compile"]) == 1
+    assert factories["mcp"] == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"model_settings": _settings(system_prompt="Other prompt.")},
+        {"selected_tools": [ToolConfig(name="metadata_search", enabled=True)]},
+        {"mcp_servers": [MCPServer(url="http://localhost:8001/mcp", api_key="rotated")]},
+        {"enable_parallel_tools": True},
+        {"system_prompt_addendum": "\nAnswer briefly."},
+    ],
+)
+async def test_changed_settings_compile_a_new_graph(factories, changes):
+    base = {
+        "model_settings": _settings(),
+        "mcp_servers": [MCPServer(url="http://localhost:8001/mcp", api_key="secret")],
+    }
+
+    first, _ = await create_geo_agent(**base)
+    second, _ = await create_geo_agent(**{**base, **changes})
+
+    assert second is not first
+    assert len(factories["compile"]) == 2
+    # The LLM client only depends on provider, model and max_tokens
+    assert factories["llm"] == 1
+
+
+@pytest.mark.asyncio
+async def test_plan_is_added_to_the_prompt_per_invocation(factories):
+    await create_geo_agent(model_settings=_settings())
+    prompt = factories["compile"][0]["prompt"]
+    plan = ExecutionPlan(
+        goal="Compare rivers",
+        steps=[
+            PlanStep(step_number=1, title="Geocode", description="Find the region"),
+            PlanStep(step_number=2, title="Fetch", description="Load rivers"),
+        ],
+        is_complex=True,
+    )
+    messages = [HumanMessage("Compare the rivers of Egypt and Sudan")]
+
+    without_plan = prompt({"messages": messages, "execution_plan": None})
+    with_plan = prompt({"messages": messages, "execution_plan": plan})
+
+    assert without_plan[0].content == "You are a map assistant."
+    assert with_plan[0].content.startswith("You are a map assistant.")
+    assert "EXECUTION PLAN" in with_plan[0].content
+    assert "Goal: Compare rivers" in with_plan[0].content
+    assert with_plan[1:] == messages
+    # Step statuses are read from the state on every call
+    plan.steps[0].status = "complete"
+    assert "[COMPLETE] Geocode" in prompt({"messages": messages, "execution_plan": plan})[0].content
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_graphs_are_evicted(factories, monkeypatch):
+    monkeypatch.setattr(single_agent, "AGENT_CACHE_SIZE", 2)
+    prompts = ["A", "B", "C"]
+
+    async def agent(prompt):
+        return (await create_geo_agent(model_settings=_settings(system_prompt=prompt)))[0]
+
+    agents = {p: await agent(p) for p in prompts}
+
+    # "A" was evicted when "C" was added, "C" is still cached
+    assert await agent("C") is agents["C"]
+    assert await agent("A") is not agents["A"]
+    assert len(factories["compile"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_expired_graphs_are_rebuilt(factories, monkeypatch):
+    first, _ = await create_geo_agent(model_settings=_settings())
+    monkeypatch.setattr(single_agent, "AGENT_CACHE_TTL", -1)
+
+    second, _ = await create_geo_agent(model_settings=_settings())
+
+    assert second is not first
+    assert factories["llm"] == 1
+
+
+@pytest.mark.asyncio
+async def test_dynamic_selections_share_graphs_per_tool_subset(factories, monkeypatch):
+    class Selector:
+        async def select_tools(self, query, tools_dict):
+            names = ["geocode_nominatim"] if "where" in query else ["metadata_search"]
+            return [tools_dict[name] for name in names if name in tools_dict]
+
+    monkeypatch.setattr("services.tool_selector.create_tool_selector", lambda **k: Selector())
+    settings = _settings(enable_dynamic_tools=True)
+
+    first, _ = await create_geo_agent(model_settings=settings, query="where is Paris")
+    second, _ = await create_geo_agent(model_settings=settings, query="where is Rome")
+    third, _ = await create_geo_agent(model_settings=settings, query="describe the layer")
+
+    assert second is first and third is not first
+    assert len(factories["compile"]) == 2
@@ -156,7 +156,7 @@ class TestUniqueValuesOperation:
 class TestFilterWhereOperation:
     """Test filter_where operation."""
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     @patch("services.tools.attribute_tool2._load_gdf")
     def test_filter_where_success(self, mock_load, mock_store, sample_gdf, mock_state):
         """Test successful filter_where operation."""
@@ -201,7 +201,7 @@ class TestFilterWhereOperation:
 class TestSelectFieldsOperation:
     """Test select_fields operation."""
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     @patch("services.tools.attribute_tool2._load_gdf")
     def test_select_fields_include(self, mock_load, mock_store, sample_gdf, mock_state):
         """Test select_fields with include parameter."""
@@ -225,7 +225,7 @@ class TestSelectFieldsOperation:
 class TestSortByOperation:
     """Test sort_by operation."""
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     @patch("services.tools.attribute_tool2._load_gdf")
     def test_sort_by_success(self, mock_load, mock_store, sample_gdf, mock_state):
         """Test successful sort_by operation."""
@@ -347,7 +347,7 @@ class TestErrorHandling:
 class TestIntegration:
     """Integration tests."""
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     @patch("services.tools.attribute_tool2._load_gdf")
     def test_workflow_explore_then_filter(self, mock_load, mock_store, sample_gdf, mock_state):
         """Test a complete workflow."""
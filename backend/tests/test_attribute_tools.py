@@ -103,7 +103,7 @@ class TestFeatureCollectionConversion:
 class TestSaveGdfAsGeoJSON:
     """Test saving GeoDataFrame as GeoJSON using central file management."""
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     def test_save_gdf_as_geojson_local(self, mock_store_file, sample_gdf):
         """Test saving GeoDataFrame to local storage."""
         mock_store_file.return_value = (
@@ -113,12 +113,12 @@ class TestSaveGdfAsGeoJSON:
 
         result = _save_gdf_as_geojson(sample_gdf, "Test Result", keep_geometry=True)
 
-        # Verify store_file was called
+        # Verify store_file_chunks was called
         assert mock_store_file.called
         call_args = mock_store_file.call_args
-        filename, content = call_args[0]
+        filename, chunks = call_args[0]
         assert filename.endswith(".geojson")
-        assert isinstance(content, bytes)
+        content = b"".join(chunks)
 
         # Verify the content is valid GeoJSON
         fc = json.loads(content.decode("utf-8"))
@@ -131,7 +131,7 @@ class TestSaveGdfAsGeoJSON:
         assert result.title == "Test Result"
         assert result.data_link == "http://localhost:8000/api/stream/test_123.geojson"
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     def test_save_gdf_without_geometry(self, mock_store_file, sample_gdf):
         """Test saving GeoDataFrame without geometry."""
         mock_store_file.return_value = (
@@ -142,7 +142,7 @@ class TestSaveGdfAsGeoJSON:
         _save_gdf_as_geojson(sample_gdf, "No Geometry", keep_geometry=False)
 
         call_args = mock_store_file.call_args
-        content = call_args[0][1]
+        content = b"".join(call_args[0][1])
         fc = json.loads(content.decode("utf-8"))
 
         # Verify geometry is None in all features
@@ -187,6 +187,15 @@ class TestLoadGdf:
         assert len(gdf) == 4
         assert list(gdf["name"]) == ["Feature A", "Feature B", "Feature C", "Feature D"]
 
+    def test_load_from_upload_dir_by_filename(self, tmp_path, sample_gdf):
+        """Links that aren't upload URLs resolve by file name in the upload directory."""
+        sample_gdf.to_file(tmp_path / "abc_layer.geojson", driver="GeoJSON")
+
+        with patch("services.tools.attribute_tools.LOCAL_UPLOAD_DIR", str(tmp_path)):
+            gdf = _load_gdf("http://other-host:8000/files/abc_layer.geojson")
+
+        assert len(gdf) == 4
+
 
 class TestListFieldsGdf:
     """Test listing fields operation."""
@@ -590,7 +599,7 @@ class TestAttributeToolIntegration:
         assert len(result) == 4
         assert suggestions == {}
 
-    @patch("services.tools.attribute_tools.store_file")
+    @patch("services.tools.attribute_tools.store_file_chunks")
     def test_save_filtered_layer_with_proper_title(self, mock_store_file, sample_gdf):
         """Test that filtered layers get proper titles."""
         mock_store_file.return_value = (
@@ -0,0 +1,200 @@
+import json
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+from models.geodata import DataOrigin, DataType, GeoDataObject
+from services.storage import indexed_layers
+from services.storage.geojson_writer import gdf_to_geojson_bytes, iter_batched_feature_collection
+from services.tools import attribute_tools
+from services.tools.attribute_tool2 import attribute_tool2
+from services.tools.attributes import chunked
+from services.tools.attributes.chunked import (
+    BatchCounter,
+    filter_batches,
+    peek_batches,
+    sort_batches,
+)
+
+BASE_URL = "http://testserver"
+
+
+def _towns(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    pop = rng.integers(0, 40, n).astype(float)
+    pop[rng.random(n) < 0.1] = np.nan
+    return gpd.GeoDataFrame(
+        {
+            "name": [f"town {i}" for i in range(n)],
+            "region": rng.choice(["north", "south", "east", None], n),
+            "pop": pop,
+        },
+        geometry=[Point(i % 25, i // 25) for i in range(n)],
+        crs="EPSG:4326",
+    )
+
+
+def _batches(gdf, size):
+    return (gdf.iloc[start : start + size] for start in range(0, len(gdf), size))
+
+
+@pytest.mark.parametrize("ascending", [[True, True], [False, True], [True, False]])
+@pytest.mark.parametrize("batch_size", [37, 120, 500])
+def test_sort_matches_in_memory_sort(monkeypatch, tmp_path, ascending, batch_size):
+    # Small blocks, so runs are read in several steps
+    monkeypatch.setattr(chunked, "MERGE_BLOCK_FEATURES", 8)
+    towns = _towns()
+
+    batches = list(
+        sort_batches(_batches(towns, batch_size), ["pop", "region"], ascending, tmp_path)
+    )
+    result = pd.concat(batches)
+
+    expected = towns.sort_values(["pop", "region"], ascending=ascending, na_position="last")
+    assert sorted(result["name"]) == sorted(towns["name"])
+    pd.testing.assert_frame_equal(
+        result[["pop", "region"]].reset_index(drop=True),
+        expected[["pop", "region"]].reset_index(drop=True),
+    )
+    assert isinstance(result, gpd.GeoDataFrame) and result.crs == towns.crs
+    # Runs are removed once merged
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sort_keeps_memory_to_blocks(monkeypatch, tmp_path):
+    monkeypatch.setattr(chunked, "MERGE_BLOCK_FEATURES", 10)
+    towns = _towns(1000)
+
+    sizes = [len(b) for b in sort_batches(_batches(towns, 100), ["name"], [True], tmp_path)]
+
+    # Ten runs of 100 rows, merged 10 rows per run at a time
+    assert sum(sizes) == 1000 and max(sizes) <= 200
+
+
+def test_filter_peek_and_count():
+    towns = _towns()
+    suggestions = {}
+
+    first, batches = peek_batches(filter_batches(_batches(towns, 50), "popp >= 30", suggestions))
+    counter = BatchCounter(batches)
+    result = pd.concat(list(counter))
+
+    assert suggestions == {"popp": "pop"}
+    expected = towns[towns["pop"] >= 30]
+    assert counter.count == len(expected)
+    assert list(result["name"]) == list(expected["name"])
+    assert first.equals(result.iloc[: len(first)])
+    assert peek_batches(filter_batches(_batches(towns, 50), "pop > 100"))[0] is None
+
+
+def test_batched_feature_collection_is_one_document():
+    towns = _towns(30)
+    frames = [towns.iloc[:0], towns.iloc[:10], towns.iloc[10:10], towns.iloc[10:]]
+
+    document = b"".join(iter_batched_feature_collection(iter(frames)))
+
+    assert json.loads(document) == json.loads(gdf_to_geojson_bytes(towns))
+    assert json.loads(b"".join(iter_batched_feature_collection([])))["features"] == []
+
+
+@pytest.fixture
+def large_upload(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    path = upload_dir / "towns.geojson"
+    _towns().to_file(path, driver="GeoJSON")
+    indexed_layers.build_indexed_copy(path)
+
+    monkeypatch.setattr(attribute_tools, "LOCAL_UPLOAD_DIR", str(upload_dir))
+    monkeypatch.setattr(attribute_tools, "BASE_URL", BASE_URL)
+    monkeypatch.setattr(attribute_tools, "ATTRIBUTE_CHUNKED_MIN_SIZE", 0)
+    monkeypatch.setattr(attribute_tools, "ATTRIBUTE_CHUNK_FEATURES", 64)
+    monkeypatch.setattr(chunked, "MERGE_BLOCK_FEATURES", 16)
+
+    def no_full_load(*args, **kwargs):
+        raise AssertionError("layer loaded whole")
+
+    monkeypatch.setattr(attribute_tools, "_load_gdf", no_full_load)
+    monkeypatch.setattr("services.tools.attribute_tool2._load_gdf", no_full_load)
+    monkeypatch.setattr(
+        "services.tools.attribute_tool2._generate_smart_layer_name", lambda **k: "Result"
+    )
+    stored = {}
+
+    def store(filename, chunks):
+        stored[filename] = b"".join(chunks)
+        return f"{BASE_URL}/api/stream/{filename}", filename
+
+    monkeypatch.setattr(attribute_tools, "store_file_chunks", store)
+    layer = GeoDataObject(
+        id="1",
+        data_source_id="upload",
+        data_type=DataType.UPLOADED,
+        data_origin=DataOrigin.UPLOAD.value,
+        data_source="upload",
+        data_link=f"{BASE_URL}/uploads/towns.geojson",
+        name="towns",
+    )
+    return layer, stored
+
+
+def _run(layer, **kwargs):
+    command = attribute_tool2.func(
+        state={"messages": [], "geodata_layers": [layer], "geodata_results": []},
+        tool_call_id="call-1",
+        target_layer_name="towns",
+        **kwargs,
+    )
+    return command.update
+
+
+def _features(stored):
+    (document,) = stored.values()
+    return [f["properties"] for f in json.loads(document)["features"]]
+
+
+def test_iter_layer_batches_reads_every_feature(large_upload):
+    layer, _ = large_upload
+    path = attribute_tools._local_file(layer.data_link)
+
+    sizes = [len(b) for b in indexed_layers.iter_layer_batches(path, 64)]
+
+    assert sum(sizes) == 500 and max(sizes) == 64
+    assert indexed_layers.indexed_schema(path) == {
+        "fields": ["name", "region", "pop"],
+        "features": 500,
+    }
+
+
+def test_filter_streams_large_layers(large_upload):
+    layer, stored = large_upload
+
+    update = _run(layer, operation="filter_where", where="pop >= 35")
+
+    expected = _towns().query("pop >= 35")
+    assert sorted(p["name"] for p in _features(stored)) == sorted(expected["name"])
+    message = update["messages"][0].content
+    assert f"Result contains {len(expected)} feature(s) out of 500" in message
+    assert f"Result contains {len(expected)} feature(s)" in update["geodata_results"][0].description
+
+
+def test_sort_and_select_stream_large_layers(large_upload):
+    layer, stored = large_upload
+
+    _run(layer, operation="sort_by", sort_fields=[{"field": "pop", "direction": "desc"}])
+    pops = [p["pop"] for p in _features(stored)]
+    assert len(pops) == 500
+    present = [p for p in pops if p is not None]
+    assert present == sorted(present, reverse=True) and pops[len(present) :] == [None] * (
+        500 - len(present)
+    )
+
+    stored.clear()
+    _run(layer, operation="select_fields", include_fields=["name"])
+    assert all(set(p) == {"name"} for p in _features(stored))
+
+    update = _run(layer, operation="sort_by", sort_fields=[{"field": "area", "direction": "asc"}])
+    assert "Unknown fields in sort_by: ['area']" in update["messages"][0].content
@@ -0,0 +1,180 @@
+import gzip
+import io
+import json
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import file_streaming
+from services.background_tasks import TaskPriority
+from services.compression import gzip_utils, variants
+from services.storage import file_management, sidecars
+
+CONTENT = json.dumps(
+    {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "properties": {"id": i, "name": f"river {i % 7}"}}
+            for i in range(500)
+        ],
+    }
+).encode()
+
+
+class _RecordingTaskManager:
+    def __init__(self):
+        self.calls = []
+
+    def submit_task(self, func, *args, priority=None, **kwargs):
+        self.calls.append((func, args, priority))
+
+
+@pytest.fixture
+def task_manager(monkeypatch):
+    manager = _RecordingTaskManager()
+    monkeypatch.setattr(sidecars, "get_task_manager", lambda: manager)
+    monkeypatch.setattr(variants, "MIN_COMPRESSION_SIZE", 1000)
+    variants._precompression.clear()
+    yield manager
+    variants._precompression.clear()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(file_streaming, "LOCAL_UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(gzip_utils, "LOCAL_UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(file_management, "LOCAL_UPLOAD_DIR", str(uploads))
+    return uploads
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("gzip, deflate, br, zstd", "br"),
+        ("gzip, zstd", "zstd"),
+        ("gzip;q=1.0, zstd;q=0.5", "gzip"),
+        ("br;q=0, *", "zstd"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_negotiate_encoding(header, expected):
+    available = {"br": "a.br", "zstd": "a.zst", "gzip": "a.gz"}
+    assert variants.negotiate_encoding(header, available) == expected
+
+
+def test_negotiate_encoding_only_picks_ready_variants():
+    assert variants.negotiate_encoding("br, gzip", {"gzip": "a.gz"}) == "gzip"
+    assert variants.negotiate_encoding("br", {"gzip": "a.gz"}) is None
+
+
+def test_precompress_writes_variants_and_manifest(tmp_path, task_manager):
+    path = tmp_path / "layer.geojson"
+    path.write_bytes(CONTENT)
+
+    ready = variants.precompress(path)
+
+    expected = {"gzip"} | ({"zstd"} if variants.ZSTD_AVAILABLE else set())
+    expected |= {"br"} if variants.BROTLI_AVAILABLE else set()
+    assert set(ready) == expected
+    assert gzip.decompress(ready["gzip"].read_bytes()) == CONTENT
+    assert gzip_utils.load_gzip_index(ready["gzip"]) is not None
+    if "zstd" in ready:
+        import zstandard
+
+        assert zstandard.ZstdDecompressor().decompress(ready["zstd"].read_bytes()) == CONTENT
+
+    manifest = json.loads(variants.get_manifest_path(path).read_text())
+    assert manifest["complete"] is True
+    # Complete variants are not scheduled again
+    assert variants.schedule_precompression(path) is False
+
+    # A new version of the file invalidates its variants
+    path.write_bytes(CONTENT + b" ")
+    os.utime(path, ns=(1, 1))
+    assert variants.ready_variants(path) == {}
+    assert variants.schedule_precompression(path) is True
+
+
+def test_precompress_drops_variants_that_do_not_shrink(tmp_path, task_manager):
+    path = tmp_path / "noise.json"
+    path.write_bytes(os.urandom(5000))
+
+    assert variants.precompress(path) == {}
+    assert not variants.get_variant_path(path, "gzip").exists()
+    assert json.loads(variants.get_manifest_path(path).read_text())["complete"] is True
+
+
+def test_schedule_precompression_filters_and_dedupes(tmp_path, task_manager):
+    small = tmp_path / "small.geojson"
+    small.write_bytes(b"{}")
+    binary = tmp_path / "image.tif"
+    binary.write_bytes(CONTENT)
+    layer = tmp_path / "layer.geojson"
+    layer.write_bytes(CONTENT)
+
+    assert variants.schedule_precompression(small) is False
+    assert variants.schedule_precompression(binary) is False
+    assert variants.schedule_precompression(layer) is True
+    assert variants.schedule_precompression(layer) is False
+
+    func, args, priority = task_manager.calls[0]
+    assert len(task_manager.calls) == 1
+    assert priority == TaskPriority.LOW
+
+    # Once the task has run, the file may be scheduled again if it changes
+    func(*args)
+    assert variants.ready_variants(layer)
+    assert variants._precompression.in_flight() == 0
+
+
+def test_store_file_stream_schedules_precompression(upload_dir, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(file_management, "schedule_precompression", scheduled.append)
+
+    url, unique_name = file_management.store_file_stream("layer.geojson", io.BytesIO(CONTENT))
+
+    assert scheduled == [upload_dir / unique_name]
+    assert (upload_dir / unique_name).read_bytes() == CONTENT
+
+
+def test_stream_serves_uncompressed_until_variants_are_ready(upload_dir, task_manager):
+    client = TestClient(_app())
+    path = upload_dir / "layer.geojson"
+    path.write_bytes(CONTENT)
+
+    response = client.get("/stream/layer.geojson", headers={"Accept-Encoding": "gzip, zstd"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.content == CONTENT
+    assert len(task_manager.calls) == 1
+
+    variants.precompress(path)
+
+    response = client.get("/stream/layer.geojson", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.content == CONTENT
+
+    if variants.ZSTD_AVAILABLE:
+        response = client.get("/stream/layer.geojson", headers={"Accept-Encoding": "gzip, zstd"})
+        assert response.headers["Content-Encoding"] == "zstd"
+        assert response.content == CONTENT
+
+    # Ranges are always served from the uncompressed file
+    response = client.get(
+        "/stream/layer.geojson", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"}
+    )
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.content == CONTENT[:10]
+
+
+def _app():
+    app = FastAPI()
+    app.include_router(file_streaming.router)
+    return app
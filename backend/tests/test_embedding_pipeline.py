@@ -0,0 +1,262 @@
+"""Tests for the batched, resumable GeoServer layer embedding pipeline."""
+
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from models.geodata import DataOrigin, DataType, GeoDataObject
+from services.tools.geoserver import vector_store as vs
+
+
+def make_layer(layer_id: str) -> GeoDataObject:
+    return GeoDataObject(
+        id=layer_id,
+        data_source_id="test-catalog",
+        data_type=DataType.LAYER,
+        data_origin=DataOrigin.TOOL,
+        data_source="TestGeoServer",
+        data_link=f"https://example.com/geoserver/{layer_id}",
+        name=f"layer_{layer_id}",
+        title=f"Layer {layer_id}",
+    )
+
+
+class CountingEmbeddings(Embeddings):
+    """Records batches; optionally fails on a given call to simulate a crash."""
+
+    def __init__(self, fail_on_call=None):
+        self.batches = []
+        self.fail_on_call = fail_on_call
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            call = len(self.batches)
+        if call == self.fail_on_call:
+            raise RuntimeError("embedding service unavailable")
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0, 0.0]
+
+
+@pytest.fixture
+def sqlite_store(tmp_path, monkeypatch):
+    """A plain-sqlite stand-in for the SQLiteVec tables (no vec0 extension needed)."""
+    vs.reset_vector_store_for_tests()
+    conn = sqlite3.connect(str(tmp_path / "vectors.db"), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        f"CREATE TABLE {vs._VECTOR_TABLE} "
+        "(rowid INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT, metadata BLOB, text_embedding BLOB)"
+    )
+    conn.execute(f"CREATE TABLE {vs._VECTOR_TABLE}_vec (rowid INTEGER PRIMARY KEY)")
+    vs._create_support_tables(conn)
+    conn.commit()
+    monkeypatch.setattr(vs, "get_vector_store", lambda: SimpleNamespace(_connection=conn))
+    monkeypatch.setattr(vs, "GEOSERVER_EMBEDDING_BATCH_SIZE", 4)
+    monkeypatch.setattr(vs, "GEOSERVER_EMBEDDING_PARALLEL_BATCHES", 2)
+    yield conn
+    conn.close()
+    vs.reset_vector_store_for_tests()
+
+
+def _row_count(conn):
+    return conn.execute(f"SELECT count(*) FROM {vs._MEMBER_TABLE}").fetchone()[0]
+
+
+def test_batches_are_committed_and_progress_completes(sqlite_store, monkeypatch):
+    model = CountingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", model)
+    layers = [make_layer(str(i)) for i in range(10)]
+
+    assert vs.store_layers("s1", "https://example.com/geoserver/", "Example", layers) == 10
+
+    assert sorted(len(batch) for batch in model.batches) == [2, 4, 4]
+    assert _row_count(sqlite_store) == 10
+    status = vs.get_embedding_status("s1", ["https://example.com/geoserver"])
+    assert status["https://example.com/geoserver"]["encoded"] == 10
+    # Checkpoints are removed once the run finishes
+    assert sqlite_store.execute(f"SELECT count(*) FROM {vs._CHECKPOINT_TABLE}").fetchone()[0] == 0
+
+
+def test_interrupted_run_resumes_from_committed_batches(sqlite_store, monkeypatch):
+    layers = [make_layer(str(i)) for i in range(12)]
+    backend = "https://example.com/geoserver"
+
+    # Batches are committed in order, so a failure in batch 3 keeps batches 1-2
+    monkeypatch.setattr(vs, "GEOSERVER_EMBEDDING_PARALLEL_BATCHES", 1)
+    monkeypatch.setattr(vs, "_embedding_model", CountingEmbeddings(fail_on_call=3))
+    with pytest.raises(RuntimeError):
+        vs.store_layers("s1", backend, "Example", layers, replace=True)
+    assert _row_count(sqlite_store) == 8
+
+    resumed = CountingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", resumed)
+    assert vs.store_layers("s1", backend, "Example", layers, replace=True) == 12
+
+    assert [len(batch) for batch in resumed.batches] == [4]
+    assert _row_count(sqlite_store) == 12
+    assert vs.get_embedding_status("s1", [backend])[backend]["encoded"] == 12
+
+    # A completed run leaves nothing to resume: replacing rewrites the rows,
+    # but every vector comes from the embedding cache
+    again = CountingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", again)
+    vs.store_layers("s1", backend, "Example", layers, replace=True)
+    assert again.batches == []
+    assert _row_count(sqlite_store) == 12
+
+
+def test_embed_batches_runs_inline_when_pool_is_busy(monkeypatch):
+    model = CountingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", model)
+
+    class NeverStarts:
+        def submit_task(self, func, *args, **kwargs):
+            return SimpleNamespace(cancel=lambda: True)
+
+    monkeypatch.setattr(vs, "get_task_manager", lambda: NeverStarts())
+    results = list(vs._embed_batches([(0, ["a", "bb"]), (1, []), (2, ["ccc"])]))
+    assert [index for index, _, _ in results] == [0, 1, 2]
+    assert results[1][2] == []
+    assert results[2][2] == [[3.0, 1.0, 0.0]]
+    assert model.batches == [["a", "bb"], ["ccc"]]
+
+
+def _vector_count(conn, shared_only=False):
+    where = " WHERE json_extract(metadata, '$.embedding_model') IS NOT NULL" if shared_only else ""
+    return conn.execute(f"SELECT count(*) FROM {vs._VECTOR_TABLE}{where}").fetchone()[0]
+
+
+def test_identical_layers_share_cached_vectors(sqlite_store, monkeypatch):
+    model = CountingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", model)
+    # Two layers with the same text inside one run, then the same backend for another session
+    layers = [make_layer(str(i)) for i in range(6)] + [make_layer("0")]
+
+    vs.store_layers("s1", "https://a.example.com/geoserver", "A", layers)
+    vs.store_layers("s2", "https://b.example.com/geoserver", "B", layers)
+
+    assert sum(len(batch) for batch in model.batches) == 6
+    # One vector per distinct text; the 14 layer rows point at them
+    assert _vector_count(sqlite_store) == 6
+    assert _row_count(sqlite_store) == 14
+
+    vectors, stored = vs._sqlite_partition(sqlite_store, "s2", "https://b.example.com/geoserver")
+    assert [layer.id for layer in stored] == [layer.id for layer in layers]
+    expected = model.embed_documents([vs._layer_to_text(layer) for layer in layers])
+    assert [list(vector) for vector in vectors] == expected
+
+
+def test_cache_is_keyed_on_the_embedding_model(sqlite_store, monkeypatch):
+    class OtherEmbeddings(CountingEmbeddings):
+        model_id = "other-model"
+
+    layers = [make_layer(str(i)) for i in range(3)]
+    monkeypatch.setattr(vs, "_embedding_model", CountingEmbeddings())
+    vs.store_layers("s1", "https://example.com/geoserver", "Example", layers)
+
+    other = OtherEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", other)
+    vs.store_layers("s2", "https://example.com/geoserver", "Example", layers)
+
+    assert sum(len(batch) for batch in other.batches) == 3
+    assert _vector_count(sqlite_store) == 6
+
+
+def test_vectors_are_stored_inline_when_the_model_falls_back(sqlite_store, monkeypatch):
+    class FallingBack(CountingEmbeddings):
+        model_id = "primary"
+
+        def embed_documents(self, texts):
+            self.model_id = "fallback"
+            return super().embed_documents(texts)
+
+    monkeypatch.setattr(vs, "_embedding_model", FallingBack())
+    vs.store_layers("s1", "https://example.com/geoserver", "Example", [make_layer("1")])
+
+    assert _vector_count(sqlite_store, shared_only=True) == 0
+    vectors, _ = vs._sqlite_partition(sqlite_store, "s1", "https://example.com/geoserver")
+    assert len(vectors) == 1
+
+    # The unshared vector goes with its layer
+    vs.delete_layers("s1", ["https://example.com/geoserver"])
+    assert _vector_count(sqlite_store) == 0
+
+
+def test_deleting_a_session_keeps_shared_vectors(sqlite_store, monkeypatch):
+    model = CountingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", model)
+    layers = [make_layer(str(i)) for i in range(3)]
+    vs.store_layers("s1", "https://example.com/geoserver", "Example", layers)
+
+    vs.delete_layers("s1", ["https://example.com/geoserver"])
+    assert _row_count(sqlite_store) == 0
+    assert _vector_count(sqlite_store) == 3
+
+    vs.store_layers("s2", "https://example.com/geoserver", "Example", layers)
+    assert len(model.batches) == 1
+    assert vs.list_layers("s2", ["https://example.com/geoserver"], 10)[0].id == "2"
+
+
+def test_hashing_embeddings_observe_cache_hits(monkeypatch):
+    vs.reset_vector_store_for_tests()
+    monkeypatch.setattr(vs, "_use_fallback_store", True, raising=False)
+    model = vs._HashingEmbeddings()
+    monkeypatch.setattr(vs, "_embedding_model", model)
+    layers = [make_layer(str(i)) for i in range(3)]
+
+    vs.store_layers("s1", "https://example.com/geoserver", "Example", layers)
+    vs.store_layers("s2", "https://example.com/geoserver", "Example", layers)
+
+    # Both sessions count towards IDF statistics, as if embedded twice
+    assert model._total_docs == 6
+    first, second = vs._fallback_documents[0], vs._fallback_documents[3]
+    assert first["vector"] is second["vector"]
+    vs.reset_vector_store_for_tests()
+
+
+@pytest.fixture
+def sqlite_vec_store(tmp_path, monkeypatch):
+    """A real SQLiteVec store; skipped when the vec0 extension can't be loaded."""
+    sqlite_vec = pytest.importorskip("sqlite_vec")
+    from langchain_community.vectorstores import SQLiteVec
+
+    vs.reset_vector_store_for_tests()
+    conn = sqlite3.connect(str(tmp_path / "vectors.db"), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.enable_load_extension(True)
+        sqlite_vec.load(conn)
+        conn.enable_load_extension(False)
+    except (AttributeError, sqlite3.OperationalError) as exc:
+        conn.close()
+        pytest.skip(f"sqlite-vec extension can't be loaded: {exc}")
+    store = SQLiteVec(table=vs._VECTOR_TABLE, connection=conn, embedding=CountingEmbeddings())
+    vs._create_support_tables(conn)
+    monkeypatch.setattr(vs, "get_vector_store", lambda: store)
+    monkeypatch.setattr(vs, "_embedding_model", CountingEmbeddings())
+    monkeypatch.setattr(vs, "GEOSERVER_EMBEDDING_BATCH_SIZE", 4)
+    yield conn
+    conn.close()
+    vs.reset_vector_store_for_tests()
+
+
+def test_cached_vectors_are_accepted_by_sqlite_vec(sqlite_vec_store):
+    layers = [make_layer(str(i)) for i in range(6)]
+
+    vs.store_layers("s1", "https://a.example.com/geoserver", "A", layers)
+    # The second session reuses the vectors stored by the first
+    vs.store_layers("s2", "https://b.example.com/geoserver", "B", layers)
+
+    # Both sessions share one vec0 row per layer text
+    assert _row_count(sqlite_vec_store) == 12
+    vec_rows = sqlite_vec_store.execute(f"SELECT count(*) FROM {vs._VECTOR_TABLE}_vec")
+    assert vec_rows.fetchone()[0] == 6
+    results = vs.similarity_search("s2", ["https://b.example.com/geoserver"], "Layer 3", 6)
+    assert sorted(layer.id for layer, _ in results) == [str(i) for i in range(6)]
@@ -0,0 +1,217 @@
+import json
+import os
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Point
+
+from models.geodata import DataOrigin, DataType, GeoDataObject
+from services.storage import field_index
+from services.storage.field_index import (
+    HyperLogLog,
+    compute_field_index,
+    field_entry,
+    field_summaries,
+    find_field_index,
+    get_field_index,
+    get_index_path,
+)
+from services.tools import attribute_tools
+from services.tools.attribute_tools import (
+    list_fields_gdf,
+    list_fields_index,
+    schema_context_from_index,
+    summarize_gdf,
+    summarize_index,
+    unique_values_gdf,
+    unique_values_index,
+)
+
+BASE_URL = "http://testserver"
+
+
+@pytest.fixture(autouse=True)
+def fresh_memory():
+    field_index.clear_field_index_cache()
+    yield
+    field_index.clear_field_index_cache()
+
+
+@pytest.fixture
+def towns():
+    n = 300
+    return gpd.GeoDataFrame(
+        {
+            "name": [f"town {i}" for i in range(n)],
+            "kind": ["city" if i % 3 == 0 else "village" for i in range(n)],
+            "pop": [float(i * 10) if i % 50 else None for i in range(n)],
+            "code": [i % 4 for i in range(n)],
+            "capital": [i == 0 for i in range(n)],
+        },
+        geometry=[Point(i % 10, i // 10) for i in range(n)],
+        crs="EPSG:4326",
+    )
+
+
+def test_hyperloglog_estimates_distinct_counts():
+    rng = np.random.default_rng(0)
+    for n in (10, 1000, 200_000):
+        sketch = HyperLogLog()
+        values = rng.integers(0, 2**62, size=n)
+        sketch.add_values(np.concatenate([values, values[: n // 2]]))
+        assert abs(sketch.estimate() - n) <= max(2, 0.05 * n)
+
+
+def test_index_records_every_field(towns):
+    index = compute_field_index(towns)
+
+    assert index["row_count"] == 300
+    assert index["geometry_column"] == "geometry"
+    assert [f["name"] for f in index["fields"]] == ["name", "kind", "pop", "code", "capital"]
+
+    pop = field_entry(index, "pop")
+    assert pop["null_count"] == 6 and pop["count"] == 294
+    assert pop["min"] == 10.0 and pop["max"] == 2990.0
+    assert pop["p50"] == pytest.approx(towns["pop"].median())
+    assert pop["distinct"] == pytest.approx(294, rel=0.05)
+    assert "top_values" not in pop
+
+    kind = field_entry(index, "kind")
+    assert kind["distinct"] == 2 and kind["top_values_complete"]
+    assert kind["top_values"] == [
+        {"value": "village", "count": 200},
+        {"value": "city", "count": 100},
+    ]
+
+    name = field_entry(index, "name")
+    assert name["distinct"] == 300 and not name["top_values_complete"]
+    assert len(name["top_values"]) == field_index.FIELD_INDEX_TOP_K
+
+    # Low-cardinality numeric codes are counted exactly
+    assert field_entry(index, "code")["distinct"] == 4
+    assert field_entry(index, "code")["top_values_complete"]
+    assert "min" not in field_entry(index, "capital")
+    json.dumps(index)
+
+
+def test_index_answers_match_the_frame(towns):
+    index = compute_field_index(towns)
+
+    assert summarize_index(index, ["pop", "code"]) == summarize_gdf(towns, ["pop", "code"])
+    assert unique_values_index(index, "kind") == unique_values_gdf(towns, "kind")
+    assert unique_values_index(index, "name", 5) == unique_values_gdf(towns, "name", 5)
+    listed = list_fields_index(index)
+    expected = list_fields_gdf(towns)
+    assert [(f["name"], f["type"], f["null_count"]) for f in listed["fields"]] == [
+        (f["name"], f["type"], f["null_count"]) for f in expected["fields"]
+    ]
+    assert listed["row_count"] == 300
+
+    # Questions the index can't answer exactly are left to the frame
+    assert unique_values_index(index, "name") is None
+    assert unique_values_index(index, "pop") is None
+    assert summarize_index(index, ["kind"]) is None
+    assert summarize_index(index, ["missing"]) is None
+
+
+def test_schema_context_and_summaries_cover_all_rows(towns):
+    index = compute_field_index(towns)
+
+    ctx = schema_context_from_index(index)
+    columns = {c["name"]: c for c in ctx["columns"]}
+    assert ctx["row_count"] == 300
+    assert columns["pop"]["max"] == 2990.0
+    assert columns["kind"]["top_values"] == ["village", "city"]
+    assert columns["geometry"] == {"name": "geometry", "type": "geometry"}
+
+    summaries = {s["name"]: s for s in field_summaries(index)}
+    assert summaries["pop"]["range"] == [10.0, 2990.0]
+    assert summaries["kind"]["top_values"] == ["village", "city"]
+
+
+def test_local_indexes_follow_the_file_version(tmp_path, towns, monkeypatch):
+    path = tmp_path / "towns.geojson"
+    towns.to_file(path, driver="GeoJSON")
+    computed = []
+    original = field_index.compute_field_index
+    monkeypatch.setattr(
+        field_index, "compute_field_index", lambda gdf: computed.append(1) or original(gdf)
+    )
+
+    assert find_field_index(path) is None
+    index = get_field_index(towns, file_path=path)
+    assert get_index_path(path).exists()
+
+    # Served from memory, then from the sidecar after a restart
+    assert get_field_index(towns, file_path=path) is index
+    field_index.clear_field_index_cache()
+    assert find_field_index(path)["row_count"] == 300
+    assert len(computed) == 1
+
+    # A changed file invalidates the index
+    towns.iloc[:10].to_file(path, driver="GeoJSON")
+    os.utime(path, ns=(1, 1))
+    assert find_field_index(path) is None
+    assert get_field_index(towns.iloc[:10], file_path=path)["row_count"] == 10
+    assert len(computed) == 2
+
+
+def test_remote_indexes_are_keyed_by_content_hash(towns):
+    assert find_field_index(version="abc") is None
+    index = get_field_index(towns, version="abc")
+    assert find_field_index(version="abc") is index
+    assert find_field_index(version="def") is None
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch, towns):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    towns.to_file(upload_dir / "towns.geojson", driver="GeoJSON")
+    monkeypatch.setattr(attribute_tools, "LOCAL_UPLOAD_DIR", str(upload_dir))
+    monkeypatch.setattr(attribute_tools, "BASE_URL", BASE_URL)
+    monkeypatch.setattr(attribute_tools, "local_upload_path", lambda link: None)
+    monkeypatch.setattr(attribute_tools, "_get_llm_from_options", lambda state: None)
+    return GeoDataObject(
+        id="1",
+        data_source_id="upload",
+        data_type=DataType.UPLOADED,
+        data_origin=DataOrigin.UPLOAD.value,
+        data_source="upload",
+        data_link=f"{BASE_URL}/uploads/towns.geojson",
+        name="towns",
+    )
+
+
+def test_attribute_tool_answers_from_the_index(upload, monkeypatch):
+    plans = []
+
+    def plan(query, layer_meta, schema_context, llm=None):
+        plans.append(schema_context)
+        return {"operation": "unique_values", "params": {"field": "kind"}}
+
+    monkeypatch.setattr(attribute_tools, "attribute_plan_from_prompt", plan)
+    computed = []
+    original = field_index.compute_field_index
+    monkeypatch.setattr(
+        field_index, "compute_field_index", lambda gdf: computed.append(1) or original(gdf)
+    )
+
+    results = []
+    for _ in range(2):
+        command = attribute_tools.attribute_tool.func(
+            state={"messages": [], "geodata_layers": [upload]}, tool_call_id="call-1"
+        )
+        results.append(json.loads(command.update["messages"][0].content)["result"])
+
+    assert len(computed) == 1
+    assert results[0] == results[1]
+    assert results[0]["values"] == [
+        {"value": "village", "count": 200},
+        {"value": "city", "count": 100},
+    ]
+    # The first plan saw the first rows, the second the whole layer
+    kinds = [{c["name"]: c for c in ctx["columns"]}["kind"] for ctx in plans]
+    assert "distinct" not in kinds[0]
+    assert kinds[1]["distinct"] == 2
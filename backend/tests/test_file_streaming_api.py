@@ -1,4 +1,7 @@
+import gzip
 import json
+import random
+import threading
 
 import pytest
 from fastapi import FastAPI, HTTPException
@@ -75,3 +78,130 @@ def test_head_file_returns_metadata(file_streaming_client, upload_dir):
     assert response.headers["Content-Type"] == "application/geo+json"
     assert response.headers["Content-Length"] == str(geojson.stat().st_size)
     assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def _multipart_parts(response):
+    boundary = response.headers["Content-Type"].split("boundary=")[1]
+    parts = []
+    for part in response.content.split(f"--{boundary}".encode())[1:-1]:
+        head, _, body = part.partition(b"\r\n\r\n")
+        content_range = [
+            line.split(b": ")[1].decode()
+            for line in head.split(b"\r\n")
+            if line.startswith(b"Content-Range")
+        ][0]
+        parts.append((content_range, body[:-2]))
+    return parts
+
+
+def test_stream_file_supports_multiple_ranges(file_streaming_client, upload_dir):
+    contents = bytes(range(256)) * 4
+    (upload_dir / "multi.geojson").write_bytes(contents)
+
+    response = file_streaming_client.get(
+        "/stream/multi.geojson", headers={"Range": "bytes=900-, 0-9, 5-19, -4"}
+    )
+    assert response.status_code == 206
+    assert response.headers["Content-Type"].startswith("multipart/byteranges; boundary=")
+    # Sorted, overlapping ranges merged, open end clamped to the file
+    assert _multipart_parts(response) == [
+        ("bytes 0-19/1024", contents[0:20]),
+        ("bytes 900-1023/1024", contents[900:]),
+    ]
+
+
+def test_stream_file_range_edge_cases(file_streaming_client, upload_dir):
+    contents = b"0123456789"
+    (upload_dir / "edge.geojson").write_bytes(contents)
+
+    response = file_streaming_client.get("/stream/edge.geojson", headers={"Range": "bytes=-3"})
+    assert response.headers["Content-Range"] == "bytes 7-9/10"
+    assert response.content == b"789"
+
+    response = file_streaming_client.get("/stream/edge.geojson", headers={"Range": "bytes=20-30"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */10"
+
+    response = file_streaming_client.get("/stream/edge.geojson", headers={"Range": "bytes=5-2"})
+    assert response.status_code == 400
+
+    too_many = "bytes=" + ",".join(f"{i}-{i}" for i in range(file_streaming.MAX_RANGES + 1))
+    response = file_streaming_client.get("/stream/edge.geojson", headers={"Range": too_many})
+    assert response.status_code == 200
+    assert response.content == contents
+
+
+def test_file_reads_run_on_the_stream_pool(file_streaming_client, upload_dir, monkeypatch):
+    contents = b"x" * 50
+    (upload_dir / "pool.geojson").write_bytes(contents)
+    monkeypatch.setattr(file_streaming, "CHUNK_SIZE", 16)
+    threads = []
+    original_pread = file_streaming._pread
+
+    def recording_pread(fd, size, offset):
+        threads.append(threading.current_thread().name)
+        return original_pread(fd, size, offset)
+
+    monkeypatch.setattr(file_streaming, "_pread", recording_pread)
+
+    response = file_streaming_client.get("/stream/pool.geojson")
+    assert response.content == contents
+    assert len(threads) == 5
+    assert all(name.startswith("file-stream") for name in threads)
+
+
+def _compressible(size):
+    random.seed(7)
+    words = [b"river", b"lake", b"road", b"forest", b"12.5", b"null"]
+    return b" ".join(random.choice(words) for _ in range(size))[:size]
+
+
+def test_gzip_index_reads_arbitrary_ranges(tmp_path, monkeypatch):
+    monkeypatch.setattr(gzip_utils, "INDEX_SPAN", 1000)
+    contents = _compressible(10_500)
+    original = tmp_path / "big.geojson"
+    original.write_bytes(contents)
+
+    compressed = gzip_utils.compress_file(original)
+    # Flush points don't break the gzip stream
+    assert gzip.decompress(compressed.read_bytes()) == contents
+    index = gzip_utils.load_gzip_index(compressed)
+    assert index["size"] == len(contents)
+    assert [point[0] for point in index["points"]] == list(range(0, 10_500, 1000))
+
+    for start, end in [(0, 0), (999, 1000), (2500, 7499), (10_000, 10_499), (0, 10_499)]:
+        chunks = list(gzip_utils.iter_gzip_range(compressed, index, start, end, chunk_size=256))
+        assert max(len(chunk) for chunk in chunks) <= 256
+        assert b"".join(chunks) == contents[start : end + 1]
+
+    # A rewritten .gz invalidates the index
+    compressed.write_bytes(gzip.compress(contents))
+    assert gzip_utils.load_gzip_index(compressed) is None
+
+
+def test_ranges_over_gzip_variant(file_streaming_client, upload_dir, monkeypatch):
+    monkeypatch.setattr(gzip_utils, "INDEX_SPAN", 1000)
+    contents = _compressible(5000)
+    original = upload_dir / "only-gz.geojson"
+    original.write_bytes(contents)
+    gzip_utils.compress_file(original)
+    original.unlink()
+
+    response = file_streaming_client.get(
+        "/stream/only-gz.geojson",
+        headers={"Range": "bytes=1990-2010,4990-", "Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert _multipart_parts(response) == [
+        ("bytes 1990-2010/5000", contents[1990:2011]),
+        ("bytes 4990-4999/5000", contents[4990:]),
+    ]
+
+    # Without an index the range is ignored and the gzip variant is sent whole
+    gzip_utils.get_index_path(upload_dir / "only-gz.geojson.gz").unlink()
+    response = file_streaming_client.get(
+        "/stream/only-gz.geojson", headers={"Range": "bytes=0-9", "Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200
+    assert response.content == contents
@@ -0,0 +1,72 @@
+"""Tests for GeoLayer and GeoDataFrame hand-off between geoprocessing ops."""
+
+import json
+
+import geopandas as gpd
+from shapely.geometry import Point
+
+from services.tools.geoprocessing.layer import GeoLayer, ensure_geo_layer, layer_to_gdf
+from services.tools.geoprocessing.ops.area import op_area
+from services.tools.geoprocessing.ops.buffer import op_buffer
+from services.tools.geoprocessing.ops.centroid import op_centroid
+
+
+def _points_fc():
+    return {
+        "type": "FeatureCollection",
+        "properties": {"name": "points"},
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"id": i},
+                "geometry": {"type": "Point", "coordinates": [10.0 + i, 53.0]},
+            }
+            for i in range(3)
+        ],
+    }
+
+
+def test_from_geojson_keeps_collection_properties():
+    layer = GeoLayer.from_geojson(_points_fc())
+    assert len(layer.gdf) == 3
+    assert layer.crs == "EPSG:4326"
+    assert layer.metadata == {"name": "points"}
+
+
+def test_dict_inputs_still_return_dicts():
+    result = op_centroid([_points_fc()])
+    assert isinstance(result[0], dict)
+    assert result[0]["type"] == "FeatureCollection"
+    assert len(result[0]["features"]) == 3
+
+
+def test_chained_ops_stay_in_gdf_space():
+    layer = ensure_geo_layer(_points_fc())
+    buffered = op_buffer(
+        [layer], radius=1000, radius_unit="meters", auto_optimize_crs=True, projection_metadata=True
+    )
+    assert isinstance(buffered[0], GeoLayer)
+    assert "_crs_metadata" in buffered[0].metadata
+    # The result stays in the working CRS for the next step
+    assert buffered[0].crs != "EPSG:4326"
+    assert layer_to_gdf(buffered[0]) is buffered[0].gdf
+
+    areas = op_area(buffered, unit="square_meters", auto_optimize_crs=True)
+    assert isinstance(areas[0], GeoLayer)
+    # A 1 km buffer around a point is roughly pi km^2
+    assert all(3.0e6 < a < 3.3e6 for a in areas[0].gdf["area"])
+    # Inputs are not modified
+    assert (layer.gdf.geom_type == "Point").all()
+
+
+def test_output_is_wgs84_geojson():
+    gdf = gpd.GeoDataFrame({"v": [1]}, geometry=[Point(10.0, 53.0)], crs="EPSG:4326")
+    layer = GeoLayer(gdf.to_crs("EPSG:3857"), {"_crs_metadata": {"epsg_code": "EPSG:3857"}})
+
+    fc = json.loads(b"".join(layer.iter_geojson()))
+    assert "properties" not in fc
+    x, y = fc["features"][0]["geometry"]["coordinates"]
+    assert abs(x - 10.0) < 1e-6 and abs(y - 53.0) < 1e-6
+
+    assert layer.to_geojson()["properties"]["_crs_metadata"]["epsg_code"] == "EPSG:3857"
+    assert layer_to_gdf(layer).crs == "EPSG:3857"
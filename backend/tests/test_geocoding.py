@@ -3,8 +3,8 @@ import os
 import sys
 from unittest.mock import Mock, patch
 
+import httpx
 import pytest
-import requests
 
 # Add the backend directory to the path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -108,7 +108,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_geonames_success(self, mock_geonames_response):
         """Test successful GeoNames geocoding"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = mock_geonames_response
@@ -133,7 +133,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_geonames_no_results(self):
         """Test GeoNames with no results"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"geonames": []}
@@ -144,7 +144,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_geonames_api_error(self):
         """Test GeoNames API error handling"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 500
             mock_get.return_value = mock_response
@@ -154,7 +154,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_geonames_custom_params(self, mock_geonames_response):
         """Test GeoNames with custom parameters"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = mock_geonames_response
@@ -168,7 +168,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_nominatim_success(self, mock_nominatim_response):
         """Test successful Nominatim geocoding"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = mock_nominatim_response
@@ -196,7 +196,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_nominatim_with_geojson(self, mock_nominatim_response):
         """Test Nominatim with GeoJSON enabled"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = mock_nominatim_response
@@ -210,7 +210,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_nominatim_no_results(self):
         """Test Nominatim with no results"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = []
@@ -221,7 +221,7 @@ class TestGeocodingBasicFunctions:
 
     def test_geocode_using_nominatim_api_error(self):
         """Test Nominatim API error handling"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 404
             mock_response.json.return_value = {"error": "Not found"}
@@ -301,7 +301,7 @@ class TestGeocodingErrorHandling:
 
     def test_malformed_api_response(self):
         """Test handling of malformed API responses"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.side_effect = json.JSONDecodeError("Invalid JSON", "", 0)
@@ -317,20 +317,20 @@ class TestGeocodingErrorHandling:
 
     def test_network_timeout(self):
         """Test network timeout handling"""
-        with patch("requests.get") as mock_get:
-            mock_get.side_effect = requests.exceptions.Timeout()
+        with patch("services.http_client.get") as mock_get:
+            mock_get.side_effect = httpx.TimeoutException("timed out")
 
             # Current implementation doesn't handle gracefully
             try:
                 geocode_using_geonames.func("Paris")
                 assert False, "Should have raised Timeout"
-            except requests.exceptions.Timeout:
+            except httpx.TimeoutException:
                 # This is expected with current implementation
                 pass
 
     def test_empty_query_handling(self):
         """Test handling of empty queries"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"geonames": []}
@@ -342,7 +342,7 @@ class TestGeocodingErrorHandling:
 
     def test_special_characters_in_query(self):
         """Test handling of special characters in queries"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"geonames": []}
@@ -363,7 +363,7 @@ class TestUrlConstruction:
 
     def test_geonames_url_formatting(self):
         """Test that GeoNames URLs are properly formatted with f-strings"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"geonames": []}
@@ -384,7 +384,7 @@ class TestUrlConstruction:
 
     def test_nominatim_url_formatting(self):
         """Test that Nominatim URLs are properly formatted with f-strings"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = []
@@ -405,7 +405,7 @@ class TestUrlConstruction:
 
     def test_error_message_formatting(self):
         """Test that error messages are properly formatted"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 404
             mock_response.json.return_value = {"error": "Not found"}
@@ -432,7 +432,7 @@ class TestGeocodingIntegration:
         This test ensures URLs are properly formatted and don't contain
         unformatted template literals like 'url={location_name}'.
         """
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"geonames": []}
@@ -457,7 +457,7 @@ class TestGeocodingIntegration:
 
     def test_nominatim_f_string_formatting_was_fixed(self):
         """Test Nominatim f-string formatting fix"""
-        with patch("requests.get") as mock_get:
+        with patch("services.http_client.get") as mock_get:
             mock_response = Mock()
             mock_response.status_code = 200
             mock_response.json.return_value = []
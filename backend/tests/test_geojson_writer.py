@@ -0,0 +1,87 @@
+"""Tests for the vectorized GeoDataFrame -> GeoJSON serializer."""
+
+import json
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+from shapely.geometry import LineString, Point, Polygon
+
+from services.storage.geojson_writer import (
+    gdf_to_feature_collection,
+    gdf_to_geojson_bytes,
+    iter_feature_collection,
+)
+
+
+def _sample_gdf() -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {
+            "name": ["Nairobi", "Zürich", None],
+            "pop": [4.4e6, np.nan, 12],
+            "count": [1, 2, 3],
+            "when": pd.to_datetime(["2024-01-01", "2024-06-30", None]),
+            "note": ['line\nbreak "quoted"', "b", "c"],
+        },
+        geometry=[
+            Point(36.8, -1.3),
+            LineString([(0, 0), (1, 1)]),
+            Polygon([(0, 0), (1, 0), (1, 1), (0, 0)]),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+def test_matches_geopandas_geometry_and_properties():
+    gdf = _sample_gdf()
+    fc = gdf_to_feature_collection(gdf)
+    expected = json.loads(gdf.drop(columns="when").to_json())
+
+    assert fc["type"] == "FeatureCollection"
+    assert len(fc["features"]) == 3
+    for ours, theirs in zip(fc["features"], expected["features"]):
+        assert ours["geometry"] == theirs["geometry"]
+        assert ours["properties"]["name"] == theirs["properties"]["name"]
+        assert ours["properties"]["count"] == theirs["properties"]["count"]
+        assert ours["properties"]["note"] == theirs["properties"]["note"]
+
+
+def test_missing_values_become_null():
+    props = gdf_to_feature_collection(_sample_gdf())["features"]
+    assert props[1]["properties"]["pop"] is None
+    assert props[2]["properties"]["name"] is None
+    assert props[2]["properties"]["when"] is None
+    assert props[0]["properties"]["when"].startswith("2024-01-01")
+
+
+def test_without_geometry():
+    fc = gdf_to_feature_collection(_sample_gdf(), keep_geometry=False)
+    assert all(f["geometry"] is None for f in fc["features"])
+    assert "geometry" not in fc["features"][0]["properties"]
+
+
+def test_batches_produce_valid_document():
+    gdf = gpd.GeoDataFrame(
+        {"v": list(range(25))}, geometry=[Point(i, i) for i in range(25)], crs="EPSG:4326"
+    )
+    chunks = list(iter_feature_collection(gdf, batch_size=10))
+    # header + 3 batches + footer
+    assert len(chunks) == 5
+    fc = json.loads(b"".join(chunks))
+    assert [f["properties"]["v"] for f in fc["features"]] == list(range(25))
+
+
+def test_include_id_and_missing_geometry():
+    gdf = gpd.GeoDataFrame({"v": [1, 2]}, geometry=[Point(0, 0), None], crs="EPSG:4326")
+    fc = json.loads(gdf_to_geojson_bytes(gdf, include_id=True))
+    assert [f["id"] for f in fc["features"]] == ["0", "1"]
+    assert fc["features"][1]["geometry"] is None
+
+
+def test_empty_and_attribute_only_frames():
+    empty = gpd.GeoDataFrame({"v": []}, geometry=[], crs="EPSG:4326")
+    assert gdf_to_feature_collection(empty) == {"type": "FeatureCollection", "features": []}
+
+    geometry_only = gpd.GeoDataFrame(geometry=[Point(1, 2)], crs="EPSG:4326")
+    fc = gdf_to_feature_collection(geometry_only)
+    assert fc["features"][0]["properties"] == {}
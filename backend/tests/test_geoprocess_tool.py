@@ -20,9 +20,17 @@ from langchain_core.messages import HumanMessage  # noqa: E402
 from langgraph.types import Command  # noqa: E402
 
 from models.geodata import DataOrigin, DataType, GeoDataObject  # noqa: E402
+from services.storage import file_management  # noqa: E402
 from services.tools.geoprocess_tools import geoprocess_tool  # noqa: E402
 
 
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    """Store results under tmp_path rather than the real upload directory."""
+    monkeypatch.setattr(file_management, "LOCAL_UPLOAD_DIR", str(tmp_path))
+    return tmp_path
+
+
 def invoke_tool(state, tool_call_id="test_call", **kwargs):
     """Helper function to invoke geoprocess_tool with proper ToolCall structure."""
     return geoprocess_tool.invoke(
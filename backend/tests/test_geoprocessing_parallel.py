@@ -0,0 +1,154 @@
+import geopandas as gpd
+import numpy as np
+import pytest
+from geopandas.testing import assert_geodataframe_equal
+from shapely.geometry import Point, box
+
+from services.tools.geoprocessing import parallel
+from services.tools.geoprocessing.layer import GeoLayer
+from services.tools.geoprocessing.ops.clip import op_clip
+from services.tools.geoprocessing.ops.sjoin import op_sjoin
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """One spawned pool for the module; spawning workers is the slow part."""
+    yield
+    parallel.shutdown_process_pool()
+
+
+@pytest.fixture
+def partitioned(monkeypatch, pool):
+    monkeypatch.setattr(parallel, "GEOPROCESSING_WORKERS", 2)
+    monkeypatch.setattr(parallel, "GEOPROCESSING_PARALLEL_MIN_FEATURES", 10)
+    submitted = []
+    original = parallel._map_chunks
+
+    def record(op, left, right_for, kwargs):
+        results = original(op, left, right_for, kwargs)
+        submitted.append((op, len(results)))
+        return results
+
+    monkeypatch.setattr(parallel, "_map_chunks", record)
+    return submitted
+
+
+def _points(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    xy = rng.random((n, 2)) * 10
+    gdf = gpd.GeoDataFrame(
+        {"name": [f"node {i}" for i in range(n)]},
+        geometry=gpd.points_from_xy(xy[:, 0], xy[:, 1]),
+        crs="EPSG:4326",
+    )
+    # Non-default labels must survive the round trip through the workers
+    gdf.index = rng.permutation(n) + 1000
+    return gdf
+
+
+def _areas(seed=1):
+    rng = np.random.default_rng(seed)
+    corners = rng.random((15, 2)) * 8
+    return gpd.GeoDataFrame(
+        {"admin": [f"area {i}" for i in range(len(corners))]},
+        geometry=[box(x, y, x + 2.5, y + 2.5) for x, y in corners],
+        crs="EPSG:4326",
+    )
+
+
+def _by_position(result, left, right):
+    """Order a serial join result by left then right position."""
+    left_pos = left.index.get_indexer(result.index)
+    right_pos = right.index.get_indexer(result["index_right"].fillna(-1))
+    return result.iloc[np.lexsort((right_pos, left_pos))]
+
+
+@pytest.mark.parametrize("how", ["inner", "left"])
+def test_sjoin_matches_serial(partitioned, how):
+    points, areas = _points(), _areas()
+
+    result = parallel.sjoin(points, areas, how=how, predicate="within")
+
+    assert partitioned == [("sjoin", 8)]
+    expected = _by_position(gpd.sjoin(points, areas, how=how, predicate="within"), points, areas)
+    assert_geodataframe_equal(result, expected)
+
+
+def test_sjoin_nearest_matches_serial(partitioned):
+    points, areas = _points(), _areas()
+    areas = areas.iloc[:3]
+
+    for max_distance in (None, 0.5):
+        result = parallel.sjoin_nearest(
+            points, areas, max_distance=max_distance, distance_col="distance"
+        )
+        expected = gpd.sjoin_nearest(
+            points, areas, max_distance=max_distance, distance_col="distance"
+        )
+        assert_geodataframe_equal(result, _by_position(expected, points, areas))
+    assert [op for op, _ in partitioned] == ["sjoin_nearest", "sjoin_nearest"]
+
+
+@pytest.mark.parametrize("how", ["intersection", "difference"])
+def test_overlay_matches_serial(partitioned, how):
+    cells = gpd.GeoDataFrame(
+        {"cell": range(100)},
+        geometry=[box(x, y, x + 1, y + 1) for x in range(10) for y in range(10)],
+        crs="EPSG:4326",
+    )
+    areas = _areas()
+
+    result = parallel.overlay(cells, areas, how=how)
+
+    assert partitioned == [("overlay", 8)]
+    assert_geodataframe_equal(result, gpd.overlay(cells, areas, how=how), check_less_precise=True)
+
+
+def test_clip_matches_serial(partitioned):
+    points = _points()
+    mask = box(2, 2, 6, 7)
+
+    result = parallel.clip(points, mask)
+
+    assert partitioned == [("clip", 8)]
+    assert_geodataframe_equal(result, points.clip(mask).sort_index(key=points.index.get_indexer))
+
+
+def test_unsafe_variants_run_in_process(partitioned):
+    points, areas = _points(), _areas()
+    mixed = gpd.GeoDataFrame(geometry=[Point(0, 0)] * 10 + [box(0, 0, 1, 1)] * 10, crs="EPSG:4326")
+
+    parallel.sjoin(points, areas, how="right")
+    parallel.overlay(areas, points.iloc[:20], how="union")
+    with pytest.raises(NotImplementedError):
+        parallel.overlay(mixed, areas, how="intersection")
+    parallel.sjoin(points.iloc[:5], areas)
+
+    assert partitioned == []
+
+
+def test_pool_failures_fall_back_to_serial(monkeypatch):
+    monkeypatch.setattr(parallel, "GEOPROCESSING_WORKERS", 2)
+    monkeypatch.setattr(parallel, "GEOPROCESSING_PARALLEL_MIN_FEATURES", 10)
+
+    def broken():
+        raise RuntimeError("no processes here")
+
+    monkeypatch.setattr(parallel, "_get_process_pool", broken)
+    points, areas = _points(), _areas()
+
+    result = parallel.sjoin(points, areas)
+
+    assert_geodataframe_equal(result, gpd.sjoin(points, areas))
+
+
+def test_ops_use_the_partitioned_functions(partitioned):
+    points = GeoLayer(_points(), name="nodes")
+    areas = GeoLayer(_areas(), name="admin")
+
+    joined = op_sjoin([points, areas])[0]
+    clipped = op_clip([points, GeoLayer(_areas().iloc[:1])])[0]
+
+    assert [op for op, _ in partitioned] == ["sjoin", "clip"]
+    assert len(joined.gdf) == len(gpd.sjoin(points.gdf, areas.gdf))
+    assert len(clipped.gdf) == len(points.gdf.clip(_areas().geometry.iloc[0]))
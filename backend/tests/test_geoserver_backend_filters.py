@@ -15,6 +15,15 @@ from services.tools.geoserver.custom_geoserver import (
     get_custom_geoserver_data,
     preload_backend_layers,
 )
+from services.tools.geoserver.vector_store import reset_vector_store_for_tests
+
+
+@pytest.fixture(autouse=True)
+def temp_vector_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("NALAMAP_GEOSERVER_VECTOR_DB", str(tmp_path / "geoserver_vectors.db"))
+    reset_vector_store_for_tests()
+    yield
+    reset_vector_store_for_tests()
 
 
 def _create_tool_call(tool_name: str, args: dict, call_id: str) -> dict:
@@ -0,0 +1,162 @@
+"""Tests for parallel, conditional GeoServer GetCapabilities fetching."""
+
+import ssl
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from models.settings_model import GeoServerBackend
+from services.tools.geoserver import capabilities as caps
+from services.tools.geoserver.custom_geoserver import fetch_all_service_capabilities_with_status
+
+WMS_XML = b"""<?xml version="1.0"?>
+<WMS_Capabilities version="1.3.0" xmlns="http://www.opengis.net/wms"
+    xmlns:xlink="http://www.w3.org/1999/xlink">
+  <Service>
+    <Name>WMS</Name>
+    <Title>Test</Title>
+    <ContactInformation>
+      <ContactPersonPrimary><ContactOrganization>Org</ContactOrganization></ContactPersonPrimary>
+    </ContactInformation>
+  </Service>
+  <Capability>
+    <Request>
+      <GetMap>
+        <Format>image/png</Format>
+        <DCPType><HTTP><Get><OnlineResource xlink:href="https://gs.example/wms?"/></Get></HTTP>
+        </DCPType>
+      </GetMap>
+    </Request>
+    <Layer>
+      <Title>root</Title>
+      <Layer queryable="1">
+        <Name>ws:roads</Name>
+        <Title>Roads</Title>
+        <Abstract>Road network</Abstract>
+      </Layer>
+    </Layer>
+  </Capability>
+</WMS_Capabilities>
+"""
+
+BACKEND_URL = "https://gs.example/geoserver"
+
+
+@pytest.fixture
+def cache():
+    return caps.CapabilitiesCache(max_entries=8)
+
+
+def _backend(**kwargs):
+    return GeoServerBackend(url=BACKEND_URL, enabled=True, **kwargs)
+
+
+def _response(status, content=b"", headers=None):
+    request = httpx.Request("GET", "https://gs.example/geoserver/wms")
+    return httpx.Response(status, content=content, headers=headers, request=request)
+
+
+def test_capabilities_url():
+    wmts = caps.SERVICES[3]
+    assert caps.capabilities_url(BACKEND_URL, wmts) == (
+        "https://gs.example/geoserver/gwc/service/wmts"
+        "?service=WMTS&request=GetCapabilities&version=1.0.0"
+    )
+
+
+def test_conditional_get_reuses_parsed_capabilities(cache):
+    wms = caps.SERVICES[0]
+    calls = []
+
+    def fake_request(method, url, verify=True, **kwargs):
+        calls.append(kwargs["headers"])
+        if kwargs["headers"].get("If-None-Match") == '"v1"':
+            return _response(304)
+        return _response(
+            200,
+            WMS_XML,
+            {"ETag": '"v1"', "Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"},
+        )
+
+    with patch("services.http_client.request", side_effect=fake_request):
+        first = caps.fetch_capabilities(wms, _backend(), cache)
+        with patch.object(caps, "_parse_capabilities") as parse:
+            second = caps.fetch_capabilities(wms, _backend(), cache)
+
+    assert list(first.contents) == ["ws:roads"]
+    assert second is first
+    parse.assert_not_called()
+    assert calls[0] == {}
+    assert calls[1] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Wed, 01 Oct 2025 10:00:00 GMT",
+    }
+
+
+def test_responses_without_validators_are_not_cached(cache):
+    with patch("services.http_client.request", return_value=_response(200, WMS_XML)):
+        caps.fetch_capabilities(caps.SERVICES[0], _backend(), cache)
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = caps.CapabilitiesCache(max_entries=2)
+    for key in ["a", "b"]:
+        cache.put((key, ""), caps.CachedCapabilities(b"", None, None, key))
+    cache.get(("a", ""))
+    cache.put(("c", ""), caps.CachedCapabilities(b"", None, None, "c"))
+
+    assert cache.get(("b", "")) is None
+    assert cache.get(("a", "")).service == "a"
+
+
+def test_services_are_fetched_in_parallel_with_per_request_tls(cache):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    seen = []
+
+    def fake_request(method, url, verify=True, **kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+            seen.append((verify, kwargs.get("auth")))
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return _response(200, b"<Capabilities/>")
+
+    backend = _backend(allow_insecure=True, username="user", password="pw")
+    with (
+        patch("services.http_client.request", side_effect=fake_request),
+        patch.object(caps, "_parse_capabilities", side_effect=lambda s, u, x: s.name),
+    ):
+        results = caps.fetch_backend_capabilities(backend, cache=cache)
+
+    assert results == {"WMS": "WMS", "WFS": "WFS", "WCS": "WCS", "WMTS": "WMTS"}
+    assert peak == 4
+    assert seen == [(False, ("user", "pw"))] * 4
+    # Nothing process-wide is patched for insecure backends
+    assert ssl._create_default_https_context is ssl.create_default_context
+
+
+def test_failed_services_are_reported_per_service():
+    def fake_request(method, url, verify=True, **kwargs):
+        if "service=WMS" in url:
+            return _response(200, WMS_XML)
+        if "service=WFS" in url:
+            return _response(401)
+        raise httpx.ConnectError("[Errno 111] Connection refused")
+
+    with patch("services.http_client.request", side_effect=fake_request):
+        layers, status, errors = fetch_all_service_capabilities_with_status(_backend())
+
+    assert [layer.id for layer in layers] == ["wms_ws:roads"]
+    assert layers[0].data_link.startswith("https://gs.example/geoserver/wms?")
+    assert status == {"WMS": True, "WFS": False, "WCS": False, "WMTS": False}
+    assert errors["WFS"]["error_type"] == "auth"
+    assert errors["WCS"]["error_type"] == "connection"
@@ -0,0 +1,170 @@
+"""Tests for the in-memory GeoServer layer similarity index."""
+
+import json
+import sqlite3
+import struct
+
+import numpy as np
+import pytest
+
+from models.geodata import DataOrigin, DataType, GeoDataObject
+from services.tools.geoserver import vector_store as vs
+from services.tools.geoserver.layer_index import LayerIndex, LayerPartition
+
+
+def make_layer(layer_id: str) -> GeoDataObject:
+    return GeoDataObject(
+        id=layer_id,
+        data_source_id="test-catalog",
+        data_type=DataType.LAYER,
+        data_origin=DataOrigin.TOOL,
+        data_source="TestGeoServer",
+        data_link=f"https://example.com/geoserver/{layer_id}",
+        name=layer_id,
+        title=layer_id,
+    )
+
+
+def _random_partition(rng, prefix, n, dim=16):
+    vectors = rng.normal(size=(n, dim))
+    return vectors, [make_layer(f"{prefix}-{i}") for i in range(n)]
+
+
+class _Loader:
+    def __init__(self, data):
+        self.data = data
+        self.calls = []
+
+    def load(self, session_id, backend_url):
+        self.calls.append((session_id, backend_url))
+        return self.data.get((session_id, backend_url), ([], []))
+
+    def backends(self, session_id):
+        return [backend for session, backend in self.data if session == session_id]
+
+
+def test_search_matches_brute_force_and_respects_filters():
+    rng = np.random.default_rng(1)
+    data = {
+        ("s1", "https://a"): _random_partition(rng, "a", 50),
+        ("s1", "https://b"): _random_partition(rng, "b", 30),
+        ("s2", "https://a"): _random_partition(rng, "other", 40),
+    }
+    loader = _Loader(data)
+    index = LayerIndex()
+    query = rng.normal(size=16)
+
+    partitions = index.partitions(["s1"], [], loader.load, loader.backends)
+    results = index.search(partitions, query, limit=10)
+
+    vectors = np.vstack([data[("s1", "https://a")][0], data[("s1", "https://b")][0]])
+    ids = [layer.id for key in [("s1", "https://a"), ("s1", "https://b")] for layer in data[key][1]]
+    sims = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)) @ (
+        query / np.linalg.norm(query)
+    )
+    expected = [ids[i] for i in np.argsort(-sims)[:10]]
+
+    assert [layer.id for layer, _ in results] == expected
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+    assert all(np.isclose(layer.score, max(0.0, 1 - d), atol=1e-6) for layer, d in results)
+
+    only_b = index.partitions(["s1"], ["https://b"], loader.load, loader.backends)
+    assert all(layer.id.startswith("b-") for layer, _ in index.search(only_b, query, 100))
+
+
+def test_partitions_are_cached_until_invalidated():
+    rng = np.random.default_rng(2)
+    loader = _Loader({("s1", "https://a"): _random_partition(rng, "a", 5)})
+    index = LayerIndex()
+
+    index.partitions(["s1"], ["https://a"], loader.load, loader.backends)
+    index.partitions(["s1"], ["https://a"], loader.load, loader.backends)
+    assert len(loader.calls) == 1
+
+    index.invalidate("s1", ["https://a"])
+    index.partitions(["s1"], ["https://a"], loader.load, loader.backends)
+    assert len(loader.calls) == 2
+
+    index.sync("gen-1")
+    index.partitions(["s1"], ["https://a"], loader.load, loader.backends)
+    index.sync("gen-1")
+    index.partitions(["s1"], ["https://a"], loader.load, loader.backends)
+    assert len(loader.calls) == 3
+
+
+def test_results_are_copies():
+    rng = np.random.default_rng(3)
+    vectors, layers = _random_partition(rng, "a", 3)
+    index = LayerIndex()
+    partition = LayerPartition(vectors, layers)
+
+    layer, _ = index.search([partition], vectors[0], limit=1)[0]
+    layer.title = "changed"
+    assert layers[0].title == "a-0"
+
+
+def test_ivf_partition_finds_clustered_neighbours():
+    rng = np.random.default_rng(4)
+    centers = rng.normal(size=(20, 32))
+    vectors = np.repeat(centers, 50, axis=0) + rng.normal(scale=0.05, size=(1000, 32))
+    layers = [make_layer(str(i)) for i in range(1000)]
+
+    exact = LayerIndex().search([LayerPartition(vectors, layers, ivf_min_layers=0)], centers[7], 20)
+    ivf = LayerIndex(nprobe=4).search(
+        [LayerPartition(vectors, layers, ivf_min_layers=100)], centers[7], 20
+    )
+
+    assert [layer.id for layer, _ in ivf] == [layer.id for layer, _ in exact]
+
+
+def test_sqlite_partition_reads_embeddings_and_layers():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        f"CREATE TABLE {vs._VECTOR_TABLE} "
+        "(rowid INTEGER PRIMARY KEY AUTOINCREMENT, text TEXT, metadata BLOB, text_embedding BLOB)"
+    )
+    # Rows in the older one-vector-per-session-layer layout are picked up
+    for i, (session, backend) in enumerate(
+        [("s1", "https://a"), ("s1", "https://b"), ("s2", "https://a")]
+    ):
+        layer = make_layer(f"layer-{i}")
+        metadata = vs._metadata_payload(session, backend, None, layer)
+        conn.execute(
+            f"INSERT INTO {vs._VECTOR_TABLE}(text, metadata, text_embedding) VALUES (?, ?, ?)",
+            ("text", json.dumps(metadata), struct.pack("3f", i, 1.0, 0.0)),
+        )
+    vs._create_support_tables(conn)
+
+    vectors, layers = vs._sqlite_partition(conn, "s1", "https://b")
+    assert [layer.id for layer in layers] == ["layer-1"]
+    assert np.allclose(vectors[0], [1.0, 1.0, 0.0])
+    assert sorted(vs._sqlite_backends(conn, "s1")) == ["https://a", "https://b"]
+
+
+@pytest.fixture
+def fallback_store(monkeypatch):
+    vs.reset_vector_store_for_tests()
+    monkeypatch.setattr(vs, "_use_fallback_store", True, raising=False)
+    monkeypatch.setattr(vs, "_fallback_documents", [], raising=False)
+    yield
+    vs.reset_vector_store_for_tests()
+
+
+def test_store_and_delete_refresh_search_results(fallback_store):
+    backend = "https://example.com/geoserver"
+    first = make_layer("forest")
+    first.title = "Forest cover"
+    vs.store_layers("s1", backend, None, [first])
+    assert [layer.id for layer, _ in vs.similarity_search("s1", [backend], "forest", 5)] == [
+        "forest"
+    ]
+
+    second = make_layer("forest-fires")
+    second.title = "Forest fires"
+    vs.store_layers("s1", backend, None, [second])
+    assert len(vs.similarity_search("s1", [backend], "forest", 5)) == 2
+
+    vs.delete_layers("s1", [backend])
+    assert vs.similarity_search("s1", [backend], "forest", 5) == []
@@ -1,5 +1,6 @@
 from unittest.mock import MagicMock, patch
 
+import httpx
 import pytest
 from langchain_core.messages import ToolMessage
 from langgraph.types import Command
@@ -225,7 +226,11 @@ def test_fetch_all_service_capabilities(
     mock_wmts_constructor.return_value = mock_wmts_service
 
     backend = GeoServerBackend(url=MOCK_GEOSERVER_URL, enabled=True, username="user", password="pw")
-    layers = fetch_all_service_capabilities(backend)
+    response = httpx.Response(
+        200, content=b"<Capabilities/>", request=httpx.Request("GET", MOCK_WMS_URL)
+    )
+    with patch("services.http_client.request", return_value=response):
+        layers = fetch_all_service_capabilities(backend)
 
     assert len(layers) == 5  # 2 from WMS, 1 from each of the others
     assert any(layer.id == "wms_workspace:layer1" for layer in layers)
@@ -0,0 +1,144 @@
+"""Tests for the shared pooled HTTP client."""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+from services.http_client import SHARED_CLIENT_KEY, HostPolicy, HttpClientPool
+
+
+def _pool_with_transport(handler, policies=None) -> HttpClientPool:
+    """Pool whose clients answer through ``handler`` instead of the network."""
+    pool = HttpClientPool(policies=policies or {}, http2=False)
+    transport = httpx.MockTransport(handler)
+
+    def client_kwargs(policy):
+        kwargs = HttpClientPool._client_kwargs(pool, policy)
+        kwargs.pop("http2")
+        kwargs["transport"] = transport
+        return kwargs
+
+    pool._client_kwargs = client_kwargs
+    return pool
+
+
+def test_one_client_per_host_reused():
+    pool = _pool_with_transport(
+        lambda request: httpx.Response(200, json={"ok": True}),
+        policies={"a.example": HostPolicy(), "b.example": HostPolicy()},
+    )
+
+    assert pool.request("GET", "https://a.example/x").json() == {"ok": True}
+    pool.request("GET", "https://a.example/y")
+    pool.request("GET", "https://b.example/z")
+
+    client_a = pool._sync["a.example"][0]
+    assert pool._sync_entry("a.example")[0] is client_a
+    assert pool.stats()["sync_hosts"] == ["a.example", "b.example"]
+    pool.close()
+
+
+def test_hosts_without_policy_share_one_client():
+    pool = _pool_with_transport(
+        lambda request: httpx.Response(200), policies={"known.example": HostPolicy()}
+    )
+
+    for i in range(20):
+        pool.request("GET", f"https://user-{i}.example/tile.png")
+    pool.request("GET", "https://known.example/")
+
+    assert pool.stats()["sync_hosts"] == [SHARED_CLIENT_KEY, "known.example"]
+    assert pool._sync_entry("user-0.example")[0] is pool._sync_entry("other.example")[0]
+
+    async def run():
+        for i in range(5):
+            await pool.arequest("GET", f"https://user-{i}.example/")
+        hosts = pool.stats()["async_hosts"]
+        await pool.aclose()
+        return hosts
+
+    assert asyncio.run(run()) == [SHARED_CLIENT_KEY]
+
+
+def test_host_policy_limits_concurrency():
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def handler(request):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+        return httpx.Response(200)
+
+    pool = _pool_with_transport(
+        handler, policies={"slow.example": HostPolicy(max_connections=4, max_concurrency=1)}
+    )
+    threads = [
+        threading.Thread(target=pool.request, args=("GET", "https://slow.example/q"))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak == 1
+    pool.close()
+
+
+def test_default_policy_for_unknown_host():
+    pool = HttpClientPool(policies={"known.example": HostPolicy(timeout=5)})
+    assert pool.policy_for("known.example").timeout == 5
+    assert pool.policy_for("other.example") == HostPolicy()
+    assert HostPolicy(max_connections=3).concurrency == 3
+
+
+def test_async_request_and_stream():
+    pool = _pool_with_transport(lambda request: httpx.Response(200, content=b"abc" * 10))
+
+    async def run():
+        response = await pool.arequest("GET", "https://a.example/x")
+        async with pool.astream("GET", "https://a.example/y") as streamed:
+            body = b"".join([chunk async for chunk in streamed.aiter_bytes()])
+        await pool.aclose()
+        return response.content, body
+
+    content, body = asyncio.run(run())
+    assert content == body == b"abc" * 10
+
+
+def test_async_clients_rebound_to_new_event_loop():
+    pool = _pool_with_transport(lambda request: httpx.Response(204))
+
+    async def status():
+        return (await pool.arequest("GET", "https://a.example/")).status_code
+
+    # Each asyncio.run uses a fresh loop; the stale client must not be reused
+    assert asyncio.run(status()) == 204
+    assert asyncio.run(status()) == 204
+
+
+def test_status_errors_raise_httpx_errors():
+    pool = _pool_with_transport(lambda request: httpx.Response(503))
+    with pytest.raises(httpx.HTTPStatusError):
+        pool.request("GET", "https://a.example/").raise_for_status()
+
+
+def test_insecure_requests_use_a_separate_client():
+    pool = _pool_with_transport(lambda request: httpx.Response(200))
+
+    pool.request("GET", "https://a.example/x")
+    pool.request("GET", "https://a.example/x", verify=False)
+
+    assert pool._sync_entry("a.example")[0] is not pool._sync_entry("a.example", False)[0]
+    assert pool.stats()["insecure_sync_hosts"] == [SHARED_CLIENT_KEY]
+    pool.close()
+    assert pool.stats()["insecure_sync_hosts"] == []
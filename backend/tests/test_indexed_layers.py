@@ -0,0 +1,252 @@
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import geopandas as gpd
+import numpy as np
+import pytest
+from shapely.geometry import Point, box
+
+from services.background_tasks import TaskPriority
+from services.storage import file_management, indexed_layers, sidecars
+from services.tools import attribute_tools
+from services.tools.geoprocess_tools import geoprocess_executor, read_window
+from services.tools.geoprocessing.layer import DeferredLayer, GeoLayer, ensure_geo_layer
+
+BASE_URL = "http://testserver"
+
+
+def _grid(n=40, crs="EPSG:4326"):
+    """n x n points on a one-degree grid starting at (0, 0)."""
+    xs, ys = np.meshgrid(np.arange(n), np.arange(n))
+    points = [Point(x, y) for x, y in zip(xs.ravel(), ys.ravel())]
+    gdf = gpd.GeoDataFrame(
+        {"id": range(len(points)), "label": [f"p{i}" for i in range(len(points))]},
+        geometry=points,
+        crs="EPSG:4326",
+    )
+    return gdf.to_crs(crs)
+
+
+class _RecordingTaskManager:
+    def __init__(self):
+        self.calls = []
+
+    def submit_task(self, func, *args, priority=None, **kwargs):
+        self.calls.append((func, args, priority))
+
+
+@pytest.fixture
+def task_manager(monkeypatch):
+    manager = _RecordingTaskManager()
+    monkeypatch.setattr(sidecars, "get_task_manager", lambda: manager)
+    monkeypatch.setattr(indexed_layers, "LAYER_INDEX_MIN_SIZE", 1000)
+    indexed_layers._indexing.clear()
+    yield manager
+    indexed_layers._indexing.clear()
+
+
+@pytest.fixture
+def grid_file(tmp_path):
+    path = tmp_path / "grid.geojson"
+    _grid().to_file(path, driver="GeoJSON")
+    return path
+
+
+def test_build_indexed_copy_and_windowed_reads(grid_file, task_manager):
+    assert indexed_layers.indexed_copy(grid_file) is None
+
+    copy = indexed_layers.build_indexed_copy(grid_file)
+
+    assert copy == indexed_layers.get_indexed_path(grid_file)
+    assert indexed_layers.indexed_copy(grid_file) == copy
+    with patch.object(indexed_layers.gpd, "read_file", wraps=gpd.read_file) as read:
+        window = indexed_layers.read_layer(grid_file, bbox=[10.5, 10.5, 12.5, 13.5])
+    assert read.call_args.args[0] == str(copy)
+    assert sorted(zip(window.geometry.x, window.geometry.y)) == [
+        (x, y) for x in (11.0, 12.0) for y in (11.0, 12.0, 13.0)
+    ]
+
+    columns = indexed_layers.read_layer(grid_file, columns=["id"])
+    assert list(columns.columns) == ["id", "geometry"]
+    assert len(columns) == 1600
+
+    extent = indexed_layers.layer_extent(grid_file)
+    assert extent == {"bbox": [0.0, 0.0, 39.0, 39.0], "features": 1600, "geometry_type": "Point"}
+
+    # A new version of the file invalidates the copy
+    grid_file.write_text(grid_file.read_text() + " ")
+    os.utime(grid_file, ns=(1, 1))
+    assert indexed_layers.indexed_copy(grid_file) is None
+    assert indexed_layers.layer_extent(grid_file) is None
+    # Reads fall back to the source and schedule a new copy
+    assert len(indexed_layers.read_layer(grid_file, bbox=[0, 0, 1, 1])) == 4
+    assert len(task_manager.calls) == 1
+
+
+def test_bbox_is_transformed_to_the_layer_crs(tmp_path, task_manager):
+    path = tmp_path / "mercator.geojson"
+    _grid(10, crs="EPSG:3857").to_file(path, driver="GeoJSON")
+    indexed_layers.build_indexed_copy(path)
+
+    gdf = indexed_layers.read_layer(path, bbox=[2.5, 2.5, 4.5, 3.5])
+
+    assert gdf.crs.to_epsg() == 3857
+    assert sorted(round(x) for x in gdf.to_crs(4326).geometry.x) == [3, 4]
+    assert indexed_layers.layer_extent(path)["bbox"] == pytest.approx([0, 0, 9, 9])
+
+
+def test_schedule_indexing_filters_and_dedupes(tmp_path, grid_file, task_manager):
+    small = tmp_path / "small.geojson"
+    small.write_text('{"type": "FeatureCollection", "features": []}')
+    other = tmp_path / "grid.csv"
+    other.write_bytes(grid_file.read_bytes())
+
+    assert indexed_layers.schedule_indexing(small) is False
+    assert indexed_layers.schedule_indexing(other) is False
+    assert indexed_layers.schedule_indexing(grid_file) is True
+    assert indexed_layers.schedule_indexing(grid_file) is False
+
+    func, args, priority = task_manager.calls[0]
+    assert len(task_manager.calls) == 1
+    assert priority == TaskPriority.LOW
+
+    func(*args)
+    assert indexed_layers.indexed_copy(grid_file) is not None
+    assert indexed_layers._indexing.in_flight() == 0
+    # Up to date copies are not rebuilt
+    assert indexed_layers.schedule_indexing(grid_file) is False
+
+
+def test_indexed_copy_is_built_in_bounded_windows(grid_file, monkeypatch):
+    monkeypatch.setattr(indexed_layers, "LAYER_INDEX_BATCH_FEATURES", 500)
+    collection = json.loads(grid_file.read_text())
+    # Integer values are missing in the first window only
+    for i, feature in enumerate(collection["features"]):
+        feature["properties"]["count"] = i if i >= 10 else None
+    grid_file.write_text(json.dumps(collection))
+
+    with patch.object(
+        indexed_layers.pyogrio, "read_dataframe", wraps=indexed_layers.pyogrio.read_dataframe
+    ) as read:
+        indexed_layers.build_indexed_copy(grid_file)
+
+    assert [c.kwargs["max_features"] for c in read.call_args_list] == [500] * 4
+    assert [c.kwargs["skip_features"] for c in read.call_args_list] == [0, 500, 1000, 1500]
+    copy = indexed_layers.indexed_copy(grid_file)
+    assert indexed_layers.indexed_schema(grid_file)["features"] == 1600
+    info = indexed_layers.pyogrio.read_info(str(copy))
+    assert dict(zip(info["fields"], info["dtypes"]))["count"].startswith("int")
+    assert sorted(gpd.read_file(copy)["id"]) == list(range(1600))
+
+
+def test_load_gdf_reads_a_window_of_local_uploads(tmp_path, monkeypatch, task_manager):
+    monkeypatch.setattr(attribute_tools, "LOCAL_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(attribute_tools, "BASE_URL", BASE_URL)
+    path = tmp_path / "grid.geojson"
+    _grid().to_file(path, driver="GeoJSON")
+    indexed_layers.build_indexed_copy(path)
+    url = f"{BASE_URL}/api/stream/grid.geojson"
+
+    gdf = attribute_tools._load_gdf(url, bbox=[0, 0, 2, 1], columns=["label"])
+
+    assert sorted(gdf["label"]) == ["p0", "p1", "p2", "p40", "p41", "p42"]
+    assert list(gdf.columns) == ["label", "geometry"]
+    assert len(attribute_tools._load_gdf(url)) == 1600
+
+
+def test_subset_gdf_matches_indexed_reads():
+    gdf = _grid(5)
+    subset = attribute_tools._subset_gdf(gdf, [0.5, 0.5, 1.5, 2.5], ["id"])
+    assert list(subset.columns) == ["id", "geometry"]
+    assert sorted(subset["id"]) == [6, 11]
+
+
+@pytest.mark.parametrize(
+    "step, windowed",
+    [
+        ({"operation": "clip", "params": {}}, True),
+        ({"operation": "overlay", "params": {"how": "intersection"}}, True),
+        ({"operation": "overlay", "params": {"how": "union"}}, False),
+        ({"operation": "sjoin", "params": {}}, True),
+        ({"operation": "sjoin", "params": {"how": "left"}}, False),
+        ({"operation": "sjoin", "params": {"predicate": "disjoint"}}, False),
+        ({"operation": "buffer", "params": {"radius": 1}}, False),
+    ],
+)
+def test_read_window(step, windowed):
+    window = read_window(step, [[0, 0, 10, 10], [5, -5, 20, 6]])
+    assert window == ([5, 0, 10, 6] if windowed else None)
+
+
+def test_read_window_needs_every_extent():
+    assert read_window({"operation": "clip"}, [[0, 0, 1, 1], None]) is None
+    assert read_window({"operation": "clip"}, [[0, 0, 1, 1]]) is None
+
+
+@pytest.mark.parametrize("operation", ["clip", "sjoin"])
+def test_read_window_ignores_extra_layers(operation):
+    # A third layer that the two-layer operation does not consume must not
+    # narrow (here: empty) the window
+    bboxes = [[0, 0, 10, 10], [5, 5, 20, 20], [50, 50, 60, 60]]
+    assert read_window({"operation": operation}, bboxes) is None
+
+
+def test_read_window_overlay_uses_every_layer():
+    bboxes = [[0, 0, 10, 10], [5, 5, 20, 20], [8, 0, 30, 9]]
+    assert read_window({"operation": "overlay"}, bboxes) == [8, 5, 10, 9]
+
+
+def test_executor_reads_deferred_layers_within_the_mask(tmp_path):
+    grid = _grid()
+    requested = []
+
+    def load(bbox):
+        requested.append(bbox)
+        if bbox is None:
+            return grid
+        return grid.iloc[sorted(grid.sindex.query(box(*bbox)))]
+
+    deferred = DeferredLayer(load=load, bbox=[0, 0, 39, 39], geometry_type="Point", name="grid")
+    mask = GeoLayer(
+        gpd.GeoDataFrame(geometry=[box(10.5, 10.5, 12.5, 12.5)], crs="EPSG:4326"), name="city"
+    )
+    plan = {"steps": [{"operation": "clip", "params": {}}], "result_name": "Clipped"}
+    state = {
+        "query": "clip grid to city",
+        "input_layers": [deferred, mask],
+        "enable_smart_crs": False,
+        "available_operations_and_params": ["operation: clip params:"],
+    }
+
+    with patch("services.tools.geoprocess_tools.get_llm") as mock_get_llm:
+        mock_llm = MagicMock()
+        mock_llm.generate.return_value.generations = [[MagicMock(text=json.dumps(plan))]]
+        mock_get_llm.return_value = mock_llm
+
+        result = geoprocess_executor(state)
+
+    payload = json.loads(mock_llm.generate.call_args.args[0][0][1].content)
+    assert payload["layers"][0]["bbox"] == [0, 0, 39, 39]
+    assert payload["layers"][0]["geometry_type"] == "Point"
+    assert requested == [[10.5, 10.5, 12.5, 12.5]]
+    assert len(result["result_layers"][0].gdf) == 4
+
+
+def test_deferred_layers_outside_the_window_are_not_read():
+    deferred = DeferredLayer(load=lambda bbox: pytest.fail("read"), name="grid")
+    assert deferred.materialize([5, 0, 4, 1]).gdf.empty
+
+    full = DeferredLayer(load=lambda bbox: _grid(2))
+    assert len(ensure_geo_layer(full).gdf) == 4
+
+
+def test_store_file_schedules_indexing(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_management, "LOCAL_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(file_management, "schedule_precompression", lambda path: False)
+    scheduled = []
+    monkeypatch.setattr(file_management, "schedule_indexing", scheduled.append)
+
+    _, unique_name = file_management.store_file("grid.geojson", b"{}")
+
+    assert scheduled == [tmp_path / unique_name]
@@ -0,0 +1,118 @@
+"""Tests for the process-wide parsed layer cache."""
+
+import json
+import os
+from unittest.mock import Mock, patch
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import Point
+
+from services.storage.layer_cache import LayerCache, estimate_gdf_nbytes, get_layer_cache
+from services.tools.attribute_tools import _load_gdf
+
+
+@pytest.fixture(autouse=True)
+def clear_layer_cache():
+    get_layer_cache().clear()
+    yield
+    get_layer_cache().clear()
+
+
+def _make_gdf(n: int = 3) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {"name": [f"f{i}" for i in range(n)], "value": list(range(n))},
+        geometry=[Point(i, i) for i in range(n)],
+        crs="EPSG:4326",
+    )
+
+
+class TestLayerCache:
+    def test_get_returns_copy(self):
+        cache = LayerCache(max_bytes=10_000_000)
+        cache.put("a", "fp1", _make_gdf())
+
+        first = cache.get("a", "fp1")
+        first["value"] = 99
+        second = cache.get("a", "fp1")
+
+        assert list(second["value"]) == [0, 1, 2]
+
+    def test_fingerprint_mismatch_is_miss(self):
+        cache = LayerCache(max_bytes=10_000_000)
+        cache.put("a", "fp1", _make_gdf())
+
+        assert cache.get("a", "fp2") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_by_bytes(self):
+        gdf = _make_gdf(50)
+        size = estimate_gdf_nbytes(gdf)
+        cache = LayerCache(max_bytes=size * 2 + 1)
+
+        cache.put("a", "fp", gdf)
+        cache.put("b", "fp", gdf)
+        cache.get("a", "fp")  # "a" becomes most recently used
+        cache.put("c", "fp", gdf)
+
+        assert cache.get("b", "fp") is None
+        assert cache.get("a", "fp") is not None
+        assert cache.get("c", "fp") is not None
+        assert cache.stats()["total_bytes"] <= cache.max_bytes
+
+    def test_oversized_layer_not_cached(self):
+        cache = LayerCache(max_bytes=10)
+        cache.put("a", "fp", _make_gdf())
+        assert cache.stats()["entries"] == 0
+
+    def test_conditional_headers(self):
+        cache = LayerCache(max_bytes=10_000_000)
+        assert cache.conditional_headers("a") == {}
+        cache.put("a", "fp", _make_gdf(), etag='"abc"', last_modified="Mon, 01 Jan 2024")
+        assert cache.conditional_headers("a") == {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Mon, 01 Jan 2024",
+        }
+
+
+class TestLoadGdfCaching:
+    def test_local_file_parsed_once(self, tmp_path):
+        path = tmp_path / "layer.geojson"
+        _make_gdf().to_file(path, driver="GeoJSON")
+
+        with patch(
+            "services.tools.attribute_tools.gpd.read_file", wraps=gpd.read_file
+        ) as mock_read:
+            first = _load_gdf(str(path))
+            second = _load_gdf(str(path))
+
+        assert mock_read.call_count == 1
+        assert len(first) == len(second) == 3
+
+    def test_local_file_change_invalidates(self, tmp_path):
+        path = tmp_path / "layer.geojson"
+        _make_gdf(3).to_file(path, driver="GeoJSON")
+        assert len(_load_gdf(str(path))) == 3
+
+        _make_gdf(5).to_file(path, driver="GeoJSON")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+        assert len(_load_gdf(str(path))) == 5
+
+    @patch("services.tools.attribute_tools.requests.get")
+    def test_remote_not_modified_uses_cache(self, mock_get, tmp_path):
+        body = json.loads(_make_gdf().to_json())
+        ok = Mock(status_code=200, content=json.dumps(body).encode("utf-8"))
+        ok.headers = {"ETag": '"v1"'}
+        not_modified = Mock(status_code=304, content=b"")
+        not_modified.headers = {}
+        mock_get.side_effect = [ok, not_modified]
+
+        url = "https://example.com/cached.geojson"
+        with patch("services.tools.attribute_tools.LOCAL_UPLOAD_DIR", str(tmp_path)):
+            first = _load_gdf(url)
+            second = _load_gdf(url)
+
+        assert len(first) == len(second) == 3
+        assert mock_get.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"v1"'}
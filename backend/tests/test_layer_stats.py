@@ -0,0 +1,204 @@
+import io
+import json
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import Point
+
+from api import ai_style
+from models.geodata import DataOrigin, DataType, GeoDataObject
+from services.storage import file_management, layer_stats
+from services.tools import attribute_tools
+
+BASE_URL = "http://testserver"
+
+
+def _collection():
+    features = [
+        {
+            "type": "Feature",
+            "properties": {
+                "name": f"site {i}",
+                "visitors": i * 10,
+                "rating": 4.5 if i % 2 else None,
+            },
+            "geometry": {"type": "Point", "coordinates": [10 + i, 40 - i]},
+        }
+        for i in range(20)
+    ]
+    features.append(
+        {
+            "type": "Feature",
+            "properties": {"name": "park", "visitors": 7},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [[[0, 0], [2, 0], [2, 50], [0, 0]]],
+            },
+        }
+    )
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 1 << 20])
+def test_collector_is_independent_of_chunking(chunk_size):
+    data = json.dumps(_collection()).encode()
+
+    stats = layer_stats.collect_geojson_stats(_chunked(data, chunk_size))
+
+    assert stats["complete"] is True
+    assert stats["feature_count"] == 21
+    assert stats["geometry_types"] == {"Point": 20, "Polygon": 1}
+    assert stats["bbox"] == [0.0, 0.0, 29.0, 50.0]
+    assert stats["crs"] == "EPSG:4326"
+    fields = {field["name"]: field for field in stats["fields"]}
+    assert fields["visitors"]["type"] == "int64"
+    assert (fields["visitors"]["min"], fields["visitors"]["max"]) == (0, 190)
+    assert fields["rating"]["type"] == "float64"
+    assert fields["rating"]["null_count"] == 11
+    assert fields["name"]["samples"][:2] == ["site 0", "site 1"]
+    assert len(fields["name"]["samples"]) == layer_stats.MAX_SAMPLE_VALUES
+    # First three and last two features
+    assert [row["name"] for row in stats["sample_rows"]] == [
+        "site 0",
+        "site 1",
+        "site 2",
+        "site 19",
+        "park",
+    ]
+
+
+def test_collector_validates_features():
+    collection = _collection()
+    collection["features"][:0] = [
+        {"type": "Feature", "properties": {}, "geometry": {"type": "Circle", "coordinates": []}},
+        {"type": "Feature", "properties": {}, "geometry": {"type": "LineString", "coordinates": 3}},
+        {"type": "Feature", "properties": [], "geometry": None},
+        {"name": "not a feature"},
+    ]
+    collection["crs"] = {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::3857"}}
+
+    stats = layer_stats.collect_geojson_stats([json.dumps(collection).encode()])
+
+    assert stats["complete"] is True
+    assert stats["invalid_features"] == 4
+    assert stats["feature_count"] == 24
+    assert stats["geometry_types"]["None"] == 3
+    assert stats["crs"] == "EPSG:3857"
+    assert stats["errors"][0] == "Feature 0: unknown geometry type 'Circle'"
+    assert "not a GeoJSON Feature" in stats["errors"][3]
+
+
+def test_collector_handles_single_features_and_broken_documents():
+    feature = {"type": "Feature", "properties": {"a": 1}, "geometry": None}
+    stats = layer_stats.collect_geojson_stats([json.dumps(feature).encode()])
+    assert stats["feature_count"] == 1
+    assert stats["geometry_types"] == {"None": 1}
+
+    truncated = json.dumps(_collection()).encode()[:500]
+    assert layer_stats.collect_geojson_stats([truncated])["complete"] is False
+    assert layer_stats.collect_geojson_stats([b"[1, 2]"])["complete"] is False
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(file_management, "LOCAL_UPLOAD_DIR", str(upload_dir))
+    monkeypatch.setattr(file_management, "BASE_URL", BASE_URL)
+    monkeypatch.setattr(file_management, "schedule_precompression", lambda path: False)
+    return upload_dir
+
+
+def test_store_file_stream_writes_stats_sidecar(uploads):
+    data = json.dumps(_collection()).encode()
+
+    url, unique_name = file_management.store_file_stream("sites.geojson", io.BytesIO(data))
+
+    path = uploads / unique_name
+    stats = layer_stats.load_layer_stats(path)
+    assert stats["feature_count"] == 21
+    assert file_management.local_upload_path(url) == str(path)
+
+    # A changed file no longer matches its sidecar
+    path.write_bytes(data + b"\n")
+    assert layer_stats.load_layer_stats(path) is None
+    assert layer_stats.get_layer_stats(path, compute=False) is None
+    assert layer_stats.get_layer_stats(path)["feature_count"] == 21
+
+
+def test_store_file_chunks_skips_stats_for_other_formats(uploads):
+    _, unique_name = file_management.store_file_chunks("notes.txt", [b"hello"])
+    assert not layer_stats.get_stats_path(uploads / unique_name).exists()
+
+
+def test_stats_for_other_vector_formats(tmp_path):
+    path = tmp_path / "sites.gpkg"
+    gpd.GeoDataFrame(
+        {"name": ["a", "b", None], "height": [1.5, 2.5, 3.5]},
+        geometry=[Point(0, 0), Point(1, 2), Point(3, 1)],
+        crs="EPSG:4326",
+    ).to_file(path, driver="GPKG")
+
+    stats = layer_stats.get_layer_stats(path)
+
+    assert stats["format"] == "gpkg"
+    assert stats["feature_count"] == 3
+    assert stats["geometry_types"] == {"Point": 3}
+    assert stats["bbox"] == [0.0, 0.0, 3.0, 2.0]
+    fields = {field["name"]: field for field in stats["fields"]}
+    assert fields["name"]["null_count"] == 1
+    assert (fields["height"]["min"], fields["height"]["max"]) == (1.5, 3.5)
+    assert layer_stats.get_stats_path(path).exists()
+
+
+def test_detect_geometry_type_reads_the_sidecar(uploads, monkeypatch):
+    data = json.dumps(_collection()).encode()
+    url, _ = file_management.store_file_stream("sites.geojson", io.BytesIO(data))
+    monkeypatch.setattr(ai_style, "local_upload_path", file_management.local_upload_path)
+
+    import requests
+
+    monkeypatch.setattr(requests, "get", lambda *a, **k: pytest.fail("downloaded"))
+    assert ai_style.detect_geometry_type(url) == "Mixed"
+
+
+def test_attribute_tool_answers_list_fields_from_the_sidecar(uploads, monkeypatch):
+    data = json.dumps(_collection()).encode()
+    url, unique_name = file_management.store_file_stream("sites.geojson", io.BytesIO(data))
+    layer = GeoDataObject(
+        id="1",
+        data_source_id="upload",
+        data_type=DataType.UPLOADED,
+        data_origin=DataOrigin.UPLOAD.value,
+        data_source="upload",
+        data_link=url,
+        name="sites",
+    )
+    plans = []
+
+    def plan(query, layer_meta, schema_ctx, llm=None):
+        plans.append(schema_ctx)
+        return {"operation": "list_fields", "params": {}}
+
+    monkeypatch.setattr(attribute_tools, "attribute_plan_from_prompt", plan)
+    monkeypatch.setattr(attribute_tools, "_get_llm_from_options", lambda state: None)
+    monkeypatch.setattr(attribute_tools, "_load_gdf", lambda link: pytest.fail("layer parsed"))
+
+    command = attribute_tools.attribute_tool.func(
+        state={"messages": [], "geodata_layers": [layer]}, tool_call_id="call-1"
+    )
+
+    result = json.loads(command.update["messages"][0].content)["result"]
+    assert result["row_count"] == 21
+    assert [field["name"] for field in result["fields"]] == [
+        "geometry",
+        "name",
+        "rating",
+        "visitors",
+    ]
+    assert plans[0]["row_count"] == 21
+    assert {"name": "visitors", "type": "int64", "min": 0, "max": 190} in plans[0]["columns"]
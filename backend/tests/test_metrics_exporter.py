@@ -0,0 +1,208 @@
+"""Tests for the OpenMetrics exposition of agent and server metrics."""
+
+import threading
+import time
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from services.background_tasks import BackgroundTaskManager, TaskPriority
+from utility import metrics_exporter
+from utility.metrics_exporter import (
+    LLM_DURATION_SECONDS,
+    LLM_TIME_TO_FIRST_TOKEN_SECONDS,
+    LLM_TOKENS,
+    SSE_EVENTS,
+    TOOL_CALLS,
+    TOOL_DURATION_SECONDS,
+    Counter,
+    Histogram,
+    count_sse_events,
+    render,
+)
+from utility import performance_metrics
+from utility.performance_metrics import PerformanceCallbackHandler
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    for metric in metrics_exporter.REGISTRY:
+        metric.clear()
+    yield
+
+
+def test_counter_shards_are_summed_across_threads():
+    counter = Counter("test_requests", "Test counter.", ["route"])
+
+    def work():
+        for _ in range(1000):
+            counter.inc("/chat")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert counter.value("/chat") == 8000
+    assert len(counter._shards) == 8
+
+
+def test_metric_families_must_implement_collect():
+    class NoSamples(metrics_exporter._Metric):
+        type_name = "gauge"
+
+    with pytest.raises(TypeError):
+        NoSamples("test_missing", "Metric without collect.")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test histogram.", ["tool"], buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "geocode")
+
+    samples = {(suffix, extra): value for suffix, _, extra, value in histogram.collect()}
+
+    assert samples[("_bucket", (("le", "0.1"),))] == 2
+    assert samples[("_bucket", (("le", "1.0"),))] == 3
+    assert samples[("_bucket", (("le", "+Inf"),))] == 4
+    assert samples[("_count", ())] == 4
+    assert samples[("_sum", ())] == pytest.approx(3.65)
+
+
+def test_render_openmetrics_text():
+    TOOL_DURATION_SECONDS.observe(0.2, "geocode_nominatim")
+    TOOL_CALLS.inc("geocode_nominatim", "success")
+    SSE_EVENTS.inc('say "hi"')
+
+    text = render()
+
+    assert "# TYPE nalamap_tool_calls counter" in text
+    assert 'nalamap_tool_calls_total{tool="geocode_nominatim",status="success"} 1.0' in text
+    assert 'nalamap_tool_duration_seconds_bucket{tool="geocode_nominatim",le="0.25"} 1' in text
+    assert 'nalamap_tool_duration_seconds_count{tool="geocode_nominatim"} 1' in text
+    assert r'nalamap_sse_events_total{event="say \"hi\""} 1.0' in text
+    assert text.endswith("# EOF\n")
+    # The Prometheus text format names counter families with the _total suffix
+    prometheus = render(openmetrics=False)
+    assert "# TYPE nalamap_tool_calls_total counter" in prometheus
+    assert "# EOF" not in prometheus
+
+
+@pytest.fixture
+def configured_llms(monkeypatch):
+    labels = (frozenset({"openai", "google"}), frozenset({"gpt-5-mini", "gemini-2.5-flash"}))
+    monkeypatch.setattr(performance_metrics, "_configured_llm_labels", lambda: labels)
+
+
+def test_callback_handler_exports_llm_and_tool_metrics(configured_llms):
+    handler = PerformanceCallbackHandler()
+    llm_run, tool_run, failed_run = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    metadata = {"ls_provider": "openai", "ls_model_name": "gpt-5-mini"}
+
+    handler.on_llm_start({}, ["prompt"], run_id=llm_run, metadata=metadata)
+    time.sleep(0.01)
+    handler.on_llm_new_token("Hel", run_id=llm_run)
+    handler.on_llm_new_token("lo", run_id=llm_run)
+    response = MagicMock(
+        llm_output={"token_usage": {"prompt_tokens": 120, "completion_tokens": 30}},
+        generations=[],
+    )
+    handler.on_llm_end(response, run_id=llm_run)
+
+    handler.on_tool_start({"name": "geocode_nominatim"}, "Paris", run_id=tool_run)
+    handler.on_tool_end("ok", run_id=tool_run, name="geocode_nominatim")
+    handler.on_tool_start({"name": "geocode_nominatim"}, "???", run_id=failed_run)
+    handler.on_tool_error(ValueError("no match"), run_id=failed_run)
+
+    assert LLM_DURATION_SECONDS.count("openai", "gpt-5-mini") == 1
+    assert LLM_TIME_TO_FIRST_TOKEN_SECONDS.count("openai", "gpt-5-mini") == 1
+    assert LLM_TOKENS.value("openai", "gpt-5-mini", "input") == 120
+    assert LLM_TOKENS.value("openai", "gpt-5-mini", "output") == 30
+    assert TOOL_DURATION_SECONDS.count("geocode_nominatim") == 2
+    assert TOOL_CALLS.value("geocode_nominatim", "success") == 1
+    assert TOOL_CALLS.value("geocode_nominatim", "error") == 1
+    # The per-request metrics are unchanged
+    assert handler.get_metrics()["token_usage"]["input"] == 120
+
+
+def test_llm_labels_outside_the_configured_list_are_folded(configured_llms):
+    handler = PerformanceCallbackHandler()
+    calls = [
+        {"ls_provider": "google_genai", "ls_model_name": "gemini-2.5-flash"},
+        {"ls_provider": "openai", "ls_model_name": "ft:gpt-5-mini:acme:1234"},
+        {"ls_provider": "my-proxy", "ls_model_name": "gpt-5-mini"},
+        {},
+    ]
+    for metadata in calls:
+        run_id = uuid.uuid4()
+        handler.on_llm_start({}, ["prompt"], run_id=run_id, metadata=metadata)
+        handler.on_llm_end(MagicMock(llm_output=None, generations=[]), run_id=run_id)
+
+    assert LLM_DURATION_SECONDS.count("google", "gemini-2.5-flash") == 1
+    assert LLM_DURATION_SECONDS.count("openai", "other") == 1
+    assert LLM_DURATION_SECONDS.count("other", "gpt-5-mini") == 1
+    assert LLM_DURATION_SECONDS.count("other", "other") == 1
+
+
+@pytest.mark.asyncio
+async def test_sse_events_are_counted():
+    async def events():
+        for chunk in ["event: tool_start\n", "data: {}\n\n", ": keepalive\n\n", "event: done\n"]:
+            yield chunk
+
+    chunks = [chunk async for chunk in count_sse_events(events())]
+
+    assert len(chunks) == 4
+    assert SSE_EVENTS.value("tool_start") == 1
+    assert SSE_EVENTS.value("keepalive") == 1
+    assert SSE_EVENTS.value("done") == 1
+
+
+def test_queue_depth_counts_submitted_tasks_not_yet_started(monkeypatch):
+    monkeypatch.setattr(BackgroundTaskManager, "_instance", None)
+    monkeypatch.setenv("NALAMAP_HIGH_PRIORITY_THREADS", "1")
+    monkeypatch.setenv("NALAMAP_LOW_PRIORITY_THREADS", "1")
+    manager = BackgroundTaskManager()
+    started, release = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    try:
+        running = manager.submit_task(block, priority=TaskPriority.LOW)
+        assert started.wait(5)
+        queued = [manager.submit_task(time.sleep, 0, priority=TaskPriority.LOW) for _ in range(3)]
+        assert manager.get_queue_depths() == {"high": 0, "low": 3}
+
+        # A task cancelled before it starts leaves the queue too
+        assert queued[0].cancel()
+        assert manager.get_queue_depths() == {"high": 0, "low": 2}
+
+        release.set()
+        for future in [running, *queued[1:]]:
+            future.result(5)
+        assert manager.get_queue_depths() == {"high": 0, "low": 0}
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_metrics_endpoint_negotiates_format(monkeypatch):
+    monkeypatch.setattr("services.background_tasks.get_queue_depths", lambda: {"high": 0, "low": 3})
+    client = TestClient(app)
+
+    openmetrics = client.get(
+        "/metrics", headers={"Accept": "application/openmetrics-text; version=1.0.0"}
+    )
+    prometheus = client.get("/metrics")
+
+    assert openmetrics.status_code == 200
+    assert openmetrics.headers["content-type"].startswith("application/openmetrics-text")
+    assert 'nalamap_background_tasks_queued{priority="low"} 3.0' in openmetrics.text
+    assert openmetrics.text.endswith("# EOF\n")
+    assert prometheus.headers["content-type"].startswith("text/plain; version=0.0.4")
@@ -0,0 +1,124 @@
+"""Tests for the bucketed metrics storage and its quantile sketch."""
+
+import numpy as np
+import pytest
+
+from utility import metrics_storage
+from utility.metrics_storage import MetricsStorage
+from utility.quantile_sketch import DDSketch
+
+
+class Clock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(metrics_storage.time, "time", clock.time)
+    return clock
+
+
+def test_sketch_quantiles_are_within_relative_accuracy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=0.0, sigma=1.5, size=20000)
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    ordered = np.sort(values)
+    for q in (0.01, 0.5, 0.95, 0.99):
+        exact = ordered[int(q * len(values))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+    assert DDSketch().quantile(0.5) is None
+
+
+def test_merged_sketches_match_one_sketch():
+    whole, first, second = DDSketch(), DDSketch(), DDSketch()
+    for i in range(1, 1001):
+        whole.add(i / 10)
+        (first if i % 3 else second).add(i / 10)
+
+    first.merge(second)
+
+    assert first.bins == whole.bins and first.count == whole.count
+    with pytest.raises(ValueError):
+        first.merge(DDSketch(relative_accuracy=0.05))
+
+
+def test_statistics_merge_buckets(clock):
+    storage = MetricsStorage(max_age_hours=24, bucket_seconds=60)
+    times = []
+    for i in range(600):
+        clock.now += 7
+        times.append(0.5 + (i % 37) / 10)
+        storage.store(
+            f"session{i % 4}",
+            {
+                "total_time": times[-1],
+                "llm_calls": 2,
+                "token_usage": {"total": 100 + i},
+                "errors": ["boom"] if i % 100 == 0 else [],
+                "tool_stats": {"geocode": {"calls": 2, "avg_time": 0.5, "total_time": 1.0}},
+            },
+        )
+
+    # 600 requests over 70 minutes
+    stats = storage.get_statistics(hours=2)
+
+    ordered = sorted(times)
+    response = stats["response_time"]
+    assert stats["total_requests"] == 600
+    assert response["min"] == min(times) and response["max"] == max(times)
+    assert response["avg"] == pytest.approx(np.mean(times), abs=1e-3)
+    assert response["p95"] == pytest.approx(ordered[int(0.95 * 600)], rel=0.01)
+    assert stats["llm"]["total_calls"] == 1200
+    assert stats["tokens"]["total"] == sum(100 + i for i in range(600))
+    assert stats["errors"] == {"total": 6, "rate": 0.01}
+    assert stats["tools"]["top_tools"][0]["total_calls"] == 1200
+
+    # Session-filtered statistics are computed from the raw entries
+    session = storage.get_statistics(hours=2, session_id="session1")
+    assert session["total_requests"] == 150
+    assert session["llm"]["total_calls"] == 300
+
+
+def test_old_buckets_expire_and_memory_stays_fixed(clock):
+    storage = MetricsStorage(max_age_hours=1, max_entries=50, bucket_seconds=60)
+    shape = storage._count.shape
+
+    for _ in range(500):
+        clock.now += 30
+        storage.store("s", {"total_time": 1.0})
+
+    assert storage._count.shape == shape
+    assert storage.get_count() == 50
+    # Only the buckets of the last hour (plus the current partial one) are counted
+    assert storage.get_statistics(hours=1)["total_requests"] <= 122
+    clock.now += 2 * 3600
+    assert storage.get_statistics(hours=1)["total_requests"] == 0
+
+
+def test_metrics_survive_restarts(tmp_path, clock):
+    db_path = tmp_path / "metrics.db"
+    storage = MetricsStorage(db_path=db_path)
+    for i in range(3):
+        storage.store(f"session{i}", {"total_time": i + 1.0, "llm_calls": 1})
+
+    restarted = MetricsStorage(db_path=db_path)
+
+    stats = restarted.get_statistics(hours=1)
+    assert stats["total_requests"] == 3
+    assert stats["response_time"]["max"] == 3.0
+    assert [e["session_id"] for e in restarted.get_recent(hours=1)] == [
+        "session0",
+        "session1",
+        "session2",
+    ]
+
+    restarted.clear()
+    assert MetricsStorage(db_path=db_path).get_count() == 0
@@ -47,7 +47,8 @@ class TestAgentModelSelection:
 
         # Get the call arguments
         call_kwargs = mock_create_react.call_args[1]
-        assert call_kwargs["prompt"] == "Test prompt"
+        system_message = call_kwargs["prompt"]({"messages": []})[0]
+        assert system_message.content == "Test prompt"
 
     @pytest.mark.asyncio
     @pytest.mark.skipif(
@@ -93,7 +94,7 @@ class TestAgentModelSelection:
         assert agent is not None
         call_kwargs = mock_create_react.call_args[1]
         # Should use default prompt, not empty string
-        assert call_kwargs["prompt"] != ""
+        assert call_kwargs["prompt"]({"messages": []})[0].content != ""
 
     @pytest.mark.asyncio
     @patch("services.single_agent.create_react_agent")
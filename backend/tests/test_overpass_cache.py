@@ -0,0 +1,158 @@
+"""Tests for the persistent, spatially aware Overpass response cache."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from services.tools.overpass import OverpassClient
+from services.tools.overpass_cache import (
+    OverpassResponseCache,
+    QueryExtent,
+    clip_elements,
+    normalize_query,
+)
+
+
+def _bbox_query(s, w, n, e, limit=5000, timeout=300):
+    return (
+        f"[out:json][timeout:{timeout}][maxsize:67108864];\n"
+        "(\n"
+        f'  node["amenity"="hospital"]({s},{w},{n},{e});\n'
+        f'  way["amenity"="hospital"]({s},{w},{n},{e});\n'
+        ");\n"
+        f"out geom {limit};"
+    )
+
+
+def _elements():
+    return [
+        {"type": "node", "id": 1, "lat": -1.29, "lon": 36.82, "tags": {"amenity": "hospital"}},
+        {"type": "node", "id": 2, "lat": -1.10, "lon": 37.00, "tags": {"amenity": "hospital"}},
+        {
+            "type": "way",
+            "id": 3,
+            "bounds": {"minlat": -1.31, "minlon": 36.80, "maxlat": -1.30, "maxlon": 36.81},
+            "geometry": [{"lat": -1.31, "lon": 36.80}, {"lat": -1.30, "lon": 36.81}],
+            "tags": {"amenity": "hospital"},
+        },
+    ]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return OverpassResponseCache(db_path=str(tmp_path / "overpass.db"))
+
+
+def test_normalize_ignores_settings_and_whitespace():
+    a = normalize_query(_bbox_query(-1.4, 36.7, -1.2, 36.9, timeout=60))
+    b = normalize_query("  " + _bbox_query(-1.4, 36.7, -1.2, 36.9, timeout=300) + "\n")
+    assert a.key == b.key
+    assert a.extent == QueryExtent.bbox(-1.4, 36.7, -1.2, 36.9)
+    assert a.max_results == 5000
+    assert "{EXTENT}" in a.template and "{LIMIT}" in a.template
+
+
+def test_area_queries_have_no_extent():
+    nq = normalize_query('area(3600000001)->.a;\nnode["amenity"](area.a);\nout geom 10;')
+    assert nq.extent is None
+
+
+def test_exact_hit(cache):
+    query = _bbox_query(-1.4, 36.7, -1.2, 36.9)
+    cache.put(query, {"elements": _elements()})
+    assert len(cache.get(query)["elements"]) == 3
+    assert cache.get(_bbox_query(-1.5, 36.7, -1.2, 36.9)) is None
+
+
+def test_narrower_bbox_is_clipped_from_wider(cache):
+    cache.put(_bbox_query(-1.5, 36.5, -1.0, 37.1), {"elements": _elements()})
+
+    data = cache.get(_bbox_query(-1.35, 36.75, -1.25, 36.85))
+    assert sorted(e["id"] for e in data["elements"]) == [1, 3]
+
+    # A request extending beyond the cached bbox is a miss
+    assert cache.get(_bbox_query(-1.35, 36.75, -0.5, 36.85)) is None
+
+
+def test_truncated_response_not_reused_spatially(cache):
+    cache.put(_bbox_query(-1.5, 36.5, -1.0, 37.1, limit=3), {"elements": _elements()})
+    assert cache.get(_bbox_query(-1.35, 36.75, -1.25, 36.85, limit=3)) is None
+
+
+def test_around_covered_by_larger_radius():
+    outer = QueryExtent.around(5000, -1.29, 36.82)
+    assert outer.covers(QueryExtent.around(1000, -1.29, 36.82))
+    assert not outer.covers(QueryExtent.around(1000, -1.0, 36.82))
+    clipped = clip_elements(_elements(), QueryExtent.around(1000, -1.29, 36.82))
+    assert [e["id"] for e in clipped] == [1]
+
+
+def test_ways_crossing_the_extent_are_kept():
+    # A road crossing the bbox with both vertices outside it
+    road = {
+        "type": "way",
+        "id": 10,
+        "bounds": {"minlat": -1.3, "minlon": 36.6, "maxlat": -1.3, "maxlon": 37.0},
+        "geometry": [{"lat": -1.3, "lon": 36.6}, {"lat": -1.3, "lon": 37.0}],
+    }
+    river = {
+        "type": "relation",
+        "id": 11,
+        "members": [
+            {"type": "way", "geometry": [{"lat": -1.5, "lon": 36.82}, {"lat": -1.0, "lon": 36.82}]}
+        ],
+    }
+    # Vertices on both sides, but the gap between them is not a segment
+    broken = {
+        "type": "way",
+        "id": 12,
+        "geometry": [{"lat": -1.3, "lon": 36.6}, None, {"lat": -1.3, "lon": 37.0}],
+    }
+    elements = [road, river, broken]
+    bbox = QueryExtent.bbox(-1.35, 36.75, -1.25, 36.85)
+    assert [e["id"] for e in clip_elements(elements, bbox)] == [10, 11]
+    # The road passes ~1.1 km south of the center
+    around = QueryExtent.around(1500, -1.29, 36.82)
+    assert [e["id"] for e in clip_elements(elements, around)] == [10, 11]
+    assert clip_elements([road], QueryExtent.around(1000, -1.29, 36.82)) == []
+
+
+def test_ttl_and_error_responses(tmp_path):
+    cache = OverpassResponseCache(db_path=str(tmp_path / "o.db"), ttl_seconds=0)
+    query = _bbox_query(-1.4, 36.7, -1.2, 36.9)
+    cache.put(query, {"elements": _elements()})
+    with patch("services.tools.overpass_cache.time.time", return_value=10**12):
+        assert cache.get(query) is None
+
+    cache = OverpassResponseCache(db_path=str(tmp_path / "p.db"))
+    cache.put(query, {"elements": [], "remark": "runtime error: Query timed out"})
+    assert cache.stats()["entries"] == 0
+
+
+def test_size_eviction_drops_least_recently_used(cache):
+    q1, q2, q3 = (_bbox_query(i, 0, i + 1, 1) for i in range(3))
+    cache.put(q1, {"elements": _elements()})
+    entry_size = cache.stats()["total_bytes"]
+    cache.max_bytes = entry_size * 2
+
+    cache.put(q2, {"elements": _elements()})
+    cache.get(q1)  # q1 becomes most recently used
+    cache.put(q3, {"elements": _elements()})
+
+    assert cache.get(q2) is None
+    assert cache.get(q1) is not None and cache.get(q3) is not None
+
+
+def test_client_serves_repeat_queries_from_cache(cache):
+    response = Mock(status_code=200)
+    response.json.return_value = {"elements": _elements()}
+    client = OverpassClient(cache=cache)
+    query = _bbox_query(-1.4, 36.7, -1.2, 36.9)
+
+    with patch("services.tools.overpass.http_client.post", return_value=response) as mock_post:
+        first, err1 = client.execute_query(query)
+        second, err2 = client.execute_query(query)
+
+    assert err1 is None and err2 is None
+    assert first == second
+    assert mock_post.call_count == 1
@@ -0,0 +1,256 @@
+"""Tests for streaming Overpass parsing and disk-spooled feature output."""
+
+import hashlib
+import json
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+
+from services.tools.overpass import OverpassClient, OverpassQueryError
+from services.tools.overpass_stream import (
+    NodeIndex,
+    NodeRefResolver,
+    OverpassElementStream,
+    OverpassFeatureWriter,
+)
+
+
+def _response_bytes(elements, remark=None):
+    payload = {
+        "version": 0.6,
+        "osm3s": {"copyright": "The data included in this document is from www.openstreetmap.org."},
+        "elements": elements,
+    }
+    if remark:
+        payload["remark"] = remark
+    return json.dumps(payload, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def _chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def _elements():
+    return [
+        {"type": "node", "id": 1, "lat": 48.1, "lon": 11.5, "tags": {"name": "Café Münster"}},
+        {"type": "node", "id": 2, "lat": 48.2, "lon": 11.6},
+        {"type": "node", "id": 3, "lat": 48.3, "lon": 11.7},
+        {"type": "way", "id": 10, "nodes": [2, 3], "tags": {"highway": "primary"}},
+        {
+            "type": "way",
+            "id": 11,
+            "geometry": [{"lat": 48.0, "lon": 11.0}, {"lat": 48.5, "lon": 11.5}],
+            "tags": {"highway": "secondary", "name": "Ring"},
+        },
+    ]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_stream_yields_elements_across_chunk_boundaries(chunk_size):
+    data = _response_bytes(_elements(), remark="runtime error: Query timed out")
+    stream = OverpassElementStream(_chunked(data, chunk_size))
+
+    assert list(stream) == _elements()
+    assert stream.element_count == 5
+    assert stream.remark == "runtime error: Query timed out"
+
+
+def test_stream_handles_elements_larger_than_chunks():
+    geometry = [{"lat": 48 + i * 1e-5, "lon": 11 + i * 1e-5} for i in range(5000)]
+    elements = [{"type": "way", "id": 1, "geometry": geometry}, {"type": "node", "id": 2}]
+
+    parsed = list(OverpassElementStream(_chunked(_response_bytes(elements), 512)))
+    assert parsed == elements
+
+
+def test_stream_rejects_truncated_response():
+    data = _response_bytes(_elements())
+    with pytest.raises(ValueError):
+        list(OverpassElementStream([data[: len(data) // 2]]))
+
+
+def test_node_index_lookup():
+    index = NodeIndex()
+    for node_id, lon, lat in [(30, 3.0, 30.0), (10, 1.0, 10.0), (20, 2.0, 20.0)]:
+        index.add(node_id, lon, lat)
+
+    assert len(index) == 3
+    assert index.lookup([10, 30, 20]) == [[1.0, 10.0], [3.0, 30.0], [2.0, 20.0]]
+    assert index.lookup([10, 99]) is None
+
+
+def test_resolver_builds_way_geometry_from_node_refs():
+    resolved = list(NodeRefResolver().resolve(iter(_elements())))
+
+    # Untagged member nodes are index-only
+    assert [(e["type"], e["id"]) for e in resolved] == [("node", 1), ("way", 11), ("way", 10)]
+    assert resolved[-1]["geometry"] == [{"lon": 11.6, "lat": 48.2}, {"lon": 11.7, "lat": 48.3}]
+
+
+def _feature(feature_id, geometry, name=None):
+    return {
+        "type": "Feature",
+        "id": feature_id,
+        "properties": {"name": name} if name else {},
+        "geometry": geometry,
+    }
+
+
+def test_writer_spools_dedupes_and_stores(tmp_path):
+    stored = {}
+
+    def fake_store(name, chunks):
+        stored[name] = b"".join(chunks)
+        return f"http://files/{name}", name
+
+    with OverpassFeatureWriter() as writer:
+        assert writer.add(_feature("node/1", {"type": "Point", "coordinates": [1.0, 2.0]}, "A"))
+        assert not writer.add(_feature("node/1", {"type": "Point", "coordinates": [1.0, 2.0]}))
+        writer.add(_feature("node/2", {"type": "Point", "coordinates": [3.0, 4.0]}, "B"))
+        writer.add(
+            _feature("way/3", {"type": "LineString", "coordinates": [[0.0, 0.0], [5.0, 5.0]]})
+        )
+        writer.add(_feature("rel/4", {"type": "MultiPolygon", "coordinates": []}))
+
+        assert writer.duplicates == 1
+        assert (writer.count("Points"), writer.count("Lines"), writer.total_count) == (2, 1, 3)
+        assert writer.sample_names("Points") == ["A", "B"]
+        assert writer.bbox_string("Points").startswith("POLYGON((3.0 2.0,")
+
+        with patch("services.tools.overpass_stream.store_file_chunks", side_effect=fake_store):
+            url, unique_id, sha256_hex, size = writer.store("Points", "points.json")
+
+        writer.discard("Lines")
+        assert writer.count("Lines") == 0
+
+    content = stored["points.json"]
+    collection = json.loads(content)
+    assert [f["id"] for f in collection["features"]] == ["node/1", "node/2"]
+    assert sha256_hex == hashlib.sha256(content).hexdigest()
+    assert size == len(content)
+
+
+_REQUEST = httpx.Request("POST", "https://overpass-api.de/api/interpreter")
+
+
+def _client_with_stream(response):
+    @contextmanager
+    def fake_stream(method, url, **kwargs):
+        yield response
+
+    client = OverpassClient(use_cache=False)
+    return client, patch("services.tools.overpass.http_client.stream", side_effect=fake_stream)
+
+
+def test_client_stream_query():
+    response = httpx.Response(200, content=_response_bytes(_elements()), request=_REQUEST)
+    client, mock_stream = _client_with_stream(response)
+
+    with mock_stream:
+        with client.stream_query("[out:json];node(1);out;") as elements:
+            ids = [e["id"] for e in elements]
+
+    assert ids == [1, 11, 10]
+
+
+def test_client_stream_query_reports_errors():
+    response = httpx.Response(429, content=b"rate limited", request=_REQUEST)
+    client, mock_stream = _client_with_stream(response)
+
+    with mock_stream, pytest.raises(OverpassQueryError, match="Status: 429"):
+        with client.stream_query("[out:json];node(1);out;"):
+            pass
+
+    truncated = httpx.Response(200, content=_response_bytes(_elements())[:80], request=_REQUEST)
+    client, mock_stream = _client_with_stream(truncated)
+    with mock_stream, pytest.raises(OverpassQueryError, match="invalid JSON"):
+        with client.stream_query("[out:json];node(1);out;") as elements:
+            list(elements)
+
+
+def test_client_stream_query_fills_the_cache(tmp_path):
+    from services.tools.overpass_cache import OverpassResponseCache
+
+    query = "[out:json];way(48.0,11.0,48.6,11.8);out geom;"
+    content = _response_bytes(_elements())
+    calls = []
+
+    @contextmanager
+    def fake_stream(method, url, **kwargs):
+        calls.append(url)
+        yield httpx.Response(200, content=content, request=_REQUEST)
+
+    def run(client, stop_after=None):
+        with client.stream_query(query) as elements:
+            ids = []
+            for element in elements:
+                ids.append(element["id"])
+                if len(ids) == stop_after:
+                    break
+        return ids
+
+    with patch("services.tools.overpass.http_client.stream", side_effect=fake_stream):
+        # Responses larger than the cap, or not read to the end, are not cached
+        small = OverpassResponseCache(db_path=str(tmp_path / "small.db"))
+        capped = OverpassClient(cache=small, stream_cache_max_bytes=len(content) - 1)
+        run(capped)
+        assert small.stats()["entries"] == 0
+
+        cache = OverpassResponseCache(db_path=str(tmp_path / "o.db"))
+        client = OverpassClient(cache=cache)
+        run(client, stop_after=1)
+        assert cache.stats()["entries"] == 0
+        assert len(calls) == 2
+
+        first = run(client)
+        assert len(calls) == 3
+        assert cache.stats()["entries"] == 1
+        assert run(client) == first
+        assert len(calls) == 3
+
+
+def _fake_store(name, chunks):
+    b"".join(chunks)
+    return f"http://files/{name}", name
+
+
+def test_overpass_tool_streams_linear_queries():
+    import services.tools.geocoding as gc
+
+    mod = "services.tools._geocoding_legacy"
+    location = MagicMock(lat=48.2, lon=11.6, display_name="Munich, Germany", bbox=None)
+    elements = [
+        {"type": "node", "id": 1, "lat": 48.1, "lon": 11.5, "tags": {"highway": "bus_stop"}},
+        {
+            "type": "way",
+            "id": 11,
+            "geometry": [{"lat": 48.0, "lon": 11.0}, {"lat": 48.5, "lon": 11.5}],
+            "tags": {"highway": "secondary", "name": "Ring"},
+        },
+    ]
+
+    @contextmanager
+    def fake_stream_query(self, query, timeout=300):
+        yield iter(elements)
+
+    with (
+        patch(f"{mod}._geocode_location_for_overpass", return_value=(location, None)),
+        patch(f"{mod}.OverpassClient.stream_query", fake_stream_query),
+        patch(f"{mod}.OverpassClient.execute_query") as mock_execute,
+        patch("services.tools.overpass_stream.store_file_chunks", side_effect=_fake_store),
+    ):
+        result = gc.geocode_using_overpass_to_geostate.func(
+            query="roads",
+            amenity_key="roads",
+            location_name="Munich",
+            state={"messages": [], "geodata_results": []},
+            tool_call_id="call-1",
+        )
+
+    mock_execute.assert_not_called()
+    layers = result.update["geodata_last_results"]
+    # Point noise is dropped next to the road lines
+    assert [layer.properties["geometry_type_collected"] for layer in layers] == ["Lines"]
+    assert layers[0].properties["sample_names"] == ["Ring"]
@@ -8,6 +8,7 @@ to ensure proper metric collection and timing.
 import time
 from unittest.mock import Mock
 
+import pytest
 from langchain_core.messages import AIMessage, HumanMessage
 
 from utility.performance_metrics import (
@@ -546,14 +547,16 @@ class TestMetricsStorage:
         from utility.metrics_storage import MetricsStorage
 
         storage = MetricsStorage()
-        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        for value in [1.0, 2.0, 3.0, 4.0, 5.0]:
+            storage.store(session_id="test", metrics={"total_time": value})
 
-        stats = storage._calculate_stats(values)
+        stats = storage.get_statistics(hours=1)["response_time"]
 
         assert stats["min"] == 1.0
         assert stats["max"] == 5.0
         assert stats["avg"] == 3.0
-        assert stats["median"] == 3.0
+        # Percentiles come from a sketch with 1% relative accuracy
+        assert stats["median"] == pytest.approx(3.0, rel=0.01)
 
     def test_get_top_tools(self):
         """Test top tools calculation."""
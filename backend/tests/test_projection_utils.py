@@ -1,11 +1,18 @@
+from unittest.mock import patch
+
 import geopandas as gpd
 import pytest
-from shapely.geometry import Point
+from geopandas.testing import assert_geodataframe_equal
+from shapely.geometry import LineString, Point, Polygon
 
+from services.tools.geoprocessing import projection_utils
 from services.tools.geoprocessing.projection_utils import (
     OperationType,
     get_optimal_crs_for_bbox,
+    get_transformer,
     prepare_gdf_for_operation,
+    prepare_gdfs_for_operation,
+    transform_gdf,
     validate_crs,
 )
 
@@ -99,6 +106,74 @@ class TestCRSSelection:
         assert "Manual override" in crs_info["selection_reason"]
 
 
+class TestProjectionCaches:
+    """CRS decisions, parsed CRSs and transformers are reused across calls."""
+
+    def test_decisions_are_memoized_per_bbox_bucket(self):
+        bbox = (13.0, 52.0, 14.0, 53.0)
+        with patch.object(
+            projection_utils, "decide_projection", wraps=projection_utils.decide_projection
+        ) as decide:
+            projection_utils._decide_projection_cached.cache_clear()
+            first = get_optimal_crs_for_bbox(bbox, OperationType.BUFFER)
+            # Same bucket: floating point noise below the bucket size
+            second = get_optimal_crs_for_bbox((13.0 + 1e-9, 52.0, 14.0, 53.0), OperationType.BUFFER)
+            get_optimal_crs_for_bbox(bbox, OperationType.AREA)
+
+        assert decide.call_count == 2
+        assert first == second
+        # Callers get their own copy of the cached decision
+        first["decision_path"].append("modified")
+        assert (
+            "modified" not in get_optimal_crs_for_bbox(bbox, OperationType.BUFFER)["decision_path"]
+        )
+
+    def test_transformers_are_cached(self):
+        gdf = gpd.GeoDataFrame(geometry=[Point(13.4, 52.5)], crs="EPSG:4326")
+        assert get_transformer("EPSG:4326", "EPSG:32633") is get_transformer(gdf.crs, "EPSG:32633")
+
+    @pytest.mark.parametrize("target", ["EPSG:32633", "EPSG:3857"])
+    def test_transform_gdf_matches_to_crs(self, target):
+        gdf = gpd.GeoDataFrame(
+            {"name": ["a", "b", "c"]},
+            geometry=[
+                Point(13.4, 52.5),
+                LineString([(13, 52), (14, 53)]),
+                Polygon([(13, 52), (14, 52), (14, 53), (13, 52)]),
+            ],
+            crs="EPSG:4326",
+        )
+
+        result = transform_gdf(gdf, target)
+
+        assert_geodataframe_equal(result, gdf.to_crs(target), check_less_precise=True)
+        assert gdf.crs == "EPSG:4326"
+        assert_geodataframe_equal(transform_gdf(result, "EPSG:4326"), gdf, check_less_precise=True)
+
+    def test_custom_wkt_is_parsed_once(self):
+        gdf = gpd.GeoDataFrame(geometry=[Point(20, 83), Point(25, 84)], crs="EPSG:4326")
+        prepare_gdf_for_operation(gdf, OperationType.AREA)
+        misses = projection_utils.parse_crs.cache_info().misses
+
+        _, crs_info = prepare_gdf_for_operation(gdf, OperationType.AREA)
+
+        assert crs_info.get("authority") == "WKT"
+        assert projection_utils.parse_crs.cache_info().misses == misses
+
+    def test_prepare_gdfs_uses_the_first_layers_crs(self):
+        arctic = gpd.GeoDataFrame(geometry=[Point(20, 83), Point(25, 84)], crs="EPSG:4326")
+        other = gpd.GeoDataFrame(geometry=[Point(22, 83.5)], crs="EPSG:4326")
+
+        (first, second), (first_info, second_info) = prepare_gdfs_for_operation(
+            [arctic, other], OperationType.SJOIN
+        )
+
+        # Custom polar WKT: no EPSG code, yet both layers share it
+        assert first_info.get("authority") == "WKT"
+        assert first.crs == second.crs
+        assert second_info["auto_selected"] is False
+
+
 class TestOperationIntegration:
 
     def test_buffer_with_smart_crs(self):
@@ -89,14 +89,12 @@ def test_preload_endpoint_uses_session_cookie(api_client, monkeypatch):
         errors = {}  # No errors
         return layers, status, errors
 
-    # Mock delete_layers and store_layers
-    def fake_delete_layers(session, urls):
-        pass
-
-    def fake_store_layers(session, backend_url, backend_name, layers):
+    # Mock store_layers
+    def fake_store_layers(session, backend_url, backend_name, layers, replace=False):
         called["session"] = session
         called["backend_url"] = backend_url
         called["stored_layers"] = len(layers)
+        called["replace"] = replace
         return len(layers)
 
     # Mock the task manager to execute synchronously for testing
@@ -120,9 +118,6 @@ def test_preload_endpoint_uses_session_cookie(api_client, monkeypatch):
         "services.tools.geoserver.custom_geoserver.fetch_all_service_capabilities_with_status",
         fake_fetch_capabilities,
     )
-    monkeypatch.setattr(
-        "services.tools.geoserver.custom_geoserver.delete_layers", fake_delete_layers
-    )
     monkeypatch.setattr("services.tools.geoserver.custom_geoserver.store_layers", fake_store_layers)
 
     payload = {
@@ -148,6 +143,7 @@ def test_preload_endpoint_uses_session_cookie(api_client, monkeypatch):
     assert called["executed"] is True
     assert called["session"] == session_id
     assert called["stored_layers"] == 2
+    assert called["replace"] is True
 
 
 def test_options_endpoint_returns_example_mcp_servers(api_client):
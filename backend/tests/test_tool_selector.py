@@ -8,12 +8,17 @@ and edge cases.
 from unittest.mock import AsyncMock
 
 import pytest
+from langchain_core.embeddings import Embeddings
 from langchain_core.tools import BaseTool
 
+from services import tool_selector
 from services.tool_selector import (
     TOOL_METADATA,
     DynamicToolSelector,
     SelectionStrategy,
+    ToolEmbeddings,
+    ToolMetadata,
+    _normalized,
     create_tool_selector,
 )
 
@@ -245,20 +250,19 @@ async def test_core_tools_always_included(mock_tools, mock_embeddings):
             assert core_tool in selected_names
 
 
-@pytest.mark.asyncio
-async def test_cosine_similarity_calculation(mock_embeddings):
-    """Test cosine similarity calculation."""
-    selector = DynamicToolSelector(embeddings=mock_embeddings)
+def test_cosine_similarity_calculation():
+    """Test cosine similarity calculation against all tools at once."""
+    tool_embeddings = ToolEmbeddings(
+        names=["same", "orthogonal", "opposite", "empty"],
+        matrix=_normalized([[2.0, 0.0, 0.0], [0.0, 1.0, 0.0], [-1.0, 0.0, 0.0], [0.0, 0.0, 0.0]]),
+    )
 
-    vec1 = [1.0, 0.0, 0.0]
-    vec2 = [1.0, 0.0, 0.0]
-    similarity = selector._cosine_similarity(vec1, vec2)
-    assert similarity == pytest.approx(1.0)
+    similarities = tool_embeddings.similarities(_normalized([3.0, 0.0, 0.0]))
 
-    vec3 = [1.0, 0.0, 0.0]
-    vec4 = [0.0, 1.0, 0.0]
-    similarity = selector._cosine_similarity(vec3, vec4)
-    assert similarity == pytest.approx(0.0)
+    assert similarities["same"] == pytest.approx(1.0)
+    assert similarities["orthogonal"] == pytest.approx(0.0)
+    assert similarities["opposite"] == pytest.approx(-1.0)
+    assert similarities["empty"] == pytest.approx(0.0)
 
 
 def test_create_tool_selector_factory():
@@ -469,3 +473,85 @@ async def test_module_level_metrics_storage(mock_tools):
     assert stored_metrics is not None
     assert stored_metrics["total_selections"] == 1
     assert stored_metrics["avg_tools_selected"] > 0
+
+
+class CountingEmbeddings(Embeddings):
+    """Named embedding model counting its calls."""
+
+    def __init__(self, model="test-embedding-model"):
+        self.model = model
+        self.documents = 0
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        self.documents += 1
+        return [[1.0 + ("buffer" in t), float(len(t) % 7), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [2.0, float(len(text) % 7), 1.0]
+
+
+@pytest.fixture
+def embedding_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(tool_selector, "TOOL_EMBEDDING_CACHE_DIR", str(tmp_path))
+    tool_selector.clear_embedding_cache()
+    yield tmp_path
+    tool_selector.clear_embedding_cache()
+
+
+@pytest.mark.asyncio
+async def test_tool_embeddings_are_shared_and_persisted(mock_tools, embedding_cache, monkeypatch):
+    embeddings = CountingEmbeddings()
+
+    for query in ("Buffer the rivers", "Find Berlin"):
+        await create_tool_selector(embeddings=embeddings).select_tools(query, mock_tools)
+
+    # New selectors reuse the tool matrix computed by the first one
+    assert embeddings.documents == 1
+    assert len(list(embedding_cache.glob("*.npz"))) == 1
+
+    # After a restart the matrix is read from disk
+    tool_selector.clear_embedding_cache()
+    selector = create_tool_selector(embeddings=embeddings)
+    await selector.select_tools("Find Paris", mock_tools)
+    assert embeddings.documents == 1
+    assert selector._tool_embeddings_cache.names == list(TOOL_METADATA)
+
+    # Another model, or changed tool descriptions, are embedded again
+    await create_tool_selector(embeddings=CountingEmbeddings("other")).select_tools(
+        "Find Paris", mock_tools
+    )
+    assert len(list(embedding_cache.glob("*.npz"))) == 2
+    metadata = TOOL_METADATA["geoprocess_tool"]
+    monkeypatch.setitem(
+        TOOL_METADATA,
+        "geoprocess_tool",
+        ToolMetadata(metadata.name, metadata.category, "Buffer and clip layers."),
+    )
+    await create_tool_selector(embeddings=embeddings).select_tools("Find Paris", mock_tools)
+    assert embeddings.documents == 2
+
+
+@pytest.mark.asyncio
+async def test_repeated_queries_skip_the_embedding_call(mock_tools, embedding_cache):
+    embeddings = CountingEmbeddings()
+    selector = DynamicToolSelector(embeddings=embeddings, strategy=SelectionStrategy.SEMANTIC)
+
+    first = await selector.select_tools("Buffer the rivers", mock_tools)
+    second = await create_tool_selector(embeddings=embeddings, strategy="semantic").select_tools(
+        "Buffer the rivers", mock_tools
+    )
+    await selector.select_tools("Find Berlin", mock_tools)
+
+    assert embeddings.queries == 2
+    assert [t.name for t in first] == [t.name for t in second]
+
+
+@pytest.mark.asyncio
+async def test_unnamed_models_are_not_shared(mock_tools, mock_embeddings, embedding_cache):
+    await DynamicToolSelector(embeddings=mock_embeddings).select_tools("Find Berlin", mock_tools)
+    await DynamicToolSelector(embeddings=mock_embeddings).select_tools("Find Berlin", mock_tools)
+
+    assert mock_embeddings.aembed_query.await_count == 2
+    assert list(embedding_cache.iterdir()) == []
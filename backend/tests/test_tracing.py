@@ -0,0 +1,193 @@
+"""Tests for request tracing spans, export and the debug trace viewer."""
+
+import asyncio
+import json
+import uuid
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from utility import tracing
+from utility.tracing import (
+    TracingCallbackHandler,
+    get_recent_traces,
+    get_trace_waterfall,
+    span,
+    start_trace,
+    to_otlp,
+    trace_stream,
+    traced,
+)
+
+
+@pytest.fixture
+def tracer(monkeypatch):
+    tracer = tracing.get_tracer()
+    monkeypatch.setattr(tracer, "sample_rate", 1.0)
+    monkeypatch.setattr(tracer, "file_path", "")
+    monkeypatch.setattr(tracer, "otlp_endpoint", "")
+    tracer.clear()
+    yield tracer
+    tracer.clear()
+
+
+def _spans_by_name(trace_id):
+    return {s["name"]: s for s in get_trace_waterfall(trace_id)}
+
+
+def test_nested_spans_form_one_trace(tracer):
+    with start_trace("chat.stream", session_id="abc") as root:
+        with span("agent.create"):
+            with span("tools.select", available=12):
+                pass
+        with pytest.raises(ValueError):
+            with span("plan.create"):
+                raise ValueError("planner failed")
+
+    spans = _spans_by_name(root.trace_id)
+
+    assert spans["tools.select"]["parentSpanId"] == spans["agent.create"]["spanId"]
+    assert spans["tools.select"]["depth"] == 2
+    assert spans["tools.select"]["attributes"] == {"available": 12}
+    assert spans["plan.create"]["status"] == {"code": "ERROR", "message": "planner failed"}
+    assert spans["chat.stream"]["kind"] == "SERVER"
+    assert [t["trace_id"] for t in get_recent_traces()] == [root.trace_id]
+    assert tracing.current_span() is None
+
+
+def test_unsampled_requests_record_nothing(tracer):
+    tracer.sample_rate = 0.0
+
+    with start_trace("chat.stream") as root:
+        with span("agent.create") as child:
+            assert root is None and child is None
+
+    # Spans outside a trace are no-ops as well
+    with span("HTTP GET") as orphan:
+        assert orphan is None
+    assert get_recent_traces() == []
+
+
+@pytest.mark.asyncio
+async def test_spans_follow_tasks_threads_and_streams(tracer):
+    @traced("gdf.load")
+    def load():
+        return tracing.current_span().name
+
+    @traced("vector_store.search")
+    async def search():
+        await asyncio.sleep(0)
+        return tracing.current_span().name
+
+    async def events():
+        yield await asyncio.to_thread(load)
+        yield await asyncio.create_task(search())
+
+    chunks = [chunk async for chunk in trace_stream(events(), "chat.stream")]
+
+    assert chunks == ["gdf.load", "vector_store.search"]
+    (summary,) = get_recent_traces()
+    spans = _spans_by_name(summary["trace_id"])
+    assert summary["span_count"] == 3
+    assert spans["gdf.load"]["parentSpanId"] == spans["chat.stream"]["spanId"]
+    assert spans["vector_store.search"]["parentSpanId"] == spans["chat.stream"]["spanId"]
+
+
+def test_callback_spans_are_parents_of_tool_io(tracer):
+    handler = TracingCallbackHandler()
+    llm_run, tool_run = uuid.uuid4(), uuid.uuid4()
+
+    with start_trace("chat.stream") as root:
+        assert len(tracing.callbacks()) == 1
+        handler.on_llm_start({}, ["prompt"], run_id=llm_run, metadata={"ls_provider": "openai"})
+        handler.on_llm_end(
+            type("Result", (), {"llm_output": {"token_usage": {"prompt_tokens": 7}}}),
+            run_id=llm_run,
+        )
+        handler.on_tool_start({"name": "geocode_nominatim"}, "Paris", run_id=tool_run)
+        with span("HTTP GET", "CLIENT"):
+            pass
+        handler.on_tool_error(RuntimeError("timeout"), run_id=tool_run)
+        assert tracing.current_span() is root
+
+    assert tracing.callbacks() == []
+    spans = _spans_by_name(root.trace_id)
+    assert spans["llm.call"]["attributes"]["gen_ai.system"] == "openai"
+    assert spans["llm.call"]["attributes"]["gen_ai.usage.input_tokens"] == 7
+    assert spans["HTTP GET"]["parentSpanId"] == spans["tool.geocode_nominatim"]["spanId"]
+    assert spans["tool.geocode_nominatim"]["status"]["code"] == "ERROR"
+
+
+def test_http_client_records_client_spans(tracer):
+    from services.http_client import HttpClientPool
+
+    pool = HttpClientPool()
+    transport = httpx.MockTransport(lambda request: httpx.Response(204))
+    client, _ = pool._sync_entry("overpass-api.de", True)
+    client._transport = transport
+
+    with start_trace("chat.stream") as root:
+        pool.request("GET", "https://overpass-api.de/api/interpreter?data=secret")
+    pool.close()
+
+    http = _spans_by_name(root.trace_id)["HTTP GET"]
+    assert http["kind"] == "CLIENT"
+    assert http["attributes"] == {
+        "http.request.method": "GET",
+        "server.address": "overpass-api.de",
+        "http.response.status_code": 204,
+    }
+
+
+def test_finished_traces_are_exported(tracer, tmp_path, monkeypatch):
+    posted = []
+
+    def post(url, json, timeout):
+        posted.append((url, json))
+        return httpx.Response(200, request=httpx.Request("POST", url))
+
+    monkeypatch.setattr(httpx, "post", post)
+    with start_trace("chat.stream") as root:
+        with span("plan.create", steps=3):
+            pass
+    # Export synchronously instead of on the background exporter thread
+    tracer.file_path = str(tmp_path / "traces" / "traces.jsonl")
+    tracer.otlp_endpoint = "http://localhost:4318/v1/traces"
+    tracer.write(tracer.get(root.trace_id))
+
+    line = json.loads((tmp_path / "traces" / "traces.jsonl").read_text().splitlines()[0])
+    assert line["traceId"] == root.trace_id
+    assert [s["name"] for s in line["spans"]] == ["plan.create", "chat.stream"]
+
+    url, body = posted[0]
+    otlp_spans = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert url == "http://localhost:4318/v1/traces"
+    assert otlp_spans[0]["attributes"] == [{"key": "steps", "value": {"intValue": "3"}}]
+    assert otlp_spans[1]["parentSpanId"] == "" and otlp_spans[1]["kind"] == 2
+    assert len(otlp_spans[1]["traceId"]) == 32 and len(otlp_spans[1]["spanId"]) == 16
+
+
+def test_to_otlp_sets_service_name():
+    body = to_otlp([], "nalamap-test")
+    resource = body["resourceSpans"][0]["resource"]["attributes"]
+    assert resource == [{"key": "service.name", "value": {"stringValue": "nalamap-test"}}]
+
+
+def test_trace_viewer_endpoints(tracer):
+    with start_trace("chat.stream") as root:
+        with span("tool.geocode_nominatim"):
+            pass
+    client = TestClient(app)
+
+    listing = client.get("/api/debug/traces").json()["traces"]
+    waterfall = client.get(f"/api/debug/traces/{root.trace_id}").json()
+    page = client.get(f"/api/debug/traces/{root.trace_id}", params={"format": "html"})
+
+    assert listing[0]["trace_id"] == root.trace_id
+    assert [s["name"] for s in waterfall["spans"]] == ["chat.stream", "tool.geocode_nominatim"]
+    assert waterfall["spans"][1]["depth"] == 1
+    assert page.headers["content-type"].startswith("text/html")
+    assert "tool.geocode_nominatim" in page.text
+    assert client.get("/api/debug/traces/unknown").status_code == 404
@@ -15,11 +15,11 @@ BACKEND_ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(BACKEND_ROOT))
 
 
-def build_minimal_app(tmp_path: Path) -> TestClient:
+def build_minimal_app(tmp_path: Path, monkeypatch) -> TestClient:
     """Create a minimal FastAPI app mounting only the upload router and static files."""
     uploads = tmp_path / "uploads"
     uploads.mkdir(parents=True, exist_ok=True)
-    os.environ["LOCAL_UPLOAD_DIR"] = str(uploads)
+    monkeypatch.setenv("LOCAL_UPLOAD_DIR", str(uploads))
 
     # Import after setting env, and reload to pick up overrides even if previously imported
     if "core.config" in sys.modules:
@@ -27,6 +27,13 @@ def build_minimal_app(tmp_path: Path) -> TestClient:
     if "services.storage.file_management" in sys.modules:
         importlib.reload(sys.modules["services.storage.file_management"])  # type: ignore[arg-type]
 
+    # .env.local overrides the environment, so point the modules at tmp_path directly
+    import core.config as cfg
+    import services.storage.file_management as file_management
+
+    monkeypatch.setattr(cfg, "LOCAL_UPLOAD_DIR", str(uploads))
+    monkeypatch.setattr(file_management, "LOCAL_UPLOAD_DIR", str(uploads))
+
     from api.data_management import router as upload_router  # noqa: E402
     from core.config import LOCAL_UPLOAD_DIR  # noqa: E402
 
@@ -38,8 +45,8 @@ def build_minimal_app(tmp_path: Path) -> TestClient:
 
 
 @pytest.fixture
-def client(tmp_path):
-    return build_minimal_app(tmp_path)
+def client(tmp_path, monkeypatch):
+    return build_minimal_app(tmp_path, monkeypatch)
 
 
 def test_small_file_upload_success(client, tmp_path):
@@ -75,7 +82,7 @@ def test_upload_preserves_extension(client):
 
 def test_oversize_upload_rejected(tmp_path, monkeypatch):
     # Build app
-    client = build_minimal_app(tmp_path)
+    client = build_minimal_app(tmp_path, monkeypatch)
     # Monkeypatch MAX_FILE_SIZE to a very small value for this test
     import core.config as cfg
 
@@ -0,0 +1,206 @@
+"""Tests for MVT encoding and the vector tile endpoints."""
+
+import json
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from shapely.geometry import LineString, Point, Polygon
+
+from api import file_streaming, tiles
+from services.tiles import vector_tiles
+from services.tiles.mvt import LayerEncoder, encode_geometry, encode_tile
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def _fields(data):
+    """Decode a protobuf message into (field, value) pairs (varint and bytes only)."""
+    pos, out = 0, []
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire == 1:
+            value, pos = data[pos : pos + 8], pos + 8
+        else:
+            length, pos = _read_varint(data, pos)
+            value, pos = data[pos : pos + length], pos + length
+        out.append((field, value))
+    return out
+
+
+def _packed(data):
+    values, pos = [], 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        values.append(value)
+    return values
+
+
+def _decode_layers(tile):
+    layers = {}
+    for field, layer_bytes in _fields(tile):
+        assert field == 3
+        layer = _fields(layer_bytes)
+        name = next(v for f, v in layer if f == 1).decode()
+        keys = [v.decode() for f, v in layer if f == 3]
+        values = [_fields(v)[0] for f, v in layer if f == 4]
+        features = []
+        for feature_bytes in (v for f, v in layer if f == 2):
+            feature = dict(_fields(feature_bytes))
+            tags = _packed(feature.get(2, b""))
+            props = {}
+            for k, v in zip(tags[::2], tags[1::2]):
+                kind, raw = values[v]
+                props[keys[k]] = raw.decode() if kind == 1 else raw
+            features.append(
+                {
+                    "id": feature.get(1),
+                    "type": feature[3],
+                    "geometry": _packed(feature[4]),
+                    "properties": props,
+                }
+            )
+        layers[name] = features
+    return layers
+
+
+def test_polygon_rings_are_wound_and_closed():
+    # Counter-clockwise in tile coordinates (y down): must be reversed
+    square = Polygon([(0, 0), (0, 10), (10, 10), (10, 0)])
+    feature_type, commands = encode_geometry(square)
+
+    assert feature_type == 3
+    # MoveTo(1) (10,0) / LineTo(3) (0,10) (-10,0) (0,-10) / ClosePath
+    assert commands == [9, 20, 0, 26, 0, 20, 19, 0, 0, 19, 15]
+
+
+def test_geometries_collapsing_on_the_grid_are_dropped():
+    assert encode_geometry(LineString([(1.2, 1.2), (1.4, 1.1)])) is None
+    assert encode_geometry(Polygon([(0, 0), (0.2, 0), (0.2, 0.2)])) is None
+    assert encode_geometry(Point(3, 4)) == (1, [9, 6, 8])
+
+
+def test_layer_encoder_interns_properties():
+    layer = LayerEncoder("roads")
+    layer.add_feature(Point(1, 1), {"kind": "primary", "lanes": 2, "oneway": None}, 7)
+    layer.add_feature(Point(2, 2), {"kind": "primary", "lanes": -1})
+
+    decoded = _decode_layers(encode_tile([layer]))["roads"]
+    assert [feature["id"] for feature in decoded] == [7, None]
+    assert decoded[0]["properties"] == {"kind": "primary", "lanes": 2}
+    # Negative integers use zigzag sint encoding
+    assert decoded[1]["properties"]["lanes"] == 1
+    assert encode_tile([LayerEncoder("empty")]) == b""
+
+
+def _write_layer(path):
+    dense_line = [(8.0 + i * 1e-4, 47.0 + (i % 2) * 1e-5) for i in range(2000)]
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"name": "Lake", "area": 12.5},
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [
+                        [[8.2, 46.9], [8.4, 46.9], [8.4, 47.1], [8.2, 47.1], [8.2, 46.9]]
+                    ],
+                },
+            },
+            {
+                "type": "Feature",
+                "properties": {"name": "Road", "area": None},
+                "geometry": {"type": "LineString", "coordinates": dense_line},
+            },
+        ],
+    }
+    path.write_text(json.dumps(collection), encoding="utf-8")
+
+
+def test_tiles_simplify_per_zoom(tmp_path):
+    path = tmp_path / "layer.geojson"
+    _write_layer(path)
+    source = vector_tiles.TileSource.from_file(path)
+
+    world = _decode_layers(source.render(0, 0, 0))["layer"]
+    assert sorted(feature["properties"]["name"] for feature in world) == ["Lake", "Road"]
+
+    # Tile containing the road at z14 keeps far more vertices than at z4
+    lon, lat = 8.05, 47.0
+    n = 2**14
+    x = int((lon + 180) / 360 * n)
+    y = int((1 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2 * n)
+    detailed = _decode_layers(source.render(14, x, y))["layer"]
+    coarse = _decode_layers(source.render(4, x >> 10, y >> 10))["layer"]
+    road = [f for f in detailed if f["properties"]["name"] == "Road"][0]
+    coarse_road = [f for f in coarse if f["properties"]["name"] == "Road"][0]
+    assert len(road["geometry"]) > 10 * len(coarse_road["geometry"])
+
+    # Far away from the data
+    assert source.render(3, 0, 0) == b""
+
+
+@pytest.fixture
+def tile_client(tmp_path, monkeypatch):
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(file_streaming, "LOCAL_UPLOAD_DIR", str(uploads))
+    service = vector_tiles.VectorTileService(cache_dir=str(tmp_path / "tiles"), max_zoom=18)
+    monkeypatch.setattr(tiles, "get_tile_service", lambda: service)
+    app = FastAPI()
+    app.include_router(tiles.router)
+    return TestClient(app), uploads, service
+
+
+def test_tile_endpoint_renders_and_caches(tile_client, monkeypatch):
+    client, uploads, service = tile_client
+    _write_layer(uploads / "lake.geojson")
+
+    response = client.get("/tiles/lake.geojson/0/0/0.mvt")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert len(_decode_layers(response.content)["lake"]) == 2
+    assert list(service.cache_dir.rglob("0.mvt"))
+    assert client.get("/tiles/lake.geojson/3/0/0.mvt").status_code == 204
+
+    # Served from the disk cache afterwards
+    monkeypatch.setattr(vector_tiles.TileSource, "render", lambda *args: pytest.fail("rendered"))
+    assert client.get("/tiles/lake.geojson/0/0/0.mvt").content == response.content
+    assert client.get("/tiles/lake.geojson/3/0/0.mvt").status_code == 204
+
+
+def test_tile_endpoint_errors(tile_client):
+    client, uploads, _ = tile_client
+    _write_layer(uploads / "lake.geojson")
+    (uploads / "notes.txt").write_text("hello", encoding="utf-8")
+
+    assert client.get("/tiles/missing.geojson/0/0/0.mvt").status_code == 404
+    assert client.get("/tiles/lake.geojson/1/2/0.mvt").status_code == 400
+    assert client.get("/tiles/lake.geojson/19/0/0.mvt").status_code == 400
+    assert client.get("/tiles/notes.txt/0/0/0.mvt").status_code == 422
+
+
+def test_tilejson(tile_client):
+    client, uploads, _ = tile_client
+    _write_layer(uploads / "lake.geojson")
+
+    metadata = client.get("/tiles/lake.geojson/tilejson.json").json()
+    assert metadata["tiles"][0].endswith("/tiles/lake.geojson/{z}/{x}/{y}.mvt")
+    assert metadata["feature_count"] == 2
+    assert metadata["maxzoom"] == 18
+    assert metadata["bounds"] == pytest.approx([8.0, 46.9, 8.4, 47.1], abs=1e-6)
+    assert set(metadata["vector_layers"][0]["fields"]) == {"name", "area"}
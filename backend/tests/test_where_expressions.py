@@ -0,0 +1,229 @@
+import io
+import json
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import Point
+
+from models.geodata import DataOrigin, DataType, GeoDataObject
+from services.storage import file_management, indexed_layers
+from services.tools import attribute_tools
+from services.tools.attributes import ops
+from services.tools.attributes.where import compile_where, parse_where
+
+BASE_URL = "http://testserver"
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "pop": [5.0, np.nan, 50.0, 500.0],
+            "rank": [1, 2, 3, 4],
+            "nullable": pd.array([1, None, 3, 4], dtype="Int64"),
+            "name": ["Oslo", None, "Bergen", "Tromsø"],
+            "mixed": pd.Series(["a", 7, None, "b"], dtype=object),
+            "founded": pd.to_datetime(["1048-01-01", None, "1070-01-01", "1794-01-01"]),
+        }
+    )
+
+
+def _rows(frame, where):
+    mask = compile_where(where).mask(frame)
+    assert isinstance(mask, np.ndarray) and mask.dtype == bool
+    return list(np.flatnonzero(mask))
+
+
+@pytest.mark.parametrize(
+    "where, rows",
+    [
+        ("pop > 10", [2, 3]),
+        ("pop = '50'", [2]),
+        ("pop > 'many'", []),
+        ("rank IN (1, 3.0, '4')", [0, 2]),
+        ("nullable >= 3", [2, 3]),
+        ("name = 'Oslo' OR rank = 4", [0, 3]),
+        ("name > 'C'", [0, 3]),
+        ("name IN ('Oslo', 'Bergen')", [0, 2]),
+        ("name > 5", []),
+        ("mixed = 'a'", [0]),
+        ("mixed > 'a'", []),
+        ("founded > '1060-01-01'", [2, 3]),
+        ("nullable IS NULL OR name IS NULL", [1]),
+        ("NOT (pop > 10) AND pop IS NOT NULL", [0]),
+        ("Pop > 10", [2, 3]),
+    ],
+)
+def test_masks(frame, where, rows):
+    assert _rows(frame, where) == rows
+
+
+def test_missing_values_only_satisfy_not_equal(frame):
+    # Whatever the dtype: numpy floats, nullable integers, strings, objects
+    for field, value in [("pop", "5"), ("nullable", "1"), ("name", "'Oslo'"), ("mixed", "'a'")]:
+        assert 1 in _rows(frame, f"{field} != {value}")
+        assert 1 not in _rows(frame, f"{field} = {value}")
+        assert 1 in _rows(frame, f"NOT {field} = {value}")
+
+
+def test_masks_do_not_modify_the_frame(frame):
+    before = frame.copy()
+    _rows(frame, "nullable IS NULL AND rank > 0")
+    _rows(frame, "NOT nullable IS NULL")
+    pd.testing.assert_frame_equal(frame, before)
+
+
+def test_fuzzy_fields_are_reported(frame):
+    suggestions = {}
+    mask = compile_where("popp > 10 AND NAME IS NOT NULL").mask(frame, suggestions)
+    assert list(np.flatnonzero(mask)) == [2, 3]
+    assert suggestions == {"popp": "pop"}
+    with pytest.raises(ValueError, match="Field 'area' not found"):
+        compile_where("area > 1").mask(frame)
+
+
+def test_expressions_are_parsed_and_compiled_once():
+    parse_where.cache_clear()
+    compile_where.cache_clear()
+
+    first = compile_where("a > 1 and (b in ('x', 'y') or c is not null)")
+    assert compile_where("a > 1 and (b in ('x', 'y') or c is not null)") is first
+    assert parse_where.cache_info().misses == 1
+    assert first.ast == (
+        "and",
+        ("cmp", "a", ">", 1),
+        ("or", ("in", "b", ("x", "y")), ("isnull", "c", True)),
+    )
+    assert first.fields == ["a", "b", "c"]
+    with pytest.raises(ValueError):
+        compile_where("a >")
+
+
+def test_ogr_sql_translation():
+    schema = {"pop": "float64", "name": "object", "kind": "object"}
+
+    sql = compile_where("NOT (pop > 10 OR name != 'Oslo') AND kind IN ('a', 'b')").to_ogr_sql(
+        schema
+    )
+
+    assert sql == (
+        '((NOT (("pop" > 10 AND "pop" IS NOT NULL) OR ("name" <> \'Oslo\' OR "name" IS NULL)))'
+        " AND (\"kind\" IN ('a', 'b') AND \"kind\" IS NOT NULL))"
+    )
+    # Anything OGR could evaluate differently is left to the in-memory mask
+    assert compile_where("Pop > 10").to_ogr_sql(schema) is None
+    assert compile_where("pop > '10'").to_ogr_sql(schema) is None
+    assert compile_where("name IN ('a', 1) OR pop > 1").to_ogr_sql(schema) is None
+
+
+def test_feature_collection_filters_use_the_compiled_engine():
+    fc = {
+        "type": "FeatureCollection",
+        "features": [{"type": "Feature", "properties": {"n": i}} for i in range(5)],
+    }
+    out = ops.filter_where(fc, "n in (1, 2) or not n < 4")
+    assert [f["properties"]["n"] for f in out["features"]] == [1, 2, 4]
+
+
+def test_feature_collection_and_frame_filters_agree_on_missing_values():
+    props = [{"name": "a"}, {"name": None}, {"name": "b"}, {}]
+    fc = {"type": "FeatureCollection", "features": [{"properties": p} for p in props]}
+    frame = pd.DataFrame.from_records(props)
+
+    for where in ("name != 'a'", "not name = 'a'", "name in ('a', 'b')"):
+        out = ops.filter_where(fc, where)
+        expected = compile_where(where).mask(frame)
+        assert [f["properties"] for f in out["features"]] == [
+            p for p, keep in zip(props, expected) if keep
+        ]
+    assert len(ops.filter_where(fc, "name != 'a'")["features"]) == 3
+
+
+@pytest.fixture
+def indexed_upload(tmp_path, monkeypatch):
+    monkeypatch.setattr(indexed_layers, "schedule_indexing", lambda path: False)
+    path = tmp_path / "towns.geojson"
+    gpd.GeoDataFrame(
+        {"name": [f"town {i}" for i in range(100)], "pop": [i * 10.0 for i in range(100)]},
+        geometry=[Point(i, i) for i in range(100)],
+        crs="EPSG:4326",
+    ).to_file(path, driver="GeoJSON")
+    indexed_layers.build_indexed_copy(path)
+    return path
+
+
+def test_read_layer_pushes_filters_into_indexed_reads(indexed_upload):
+    gdf = indexed_layers.read_layer(indexed_upload, where="pop >= 950 OR name = 'town 3'")
+    assert sorted(gdf["name"]) == ["town 3", "town 95", "town 96", "town 97", "town 98", "town 99"]
+
+    # Not translatable: every feature is read and the caller filters
+    assert len(indexed_layers.read_layer(indexed_upload, where="Pop >= 950")) == 100
+    assert len(indexed_layers.read_layer(indexed_upload, where="pop >")) == 100
+
+
+def test_filter_where_reads_only_matching_features(tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    monkeypatch.setattr(file_management, "LOCAL_UPLOAD_DIR", str(upload_dir))
+    monkeypatch.setattr(file_management, "BASE_URL", BASE_URL)
+    monkeypatch.setattr(file_management, "schedule_precompression", lambda path: False)
+    monkeypatch.setattr(file_management, "schedule_indexing", lambda path: False)
+    monkeypatch.setattr(indexed_layers, "schedule_indexing", lambda path: False)
+    monkeypatch.setattr(attribute_tools, "LOCAL_UPLOAD_DIR", str(upload_dir))
+    monkeypatch.setattr(attribute_tools, "BASE_URL", BASE_URL)
+    collection = {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"name": f"town {i}", "pop": i * 10},
+                "geometry": {"type": "Point", "coordinates": [i, i]},
+            }
+            for i in range(50)
+        ],
+    }
+    url, unique_name = file_management.store_file_stream(
+        "towns.geojson", io.BytesIO(json.dumps(collection).encode())
+    )
+    indexed_layers.build_indexed_copy(upload_dir / unique_name)
+    layer = GeoDataObject(
+        id="1",
+        data_source_id="upload",
+        data_type=DataType.UPLOADED,
+        data_origin=DataOrigin.UPLOAD.value,
+        data_source="upload",
+        data_link=url,
+        name="towns",
+    )
+    loaded = []
+    load_gdf = attribute_tools._load_gdf
+
+    def record(link, bbox=None, columns=None, where=None):
+        gdf = load_gdf(link, bbox, columns, where)
+        loaded.append((where, len(gdf)))
+        return gdf
+
+    saved = []
+    monkeypatch.setattr(attribute_tools, "_load_gdf", record)
+    monkeypatch.setattr(
+        attribute_tools,
+        "attribute_plan_from_prompt",
+        lambda *a, **k: {"operation": "filter_where", "params": {"where": "pop > 450"}},
+    )
+    monkeypatch.setattr(attribute_tools, "_get_llm_from_options", lambda state: None)
+    monkeypatch.setattr(attribute_tools, "_generate_smart_layer_name", lambda **k: "Big towns")
+    monkeypatch.setattr(
+        attribute_tools,
+        "_save_gdf_as_geojson",
+        lambda gdf, title, **k: saved.append(gdf) or layer.model_copy(update={"title": title}),
+    )
+
+    command = attribute_tools.attribute_tool.func(
+        state={"messages": [], "geodata_layers": [layer]}, tool_call_id="call-1"
+    )
+
+    assert loaded == [("pop > 450", 4)]
+    assert sorted(saved[0]["pop"]) == [460, 470, 480, 490]
+    assert "out of 50 original features" in command.update["messages"][0].content
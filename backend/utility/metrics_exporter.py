@@ -0,0 +1,282 @@
+"""
+OpenMetrics/Prometheus exposition of agent and server metrics.
+
+Counters and histograms are updated on the request hot path (LLM callbacks,
+tool calls, SSE streaming, vector searches), so updates never take a lock:
+every thread writes to its own shard, and a scrape of ``/metrics`` sums the
+shards. Gauges are computed by a callback at scrape time.
+
+prometheus_client is not a dependency; the exposition format is small enough
+to render here.
+
+Example:
+    >>> TOOL_DURATION_SECONDS.observe(0.42, "geocode_nominatim")
+    >>> text = render()  # OpenMetrics text for the /metrics endpoint
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds (seconds) for latency histograms, from cache hits to slow LLM calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric(ABC):
+    """Base class for a metric family with a fixed set of label names."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelValues, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelValues, Any]:
+        """This thread's shard; only the first update from a thread locks."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard: Dict[LabelValues, Any] = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self) -> List[Dict[LabelValues, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() is atomic, so a shard being written is copied consistently
+        return [shard.copy() for shard in shards]
+
+    def clear(self) -> None:
+        """Reset all values (used by tests)."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+    @abstractmethod
+    def collect(self) -> List[Tuple[str, LabelValues, Sequence[Tuple[str, str]], float]]:
+        """Samples as (suffix, label values, extra labels, value)."""
+
+
+class Counter(_Metric):
+    """Monotonic counter, exposed as ``<name>_total``."""
+
+    type_name = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0.0) + amount
+
+    def value(self, *labelvalues: str) -> float:
+        return sum(shard.get(labelvalues, 0.0) for shard in self._snapshots())
+
+    def collect(self):
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshots():
+            for labelvalues, value in shard.items():
+                totals[labelvalues] = totals.get(labelvalues, 0.0) + value
+        return [("_total", labels, (), value) for labels, value in sorted(totals.items())]
+
+
+class Histogram(_Metric):
+    """Histogram with fixed bucket upper bounds.
+
+    Each shard keeps, per label set, a list of per-bucket counts (the last one
+    for +Inf) followed by the sum of observations.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            counts = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block (or decorated function)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def _merged(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshots():
+            for labelvalues, counts in shard.items():
+                counts = list(counts)
+                total = merged.get(labelvalues)
+                if total is None:
+                    merged[labelvalues] = counts
+                else:
+                    for i, count in enumerate(counts):
+                        total[i] += count
+        return merged
+
+    def count(self, *labelvalues: str) -> int:
+        counts = self._merged().get(labelvalues)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def collect(self):
+        samples = []
+        for labelvalues, counts in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                samples.append(("_bucket", labelvalues, (("le", _format(bound)),), cumulative))
+            samples.append(("_count", labelvalues, (), cumulative))
+            samples.append(("_sum", labelvalues, (), counts[-1]))
+        return samples
+
+
+class CallbackGauge(_Metric):
+    """Gauge whose values are read from ``callback`` at scrape time.
+
+    The callback returns a mapping of label values to the current value.
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        callback: Callable[[], Dict[LabelValues, float]],
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def collect(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.warning(f"Failed to read gauge {self.name}: {e}")
+            return []
+        return [("", labels, (), value) for labels, value in sorted(values.items())]
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return f"{value:.1f}"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _background_queue_depths() -> Dict[LabelValues, float]:
+    from services.background_tasks import get_queue_depths
+
+    return {(priority,): depth for priority, depth in get_queue_depths().items()}
+
+
+TOOL_DURATION_SECONDS = Histogram(
+    "nalamap_tool_duration_seconds", "Duration of agent tool calls.", ["tool"]
+)
+TOOL_CALLS = Counter(
+    "nalamap_tool_calls", "Agent tool calls by outcome (success or error).", ["tool", "status"]
+)
+LLM_DURATION_SECONDS = Histogram(
+    "nalamap_llm_duration_seconds", "Duration of LLM calls.", ["provider", "model"]
+)
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = Histogram(
+    "nalamap_llm_time_to_first_token_seconds",
+    "Time from the start of a streamed LLM call to its first token.",
+    ["provider", "model"],
+)
+LLM_TOKENS = Counter(
+    "nalamap_llm_tokens", "LLM tokens by kind (input or output).", ["provider", "model", "kind"]
+)
+SSE_EVENTS = Counter("nalamap_sse_events", "Server-sent events emitted by type.", ["event"])
+VECTOR_SEARCH_DURATION_SECONDS = Histogram(
+    "nalamap_vector_search_duration_seconds", "Duration of vector-store searches.", ["store"]
+)
+BACKGROUND_TASKS_QUEUED = CallbackGauge(
+    "nalamap_background_tasks_queued",
+    "Tasks waiting for a background thread, by pool priority.",
+    ["priority"],
+    _background_queue_depths,
+)
+
+REGISTRY: List[_Metric] = [
+    TOOL_DURATION_SECONDS,
+    TOOL_CALLS,
+    LLM_DURATION_SECONDS,
+    LLM_TIME_TO_FIRST_TOKEN_SECONDS,
+    LLM_TOKENS,
+    SSE_EVENTS,
+    VECTOR_SEARCH_DURATION_SECONDS,
+    BACKGROUND_TASKS_QUEUED,
+]
+
+
+def render(openmetrics: bool = True) -> str:
+    """Render all registered metrics.
+
+    Args:
+        openmetrics: OpenMetrics 1.0 text if True, else Prometheus text 0.0.4
+
+    Returns:
+        The exposition text
+    """
+    lines = []
+    for metric in REGISTRY:
+        # OpenMetrics names counter families without the _total suffix
+        family = metric.name
+        if metric.type_name == "counter" and not openmetrics:
+            family += "_total"
+        lines.append(f"# HELP {family} {metric.documentation}")
+        lines.append(f"# TYPE {family} {metric.type_name}")
+        for suffix, labelvalues, extra, value in metric.collect():
+            labels = list(zip(metric.labelnames, labelvalues)) + list(extra)
+            label_text = ",".join(f'{name}="{_escape(v)}"' for name, v in labels)
+            label_text = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{metric.name}{suffix}{label_text} {_format(value)}")
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+async def count_sse_events(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Pass SSE chunks through, counting ``event:`` lines and keepalives."""
+    async for chunk in chunks:
+        if chunk.startswith("event: "):
+            SSE_EVENTS.inc(chunk[7:].strip())
+        elif chunk.startswith(": keepalive"):
+            SSE_EVENTS.inc("keepalive")
+        yield chunk
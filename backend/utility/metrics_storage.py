@@ -1,24 +1,157 @@
 """
-In-memory metrics storage for performance monitoring.
+Fixed-memory metrics storage for performance monitoring.
 
 Provides storage, retrieval, and aggregation of historical performance metrics.
+
+Each request's metrics are added to the aggregates of the time bucket it falls
+in (METRICS_BUCKET_SECONDS wide). Buckets live in numpy ring buffers that
+cover ``max_age_hours``: per series a count, sum, minimum and maximum, and for
+response times, LLM times and token counts a DDSketch, so percentiles can be
+merged across buckets. Statistics are computed from the buckets of the
+requested period, so their cost depends on the number of buckets, not of
+requests, and memory does not grow with traffic. The raw entries behind
+``/metrics/recent`` and session-filtered statistics are kept in a ring of at
+most ``max_entries``.
+
+With a database path, entries are also written to SQLite and replayed into
+the buckets at startup.
 """
 
+import json
 import logging
-import statistics
+import math
+import sqlite3
+import threading
 import time
-from collections import defaultdict
+from collections import deque
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from core.config import METRICS_BUCKET_SECONDS, METRICS_DB_PATH
+from utility.quantile_sketch import DDSketch
 
 logger = logging.getLogger(__name__)
 
+# Series with percentiles, and series only summed / averaged
+_DISTRIBUTIONS = ("total_time", "agent_execution", "llm_time", "tokens")
+_COUNTERS = (
+    "llm_calls",
+    "tool_calls",
+    "message_reduction",
+    "errors",
+    "selector_time_ms",
+    "selector_tools",
+    "selector_fallbacks",
+)
+_SERIES = _DISTRIBUTIONS + _COUNTERS
+_SERIES_INDEX = {name: i for i, name in enumerate(_SERIES)}
+
+
+def _observations(metrics: Dict[str, Any]) -> Dict[str, float]:
+    """The series values of one request's metrics (absent series are left out)."""
+    values: Dict[str, float] = {}
+    for name in ("total_time", "agent_execution", "llm_time", "llm_calls", "tool_calls"):
+        if name in metrics:
+            values[name] = metrics[name]
+    if "total" in metrics.get("token_usage", {}):
+        values["tokens"] = metrics["token_usage"]["total"]
+    if "message_reduction" in metrics:
+        values["message_reduction"] = metrics["message_reduction"]
+    if "errors" in metrics:
+        values["errors"] = len(metrics["errors"])
+    selector = metrics.get("tool_selector") or {}
+    if selector.get("total_selections", 0) > 0:
+        values["selector_time_ms"] = selector["avg_selection_time_ms"]
+        values["selector_tools"] = selector["avg_tools_selected"]
+        values["selector_fallbacks"] = selector.get("fallback_count", 0)
+    return values
+
+
+class _Aggregate:
+    """Totals of the requests of one bucket, or of a whole queried period."""
+
+    def __init__(self):
+        self.requests = 0
+        self.first_timestamp = math.inf
+        self.last_timestamp = -math.inf
+        self.count = np.zeros(len(_SERIES), dtype=np.int64)
+        self.total = np.zeros(len(_SERIES))
+        self.minimum = np.full(len(_SERIES), np.inf)
+        self.maximum = np.full(len(_SERIES), -np.inf)
+        self.sketches: Dict[str, DDSketch] = {}
+        # tool -> [calls, total time, min time, max time]
+        self.tool_stats: Dict[str, List[float]] = {}
+        # tool -> [invocations, successes, failures]
+        self.tool_usage: Dict[str, List[int]] = {}
+
+    def add_tools(self, metrics: Dict[str, Any]) -> None:
+        for tool_name, stats in metrics.get("tool_stats", {}).items():
+            calls = stats["calls"]
+            total = stats.get("total_time", stats["avg_time"] * calls)
+            entry = self.tool_stats.setdefault(tool_name, [0, 0.0, math.inf, -math.inf])
+            entry[0] += calls
+            entry[1] += total
+            entry[2] = min(entry[2], stats.get("min_time", stats["avg_time"]))
+            entry[3] = max(entry[3], stats.get("max_time", stats["avg_time"]))
+        for tool_name, usage in metrics.get("tool_usage", {}).items():
+            entry = self.tool_usage.setdefault(tool_name, [0, 0, 0])
+            entry[0] += usage.get("invocations", 0)
+            entry[1] += usage.get("successes", 0)
+            entry[2] += usage.get("failures", 0)
+
+    def add_sketches(self, values: Dict[str, float]) -> None:
+        for name in _DISTRIBUTIONS:
+            if name in values:
+                self.sketches.setdefault(name, DDSketch()).add(values[name])
+
+    def add(self, timestamp: float, metrics: Dict[str, Any]) -> None:
+        """Add one request's metrics."""
+        values = _observations(metrics)
+        self.requests += 1
+        self.first_timestamp = min(self.first_timestamp, timestamp)
+        self.last_timestamp = max(self.last_timestamp, timestamp)
+        for name, value in values.items():
+            i = _SERIES_INDEX[name]
+            self.count[i] += 1
+            self.total[i] += value
+            self.minimum[i] = min(self.minimum[i], value)
+            self.maximum[i] = max(self.maximum[i], value)
+        self.add_sketches(values)
+        self.add_tools(metrics)
+
+    def merge_details(self, other: "_Aggregate") -> None:
+        """Merge the sketches and tool totals of ``other``."""
+        for name, sketch in other.sketches.items():
+            self.sketches.setdefault(name, DDSketch()).merge(sketch)
+        for tool_name, stats in other.tool_stats.items():
+            entry = self.tool_stats.setdefault(tool_name, [0, 0.0, math.inf, -math.inf])
+            entry[0] += stats[0]
+            entry[1] += stats[1]
+            entry[2] = min(entry[2], stats[2])
+            entry[3] = max(entry[3], stats[3])
+        for tool_name, usage in other.tool_usage.items():
+            entry = self.tool_usage.setdefault(tool_name, [0, 0, 0])
+            for i in range(3):
+                entry[i] += usage[i]
+
+    def sum(self, name: str) -> Union[int, float]:
+        total = self.total[_SERIES_INDEX[name]].item()
+        # Counts (calls, tokens, errors) stay integers
+        return int(total) if total.is_integer() else total
+
+    def mean(self, name: str) -> float:
+        i = _SERIES_INDEX[name]
+        return (self.total[i] / self.count[i]).item() if self.count[i] else 0
+
 
 class MetricsStorage:
-    """In-memory storage for performance metrics.
+    """Fixed-memory storage for performance metrics.
 
-    Stores metrics with automatic cleanup of old data.
-    Provides aggregation and statistical analysis.
+    Stores per-bucket aggregates and a bounded ring of raw entries, with
+    automatic expiry of old data. Provides aggregation and statistical analysis.
 
     Example:
         >>> storage = MetricsStorage(max_age_hours=24)
@@ -27,21 +160,88 @@ class MetricsStorage:
         >>> stats = storage.get_statistics(hours=24)
     """
 
-    def __init__(self, max_age_hours: Union[int, float] = 24, max_entries: int = 10000):
+    def __init__(
+        self,
+        max_age_hours: Union[int, float] = 24,
+        max_entries: int = 10000,
+        bucket_seconds: float = METRICS_BUCKET_SECONDS,
+        db_path: Optional[Union[str, Path]] = None,
+    ):
         """Initialize metrics storage.
 
         Args:
             max_age_hours: Maximum age of metrics to keep (hours)
-            max_entries: Maximum number of metric entries to store
+            max_entries: Maximum number of raw metric entries to keep
+            bucket_seconds: Width of the aggregation time buckets
+            db_path: Optional SQLite file to persist entries to
         """
         self.max_age_seconds = max_age_hours * 3600
         self.max_entries = max_entries
-        self._metrics: List[Dict[str, Any]] = []
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = math.ceil(self.max_age_seconds / bucket_seconds) + 1
+        self._lock = threading.Lock()
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max_entries)
+        self._reset_buckets()
         self._last_cleanup = time.time()
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._open_db(Path(db_path))
         logger.info(
-            f"Initialized metrics storage (max_age={max_age_hours}h, max_entries={max_entries})"
+            f"Initialized metrics storage (max_age={max_age_hours}h, max_entries={max_entries}, "
+            f"buckets={self.num_buckets}x{bucket_seconds}s)"
         )
 
+    def _reset_buckets(self) -> None:
+        n, k = self.num_buckets, len(_SERIES)
+        self._bucket_ids = np.full(n, -1, dtype=np.int64)
+        self._requests = np.zeros(n, dtype=np.int64)
+        self._first_timestamp = np.full(n, np.inf)
+        self._last_timestamp = np.full(n, -np.inf)
+        self._count = np.zeros((n, k), dtype=np.int64)
+        self._total = np.zeros((n, k))
+        self._minimum = np.full((n, k), np.inf)
+        self._maximum = np.full((n, k), -np.inf)
+        # Sketches and tool totals per bucket
+        self._details: List[_Aggregate] = [_Aggregate() for _ in range(n)]
+
+    def _slot(self, timestamp: float) -> int:
+        """Ring slot of the bucket of ``timestamp``, cleared if it held an older bucket."""
+        bucket = int(timestamp // self.bucket_seconds)
+        slot = bucket % self.num_buckets
+        if self._bucket_ids[slot] != bucket:
+            self._bucket_ids[slot] = bucket
+            self._requests[slot] = 0
+            self._first_timestamp[slot] = np.inf
+            self._last_timestamp[slot] = -np.inf
+            self._count[slot] = 0
+            self._total[slot] = 0
+            self._minimum[slot] = np.inf
+            self._maximum[slot] = -np.inf
+            self._details[slot] = _Aggregate()
+        return slot
+
+    def _record(self, entry: Dict[str, Any]) -> None:
+        timestamp = entry["timestamp"]
+        metrics = entry["metrics"]
+        self._entries.append(entry)
+
+        slot = self._slot(timestamp)
+        self._requests[slot] += 1
+        self._first_timestamp[slot] = min(self._first_timestamp[slot], timestamp)
+        self._last_timestamp[slot] = max(self._last_timestamp[slot], timestamp)
+        values = _observations(metrics)
+        if values:
+            index = np.fromiter((_SERIES_INDEX[name] for name in values), dtype=np.intp)
+            observed = np.fromiter(values.values(), dtype=np.float64)
+            self._count[slot, index] += 1
+            self._total[slot, index] += observed
+            self._minimum[slot, index] = np.minimum(self._minimum[slot, index], observed)
+            self._maximum[slot, index] = np.maximum(self._maximum[slot, index], observed)
+        details = self._details[slot]
+        details.add_sketches(values)
+        details.add_tools(metrics)
+
     def store(self, session_id: str, metrics: Dict[str, Any]) -> None:
         """Store metrics for a session.
 
@@ -56,33 +256,82 @@ class MetricsStorage:
             "metrics": metrics,
         }
 
-        self._metrics.append(entry)
+        with self._lock:
+            self._record(entry)
+            self._persist(entry)
 
-        # Periodic cleanup
-        if len(self._metrics) > self.max_entries or (time.time() - self._last_cleanup > 3600):
-            self._cleanup()
+            # Periodic cleanup
+            if time.time() - self._last_cleanup > 3600:
+                self._cleanup()
 
         logger.debug(
-            f"Stored metrics for session {session_id} (total entries: {len(self._metrics)})"
+            f"Stored metrics for session {session_id} (total entries: {len(self._entries)})"
         )
 
     def _cleanup(self) -> None:
-        """Remove old metrics entries."""
+        """Remove expired raw entries (buckets expire as the ring wraps around)."""
         cutoff_time = time.time() - self.max_age_seconds
-        original_count = len(self._metrics)
-
-        self._metrics = [m for m in self._metrics if m["timestamp"] > cutoff_time]
-
-        # If still too many, keep only the most recent
-        if len(self._metrics) > self.max_entries:
-            self._metrics = sorted(self._metrics, key=lambda x: x["timestamp"])[-self.max_entries :]
+        removed = 0
+        while self._entries and self._entries[0]["timestamp"] <= cutoff_time:
+            self._entries.popleft()
+            removed += 1
+        if self._db is not None:
+            try:
+                self._db.execute("DELETE FROM request_metrics WHERE timestamp <= ?", (cutoff_time,))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not prune persisted metrics: {e}")
 
-        removed = original_count - len(self._metrics)
         if removed > 0:
             logger.info(f"Cleaned up {removed} old metrics entries")
 
         self._last_cleanup = time.time()
 
+    # ===================================
+    # Persistence
+    # ===================================
+    def _open_db(self, db_path: Path) -> None:
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS request_metrics (
+                    timestamp REAL NOT NULL,
+                    session_id TEXT,
+                    entry TEXT NOT NULL
+                )
+                """)
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS request_metrics_timestamp "
+                "ON request_metrics (timestamp)"
+            )
+            cutoff_time = time.time() - self.max_age_seconds
+            rows = self._db.execute(
+                "SELECT entry FROM request_metrics WHERE timestamp > ? ORDER BY timestamp",
+                (cutoff_time,),
+            )
+            restored = 0
+            for (entry,) in rows:
+                self._record(json.loads(entry))
+                restored += 1
+            logger.info(f"Restored {restored} metrics entries from {db_path}")
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.warning(f"Metrics persistence disabled, could not open {db_path}: {e}")
+            self._db = None
+
+    def _persist(self, entry: Dict[str, Any]) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT INTO request_metrics (timestamp, session_id, entry) VALUES (?, ?, ?)",
+                (entry["timestamp"], entry["session_id"], json.dumps(entry, default=str)),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist metrics entry: {e}")
+
+    # ===================================
+    # Queries
+    # ===================================
     def get_recent(self, hours: int = 1, session_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get recent metrics entries.
 
@@ -94,7 +343,9 @@ class MetricsStorage:
             List of metrics entries
         """
         cutoff_time = time.time() - (hours * 3600)
-        recent = [m for m in self._metrics if m["timestamp"] > cutoff_time]
+        with self._lock:
+            entries = list(self._entries)
+        recent = [m for m in entries if m["timestamp"] > cutoff_time]
 
         if session_id:
             recent = [m for m in recent if m["session_id"] == session_id]
@@ -107,128 +358,111 @@ class MetricsStorage:
         Returns:
             List of all metrics entries
         """
-        return self._metrics.copy()
+        with self._lock:
+            return list(self._entries)
+
+    def _aggregate_buckets(self, hours: Union[int, float]) -> _Aggregate:
+        """Totals of the buckets overlapping the last ``hours``."""
+        current = int(time.time() // self.bucket_seconds)
+        span = math.ceil(hours * 3600 / self.bucket_seconds)
+        oldest = current - min(span, self.num_buckets) + 1
+
+        aggregate = _Aggregate()
+        with self._lock:
+            selected = (self._bucket_ids >= oldest) & (self._bucket_ids <= current)
+            aggregate.requests = int(self._requests[selected].sum())
+            if aggregate.requests == 0:
+                return aggregate
+            aggregate.first_timestamp = float(self._first_timestamp[selected].min())
+            aggregate.last_timestamp = float(self._last_timestamp[selected].max())
+            aggregate.count = self._count[selected].sum(axis=0)
+            aggregate.total = self._total[selected].sum(axis=0)
+            aggregate.minimum = self._minimum[selected].min(axis=0)
+            aggregate.maximum = self._maximum[selected].max(axis=0)
+            for slot in np.flatnonzero(selected):
+                aggregate.merge_details(self._details[slot])
+        return aggregate
+
+    def _aggregate_entries(self, entries: Iterable[Dict[str, Any]]) -> _Aggregate:
+        aggregate = _Aggregate()
+        for entry in entries:
+            aggregate.add(entry["timestamp"], entry["metrics"])
+        return aggregate
 
     def get_statistics(self, hours: int = 24, session_id: Optional[str] = None) -> Dict[str, Any]:
         """Calculate aggregated statistics for recent metrics.
 
         Args:
             hours: Number of hours to analyze
-            session_id: Optional filter by session ID
+            session_id: Optional filter by session ID (computed from the raw
+                entries still kept)
 
         Returns:
             Dictionary with aggregated statistics
         """
-        recent = self.get_recent(hours=hours, session_id=session_id)
+        if session_id:
+            aggregate = self._aggregate_entries(self.get_recent(hours, session_id))
+        else:
+            aggregate = self._aggregate_buckets(hours)
 
-        if not recent:
+        if aggregate.requests == 0:
             return {
                 "period_hours": hours,
                 "total_requests": 0,
                 "error": "No metrics available for this period",
             }
 
-        # Extract metric values
-        total_times = []
-        agent_times = []
-        llm_calls = []
-        llm_times = []
-        tool_calls = []
-        token_totals = []
-        message_reductions = []
-        errors_count = 0
-        tool_stats_all = defaultdict(list)
-        tool_usage_all = defaultdict(lambda: {"invocations": 0, "successes": 0, "failures": 0})
-        tool_selector_metrics = {"selections": [], "tools_selected": [], "fallbacks": 0}
-
-        for entry in recent:
-            m = entry["metrics"]
-
-            if "total_time" in m:
-                total_times.append(m["total_time"])
-            if "agent_execution" in m:
-                agent_times.append(m["agent_execution"])
-            if "llm_calls" in m:
-                llm_calls.append(m["llm_calls"])
-            if "llm_time" in m:
-                llm_times.append(m["llm_time"])
-            if "tool_calls" in m:
-                tool_calls.append(m["tool_calls"])
-            if "token_usage" in m and "total" in m["token_usage"]:
-                token_totals.append(m["token_usage"]["total"])
-            if "message_reduction" in m:
-                message_reductions.append(m["message_reduction"])
-            if "errors" in m:
-                errors_count += len(m["errors"])
-
-            # Tool statistics
-            if "tool_stats" in m:
-                for tool_name, stats in m["tool_stats"].items():
-                    tool_stats_all[tool_name].append(stats)
-
-            # Tool usage tracking (Week 3)
-            if "tool_usage" in m:
-                for tool_name, usage in m["tool_usage"].items():
-                    tool_usage_all[tool_name]["invocations"] += usage.get("invocations", 0)
-                    tool_usage_all[tool_name]["successes"] += usage.get("successes", 0)
-                    tool_usage_all[tool_name]["failures"] += usage.get("failures", 0)
-
-            # Tool selector metrics (Week 3)
-            if "tool_selector" in m:
-                sel = m["tool_selector"]
-                if "total_selections" in sel and sel["total_selections"] > 0:
-                    tool_selector_metrics["selections"].append(sel["avg_selection_time_ms"])
-                    tool_selector_metrics["tools_selected"].append(sel["avg_tools_selected"])
-                    tool_selector_metrics["fallbacks"] += sel.get("fallback_count", 0)
-
-        # Calculate statistics
+        errors_count = int(aggregate.sum("errors"))
         stats = {
             "period_hours": hours,
-            "total_requests": len(recent),
+            "total_requests": aggregate.requests,
             "time_range": {
-                "start": datetime.fromtimestamp(recent[0]["timestamp"]).isoformat(),
-                "end": datetime.fromtimestamp(recent[-1]["timestamp"]).isoformat(),
+                "start": datetime.fromtimestamp(aggregate.first_timestamp).isoformat(),
+                "end": datetime.fromtimestamp(aggregate.last_timestamp).isoformat(),
             },
-            "response_time": self._calculate_stats(total_times, "seconds"),
-            "agent_execution_time": self._calculate_stats(agent_times, "seconds"),
+            "response_time": self._calculate_stats(aggregate, "total_time"),
+            "agent_execution_time": self._calculate_stats(aggregate, "agent_execution"),
             "llm": {
-                "total_calls": sum(llm_calls) if llm_calls else 0,
-                "avg_calls_per_request": (statistics.mean(llm_calls) if llm_calls else 0),
-                "total_time": sum(llm_times) if llm_times else 0,
-                "time_stats": self._calculate_stats(llm_times, "seconds"),
+                "total_calls": aggregate.sum("llm_calls"),
+                "avg_calls_per_request": aggregate.mean("llm_calls"),
+                "total_time": aggregate.sum("llm_time"),
+                "time_stats": self._calculate_stats(aggregate, "llm_time"),
             },
             "tools": {
-                "total_calls": sum(tool_calls) if tool_calls else 0,
-                "avg_calls_per_request": (statistics.mean(tool_calls) if tool_calls else 0),
-                "top_tools": self._get_top_tools(tool_stats_all),
+                "total_calls": aggregate.sum("tool_calls"),
+                "avg_calls_per_request": aggregate.mean("tool_calls"),
+                "top_tools": self._get_top_tools(aggregate.tool_stats),
             },
-            "tool_usage": self._get_tool_usage_stats(tool_usage_all),
-            "tool_selector": self._get_tool_selector_stats(tool_selector_metrics),
+            "tool_usage": self._get_tool_usage_stats(aggregate.tool_usage),
+            "tool_selector": self._get_tool_selector_stats(aggregate),
             "tokens": {
-                "total": sum(token_totals) if token_totals else 0,
-                "avg_per_request": (statistics.mean(token_totals) if token_totals else 0),
-                "stats": self._calculate_stats(token_totals, "tokens"),
+                "total": aggregate.sum("tokens"),
+                "avg_per_request": aggregate.mean("tokens"),
+                "stats": self._calculate_stats(aggregate, "tokens"),
             },
             "message_pruning": {
-                "total_reduction": (sum(message_reductions) if message_reductions else 0),
-                "avg_reduction": (statistics.mean(message_reductions) if message_reductions else 0),
+                "total_reduction": aggregate.sum("message_reduction"),
+                "avg_reduction": aggregate.mean("message_reduction"),
             },
-            "errors": {"total": errors_count, "rate": errors_count / len(recent)},
+            "errors": {"total": errors_count, "rate": errors_count / aggregate.requests},
         }
 
         return stats
 
-    def _calculate_stats(self, values: List[float], unit: str = "") -> Dict[str, float]:
-        """Calculate statistical measures for a list of values.
+    def _calculate_stats(self, aggregate: _Aggregate, name: str) -> Dict[str, float]:
+        """Calculate statistical measures of a series.
 
         Args:
-            values: List of numeric values
-            unit: Optional unit label
+            aggregate: Totals of the analyzed period
+            name: Series name (one of the distributions)
 
         Returns:
-            Dictionary with min, max, avg, median, p50, p95, p99
+            Dictionary with min, max, avg, median, p50, p95, p99 (percentiles
+            within the sketch's relative accuracy)
         """
-        if not values:
+        i = _SERIES_INDEX[name]
+        sketch = aggregate.sketches.get(name)
+        if not aggregate.count[i] or sketch is None:
             return {
                 "min": 0,
                 "max": 0,
@@ -239,26 +473,30 @@ class MetricsStorage:
                 "p99": 0,
             }
 
-        sorted_values = sorted(values)
-        n = len(sorted_values)
+        low = aggregate.minimum[i].item()
+        high = aggregate.maximum[i].item()
+
+        def percentile(q: float) -> float:
+            # Keep estimates within the observed range
+            return round(min(max(sketch.quantile(q), low), high), 3)
 
         return {
-            "min": round(min(values), 3),
-            "max": round(max(values), 3),
-            "avg": round(statistics.mean(values), 3),
-            "median": round(statistics.median(values), 3),
-            "p50": round(sorted_values[int(n * 0.5)], 3),
-            "p95": round(sorted_values[int(n * 0.95)] if n > 1 else max(values), 3),
-            "p99": round(sorted_values[int(n * 0.99)] if n > 1 else max(values), 3),
+            "min": round(low, 3),
+            "max": round(high, 3),
+            "avg": round(aggregate.mean(name), 3),
+            "median": percentile(0.5),
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
         }
 
     def _get_top_tools(
-        self, tool_stats_all: Dict[str, List[Dict]], limit: int = 10
+        self, tool_stats: Dict[str, List[float]], limit: int = 10
     ) -> List[Dict[str, Any]]:
         """Get top tools by call count.
 
         Args:
-            tool_stats_all: Dictionary of tool statistics
+            tool_stats: Tool name -> [calls, total time, min time, max time]
             limit: Maximum number of tools to return
 
         Returns:
@@ -266,18 +504,13 @@ class MetricsStorage:
         """
         top_tools = []
 
-        for tool_name, stats_list in tool_stats_all.items():
-            total_calls = sum(s["calls"] for s in stats_list)
-            all_times = []
-            for s in stats_list:
-                all_times.extend([s["avg_time"]] * s["calls"])
-
+        for tool_name, (calls, total_time, min_time, max_time) in tool_stats.items():
             tool_info = {
                 "name": tool_name,
-                "total_calls": total_calls,
-                "avg_time": round(statistics.mean(all_times), 3) if all_times else 0,
-                "min_time": round(min(all_times), 3) if all_times else 0,
-                "max_time": round(max(all_times), 3) if all_times else 0,
+                "total_calls": calls,
+                "avg_time": round(total_time / calls, 3) if calls else 0,
+                "min_time": round(min_time, 3) if calls else 0,
+                "max_time": round(max_time, 3) if calls else 0,
             }
             top_tools.append(tool_info)
 
@@ -286,18 +519,18 @@ class MetricsStorage:
         return top_tools[:limit]
 
     def _get_tool_usage_stats(
-        self, tool_usage_all: Dict[str, Dict[str, int]], limit: int = 20
+        self, tool_usage: Dict[str, List[int]], limit: int = 20
     ) -> Dict[str, Any]:
         """Get tool usage statistics (Week 3 - Tool Usage Analytics).
 
         Args:
-            tool_usage_all: Aggregated tool usage data
+            tool_usage: Tool name -> [invocations, successes, failures]
             limit: Maximum number of tools to return
 
         Returns:
             Dictionary with tool usage statistics
         """
-        if not tool_usage_all:
+        if not tool_usage:
             return {
                 "top_tools": [],
                 "total_invocations": 0,
@@ -305,9 +538,9 @@ class MetricsStorage:
             }
 
         # Calculate total invocations and success rate
-        total_invocations = sum(t["invocations"] for t in tool_usage_all.values())
-        total_successes = sum(t["successes"] for t in tool_usage_all.values())
-        total_failures = sum(t["failures"] for t in tool_usage_all.values())
+        total_invocations = sum(t[0] for t in tool_usage.values())
+        total_successes = sum(t[1] for t in tool_usage.values())
+        total_failures = sum(t[2] for t in tool_usage.values())
 
         success_rate = (
             round(total_successes / total_invocations, 3) if total_invocations > 0 else 0.0
@@ -315,15 +548,14 @@ class MetricsStorage:
 
         # Build top tools list
         top_tools = []
-        for tool_name, usage in tool_usage_all.items():
-            inv = usage["invocations"]
-            tool_success_rate = round(usage["successes"] / inv, 3) if inv > 0 else 0.0
+        for tool_name, (inv, successes, failures) in tool_usage.items():
+            tool_success_rate = round(successes / inv, 3) if inv > 0 else 0.0
             top_tools.append(
                 {
                     "name": tool_name,
                     "invocations": inv,
-                    "successes": usage["successes"],
-                    "failures": usage["failures"],
+                    "successes": successes,
+                    "failures": failures,
                     "success_rate": tool_success_rate,
                 }
             )
@@ -339,16 +571,17 @@ class MetricsStorage:
             "success_rate": success_rate,
         }
 
-    def _get_tool_selector_stats(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+    def _get_tool_selector_stats(self, aggregate: _Aggregate) -> Dict[str, Any]:
         """Get tool selector statistics (Week 3 - Performance Monitoring).
 
         Args:
-            metrics: Tool selector metrics data
+            aggregate: Totals of the analyzed period
 
         Returns:
             Dictionary with tool selector statistics
         """
-        if not metrics["selections"]:
+        selections = int(aggregate.count[_SERIES_INDEX["selector_time_ms"]])
+        if not selections:
             return {
                 "enabled": False,
                 "avg_selection_time_ms": 0.0,
@@ -357,31 +590,35 @@ class MetricsStorage:
                 "fallback_rate": 0.0,
             }
 
+        fallbacks = int(aggregate.sum("selector_fallbacks"))
         return {
             "enabled": True,
-            "avg_selection_time_ms": round(statistics.mean(metrics["selections"]), 2),
-            "avg_tools_selected": round(statistics.mean(metrics["tools_selected"]), 2),
-            "fallback_count": metrics["fallbacks"],
-            "fallback_rate": (
-                round(metrics["fallbacks"] / len(metrics["selections"]), 3)
-                if metrics["selections"]
-                else 0.0
-            ),
+            "avg_selection_time_ms": round(aggregate.mean("selector_time_ms"), 2),
+            "avg_tools_selected": round(aggregate.mean("selector_tools"), 2),
+            "fallback_count": fallbacks,
+            "fallback_rate": round(fallbacks / selections, 3),
         }
 
     def clear(self) -> None:
         """Clear all stored metrics."""
-        count = len(self._metrics)
-        self._metrics = []
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._reset_buckets()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM request_metrics")
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not clear persisted metrics: {e}")
         logger.info(f"Cleared {count} metrics entries")
 
     def get_count(self) -> int:
-        """Get current number of stored metrics entries.
+        """Get current number of stored raw metrics entries.
 
         Returns:
             Number of entries
         """
-        return len(self._metrics)
+        return len(self._entries)
 
 
 # Global storage instance
@@ -396,5 +633,5 @@ def get_metrics_storage() -> MetricsStorage:
     """
     global _storage
     if _storage is None:
-        _storage = MetricsStorage(max_age_hours=24, max_entries=10000)
+        _storage = MetricsStorage(max_age_hours=24, max_entries=10000, db_path=METRICS_DB_PATH)
     return _storage
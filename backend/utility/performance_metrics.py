@@ -7,12 +7,57 @@ through both manual tracking and LangChain callback handlers.
 
 import logging
 import time
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
 
 from langchain.callbacks.base import BaseCallbackHandler
 
+from utility.metrics_exporter import (
+    LLM_DURATION_SECONDS,
+    LLM_TIME_TO_FIRST_TOKEN_SECONDS,
+    LLM_TOKENS,
+    TOOL_CALLS,
+    TOOL_DURATION_SECONDS,
+)
+
 logger = logging.getLogger(__name__)
 
+# Label used for providers/models that are not in the configured list
+OTHER_LABEL = "other"
+
+# LangChain's ls_provider values that differ from our provider names
+_PROVIDER_ALIASES = {"google_genai": "google", "google_vertexai": "google", "azure_openai": "azure"}
+
+
+@lru_cache(maxsize=1)
+def _configured_llm_labels() -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """Return the provider names and model names that may appear as metric labels."""
+    from services.ai.provider_interface import get_all_providers
+
+    providers = get_all_providers()
+    models = {model.name for info in providers.values() for model in info.models}
+    return frozenset(providers), frozenset(models)
+
+
+def _llm_labels(metadata: Dict[str, Any]) -> Tuple[str, str]:
+    """Map LangChain's ls_provider/ls_model_name onto bounded metric labels.
+
+    Both values come from the caller, so anything that is not a configured
+    provider or model is folded into ``"other"``.
+    """
+    try:
+        providers, models = _configured_llm_labels()
+    except Exception as e:
+        logger.debug(f"Could not load configured LLM providers: {e}")
+        providers, models = frozenset(), frozenset()
+    provider = str(metadata.get("ls_provider", "")).lower()
+    provider = _PROVIDER_ALIASES.get(provider, provider)
+    model = str(metadata.get("ls_model_name", ""))
+    return (
+        provider if provider in providers else OTHER_LABEL,
+        model if model in models else OTHER_LABEL,
+    )
+
 
 class PerformanceMetrics:
     """Track performance metrics for agent execution.
@@ -105,6 +150,9 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
     - Tool execution timing (per tool)
     - Token usage (input/output/total)
 
+    LLM and tool latencies, time to first token and token counts are also
+    exported per provider/model and per tool on the ``/metrics`` endpoint.
+
     Works with both LangChain and LangGraph agents.
 
     Example:
@@ -127,6 +175,10 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
         }
         self._llm_start_time: Optional[float] = None
         self._tool_start_times: Dict[str, float] = {}
+        # run_id -> (start, provider, model, first token seen) for exported metrics
+        self._llm_runs: Dict[Any, list] = {}
+        # run_id -> (tool name, start) for exported metrics
+        self._tool_runs: Dict[Any, tuple] = {}
 
     def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
         """Called when LLM starts.
@@ -139,6 +191,21 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
         self._llm_start_time = time.time()
         self.metrics["llm_calls"] += 1
 
+        provider, model = _llm_labels(kwargs.get("metadata") or {})
+        self._llm_runs[kwargs.get("run_id")] = [time.perf_counter(), provider, model, False]
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        """Called for each streamed token; records the time to the first one.
+
+        Args:
+            token: The new token
+            **kwargs: Additional arguments
+        """
+        run = self._llm_runs.get(kwargs.get("run_id"))
+        if run and not run[3]:
+            run[3] = True
+            LLM_TIME_TO_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - run[0], run[1], run[2])
+
     def on_llm_end(self, response: Any, **kwargs: Any) -> None:
         """Called when LLM finishes.
 
@@ -153,30 +220,31 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
             self.metrics["llm_time"] += duration
             self._llm_start_time = None
 
-        # Extract token usage from response
-        if hasattr(response, "llm_output") and response.llm_output:
-            token_usage = response.llm_output.get("token_usage", {})
-            if token_usage:
-                self.metrics["token_usage"]["input"] += token_usage.get("prompt_tokens", 0)
-                self.metrics["token_usage"]["output"] += token_usage.get("completion_tokens", 0)
-                self.metrics["token_usage"]["total"] += token_usage.get("total_tokens", 0)
+        run = self._llm_runs.pop(kwargs.get("run_id"), None)
+        if run:
+            LLM_DURATION_SECONDS.observe(time.perf_counter() - run[0], run[1], run[2])
 
-        # Also try to get from generations if available
+        # Collect token usage from the response and from generations if available
+        usages = []
+        if hasattr(response, "llm_output") and response.llm_output:
+            usages.append(response.llm_output.get("token_usage", {}))
         if hasattr(response, "generations") and response.generations:
             for gen_list in response.generations:
                 for gen in gen_list:
                     if hasattr(gen, "generation_info") and gen.generation_info:
-                        token_usage = gen.generation_info.get("token_usage", {})
-                        if token_usage:
-                            self.metrics["token_usage"]["input"] += token_usage.get(
-                                "prompt_tokens", 0
-                            )
-                            self.metrics["token_usage"]["output"] += token_usage.get(
-                                "completion_tokens", 0
-                            )
-                            self.metrics["token_usage"]["total"] += token_usage.get(
-                                "total_tokens", 0
-                            )
+                        usages.append(gen.generation_info.get("token_usage", {}))
+
+        for token_usage in usages:
+            if not token_usage:
+                continue
+            input_tokens = token_usage.get("prompt_tokens", 0)
+            output_tokens = token_usage.get("completion_tokens", 0)
+            self.metrics["token_usage"]["input"] += input_tokens
+            self.metrics["token_usage"]["output"] += output_tokens
+            self.metrics["token_usage"]["total"] += token_usage.get("total_tokens", 0)
+            if run:
+                LLM_TOKENS.inc(run[1], run[2], "input", amount=input_tokens)
+                LLM_TOKENS.inc(run[1], run[2], "output", amount=output_tokens)
 
     def on_llm_error(self, error: Exception, **kwargs: Any) -> None:
         """Called when LLM encounters an error.
@@ -189,6 +257,10 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
         if self._llm_start_time:
             self._llm_start_time = None
 
+        run = self._llm_runs.pop(kwargs.get("run_id"), None)
+        if run:
+            LLM_DURATION_SECONDS.observe(time.perf_counter() - run[0], run[1], run[2])
+
     def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
         """Called when tool execution starts.
 
@@ -199,6 +271,7 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
         """
         tool_name = serialized.get("name", "unknown")
         self._tool_start_times[tool_name] = time.time()
+        self._tool_runs[kwargs.get("run_id")] = (tool_name, time.perf_counter())
         self.metrics["tool_calls"] += 1
 
         # Track tool usage count
@@ -217,6 +290,8 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
             output: Tool output
             **kwargs: Additional arguments
         """
+        self._export_tool_call("success", kwargs)
+
         # Try to get tool name from kwargs or use last started tool
         tool_name = kwargs.get("name")
         if not tool_name and self._tool_start_times:
@@ -242,6 +317,8 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
             error: The error that occurred
             **kwargs: Additional arguments
         """
+        self._export_tool_call("error", kwargs)
+
         tool_name = kwargs.get("name", "unknown")
         self.metrics["errors"].append({"type": "tool", "tool": tool_name, "error": str(error)})
 
@@ -253,6 +330,14 @@ class PerformanceCallbackHandler(BaseCallbackHandler):
         if tool_name in self._tool_start_times:
             del self._tool_start_times[tool_name]
 
+    def _export_tool_call(self, status: str, kwargs: Dict[str, Any]) -> None:
+        """Export the duration and outcome of the tool run in ``kwargs``."""
+        run = self._tool_runs.pop(kwargs.get("run_id"), None)
+        if run:
+            tool_name, start = run
+            TOOL_DURATION_SECONDS.observe(time.perf_counter() - start, tool_name)
+            TOOL_CALLS.inc(tool_name, status)
+
     def get_metrics(self) -> Dict[str, Any]:
         """Get all collected metrics.
 
@@ -0,0 +1,77 @@
+"""
+Mergeable quantile sketch for latency and size distributions.
+
+A DDSketch (Masson, Rim and Lee, VLDB 2019) counts values in logarithmic bins
+whose width grows with the value, so every quantile it reports is within a
+fixed relative error of the exact one, whatever the distribution. Sketches of
+different periods merge by adding their bin counts, which lets metrics be
+aggregated per time bucket and combined at query time.
+"""
+
+import math
+from typing import Dict, Optional
+
+# Values at or below this are counted as zero (times and counts are not negative)
+MIN_INDEXABLE_VALUE = 1e-9
+
+
+class DDSketch:
+    """Quantile sketch with a relative accuracy guarantee.
+
+    Example:
+        >>> sketch = DDSketch()
+        >>> for value in (0.2, 0.4, 1.5):
+        ...     sketch.add(value)
+        >>> round(sketch.quantile(0.5), 2)
+        0.4
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """Initialize an empty sketch.
+
+        Args:
+            relative_accuracy: Maximum relative error of reported quantiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add ``value`` (``count`` times)."""
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.count += count
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add the values of ``other`` (a sketch with the same accuracy)."""
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value at quantile ``q`` (0-1), or None if the sketch is empty.
+
+        Like indexing the sorted values at ``int(q * count)``, within the
+        relative accuracy.
+        """
+        if self.count == 0:
+            return None
+        rank = min(int(q * self.count), self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                # Midpoint (in relative terms) of the bin (gamma^(key-1), gamma^key]
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
@@ -0,0 +1,485 @@
+"""
+Request tracing with OpenTelemetry-compatible spans.
+
+A sampled request opens a root span with ``start_trace``; code on its path
+adds child spans with ``span``/``traced`` (planning, message preparation,
+tool selection, tool and LLM calls via ``TracingCallbackHandler``, HTTP
+calls, layer loading, vector searches). The current span travels in a
+context variable, so asyncio tasks and LangChain's tool threads inherit it.
+Outside a sampled trace, ``span`` costs a single context variable lookup.
+
+Finished traces are kept in memory for the debug trace viewer, and are
+exported from a background thread to a JSON-lines file (TRACE_FILE_PATH)
+and/or an OTLP/HTTP collector (OTEL_EXPORTER_OTLP_TRACES_ENDPOINT) in the
+OTLP JSON encoding. The opentelemetry SDK is not a dependency.
+
+Example:
+    >>> with start_trace("chat.stream", session_id="abc"):
+    ...     with span("plan.create"):
+    ...         pass
+    >>> get_recent_traces()[0]["name"]
+    'chat.stream'
+"""
+
+import functools
+import inspect
+import json
+import logging
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+from core.config import (
+    OTEL_EXPORTER_OTLP_TRACES_ENDPOINT,
+    OTEL_SERVICE_NAME,
+    TRACE_BUFFER_SIZE,
+    TRACE_FILE_PATH,
+    TRACE_SAMPLE_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# OTLP enum values
+SPAN_KINDS = {"INTERNAL": 1, "SERVER": 2, "CLIENT": 3}
+STATUS_CODES = {"UNSET": 0, "OK": 1, "ERROR": 2}
+
+
+@dataclass
+class Span:
+    """One timed operation of a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    kind: str = "INTERNAL"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time_ns: int = field(default_factory=time.time_ns)
+    end_time_ns: Optional[int] = None
+    status: str = "UNSET"
+    status_message: str = ""
+    parent: Optional["Span"] = field(default=None, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.status = "ERROR"
+        self.status_message = str(error)[:500]
+        self.attributes["exception.type"] = type(error).__name__
+
+    def end(self) -> None:
+        if self.end_time_ns is None:
+            self.end_time_ns = time.time_ns()
+            _tracer.on_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": self.start_time_ns,
+            "endTimeUnixNano": self.end_time_ns,
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("nalamap_current_span", default=None)
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans: List[Dict[str, Any]], service_name: str) -> Dict[str, Any]:
+    """Encode finished spans (``Span.to_dict``) as an OTLP/JSON export request."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "nalamap"},
+                        "spans": [
+                            {
+                                "traceId": s["traceId"],
+                                "spanId": s["spanId"],
+                                "parentSpanId": s["parentSpanId"] or "",
+                                "name": s["name"],
+                                "kind": SPAN_KINDS[s["kind"]],
+                                "startTimeUnixNano": str(s["startTimeUnixNano"]),
+                                "endTimeUnixNano": str(s["endTimeUnixNano"]),
+                                "attributes": [
+                                    {"key": key, "value": _otlp_value(value)}
+                                    for key, value in s["attributes"].items()
+                                ],
+                                "status": {
+                                    "code": STATUS_CODES[s["status"]["code"]],
+                                    "message": s["status"]["message"],
+                                },
+                            }
+                            for s in spans
+                        ],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class Tracer:
+    """Collects the spans of sampled traces and hands finished traces to sinks."""
+
+    def __init__(
+        self,
+        sample_rate: float = TRACE_SAMPLE_RATE,
+        buffer_size: int = TRACE_BUFFER_SIZE,
+        file_path: str = TRACE_FILE_PATH,
+        otlp_endpoint: str = OTEL_EXPORTER_OTLP_TRACES_ENDPOINT,
+        service_name: str = OTEL_SERVICE_NAME,
+    ):
+        self.sample_rate = sample_rate
+        self.buffer_size = buffer_size
+        self.file_path = file_path
+        self.otlp_endpoint = otlp_endpoint
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        # trace_id -> finished spans, until the root span ends
+        self._open: Dict[str, List[Dict[str, Any]]] = {}
+        self._recent: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._export_queue: "queue.Queue[List[Dict[str, Any]]]" = queue.Queue(maxsize=1000)
+        self._exporter: Optional[threading.Thread] = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def on_start(self, span: Span) -> None:
+        if span.parent_span_id is None:
+            with self._lock:
+                self._open[span.trace_id] = []
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            spans = self._open.get(span.trace_id)
+            if spans is None:
+                # Ended after its root span: the trace was already exported
+                return
+            spans.append(span.to_dict())
+            if span.parent_span_id is not None:
+                return
+            del self._open[span.trace_id]
+            self._recent[span.trace_id] = spans
+            while len(self._recent) > self.buffer_size:
+                self._recent.popitem(last=False)
+        if self.file_path or self.otlp_endpoint:
+            self._export(spans)
+
+    def _export(self, spans: List[Dict[str, Any]]) -> None:
+        if self._exporter is None:
+            with self._lock:
+                if self._exporter is None:
+                    self._exporter = threading.Thread(
+                        target=self._export_loop, name="trace-exporter", daemon=True
+                    )
+                    self._exporter.start()
+        try:
+            self._export_queue.put_nowait(spans)
+        except queue.Full:
+            logger.warning("Trace export queue is full, dropping trace")
+
+    def _export_loop(self) -> None:
+        while True:
+            spans = self._export_queue.get()
+            try:
+                self.write(spans)
+            except Exception as e:
+                logger.warning(f"Failed to export trace: {e}")
+
+    def write(self, spans: List[Dict[str, Any]]) -> None:
+        """Send one finished trace to the configured sinks."""
+        if self.file_path:
+            path = Path(self.file_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(
+                    json.dumps({"traceId": spans[-1]["traceId"], "spans": spans}, default=str)
+                    + "\n"
+                )
+        if self.otlp_endpoint:
+            import httpx
+
+            response = httpx.post(
+                self.otlp_endpoint, json=to_otlp(spans, self.service_name), timeout=5
+            )
+            response.raise_for_status()
+
+    def recent(self) -> List[List[Dict[str, Any]]]:
+        with self._lock:
+            return list(self._recent.values())
+
+    def get(self, trace_id: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            return self._recent.get(trace_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._open.clear()
+            self._recent.clear()
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the global tracer instance."""
+    return _tracer
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of the current context, if it is being traced."""
+    return _current_span.get()
+
+
+def start_span(
+    name: str, kind: str = "INTERNAL", parent: Optional[Span] = None, **attributes: Any
+) -> Span:
+    """Open a span under ``parent`` without making it current; call ``end()``."""
+    span = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else _new_id(128),
+        span_id=_new_id(64),
+        parent_span_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=attributes,
+        parent=parent,
+    )
+    _tracer.on_start(span)
+    return span
+
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.record_error(e)
+        raise
+    finally:
+        span.end()
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Exited in another context (e.g. an async generator closed elsewhere)
+            pass
+
+
+@contextmanager
+def start_trace(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Start a new trace if this request is sampled (a child span inside a trace).
+
+    Yields the root span, or None if the request is not traced.
+    """
+    parent = _current_span.get()
+    if parent is None and not _tracer.should_sample():
+        yield None
+        return
+    with _activate(start_span(name, "SERVER" if parent is None else "INTERNAL", parent)) as s:
+        s.attributes.update(attributes)
+        yield s
+
+
+@contextmanager
+def span(name: str, kind: str = "INTERNAL", **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time the ``with`` block as a child of the current span.
+
+    Yields the span, or None (doing nothing) outside a traced request.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _activate(start_span(name, kind, parent, **attributes)) as s:
+        yield s
+
+
+def traced(name: str, kind: str = "INTERNAL") -> Callable:
+    """Decorator recording each call of a sync or async function as a span."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, kind):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def trace_stream(
+    chunks: AsyncIterator[str], name: str, **attributes: Any
+) -> AsyncIterator[str]:
+    """Pass a streamed response through, tracing its production as one trace.
+
+    The chunks' generator runs in this context, so spans it opens are children
+    of the trace's root span.
+    """
+    with start_trace(name, **attributes):
+        async for chunk in chunks:
+            yield chunk
+
+
+def callbacks() -> List[BaseCallbackHandler]:
+    """LangChain callbacks to add to an agent run (none outside a traced request)."""
+    return [TracingCallbackHandler()] if _current_span.get() is not None else []
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Record LLM and tool runs of a LangChain/LangGraph agent as spans.
+
+    A tool's span becomes the current span while the tool runs, so HTTP calls
+    and layer loads inside the tool are nested under it.
+    """
+
+    # Run in the caller's context so the current span reaches the tool
+    run_inline = True
+
+    def __init__(self):
+        super().__init__()
+        self._spans: Dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: str, kind: str = "INTERNAL", **attributes) -> None:
+        parent = _current_span.get()
+        if parent is None:
+            return
+        span = start_span(name, kind, parent, **attributes)
+        self._spans[run_id] = span
+        _current_span.set(span)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None) -> Optional[Span]:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return None
+        if error is not None:
+            span.record_error(error)
+        span.end()
+        if _current_span.get() is span:
+            _current_span.set(span.parent)
+        return span
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        metadata = kwargs.get("metadata") or {}
+        self._start(
+            kwargs["run_id"],
+            "llm.call",
+            "CLIENT",
+            **{
+                "gen_ai.system": str(metadata.get("ls_provider", "unknown")),
+                "gen_ai.request.model": str(metadata.get("ls_model_name", "unknown")),
+            },
+        )
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        span = self._end(kwargs["run_id"])
+        usage = (getattr(response, "llm_output", None) or {}).get("token_usage") or {}
+        if span is not None and usage:
+            span.set_attribute("gen_ai.usage.input_tokens", usage.get("prompt_tokens", 0))
+            span.set_attribute("gen_ai.usage.output_tokens", usage.get("completion_tokens", 0))
+
+    def on_llm_error(self, error: BaseException, **kwargs: Any) -> None:
+        self._end(kwargs["run_id"], error)
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, **kwargs: Any) -> None:
+        tool_name = serialized.get("name", "unknown")
+        self._start(kwargs["run_id"], f"tool.{tool_name}", tool=tool_name)
+
+    def on_tool_end(self, output: Any, **kwargs: Any) -> None:
+        self._end(kwargs["run_id"])
+
+    def on_tool_error(self, error: BaseException, **kwargs: Any) -> None:
+        self._end(kwargs["run_id"], error)
+
+
+def get_recent_traces() -> List[Dict[str, Any]]:
+    """Summaries of the sampled traces kept in memory, newest first."""
+    summaries = []
+    for spans in reversed(_tracer.recent()):
+        root = spans[-1]
+        summaries.append(
+            {
+                "trace_id": root["traceId"],
+                "name": root["name"],
+                "start_time": root["startTimeUnixNano"] / 1e9,
+                "duration_ms": (root["endTimeUnixNano"] - root["startTimeUnixNano"]) / 1e6,
+                "span_count": len(spans),
+                "status": root["status"]["code"],
+                "attributes": root["attributes"],
+            }
+        )
+    return summaries
+
+
+def get_trace_waterfall(trace_id: str) -> Optional[List[Dict[str, Any]]]:
+    """The spans of a kept trace in start order, with offsets and nesting depth.
+
+    Returns:
+        List of span dicts with ``offset_ms``, ``duration_ms`` and ``depth``
+        added, or None if the trace is not (or no longer) kept
+    """
+    spans = _tracer.get(trace_id)
+    if spans is None:
+        return None
+    root = spans[-1]
+    by_id = {s["spanId"]: s for s in spans}
+
+    def depth(s: Dict[str, Any]) -> int:
+        d = 0
+        while s["parentSpanId"] in by_id:
+            s = by_id[s["parentSpanId"]]
+            d += 1
+        return d
+
+    return [
+        {
+            **s,
+            "offset_ms": (s["startTimeUnixNano"] - root["startTimeUnixNano"]) / 1e6,
+            "duration_ms": (s["endTimeUnixNano"] - s["startTimeUnixNano"]) / 1e6,
+            "depth": depth(s),
+        }
+        for s in sorted(spans, key=lambda s: s["startTimeUnixNano"])
+    ]